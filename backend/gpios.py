@@ -1,31 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from threading import Thread
+from threading import Thread, Lock, Timer, Event, current_thread
+from types import MappingProxyType
 import logging
 import time
-import uptime
 
-# pylint: disable=no-name-in-module
-from RPi.GPIO import (
-    LOW as GPIO_LOW,
-    HIGH as GPIO_HIGH,
-    BOARD as GPIO_BOARD,
-    OUT as GPIO_OUT,
-    IN as GPIO_IN,
-    PUD_DOWN as GPIO_PUD_DOWN,
-    RPI_INFO as GPIO_RPI_INFO,
-)
-
-# pylint: disable=no-name-in-module
-from RPi.GPIO import (
-    cleanup as GPIO_cleanup,
-    setup as GPIO_setup,
-    input as GPIO_input,
-    output as GPIO_output,
-    setmode as GPIO_setmode,
-    setwarnings as GPIO_setwarnings,
-)
 from cleep.exception import (
     InvalidParameter,
     Unauthorized,
@@ -33,100 +13,393 @@ from cleep.exception import (
     CommandError,
 )
 from cleep.core import CleepModule
+from cleep.libs.internals.task import Task
+from .gpiosbackend import (
+    LOW as GPIO_LOW,
+    HIGH as GPIO_HIGH,
+    OUT as GPIO_OUT,
+    IN as GPIO_IN,
+    PUD_DOWN as GPIO_PUD_DOWN,
+    RISING as GPIO_RISING,
+    FALLING as GPIO_FALLING,
+    GpioRpiBackend,
+    GpioChardevBackend,
+    GpioMmapBackend,
+    GpioSimulatedBackend,
+)
+from .gpioslineeventwatcher import GpioLineEventWatcher
+from .gpiosdebouncer import GpioDebouncer
+from .gpiospulsecounter import GpioPulseCounter
+from .gpiosemissionpolicy import GpioEmissionPolicy
+from .gpiosdevicesindex import GpioDevicesIndex
+from .gpiospwm import GpioSoftwarePwm, GpioHardwarePwm
+from .gpiostimerwheel import GpioTimerWheel
+from .gpioshistory import GpioEdgeHistory
+from .gpioslatency import GpioLatencyStats
+from .gpiosinputstate import GpioInputState
+from .gpiosinputrecord import GpioInputRecord
+from .gpiosdispatcher import GpioCallbackDispatcher
+from .gpiosgesture import GpioGestureDetector
 
 __all__ = ["Gpios"]
 
 
 class GpioInputWatcher(Thread):
     """
-    Class that watches for changes on specified input pin
+    Class that samples all watched input pins from a single thread
     We don't use GPIO lib implemented threaded callback due to a bug when executing a timer within callback function.
 
+    Inputs are stored in a compact table (one slotted GpioInputRecord per input) that is replaced (copy-on-write)
+    each time an input is added or removed, so registering or unregistering an input never spawns nor kills a thread.
+    Each input is debounced by its own GpioDebouncer state machine so sampling never stops.
+    Watcher waits for next sampling on an event, so stopping it or adding an input takes effect
+    immediately, and removing an input waits for the sampling in progress so no callback is
+    triggered for a removed input once it returns.
+
+    Callbacks receive the monotonic timestamp of the debounced edge, or None for the callback
+    sending input initial value (it is not an edge).
+
+    Pulse counters can't be fed at high rate by polling, so they rely on backend edge detection whose
+    callback only increments the counter.
+
     Note:
         This object doesn't configure pin!
     """
 
-    DEBOUNCE = 0.20
+    DEBOUNCE = GpioDebouncer.DEBOUNCE
+    STABLE_TIME = GpioDebouncer.STABLE_TIME
+    REARM_TIME = GpioDebouncer.REARM_TIME
+    POLL_PERIOD = 0.125
 
-    def __init__(self, pin, uuid, on_callback, off_callback, level=GPIO_LOW):
+    def __init__(self, on_callback, off_callback, backend=None):
         """
         Constructor
 
         Args:
-            pin (int): gpio pin number
-            uuid (str): device uuid
-            on_callback (function): on callback
-            off_callback (function): off callback
-            level (RPi.GPIO.LOW|RPi.GPIO.HIGH): triggered level
+            on_callback (function): on callback called with (uuid, timestamp)
+            off_callback (function): off callback called with (uuid, duration, timestamp)
+            backend (GpioBackend): gpios backend
         """
         # init
         Thread.__init__(self)
-        Thread.daemon = True
+        self.daemon = True
         self.logger = logging.getLogger("Gpios")
         # self.logger.setLevel(logging.DEBUG)
-        self.uuid = uuid
 
         # members
         self.continu = True
-        self.pin = pin
-        self.level = level
         self.debounce = GpioInputWatcher.DEBOUNCE
+        self.stable_time = GpioInputWatcher.STABLE_TIME
+        self.rearm_time = GpioInputWatcher.REARM_TIME
+        self.poll_period = GpioInputWatcher.POLL_PERIOD
         self.on_callback = on_callback
         self.off_callback = off_callback
+        self.backend = backend
+        self._inputs = ()
+        self._inputs_lock = Lock()
+        self._sampling_lock = Lock()
+        self._wakeup = Event()
+        self._counters = {}
+
+        # health metrics
+        self.loops = 0
+        self.overruns = 0
+        self.cpu_time = 0.0
+        self.last_alive = None
+
+        # (sampling tick, tick timestamp, bitmask of debounced high levels by pin number)
+        self.snapshot = (0, None, 0)
 
     def stop(self):
         """
         Stop process
         """
         self.continu = False
+        self._wakeup.set()
+
+    def get_snapshot(self):
+        """
+        Return debounced levels of all watched inputs at last sampling tick
+
+        Returns:
+            tuple: (sampling tick number, tick monotonic timestamp, levels bitmask with bit N set
+                   if input on pin N is high)
+        """
+        return self.snapshot
+
+    def add_input(
+        self, pin, uuid, level=GPIO_LOW, history=None, latency=None, state=None
+    ):
+        """
+        Add input to watch. If input is already watched it is replaced
+
+        Args:
+            pin (int): gpio pin number
+            uuid (str): device uuid
+            level (RPi.GPIO.LOW|RPi.GPIO.HIGH): triggered level
+            history (GpioEdgeHistory): history fed with input debounced transitions
+            latency (GpioLatencyStats): stats fed with detection delay and callback duration
+            state (GpioInputState): live input state updated on debounced transitions
+        """
+        record = GpioInputRecord(uuid, pin, None, None, history, latency, state, level=level)
+        with self._inputs_lock:
+            inputs = [entry for entry in self._inputs if entry.uuid != uuid]
+            inputs.append(record)
+            self._inputs = tuple(inputs)
+
+        # sample new input now
+        self._wakeup.set()
+
+    def add_counter(self, pin, uuid, counter, level=GPIO_HIGH):
+        """
+        Add pulse counter input. If input is already watched it is replaced
+
+        Args:
+            pin (int): gpio pin number
+            uuid (str): device uuid
+            counter (GpioPulseCounter): counter to feed
+            level (RPi.GPIO.LOW|RPi.GPIO.HIGH): level reached by counted edges (HIGH for rising edges)
+        """
+        self.remove_input(uuid)
+
+        with self._inputs_lock:
+            self._counters[uuid] = pin
+        self._add_event_detect(
+            pin,
+            GPIO_RISING if level == GPIO_HIGH else GPIO_FALLING,
+            lambda channel: counter.add_edge(time.monotonic()),
+        )
+
+    def remove_input(self, uuid):
+        """
+        Remove watched input or pulse counter
+
+        Args:
+            uuid (str): device uuid
+
+        Returns:
+            bool: True if input was watched, False otherwise
+        """
+        with self._inputs_lock:
+            inputs = tuple(entry for entry in self._inputs if entry.uuid != uuid)
+            removed = len(inputs) != len(self._inputs)
+            self._inputs = inputs
+            counter_pin = self._counters.pop(uuid, None)
+
+        if removed and current_thread() is not self:
+            # wait for sampling in progress that may still use removed input
+            with self._sampling_lock:
+                pass
+
+        if counter_pin is not None:
+            self._remove_event_detect(counter_pin)
+            removed = True
+
+        return removed
+
+    def has_input(self, uuid):
+        """
+        Return True if input is watched
+
+        Args:
+            uuid (str): device uuid
+
+        Returns:
+            bool: True if input is watched
+        """
+        return uuid in self._counters or any(
+            entry.uuid == uuid for entry in self._inputs
+        )
+
+    def get_inputs(self):
+        """
+        Return watched inputs
+
+        Returns:
+            list: list of watched devices uuids
+        """
+        return [entry.uuid for entry in self._inputs] + list(self._counters.keys())
+
+    def _get_inputs_levels(self, pins):  # pragma: no cover
+        """
+        Return inputs values. All inputs are read in a single backend call so backends reading
+        a whole gpio bank at once sample all inputs with a single read
+
+        Args:
+            pins (list): gpio pins numbers
+
+        Returns:
+            list: inputs levels (GPIO_HIGH | GPIO_LOW)
+        """
+        return self.backend.inputs(pins)
+
+    def _add_event_detect(self, pin, edge, callback):  # pragma: no cover
+        """
+        Enable edge detection on specified pin
+
+        Args:
+            pin (int): gpio pin number
+            edge (GPIO_RISING|GPIO_FALLING): detected edge
+            callback (function): function called on each detected edge
+        """
+        self.backend.add_event_detect(pin, edge, callback)
+
+    def _remove_event_detect(self, pin):  # pragma: no cover
+        """
+        Disable edge detection on specified pin
+
+        Args:
+            pin (int): gpio pin number
+        """
+        self.backend.remove_event_detect(pin)
+
+    def get_debounce_stats(self):
+        """
+        Return debounce counters of watched inputs
+
+        Returns:
+            dict: debounce counters by device uuid::
+
+                {
+                    uuid (str): {
+                        bounces (int): number of edges detected inside debounce window
+                        glitches (int): number of level changes shorter than stable time
+                        pending (bool): True if a level change is waiting to be accepted
+                    },
+                    ...
+                }
 
-    def _get_input_level(self):  # pragma: no cover
         """
-        Return input value
+        stats = {}
+        for entry in self._inputs:
+            debouncer = entry.debouncer
+            stats[entry.uuid] = {
+                "bounces": debouncer.bounces if debouncer else 0,
+                "glitches": debouncer.glitches if debouncer else 0,
+                "pending": debouncer.is_pending() if debouncer else False,
+            }
+        return stats
+
+    def get_health(self):
+        """
+        Return sampler health metrics
 
         Returns:
-            (RPi.GPIO.HIGH | RPi.GPIO.LOW): input level
+            dict: health metrics::
+
+                {
+                    loops (int): number of sampling loops
+                    overruns (int): number of sampling loops longer than poll period
+                    bounces (int): number of transitions detected inside debounce window
+                    cputime (float): sampler thread CPU time (seconds)
+                    lastalive (float): timestamp of last sampling loop (None if never run)
+                }
+
+        """
+        last_alive = self.last_alive
+        return {
+            "loops": self.loops,
+            "overruns": self.overruns,
+            "bounces": sum(
+                entry.debouncer.bounces
+                for entry in self._inputs
+                if entry.debouncer is not None
+            ),
+            "cputime": self.cpu_time,
+            "lastalive": (
+                None
+                if last_alive is None
+                else time.time() - (time.monotonic() - last_alive)
+            ),
+        }
+
+    def _sample_input(self, record, level, now):
+        """
+        Debounce input sample and trigger callbacks on debounced level changes
+
+        Args:
+            record (GpioInputRecord): input record
+            level (GPIO_HIGH | GPIO_LOW): sampled input level
+            now (float): sampling timestamp
         """
-        return GPIO_input(self.pin)
+        debouncer = record.debouncer
+
+        if debouncer is None:
+            # first iteration, send initial value
+            record.debouncer = GpioDebouncer(
+                level, now, self.debounce, self.stable_time, self.rearm_time
+            )
+            if record.history is not None:
+                record.history.add(now, level)
+            if record.state is not None:
+                record.state.update(level, level == record.level, now)
+            if record.level == GPIO_LOW:
+                self.off_callback(record.uuid, 0, None)
+            else:
+                self.on_callback(record.uuid, None)
+
+        elif debouncer.update(level, now):
+            if record.history is not None:
+                record.history.add(debouncer.timestamp, debouncer.level)
+            if record.state is not None:
+                record.state.update(
+                    debouncer.level,
+                    debouncer.level == record.level,
+                    debouncer.timestamp,
+                )
+            start = time.monotonic()
+            if debouncer.level == record.level:
+                self.logger.trace("Input %s on", record.pin)
+                record.time_on = debouncer.timestamp
+                self.on_callback(record.uuid, debouncer.timestamp)
+            else:
+                self.logger.trace("Input %s off", record.pin)
+                duration = debouncer.timestamp - record.time_on if record.time_on else 0
+                self.off_callback(record.uuid, duration, debouncer.timestamp)
+            if record.latency is not None:
+                record.latency.detection.add(max(0.0, start - debouncer.timestamp))
+                record.latency.callback.add(time.monotonic() - start)
 
     def run(self):
         """
         Run watcher
         """
-        last_level = None
-        time_on = 0
-
-        # send current level
         try:
             while self.continu:
-                # get level
-                level = self._get_input_level()
-
-                if last_level is None:
-                    # first iteration, send initial value
-                    if self.level == GPIO_LOW:
-                        self.off_callback(self.uuid, 0)
-                    else:
-                        self.on_callback(self.uuid)
-
-                elif level != last_level and level == self.level:
-                    self.logger.trace("Input %s on" % str(self.pin))
-                    time_on = uptime.uptime()
-                    self.on_callback(self.uuid)
-                    time.sleep(self.debounce)
-
-                elif level != last_level:
-                    self.logger.trace("Input %s off" % str(self.pin))
-                    self.off_callback(self.uuid, uptime.uptime() - time_on)
-                    time.sleep(self.debounce)
-
-                else:
-                    time.sleep(0.125)
-
-                # update last level
-                last_level = level
-        except Exception:  # pragma: no cover
-            self.logger.exception("Exception in GpioInputWatcher:")
+                self._wakeup.clear()
+                with self._sampling_lock:
+                    now = time.monotonic()
+                    inputs = self._inputs
+                    pins = [record.pin for record in inputs]
+                    try:
+                        levels = self._get_inputs_levels(pins)
+                    except Exception:  # pragma: no cover
+                        self.logger.exception(
+                            "Exception reading inputs in GpioInputWatcher:"
+                        )
+                        levels = ()
+                    mask = 0
+                    for record, level in zip(inputs, levels):
+                        try:
+                            self._sample_input(record, level, now)
+                            if record.debouncer.level:
+                                mask |= 1 << record.pin
+                        except Exception:  # pragma: no cover
+                            self.logger.exception(
+                                "Exception in GpioInputWatcher for pin %s:" % record.pin
+                            )
+
+                # update health metrics and snapshot
+                self.loops += 1
+                self.snapshot = (self.loops, now, mask)
+                self.last_alive = now
+                self.cpu_time = time.thread_time()
+                if time.monotonic() - now > self.poll_period:
+                    self.overruns += 1
+
+                self._wakeup.wait(self.poll_period)
+        except Exception:
+            self.logger.exception("GpioInputWatcher stopped unexpectedly:")
 
 
 # RASPI GPIO numbering scheme:
@@ -180,6 +453,15 @@ class Gpios(CleepModule):
     MODULE_URLBUGS = "https://github.com/tangb/cleepmod-gpios/issues"
 
     MODULE_CONFIG_FILE = "gpios.conf"
+    DEFAULT_CONFIG = {
+        "input_backend": "polling",
+        "persist_delay": 10.0,
+        "history_size": GpioEdgeHistory.SIZE,
+        "gpio_backend": "rpigpio",
+        "dispatch_queue_size": GpioCallbackDispatcher.QUEUE_SIZE,
+        "dispatch_workers": GpioCallbackDispatcher.WORKERS,
+        "dispatch_overflow": GpioCallbackDispatcher.OVERFLOW_DROP_OLDEST,
+    }
 
     GPIOS_REV1 = {
         "GPIO0": 3,
@@ -334,9 +616,35 @@ class Gpios(CleepModule):
     MODE_INPUT = "input"
     MODE_OUTPUT = "output"
     MODE_RESERVED = "reserved"
+    MODE_COUNTER = "counter"
+    MODE_PWM = "pwm"
+
+    COUNTER_INTERVAL = 10.0
+    PWM_FREQUENCY = 100.0
+
+    INPUT_BACKEND_POLLING = "polling"
+    INPUT_BACKEND_CHARDEV = "chardev"
+
+    GPIO_BACKENDS = {
+        GpioRpiBackend.NAME: GpioRpiBackend,
+        GpioChardevBackend.NAME: GpioChardevBackend,
+        GpioMmapBackend.NAME: GpioMmapBackend,
+        GpioSimulatedBackend.NAME: GpioSimulatedBackend,
+    }
 
     INPUT_DROP_THRESHOLD = 0.150  # in ms
 
+    HISTORY_MAX_SIZE = 65536
+
+    DISPATCH_MAX_QUEUE_SIZE = 65536
+    DISPATCH_MAX_WORKERS = 8
+
+    WATCHDOG_INTERVAL = 5.0
+    # delay before retrying a failed output states save when persist delay is 0
+    PERSIST_RETRY_DELAY = 10.0
+    # max time waiting for threads to stop
+    STOP_TIMEOUT = 2.0
+
     def __init__(self, bootstrap, debug_enabled):
         """
         Constructor
@@ -348,19 +656,85 @@ class Gpios(CleepModule):
         CleepModule.__init__(self, bootstrap, debug_enabled)
 
         # members
-        self._input_watchers = {}
+        self._backend = None
+        self._input_watcher = None
+        self._dispatcher = None
+        self._watchdog_task = None
+        self._watcher_restarts = 0
+        self._counters = {}
+        self._counters_task = None
+        self._emission_policies = {}
+        self._histories = {}
+        self._latencies = {}
+        self._input_states = {}
+        # runtime records of watched inputs used by input callbacks
+        self._input_records = {}
+        self._devices_index = GpioDevicesIndex(self.MODE_RESERVED)
+        self._revision = None
+        self._gpio_pins = MappingProxyType({})
+        self._pin_labels = MappingProxyType({})
+        self._pin_gpios = MappingProxyType({})
+        # pin: GPION bit in levels bitmasks
+        self._pin_bits = MappingProxyType({})
+        self._pins_number = 0
+        self._pins_usage_lock = Lock()
+        # bitmask of written output levels (bit N for GPION)
+        self._outputs_levels = 0
+        self._outputs_lock = Lock()
+        self._pins_usage = {}
+        self._pins_usage_version = 0
+        self._software_pwm = None
+        self._pwms = {}
+        self._timer_wheel = None
+        self._pulses = {}
+        self._persist_lock = Lock()
+        self._flush_lock = Lock()
+        self._persist_states = {}
+        self._persist_changes = 0
+        self._persist_timer = None
+        self._persist_stats = {
+            "changes": 0,
+            "flushes": 0,
+            "coalesced": 0,
+            "lastlatency": 0.0,
+            "maxlatency": 0.0,
+        }
 
         # events
         self.gpios_gpio_off = self._get_event("gpios.gpio.off")
         self.gpios_gpio_on = self._get_event("gpios.gpio.on")
+        self.gpios_gpio_counter = self._get_event("gpios.gpio.counter")
+        self.gpios_outputs_update = self._get_event("gpios.outputs.update")
+        self.gpios_gpio_pwm = self._get_event("gpios.gpio.pwm")
+        self.gpios_gpio_gesture = self._get_event("gpios.gpio.gesture")
 
     def _configure(self):
         """
         Configure application
         """
+        # index configured devices (used to build pins usage cache)
+        self._devices_index.rebuild(CleepModule.get_module_devices(self))
+
         # configure raspberry pi
-        GPIO_setmode(GPIO_BOARD)
-        GPIO_setwarnings(False)
+        self._backend = self.__create_backend()
+        self._detect_board()
+        self._backend.set_board(self._gpio_pins)
+
+        # start input callbacks dispatcher
+        self._dispatcher = self.__create_dispatcher()
+        self._dispatcher.start()
+
+        # start input watcher and its watchdog
+        self._input_watcher = self.__create_input_watcher()
+        self._input_watcher.start()
+        self._watchdog_task = Task(
+            self.WATCHDOG_INTERVAL, self._check_input_watcher, self.logger
+        )
+        self._watchdog_task.start()
+
+        # start scheduled actions timer wheel
+        self._timer_wheel = GpioTimerWheel()
+        self._timer_wheel.start()
 
     def _on_start(self):
         """
@@ -375,12 +749,132 @@ class Gpios(CleepModule):
         """
         Stop application
         """
-        # stop input watchers
-        for uuid in self._input_watchers:
-            self._input_watchers[uuid].stop()
+        # stop input watcher
+        if self._watchdog_task:
+            self._watchdog_task.stop()
+        if self._input_watcher:
+            self._input_watcher.stop()
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
+        if self._counters_task:
+            self._counters_task.stop()
+        if self._timer_wheel is not None:
+            self._timer_wheel.stop()
+
+        # stop pwms
+        for pwm in self._pwms.values():
+            if pwm["hardware"]:
+                pwm["hardware"].stop()
+        if self._software_pwm:
+            self._software_pwm.stop()
+
+        # wait for threads to stop before releasing gpios
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        threads = (
+            self._input_watcher,
+            self._dispatcher,
+            self._timer_wheel,
+            self._software_pwm,
+        )
+        for thread in threads:
+            if thread is None or not thread.is_alive():
+                continue
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                self.logger.warning(
+                    "%s thread still running after %ss"
+                    % (thread.__class__.__name__, self.STOP_TIMEOUT)
+                )
+
+        # save pending output states
+        self._flush_states()
 
         # cleanup gpios
-        GPIO_cleanup()
+        self._backend.cleanup()
+
+    def __create_backend(self):
+        """
+        Create gpios backend according to configured gpio backend. RPi.GPIO backend is used as
+        fallback if configured backend cannot be used.
+
+        Returns:
+            GpioBackend: gpios backend instance
+        """
+        name = self._get_config_field("gpio_backend")
+        if name in self.GPIO_BACKENDS and name != GpioRpiBackend.NAME:
+            try:
+                return self.GPIO_BACKENDS[name]()
+            except Exception:
+                self.logger.exception(
+                    'Unable to use "%s" gpio backend, fallback to RPi.GPIO backend' % name
+                )
+
+        return GpioRpiBackend()
+
+    def __create_input_watcher(self):
+        """
+        Create input watcher according to configured input backend. Polling watcher is used as
+        fallback if gpio character device cannot be used, or if its lines are already held by
+        chardev gpio backend (kernel rejects line events request on a requested line).
+
+        Returns:
+            GpioInputWatcher|GpioLineEventWatcher: input watcher instance
+        """
+        input_backend = self._get_config_field("input_backend")
+        if input_backend == self.INPUT_BACKEND_CHARDEV and isinstance(
+            self._backend, GpioChardevBackend
+        ):
+            self.logger.warning(
+                "Gpio lines are held by chardev gpio backend, use polling input watcher"
+            )
+        elif input_backend == self.INPUT_BACKEND_CHARDEV:
+            try:
+                lines = {
+                    pin: int(gpio.replace("GPIO", ""))
+                    for gpio, pin in self._gpio_pins.items()
+                }
+                return GpioLineEventWatcher(
+                    self.__dispatch_input_on, self.__dispatch_input_off, lines
+                )
+            except Exception:
+                self.logger.exception(
+                    "Unable to use gpio character device, fallback to polling input watcher"
+                )
+
+        return GpioInputWatcher(
+            self.__dispatch_input_on, self.__dispatch_input_off, self._backend
+        )
+
+    def __create_dispatcher(self):
+        """
+        Create input callbacks dispatcher according to configured dispatch policy
+
+        Returns:
+            GpioCallbackDispatcher: dispatcher instance
+        """
+        return GpioCallbackDispatcher(
+            self._get_config_field("dispatch_queue_size"),
+            self._get_config_field("dispatch_workers"),
+            self._get_config_field("dispatch_overflow"),
+        )
+
+    def _check_input_watcher(self):
+        """
+        Restart input watcher if its thread died, registering again all watched inputs
+        """
+        if self._input_watcher is None or self._input_watcher.is_alive():
+            return
+
+        self.logger.error("Input watcher thread died, restart it")
+        self._watcher_restarts += 1
+        loops = self._input_watcher.loops
+        self._input_watcher = self.__create_input_watcher()
+        # keep snapshots sequence increasing
+        self._input_watcher.loops = loops
+        self._input_watcher.start()
+        for device in self.get_module_devices().values():
+            if device["mode"] in (self.MODE_INPUT, self.MODE_COUNTER):
+                self.__launch_input_watcher(device)
 
     def _gpio_setup(
         self, pin, mode, initial=None, pull_up_down=None
@@ -394,12 +888,9 @@ class Gpios(CleepModule):
             initial (?): ?
             pull_up_mode (?): ?
         """
-        if initial is None and pull_up_down is None:
-            GPIO_setup(pin, mode)
-        elif initial is None:
-            GPIO_setup(pin, mode, pull_up_down=pull_up_down)
-        elif pull_up_down is None:
-            GPIO_setup(pin, mode, initial=initial)
+        self._backend.setup(pin, mode, initial=initial, pull_up_down=pull_up_down)
+        if mode == GPIO_OUT:
+            self.__set_outputs_levels([pin], [initial])
 
     def _gpio_output(self, pin, level):
         """
@@ -409,37 +900,207 @@ class Gpios(CleepModule):
             pin (int): pin number
             level (int): RPi.GPIO.LOW or RPi.GPIO.HIGH
         """
-        GPIO_output(pin, level)
+        self._backend.output(pin, level)
+        self.__set_outputs_levels([pin], [level])
+
+    def _gpio_outputs(self, pins, levels):
+        """
+        Set many gpios output levels at once
+
+        Args:
+            pins (list): list of pin numbers
+            levels (list): list of levels (RPi.GPIO.LOW or RPi.GPIO.HIGH), one per pin
+        """
+        self._backend.output(pins, levels)
+        self.__set_outputs_levels(pins, levels)
+
+    def __set_outputs_levels(self, pins, levels):
+        """
+        Update written output levels bitmask
+
+        Args:
+            pins (list): list of pin numbers
+            levels (list): list of levels, one per pin
+        """
+        with self._outputs_lock:
+            mask = self._outputs_levels
+            for pin, level in zip(pins, levels):
+                if level == GPIO_HIGH:
+                    mask |= self._pin_bits[pin]
+                else:
+                    mask &= ~self._pin_bits[pin]
+            self._outputs_levels = mask
+
+    def __persist_states(self, states):
+        """
+        Mark kept output states as dirty. They are saved all at once after configured
+        persist delay (or immediately if delay is 0) and when application stops.
+
+        Args:
+            states (dict): output states by device uuid::
+
+                {
+                    uuid (str): {
+                        field (str): value (any): device field to save ("on", "dutycycle"...)
+                        ...
+                    }
+                }
+
+        """
+        delay = self._get_config_field("persist_delay")
+        with self._persist_lock:
+            for device_uuid, fields in states.items():
+                self._persist_states.setdefault(device_uuid, {}).update(fields)
+            self._persist_changes += len(states)
+            self._persist_stats["changes"] += len(states)
+            if delay > 0 and self._persist_timer is None:
+                self.__schedule_flush(delay)
+
+        if delay <= 0:
+            self._flush_states()
+
+    def __schedule_flush(self, delay):
+        """
+        Schedule dirty output states flush (persist lock must be acquired)
+
+        Args:
+            delay (float): delay before flush (seconds)
+        """
+        self._persist_timer = Timer(delay, self._flush_states)
+        self._persist_timer.daemon = True
+        self._persist_timer.start()
+
+    def _flush_states(self):
+        """
+        Save dirty output states in a single config write
+
+        Returns:
+            bool: True if states saved (or nothing to save), False otherwise
+        """
+        with self._flush_lock:
+            with self._persist_lock:
+                if self._persist_timer:
+                    self._persist_timer.cancel()
+                    self._persist_timer = None
+                states = {
+                    device_uuid: dict(fields)
+                    for device_uuid, fields in self._persist_states.items()
+                }
+                changes = self._persist_changes
+                self._persist_changes = 0
+
+            saved = True
+            if states:
+                start = time.monotonic()
+                devices = self._get_config()["devices"]
+                for device_uuid, fields in states.items():
+                    if device_uuid in devices:
+                        devices[device_uuid].update(fields)
+                saved = self._update_config({"devices": devices})
+                latency = time.monotonic() - start
+
+            with self._persist_lock:
+                if not saved:
+                    self.logger.error("Unable to save outputs states %s" % states)
+                    self._persist_changes += changes
+                    # retry later, states stay dirty
+                    if self._persist_timer is None:
+                        self.__schedule_flush(
+                            self._get_config_field("persist_delay")
+                            or self.PERSIST_RETRY_DELAY
+                        )
+                    return False
+
+                # states changed during write are kept dirty for next flush
+                for device_uuid, fields in states.items():
+                    if self._persist_states.get(device_uuid) == fields:
+                        del self._persist_states[device_uuid]
+                if states:
+                    self._persist_stats["flushes"] += 1
+                    self._persist_stats["lastlatency"] = latency
+                    self._persist_stats["maxlatency"] = max(
+                        latency, self._persist_stats["maxlatency"]
+                    )
+                self._persist_stats["coalesced"] += changes - (1 if states else 0)
+
+        return True
 
     def __launch_input_watcher(self, device):
         """
-        Launch input watcher for specified device
+        Register specified device input in input watcher
 
         Args:
             device (dict): device data
         """
         self.logger.debug(
-            'Launch input watcher for device "%s" (inverted=%s)'
+            'Watch input for device "%s" (inverted=%s)'
             % (device["uuid"], device["inverted"])
         )
-        if not device["inverted"]:
-            watcher = GpioInputWatcher(
+        if device["mode"] == self.MODE_COUNTER:
+            # keep existing counter when input watcher is restarted
+            existing = self._counters.get(device["uuid"])
+            counter = existing["counter"] if existing else GpioPulseCounter()
+            self._counters[device["uuid"]] = {
+                "counter": counter,
+                "gpio": device["gpio"],
+                "interval": device["interval"],
+                "next_publish": time.monotonic() + device["interval"],
+            }
+            self._input_watcher.add_counter(
                 device["pin"],
                 device["uuid"],
-                self.__input_on_callback,
-                self.__input_off_callback,
-                GPIO_LOW,
+                counter,
+                GPIO_LOW if device["inverted"] else GPIO_HIGH,
             )
-        else:
-            watcher = GpioInputWatcher(
-                device["pin"],
+            self.__restart_counters_task()
+            return
+
+        policy = None
+        if device.get("max_rate") or device.get("window"):
+            policy = GpioEmissionPolicy(
+                device.get("max_rate") or 0, device.get("window") or 0
+            )
+            self._emission_policies[device["uuid"]] = policy
+        history = self._histories.get(device["uuid"])
+        if history is None:
+            history = GpioEdgeHistory(self._get_config_field("history_size"))
+            self._histories[device["uuid"]] = history
+        latency = self._latencies.setdefault(device["uuid"], GpioLatencyStats())
+        state = self._input_states.setdefault(device["uuid"], GpioInputState())
+        gesture = None
+        if device.get("long_press") or device.get("click_interval"):
+            gesture = GpioGestureDetector(
                 device["uuid"],
-                self.__input_on_callback,
-                self.__input_off_callback,
-                GPIO_HIGH,
+                self._timer_wheel,
+                self.__send_gesture_event,
+                device.get("long_press") or 0,
+                device.get("click_interval") or 0,
+                device.get("hold_repeat") or 0,
             )
-        self._input_watchers[device["uuid"]] = watcher
-        watcher.start()
+        record = GpioInputRecord(
+            device["uuid"],
+            device["pin"],
+            device["gpio"],
+            device["inverted"],
+            history,
+            latency,
+            state,
+            policy,
+            gesture,
+            GPIO_HIGH if device["inverted"] else GPIO_LOW,
+        )
+        previous = self._input_records.get(device["uuid"])
+        if previous is not None and previous.gesture is not None:
+            previous.gesture.cancel()
+        self._input_records[device["uuid"]] = record
+        self._input_watcher.add_input(
+            record.pin,
+            record.uuid,
+            record.level,
+            record.history,
+            record.latency,
+            record.state,
+        )
 
     def _configure_gpio(self, device):
         """
@@ -500,7 +1161,7 @@ class Gpios(CleepModule):
                         device_id=device["uuid"],
                     )
 
-            elif device["mode"] == self.MODE_INPUT:
+            elif device["mode"] in (self.MODE_INPUT, self.MODE_COUNTER):
                 if not device["inverted"]:
                     self.logger.debug(
                         "Configure gpio %s (pin %s) as INPUT"
@@ -518,6 +1179,9 @@ class Gpios(CleepModule):
                 # and launch input watcher
                 self.__launch_input_watcher(device)
 
+            elif device["mode"] == self.MODE_PWM:
+                self.__start_pwm(device)
+
             return True
 
         except Exception:
@@ -534,6 +1198,17 @@ class Gpios(CleepModule):
         Returns:
             True if gpio reconfigured successfully, False otherwise
         """
+        if device["mode"] == self.MODE_PWM:
+            if device["uuid"] in self._pwms:
+                # keep pwm running with its current duty cycle, only levels may change
+                self.__set_pwm_levels(device)
+            else:
+                self.__start_pwm(device)
+            return True
+        if device["mode"] not in (self.MODE_INPUT, self.MODE_COUNTER):
+            # only inputs are watched
+            return True
+
         # stop watcher
         if self._deconfigure_gpio(device):
             # launch new watcher
@@ -554,580 +1229,2187 @@ class Gpios(CleepModule):
         if device["mode"] == self.MODE_OUTPUT:
             # nothing to deconfigure for output
             return True
-
-        # get watcher
-        if device["uuid"] not in self._input_watchers:
+        if device["mode"] == self.MODE_PWM:
+            return self.__stop_pwm(device)
+
+        # stop watching input
+        policy = self._emission_policies.pop(device["uuid"], None)
+        if policy is not None and self._timer_wheel is not None:
+            self._timer_wheel.cancel_group(policy)
+        if device["uuid"] in self._counters:
+            del self._counters[device["uuid"]]
+            self.__restart_counters_task()
+        removed = self._input_watcher.remove_input(device["uuid"])
+        record = self._input_records.pop(device["uuid"], None)
+        if record is not None and record.gesture is not None:
+            record.gesture.cancel()
+        if not removed:
             self.logger.debug('No gpio watcher found for device "%s"' % device)
             return False
 
-        # stop and launch again watcher
-        self._input_watchers[device["uuid"]].stop()
-        del self._input_watchers[device["uuid"]]
-
         return True
 
-    def __input_on_callback(self, device_uuid):
+    def __start_pwm(self, device):
         """
-        Callback when input is turned on (internal use)
+        Start device pwm, using hardware pwm channel if pin supports it and channel is free,
+        shared software pwm engine otherwise
 
         Args:
-            device_uuid (string): device uuid
+            device (dict): device data
         """
-        self.logger.debug("on_callback for gpio %s triggered" % device_uuid)
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise Exception('Device "%s" not found' % device_uuid)
+        duty_cycle = device["dutycycle"] if device["keep"] else 0
+        pwm = {
+            "pin": device["pin"],
+            "frequency": device["frequency"],
+            "dutycycle": duty_cycle,
+            "activelevel": GPIO_HIGH if device["inverted"] else GPIO_LOW,
+            "inactivelevel": GPIO_LOW if device["inverted"] else GPIO_HIGH,
+            "hardware": None,
+        }
 
-        # broadcast event
-        self.gpios_gpio_on.send(
-            params={"gpio": device["gpio"], "init": False}, device_id=device_uuid
-        )
+        channel = GpioHardwarePwm.get_channel(device["pin"])
+        used_channels = [
+            other["hardware"].channel
+            for other in self._pwms.values()
+            if other["hardware"]
+        ]
+        if channel is not None and channel not in used_channels:
+            self.logger.debug(
+                "Configure gpio %s (pin %s) as hardware PWM"
+                % (device["gpio"], device["pin"])
+            )
+            pwm["hardware"] = GpioHardwarePwm(channel)
+            pwm["hardware"].start(
+                device["frequency"], self.__get_hardware_duty_cycle(pwm, duty_cycle)
+            )
+        else:
+            self.logger.debug(
+                "Configure gpio %s (pin %s) as software PWM"
+                % (device["gpio"], device["pin"])
+            )
+            self._gpio_setup(device["pin"], GPIO_OUT, initial=pwm["inactivelevel"])
+            if self._software_pwm is None:
+                # engine drives backend directly, pwm levels are not tracked in outputs levels
+                self._software_pwm = GpioSoftwarePwm(self._backend.output)
+                self._software_pwm.start()
+            self._software_pwm.add_channel(
+                device["pin"], device["frequency"], duty_cycle, pwm["activelevel"]
+            )
+        self._pwms[device["uuid"]] = pwm
 
-    def __input_off_callback(self, device_uuid, duration):
+    def __set_pwm_levels(self, device):
         """
-        Callback when input is turned off
+        Apply device inverted flag to running pwm, swapping its active and inactive levels
 
         Args:
-            device_uuid (string): device uuid
-            duration (float): trigger duration
+            device (dict): device data
         """
-        self.logger.debug("off_callback for gpio %s triggered" % device_uuid)
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise Exception('Device "%s" not found' % device_uuid)
+        pwm = self._pwms[device["uuid"]]
+        active_level = GPIO_HIGH if device["inverted"] else GPIO_LOW
+        if pwm["activelevel"] == active_level:
+            return
 
-        # broadcast event
-        self.gpios_gpio_off.send(
-            params={"gpio": device["gpio"], "init": False, "duration": duration},
-            device_id=device_uuid,
-        )
+        pwm["activelevel"], pwm["inactivelevel"] = active_level, pwm["activelevel"]
+        if pwm["hardware"]:
+            pwm["hardware"].set_duty_cycle(
+                self.__get_hardware_duty_cycle(pwm, pwm["dutycycle"])
+            )
+        else:
+            self._software_pwm.add_channel(
+                pwm["pin"], pwm["frequency"], pwm["dutycycle"], active_level
+            )
 
-    def _get_revision(self):
+    def __stop_pwm(self, device):
         """
-        Return raspberry pi revision
+        Stop device pwm
+
+        Args:
+            device (dict): device data
 
         Returns:
-            int: raspberry pi revision number
+            bool: True if pwm stopped, False if pwm was not running
         """
-        return GPIO_RPI_INFO["P1_REVISION"]
+        pwm = self._pwms.pop(device["uuid"], None)
+        if pwm is None:
+            self.logger.debug('No pwm found for device "%s"' % device)
+            return False
 
-    def get_module_config(self):
+        if pwm["hardware"]:
+            pwm["hardware"].stop()
+        else:
+            self._software_pwm.remove_channel(pwm["pin"])
+            self._gpio_output(pwm["pin"], pwm["inactivelevel"])
+
+        return True
+
+    def __get_hardware_duty_cycle(self, pwm, duty_cycle):
         """
-        Return module full config
+        Return duty cycle to apply on hardware pwm. Hardware output is high during duty cycle
+        so duty cycle is reversed when active level is low
 
-        Returns:
-            gpios configuration::
+        Args:
+            pwm (dict): pwm data
+            duty_cycle (float): device duty cycle
 
-                {
-                    revision (int): revision number (1|2|3)
-                    pinsnumber (int): number of board pins
-                }
+        Returns:
+            float: hardware duty cycle
+        """
+        return duty_cycle if pwm["activelevel"] == GPIO_HIGH else 100.0 - duty_cycle
 
+    def __check_pwm_frequency(self, pin, frequency):
         """
-        config = {}
+        Check pwm frequency can be generated on specified pin
 
-        config["revision"] = self._get_revision()
-        config["pinsnumber"] = self.get_pins_number()
+        Args:
+            pin (int): pin number
+            frequency (float): pwm frequency
 
-        return config
+        Raises:
+            InvalidParameter: if frequency is invalid
+        """
+        self.__check_number("frequency", frequency)
+        if (
+            frequency is not None
+            and frequency > GpioSoftwarePwm.MAX_FREQUENCY
+            and GpioHardwarePwm.get_channel(pin) is None
+        ):
+            raise InvalidParameter(
+                'Parameter "frequency" is invalid (software pwm frequency must be lower than %s)'
+                % GpioSoftwarePwm.MAX_FREQUENCY
+            )
 
-    def get_pins_usage(self):
+    def __restart_counters_task(self):
         """
-        Return pins usage
-
-        Returns:
-            dict: dict of pins::
+        Restart task publishing pulse counters. Task runs at smallest counters interval
+        """
+        if self._counters_task:
+            self._counters_task.stop()
+            self._counters_task = None
 
-                {
-                    pin (int): {
-                        label (str): Gpio label ("GPIOX"|"5v"|"3.3v"|"gnd"|"dnc"),
-                        gpio (dict): {
-                            assigned (bool): True if gpio assigned,
-                            owner (str): gpio application owner or None,
-                        }
-                    },
-                    ...
-                }
+        if not self._counters:
+            return
+        period = min(counter["interval"] for counter in self._counters.values())
+        self._counters_task = Task(period, self._publish_counters, self.logger)
+        self._counters_task.start()
 
+    def _publish_counters(self):
+        """
+        Publish counters whose interval is elapsed, one aggregated event per counter
         """
-        output = {}
+        now = time.monotonic()
+        for uuid, counter in list(self._counters.items()):
+            # small tolerance to not skip a whole period because of task jitter
+            if now < counter["next_publish"] - 0.05:
+                continue
+            counter["next_publish"] = now + counter["interval"]
 
-        # get pins descriptions according to raspberry pi revision
-        all_pins = {}
-        rev = self._get_revision()
-        if rev == 1:
-            all_pins = self.PINS_REV1
-        elif rev == 2:
-            all_pins = self.PINS_REV2
-        elif rev == 3:
-            all_pins = self.PINS_REV3
-        self.logger.debug("all_pins %s" % all_pins)
+            params = counter["counter"].publish(now)
+            params["gpio"] = counter["gpio"]
+            self.gpios_gpio_counter.send(params=params, device_id=uuid)
 
-        # fill pins usage
-        all_gpios = self.get_raspi_gpios()
-        self.logger.debug("all_gpios %s" % all_gpios)
-        devices = self.get_module_devices()
-        for pin_number in all_pins:
-            # default pin data
-            output[pin_number] = {"label": all_pins[pin_number], "gpio": None}
+    def __dispatch_input_on(self, device_uuid, timestamp):
+        """
+        Queue input on callback in dispatcher (called by input watcher)
+
+        Args:
+            device_uuid (string): device uuid
+            timestamp (float): monotonic timestamp of edge (None for initial value)
+        """
+        self._dispatcher.dispatch(
+            device_uuid,
+            self.__input_on_callback,
+            (device_uuid, timestamp, time.monotonic()),
+        )
 
-            # fill gpio data
-            if all_pins[pin_number] in all_gpios:
-                gpio_name = all_pins[pin_number]
-                assigned = False
-                owner = None
-                for uuid in devices:
-                    if devices[uuid]["gpio"] == gpio_name:
-                        assigned = True
-                        owner = devices[uuid]["owner"]
-                        break
+    def __dispatch_input_off(self, device_uuid, duration, timestamp):
+        """
+        Queue input off callback in dispatcher (called by input watcher)
 
-                output[pin_number]["gpio"] = {"assigned": assigned, "owner": owner}
+        Args:
+            device_uuid (string): device uuid
+            duration (float): trigger duration
+            timestamp (float): monotonic timestamp of edge (None for initial value)
+        """
+        self._dispatcher.dispatch(
+            device_uuid,
+            self.__input_off_callback,
+            (device_uuid, duration, timestamp, time.monotonic()),
+        )
 
-        return output
+    def __input_on_callback(self, device_uuid, timestamp=None, queued=None):
+        """
+        Callback when input is turned on (internal use)
 
-    def get_assigned_gpios(self):
+        Args:
+            device_uuid (string): device uuid
+            timestamp (float): monotonic timestamp of edge (None for initial value)
+            queued (float): monotonic timestamp of callback queueing in dispatcher
         """
-        Return assigned gpios
+        # called on each edge: lazy log formatting and no device config lookup
+        self.logger.debug("on_callback for gpio %s triggered", device_uuid)
+        record = self.__get_input_record(device_uuid, queued)
+        if record is None:
+            return
 
-        Returns:
-            list: List of gpios::
+        # broadcast event
+        self.__send_input_event(
+            record, self.gpios_gpio_on, {"gpio": record.gpio, "init": False}
+        )
+        # initial value is not a press, it would start a spurious gesture
+        if record.gesture is not None and timestamp is not None:
+            record.gesture.press(timestamp)
 
-                [ "GPIO3", "GPIO5", ... ]
+    def __input_off_callback(self, device_uuid, duration, timestamp=None, queued=None):
+        """
+        Callback when input is turned off
 
+        Args:
+            device_uuid (string): device uuid
+            duration (float): trigger duration
+            timestamp (float): monotonic timestamp of edge (None for initial value)
+            queued (float): monotonic timestamp of callback queueing in dispatcher
         """
-        return [device["gpio"] for _, device in self.get_module_devices().items()]
+        self.logger.debug("off_callback for gpio %s triggered", device_uuid)
+        record = self.__get_input_record(device_uuid, queued)
+        if record is None:
+            return
 
-    def get_raspi_gpios(self):
+        # broadcast event
+        self.__send_input_event(
+            record,
+            self.gpios_gpio_off,
+            {"gpio": record.gpio, "init": False, "duration": duration},
+        )
+        if record.gesture is not None and timestamp is not None:
+            record.gesture.release(timestamp, duration)
+
+    def __get_input_record(self, device_uuid, queued):
         """
-        Return available GPIO pins according to board revision
+        Return record of input whose callback is run, and measure time spent by callback in
+        dispatcher queue
+
+        Args:
+            device_uuid (string): device uuid
+            queued (float): monotonic timestamp of callback queueing (None if not queued)
 
         Returns:
-            dict: Dict of gpios::
+            GpioInputRecord: input record or None if input was deleted meanwhile
+        """
+        record = self._input_records.get(device_uuid)
+        if record is None:
+            # edges queued before input was deleted
+            self.logger.debug("Drop callback of deleted input %s", device_uuid)
+            return None
 
-                {
-                    "GPIO1": 5,
-                    "GPIO1": 5,
-                    ...
-                }
+        if queued is not None and record.latency is not None:
+            record.latency.queue.add(time.monotonic() - queued)
+        return record
 
+    def __send_input_event(self, record, event, params):
         """
-        rev = self._get_revision()
+        Send input event applying device emission policy (if any)
 
-        if rev == 1:
-            return self.GPIOS_REV1
-        if rev == 2:
-            return self.GPIOS_REV2
-        if rev == 3:
-            gpios = self.GPIOS_REV2.copy()
-            gpios.update(self.GPIOS_REV3)
-            return gpios
+        Args:
+            record (GpioInputRecord): input record
+            event (Event): event instance
+            params (dict): event parameters
+        """
+        policy = record.policy
+        if policy is not None:
+            delay = policy.submit(event, params, time.monotonic())
+            if delay is not None:
+                if delay > 0:
+                    # flush is cancelled with its policy group when input is deconfigured
+                    self._timer_wheel.add(
+                        time.monotonic() + delay,
+                        self.__flush_input_event,
+                        [record.uuid, policy],
+                        group=policy,
+                    )
+                return
 
-        return {}
+        start = time.monotonic()
+        event.send(params=params, device_id=record.uuid)
+        if record.latency is not None:
+            record.latency.send.add(time.monotonic() - start)
 
-    def get_pins_number(self):
+    def __send_gesture_event(self, device_uuid, gesture, clicks, duration, repeat):
         """
-        Return pins number according to board revision
+        Send gesture event (gestures detector callback)
+
+        Args:
+            device_uuid (str): device uuid
+            gesture (str): gesture name
+            clicks (int): number of clicks (click gestures only)
+            duration (float): press duration (seconds)
+            repeat (int): hold repeat number (hold gesture only)
+        """
+        record = self._input_records.get(device_uuid)
+        if record is None:
+            return
+        self.gpios_gpio_gesture.send(
+            params={
+                "gpio": record.gpio,
+                "gesture": gesture,
+                "clicks": clicks,
+                "duration": duration,
+                "repeat": repeat,
+            },
+            device_id=device_uuid,
+        )
+
+    def __flush_input_event(self, device_uuid, policy):
+        """
+        Send summary event of transitions merged or dropped by emission policy (timer wheel
+        callback)
+
+        Args:
+            device_uuid (str): device uuid
+            policy (GpioEmissionPolicy): device emission policy
+        """
+        if self._emission_policies.get(device_uuid) is not policy:
+            # device deleted or reconfigured meanwhile
+            return
+        summary = policy.flush(time.monotonic())
+        if summary is not None:
+            event, params = summary
+            event.send(params=params, device_id=device_uuid)
+
+    def _get_revision(self):
+        """
+        Return raspberry pi revision
 
         Returns:
-            int: pins number
+            int: raspberry pi revision number
         """
-        rev = self._get_revision()
+        return self._backend.get_revision()
+
+    def _detect_board(self):
+        """
+        Detect board revision and build board lookup tables (gpio->pin, pin->label, pin->gpio
+        and pins number). Tables are read-only and never rebuilt while application is running.
+        Pins usage cache is also built from those tables and indexed devices.
+        """
+        self._revision = self._get_revision()
+
+        gpio_pins = {}
+        pin_labels = {}
+        pins_number = 0
+        if self._revision == 1:
+            gpio_pins = self.GPIOS_REV1
+            pin_labels = self.PINS_REV1
+            pins_number = 26
+        elif self._revision == 2:
+            gpio_pins = self.GPIOS_REV2
+            pin_labels = self.PINS_REV2
+            pins_number = 26
+        elif self._revision == 3:
+            gpio_pins = dict(self.GPIOS_REV2, **self.GPIOS_REV3)
+            pin_labels = self.PINS_REV3
+            pins_number = 40
+
+        self._gpio_pins = MappingProxyType(dict(gpio_pins))
+        self._pin_labels = MappingProxyType(dict(pin_labels))
+        self._pin_gpios = MappingProxyType(
+            {pin: gpio for gpio, pin in gpio_pins.items()}
+        )
+        self._pin_bits = MappingProxyType(
+            {pin: 1 << int(gpio[4:]) for gpio, pin in gpio_pins.items()}
+        )
+        self._pins_number = pins_number
+        self.logger.debug(
+            "Board revision %s with %s pins" % (self._revision, self._pins_number)
+        )
+
+        # build pins usage cache
+        pins_usage = {}
+        for pin_number, label in self._pin_labels.items():
+            gpio_usage = None
+            if label in self._gpio_pins:
+                gpio_usage = self.__get_gpio_usage(label)
+            pins_usage[pin_number] = {"label": label, "gpio": gpio_usage}
+        with self._pins_usage_lock:
+            self._pins_usage = pins_usage
+            self._pins_usage_version += 1
 
-        if rev in (1, 2):
-            return 26
-        if rev == 3:
-            return 40
+    def __get_gpio_usage(self, gpio):
+        """
+        Return gpio usage
 
-        return 0
+        Args:
+            gpio (str): gpio name
 
-    def reserve_gpio(self, name, gpio, usage, command_sender):
+        Returns:
+            dict: gpio usage (see get_pins_usage)
         """
-        Reserve a gpio used to configure raspberry pi (ie onewire, lirc...)
-        This action only flag this gpio as reserved to avoid using it again
+        device = self._devices_index.get_by_gpio(gpio)
+        return {
+            "assigned": device is not None,
+            "owner": device["owner"] if device else None,
+        }
+
+    def __update_pins_usage(self, gpio):
+        """
+        Update cached pins usage after gpio was assigned or released. Cache is never modified
+        in place: a new pins usage dict is built so returned ones stay consistent.
 
         Args:
-            name (str): name of gpio
-            gpio (str) : gpio value
-            usage (str) : describe gpio usage
-            command_sender (str): command request sender (used to set gpio in readonly mode)
+            gpio (str): gpio name
+        """
+        pin_number = self._gpio_pins.get(gpio)
+        with self._pins_usage_lock:
+            pin_usage = self._pins_usage.get(pin_number)
+            if pin_usage is None or pin_usage["gpio"] is None:
+                # gpio not displayed in pins usage
+                return
+            gpio_usage = self.__get_gpio_usage(gpio)
+            if gpio_usage == pin_usage["gpio"]:
+                return
+
+            pins_usage = dict(self._pins_usage)
+            pins_usage[pin_number] = {"label": pin_usage["label"], "gpio": gpio_usage}
+            self._pins_usage = pins_usage
+            self._pins_usage_version += 1
+
+    def get_module_config(self):
+        """
+        Return module full config
 
         Returns:
-            dict: Created gpio device::
+            gpios configuration::
 
                 {
-                    name (str): name of gpio
-                    mode (str): Gpio mode ("output"|"input")
-                    pin (number): Gpio pin number
-                    gpio (str): Gpio id (GPIOX)
-                    keep (bool): True if gpio value is stored in config and restored after reboot
-                    on (bool): True if gpio is on
-                    inverted (bool): Gpio has inverted state
-                    owner (str): Application that owns the gpio
-                    type (str): Always "gpio"
-                    subtype (str): Same value than mode
+                    revision (int): revision number (1|2|3)
+                    pinsnumber (int): number of board pins
+                    inputbackend (str): configured input backend ("polling"|"chardev")
+                    gpiobackend (str): running gpio backend ("rpigpio"|"chardev"|"simulated")
+                    persistdelay (float): delay before saving kept output states (seconds)
+                    historysize (int): max number of edges kept in each input history
+                    dispatchqueuesize (int): max number of input callbacks queued per worker
+                    dispatchworkers (int): number of input callbacks dispatcher workers
+                    dispatchoverflow (str): dispatcher overflow policy
                 }
 
-        Raises:
-            CommandError: Command failed
-            MissingParameter: Missing command parameter
-            InvalidParameter: Invalid command parameter
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
+        config = {}
 
-        # check values
-        if gpio:
-            found_gpio = self._search_device("gpio", gpio)
-            if found_gpio is not None and found_gpio["subtype"] != usage:
-                raise InvalidParameter(
-                    'Gpio "%s" is already reserved for "%s" usage'
-                    % (found_gpio["gpio"], found_gpio["subtype"])
-                )
-            if found_gpio is not None and found_gpio["subtype"] == usage:
-                return found_gpio
-        self._check_parameters(
-            [
-                {
-                    "name": "name",
-                    "value": name,
-                    "type": str,
-                    "validator": lambda val: self._search_device("name", val) is None,
-                    "message": 'Name "%s" is already used' % name,
-                },
-                {
-                    "name": "gpio",
-                    "value": gpio,
-                    "type": str,
-                    "validator": lambda val: val in self.get_raspi_gpios().keys(),
-                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
-                },
-                {"name": "usage", "value": usage, "type": str},
-            ]
+        config["revision"] = self._revision
+        config["pinsnumber"] = self.get_pins_number()
+        config["inputbackend"] = self._get_config_field("input_backend")
+        config["gpiobackend"] = (
+            self._backend.NAME
+            if self._backend
+            else self._get_config_field("gpio_backend")
         )
+        config["persistdelay"] = self._get_config_field("persist_delay")
+        config["historysize"] = self._get_config_field("history_size")
+        config["dispatchqueuesize"] = self._get_config_field("dispatch_queue_size")
+        config["dispatchworkers"] = self._get_config_field("dispatch_workers")
+        config["dispatchoverflow"] = self._get_config_field("dispatch_overflow")
 
-        # gpio is valid, prepare new entry
-        data = {
-            "name": name,
-            "mode": self.MODE_RESERVED,
-            "pin": self.get_raspi_gpios()[gpio],
-            "gpio": gpio,
-            "keep": False,
-            "on": False,
-            "inverted": False,
-            "owner": command_sender,
-            "type": "gpio",
-            "subtype": usage,
-        }
+        return config
 
-        # add device
-        self.logger.debug("data=%s" % data)
-        device = self._add_device(data)
-        if device is None:
-            raise CommandError("Unable to add device")
+    def get_debounce_stats(self):
+        """
+        Return inputs debounce counters. Edges occuring inside debounce window are not dropped
+        silently but counted here.
 
-        return device
+        Returns:
+            dict: debounce counters by device uuid::
+
+                {
+                    uuid (str): {
+                        bounces (int): number of edges detected inside debounce window
+                        glitches (int): number of level changes shorter than stable time
+                        pending (bool): True if a level change is waiting to be accepted
+                    },
+                    ...
+                }
 
-    def get_reserved_gpios(self, usage):
         """
-        Return reserved gpios for specified usage
+        return self._input_watcher.get_debounce_stats()
 
-        Args:
-            usage (str): gpio reserved usage
+    def get_emission_stats(self):
+        """
+        Return events emission counters of inputs having an emission policy
 
         Returns:
-            list: list of reserved gpios (full data)::
+            dict: counters by device uuid::
 
-                [
-                    {
-                        gpio: "GPIO1",
-                        pin: 1,
-                        ...
+                {
+                    uuid (str): {
+                        emitted (int): number of events sent
+                        merged (int): number of events merged in summary events
+                        dropped (int): number of events dropped by rate limiting
                     },
                     ...
-                ]
+                }
 
         """
-        if usage is None or len(usage) == 0:
-            raise MissingParameter('Parameter "usage" is missing')
+        return {
+            uuid: policy.get_stats()
+            for uuid, policy in list(self._emission_policies.items())
+        }
 
-        gpios = self._search_devices("subtype", usage)
-        return [gpio for gpio in gpios if gpio["mode"] == self.MODE_RESERVED]
+    def get_gesture_stats(self):
+        """
+        Return gestures detectors state and counters of inputs having gestures enabled
+
+        Returns:
+            dict: detectors stats by device uuid::
+
+                {
+                    uuid (str): {
+                        gestures (int): number of emitted gestures
+                        pressed (bool): True if input is pressed
+                        clicks (int): number of clicks of click gesture in progress
+                        pressduration (float): current press duration (0 if released)
+                    },
+                    ...
+                }
 
-    def is_reserved_gpio(self, gpio):
         """
-        Return True if gpio is reserved
+        return {
+            uuid: record.gesture.get_stats()
+            for uuid, record in list(self._input_records.items())
+            if record.gesture is not None
+        }
 
-        Args:
-            gpio (str): gpio
+    def get_sampler_stats(self):
+        """
+        Return input sampler health metrics, to detect degraded sampling
 
         Returns:
-            bool: True if gpio is reserved, False otherwise
-        """
-        device = self._search_device("gpio", gpio)
-        if device is None:
-            return False
+            dict: sampler health::
 
-        self.logger.debug("is_reserved_gpio: %s" % device)
-        if device["mode"] == self.MODE_RESERVED:
-            return True
+                {
+                    backend (str): running input backend ("polling"|"chardev")
+                    alive (bool): True if sampler thread is running
+                    restarts (int): number of sampler restarts after its thread died
+                    inputs (int): number of watched inputs
+                    loops (int): number of sampler loops
+                    overruns (int): number of loops longer than poll period (polling) or events
+                                    reads that filled read buffer (chardev)
+                    bounces (int): number of transitions detected inside debounce window
+                    cputime (float): sampler thread CPU time (seconds)
+                    lastalive (float): timestamp of last sampler loop (None if never run)
+                }
 
-        return False
+        """
+        watcher = self._input_watcher
+        stats = watcher.get_health()
+        stats.update(
+            {
+                "backend": (
+                    self.INPUT_BACKEND_CHARDEV
+                    if isinstance(watcher, GpioLineEventWatcher)
+                    else self.INPUT_BACKEND_POLLING
+                ),
+                "alive": watcher.is_alive(),
+                "restarts": self._watcher_restarts,
+                "inputs": len(watcher.get_inputs()),
+            }
+        )
 
-    def add_gpio(self, name, gpio, mode, keep, inverted, command_sender):
+        return stats
+
+    def get_stats(self, reset=True):
         """
-        Add new gpio
+        Return inputs latency statistics, from physical edge to event sent on bus. Statistics
+        are reset after being returned unless reset is disabled.
 
         Args:
-            name (str): name of gpio
-            gpio (str): selected gpio ("GPIOX")
-            mode (str): mode ("input"|"output")
-            keep (bool): keep state when restarting
-            inverted (bool): if true a callback will be triggered on gpio low level instead of high level
-            command_sender (str): command request sender (optional)
+            reset (bool): reset statistics (default True)
 
         Returns:
-            dict: created gpio device ::
+            dict: latency statistics by gpio::
 
                 {
-                    name (str): name of gpio
-                    mode (str): Gpio mode ("output"|"input")
-                    pin (number): Gpio pin number
-                    gpio (str): Gpio id (GPIOX)
-                    keep (bool): True if gpio value is stored in config and restored after reboot
-                    on (bool): True if gpio is on
-                    inverted (bool): Gpio has inverted state
-                    owner (str): Application that owns the gpio
-                    type (str): Always "gpio"
-                    subtype (str): Same value than mode
+                    gpio (str): {
+                        detection (dict): delay between edge and input callback dispatch
+                        callback (dict): input callback dispatch duration (input watcher is blocked)
+                        queue (dict): time spent by input callback in dispatcher queue
+                        send (dict): event send duration
+                    },
+                    ...
+                }
+
+            Each statistic is::
+
+                {
+                    count (int): number of samples
+                    mean (float): mean latency (seconds)
+                    max (float): max latency (seconds)
+                    p50 (float): median latency (seconds)
+                    p90 (float): 90th percentile latency (seconds)
+                    p99 (float): 99th percentile latency (seconds)
                 }
 
         Raises:
-            CommandError: Command failed
-            MissingParameter: Missing command parameter
-            InvalidParameter: Invalid command parameter specified
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {"name": "reset", "value": reset, "type": bool},
+            ]
+        )
+
+        stats = {}
+        for uuid, latency in list(self._latencies.items()):
+            device = self._devices_index.get(uuid)
+            if device is not None:
+                stats[device["gpio"]] = latency.snapshot(reset)
+
+        return stats
+
+    def get_pins_usage(self, version=None):
+        """
+        Return pins usage
+
+        Pins usage is cached and updated each time a gpio is assigned or released. Specify
+        the version of pins usage you already have to only get pins usage if it changed.
+
+        Args:
+            version (int): pins usage version held by caller (optional)
+
+        Returns:
+            dict: dict of pins (if version is not specified)::
+
+                {
+                    pin (int): {
+                        label (str): Gpio label ("GPIOX"|"5v"|"3.3v"|"gnd"|"dnc"),
+                        gpio (dict): {
+                            assigned (bool): True if gpio assigned,
+                            owner (str): gpio application owner or None,
+                        }
+                    },
+                    ...
+                }
+
+            dict: versioned pins usage (if version is specified)::
+
+                {
+                    version (int): current pins usage version
+                    unchanged (bool): True if pins usage didn't change since specified version
+                    pins (dict): dict of pins as described above, None if unchanged
+                }
+
+        """
+        with self._pins_usage_lock:
+            pins_usage = self._pins_usage
+            current_version = self._pins_usage_version
+
+        if version is None:
+            return pins_usage
+        if version == current_version:
+            return {"version": current_version, "unchanged": True, "pins": None}
+        return {"version": current_version, "unchanged": False, "pins": pins_usage}
+
+    def get_assigned_gpios(self):
+        """
+        Return assigned gpios
+
+        Returns:
+            list: List of gpios::
+
+                [ "GPIO3", "GPIO5", ... ]
+
+        """
+        return self._devices_index.get_gpios()
+
+    def get_raspi_gpios(self):
+        """
+        Return available GPIO pins according to board revision
+
+        Returns:
+            dict: Dict of gpios::
+
+                {
+                    "GPIO1": 5,
+                    "GPIO1": 5,
+                    ...
+                }
+
+        """
+        return self._gpio_pins.copy()
+
+    def get_pins_number(self):
+        """
+        Return pins number according to board revision
+
+        Returns:
+            int: pins number
+        """
+        return self._pins_number
+
+    def set_input_backend(self, backend):
+        """
+        Set input backend used to watch inputs. New backend is used after application restart.
+        Chardev input backend falls back to polling when chardev gpio backend is used.
+
+        Args:
+            backend (str): input backend ("polling"|"chardev")
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "backend",
+                    "value": backend,
+                    "type": str,
+                    "validator": lambda val: val
+                    in (self.INPUT_BACKEND_POLLING, self.INPUT_BACKEND_CHARDEV),
+                },
+            ]
+        )
+
+        if not self._set_config_field("input_backend", backend):
+            raise CommandError("Unable to save input backend")
+
+    def set_gpio_backend(self, backend):
+        """
+        Set backend used to access gpios. New backend is used after application restart.
+
+        Args:
+            backend (str): gpio backend ("rpigpio"|"chardev"|"gpiomem"|"simulated")
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "backend",
+                    "value": backend,
+                    "type": str,
+                    "validator": lambda val: val in self.GPIO_BACKENDS,
+                },
+            ]
+        )
+
+        if not self._set_config_field("gpio_backend", backend):
+            raise CommandError("Unable to save gpio backend")
+
+    def set_persist_delay(self, delay):
+        """
+        Set delay before kept output states are saved. All states changed during this delay
+        are saved at once. Use 0 to save state on each change.
+
+        Args:
+            delay (float): delay in seconds
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        if delay is None:
+            raise MissingParameter('Parameter "delay" is missing')
+        self.__check_number("delay", delay, allow_zero=True)
+
+        if not self._set_config_field("persist_delay", delay):
+            raise CommandError("Unable to save persist delay")
+
+    def set_history_size(self, size):
+        """
+        Set max number of edges kept in each input history. Memory used by an input history is
+        9 bytes per edge. Existing histories are resized keeping their latest edges.
+
+        Args:
+            size (int): max number of edges
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "size",
+                    "value": size,
+                    "type": int,
+                    "validator": lambda val: 0 < val <= self.HISTORY_MAX_SIZE,
+                    "message": 'Parameter "size" must be between 1 and %s'
+                    % self.HISTORY_MAX_SIZE,
+                },
+            ]
+        )
+
+        if not self._set_config_field("history_size", size):
+            raise CommandError("Unable to save history size")
+        for history in list(self._histories.values()):
+            history.resize(size)
+
+    def set_dispatch_policy(self, queue_size, workers, overflow):
+        """
+        Set input callbacks dispatcher policy. Input watcher queues input callbacks that are run
+        by dispatcher workers, callbacks of an input are always run in order by the same worker.
+        Dispatcher is restarted with new policy, already queued callbacks are still run.
+
+        Args:
+            queue_size (int): max number of callbacks queued per worker
+            workers (int): number of worker threads
+            overflow (str): what to do when a worker queue is full::
+
+                drop_oldest: drop oldest queued callback
+                drop_newest: drop new callback
+                block: input watcher waits until a callback is dequeued
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "queue_size",
+                    "value": queue_size,
+                    "type": int,
+                    "validator": lambda val: 0 < val <= self.DISPATCH_MAX_QUEUE_SIZE,
+                    "message": 'Parameter "queue_size" must be between 1 and %s'
+                    % self.DISPATCH_MAX_QUEUE_SIZE,
+                },
+                {
+                    "name": "workers",
+                    "value": workers,
+                    "type": int,
+                    "validator": lambda val: 0 < val <= self.DISPATCH_MAX_WORKERS,
+                    "message": 'Parameter "workers" must be between 1 and %s'
+                    % self.DISPATCH_MAX_WORKERS,
+                },
+                {
+                    "name": "overflow",
+                    "value": overflow,
+                    "type": str,
+                    "validator": lambda val: val in GpioCallbackDispatcher.OVERFLOWS,
+                    "message": 'Parameter "overflow" must be one of %s'
+                    % ", ".join(GpioCallbackDispatcher.OVERFLOWS),
+                },
+            ]
+        )
+
+        saved = self._update_config(
+            {
+                "dispatch_queue_size": queue_size,
+                "dispatch_workers": workers,
+                "dispatch_overflow": overflow,
+            }
+        )
+        if not saved:
+            raise CommandError("Unable to save dispatch policy")
+
+        dispatcher = self.__create_dispatcher()
+        dispatcher.start()
+        previous, self._dispatcher = self._dispatcher, dispatcher
+        if previous is not None:
+            previous.stop()
+
+    def get_dispatch_stats(self):
+        """
+        Return input callbacks dispatcher statistics
+
+        Returns:
+            dict: dispatcher statistics::
+
+                {
+                    workers (int): number of worker threads
+                    queuesize (int): max number of queued callbacks per worker
+                    overflow (str): overflow policy
+                    depth (int): number of queued callbacks
+                    highwater (int): max number of callbacks queued in a worker
+                    dispatched (int): number of callbacks run
+                    dropped (int): number of callbacks dropped by overflow policy
+                    blocked (int): number of times input watcher was blocked on full queue
+                    errors (int): number of callbacks that raised an exception
+                }
+
+        """
+        return self._dispatcher.get_stats()
+
+    def get_gpio_history(self, gpio, since=None, limit=None):
+        """
+        Return debounced transitions recorded for specified input gpio
+
+        Args:
+            gpio (str): gpio name (GPIOXX)
+            since (float): only return edges recorded after this monotonic timestamp (use "now"
+                           value of previous call to get new edges only)
+            limit (int): max number of returned edges (latest ones are returned)
+
+        Returns:
+            dict: gpio history::
+
+                {
+                    gpio (str): gpio name
+                    now (float): current monotonic timestamp
+                    start (float): monotonic timestamp of first returned edge (None if no edge)
+                    offsets (list): edges offsets from start (microseconds)
+                    levels (str): edges levels ("0" low, "1" high)
+                    total (int): number of edges recorded since input is watched
+                    size (int): max number of edges kept
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "gpio",
+                    "value": gpio,
+                    "type": str,
+                    "validator": lambda val: val in self._gpio_pins,
+                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
+                },
+            ]
+        )
+        self.__check_number("since", since, allow_zero=True)
+        if limit is not None and (
+            isinstance(limit, bool) or not isinstance(limit, int) or limit <= 0
+        ):
+            raise InvalidParameter(
+                'Parameter "limit" is invalid (specified="%s")' % limit
+            )
+
+        device = self._devices_index.get_by_gpio(gpio)
+        history = self._histories.get(device["uuid"]) if device else None
+        if history is None:
+            raise CommandError('Gpio "%s" is not a watched input' % gpio)
+
+        now = time.monotonic()
+        timestamps, levels = history.get_edges(since, limit)
+        start = timestamps[0] if timestamps else None
+        return {
+            "gpio": gpio,
+            "now": now,
+            "start": start,
+            "offsets": [
+                int(round((timestamp - start) * 1000000.0)) for timestamp in timestamps
+            ],
+            "levels": "".join("1" if level else "0" for level in levels),
+            "total": history.total,
+            "size": history.size,
+        }
+
+    def get_persist_stats(self):
+        """
+        Return kept output states persistence statistics
+
+        Returns:
+            dict: statistics::
+
+                {
+                    pending (int): number of states waiting to be saved
+                    changes (int): number of kept states changes
+                    flushes (int): number of config writes
+                    coalesced (int): number of config writes saved by grouping changes
+                    lastlatency (float): last config write duration (seconds)
+                    maxlatency (float): longest config write duration (seconds)
+                }
+
+        """
+        with self._persist_lock:
+            return dict(self._persist_stats, pending=len(self._persist_states))
+
+    def get_module_devices(self):
+        """
+        Return module devices with output states not saved yet
+
+        Returns:
+            dict: module devices
+        """
+        devices = CleepModule.get_module_devices(self)
+        with self._persist_lock:
+            for device_uuid, fields in self._persist_states.items():
+                if device_uuid in devices:
+                    devices[device_uuid].update(fields)
+
+        return devices
+
+    def reserve_gpio(self, name, gpio, usage, command_sender):
+        """
+        Reserve a gpio used to configure raspberry pi (ie onewire, lirc...)
+        This action only flag this gpio as reserved to avoid using it again
+
+        Args:
+            name (str): name of gpio
+            gpio (str) : gpio value
+            usage (str) : describe gpio usage
+            command_sender (str): command request sender (used to set gpio in readonly mode)
+
+        Returns:
+            dict: Created gpio device::
+
+                {
+                    name (str): name of gpio
+                    mode (str): Gpio mode ("output"|"input")
+                    pin (number): Gpio pin number
+                    gpio (str): Gpio id (GPIOX)
+                    keep (bool): True if gpio value is stored in config and restored after reboot
+                    on (bool): True if gpio is on
+                    inverted (bool): Gpio has inverted state
+                    owner (str): Application that owns the gpio
+                    type (str): Always "gpio"
+                    subtype (str): Same value than mode
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        if gpio:
+            found_gpio = self._devices_index.get_by_gpio(gpio)
+            if found_gpio is not None and found_gpio["subtype"] != usage:
+                raise InvalidParameter(
+                    'Gpio "%s" is already reserved for "%s" usage'
+                    % (found_gpio["gpio"], found_gpio["subtype"])
+                )
+            if found_gpio is not None and found_gpio["subtype"] == usage:
+                return dict(found_gpio)
+        self._check_parameters(
+            [
+                {
+                    "name": "name",
+                    "value": name,
+                    "type": str,
+                    "validator": lambda val: self._devices_index.get_by_name(val)
+                    is None,
+                    "message": 'Name "%s" is already used' % name,
+                },
+                {
+                    "name": "gpio",
+                    "value": gpio,
+                    "type": str,
+                    "validator": lambda val: val in self._gpio_pins,
+                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
+                },
+                {"name": "usage", "value": usage, "type": str},
+            ]
+        )
+
+        # gpio is valid, prepare new entry
+        data = {
+            "name": name,
+            "mode": self.MODE_RESERVED,
+            "pin": self._gpio_pins[gpio],
+            "gpio": gpio,
+            "keep": False,
+            "on": False,
+            "inverted": False,
+            "owner": command_sender,
+            "type": "gpio",
+            "subtype": usage,
+        }
+
+        # add device
+        self.logger.debug("data=%s" % data)
+        device = self._add_device(data)
+        if device is None:
+            raise CommandError("Unable to add device")
+        self._devices_index.add(device)
+        self.__update_pins_usage(gpio)
+
+        return device
+
+    def get_reserved_gpios(self, usage):
+        """
+        Return reserved gpios for specified usage
+
+        Args:
+            usage (str): gpio reserved usage
+
+        Returns:
+            list: list of reserved gpios (full data)::
+
+                [
+                    {
+                        gpio: "GPIO1",
+                        pin: 1,
+                        ...
+                    },
+                    ...
+                ]
+
+        """
+        if usage is None or len(usage) == 0:
+            raise MissingParameter('Parameter "usage" is missing')
+
+        return [dict(gpio) for gpio in self._devices_index.get_by_usage(usage)]
+
+    def is_reserved_gpio(self, gpio):
+        """
+        Return True if gpio is reserved
+
+        Args:
+            gpio (str): gpio
+
+        Returns:
+            bool: True if gpio is reserved, False otherwise
+        """
+        device = self._devices_index.get_by_gpio(gpio)
+        if device is None:
+            return False
+
+        self.logger.debug("is_reserved_gpio: %s" % device)
+        if device["mode"] == self.MODE_RESERVED:
+            return True
+
+        return False
+
+    def add_gpio(
+        self,
+        name,
+        gpio,
+        mode,
+        keep,
+        inverted,
+        command_sender,
+        interval=None,
+        max_rate=None,
+        window=None,
+        frequency=None,
+        long_press=None,
+        click_interval=None,
+        hold_repeat=None,
+    ):
+        """
+        Add new gpio
+
+        Args:
+            name (str): name of gpio
+            gpio (str): selected gpio ("GPIOX")
+            mode (str): mode ("input"|"output"|"counter"|"pwm")
+            keep (bool): keep state when restarting
+            inverted (bool): if true a callback will be triggered on gpio low level instead of high level
+                             (counter mode: falling edges are counted instead of rising edges)
+            command_sender (str): command request sender (optional)
+            interval (float): counter mode only, counter publication interval in seconds (optional)
+            max_rate (float): input mode only, maximum events sent per second, 0 to disable (optional)
+            window (float): input mode only, window in seconds merging transitions in a single summary
+                            event, 0 to disable (optional)
+            frequency (float): pwm mode only, pwm frequency in Hz (optional)
+            long_press (float): input mode only, press duration in seconds of longpress gesture,
+                                0 to disable (optional)
+            click_interval (float): input mode only, max delay in seconds between clicks of
+                                    click gestures, 0 to disable (optional)
+            hold_repeat (float): input mode only, hold gesture period in seconds after a long
+                                 press, 0 to disable (optional)
+
+        Returns:
+            dict: created gpio device ::
+
+                {
+                    name (str): name of gpio
+                    mode (str): Gpio mode ("output"|"input")
+                    pin (number): Gpio pin number
+                    gpio (str): Gpio id (GPIOX)
+                    keep (bool): True if gpio value is stored in config and restored after reboot
+                    on (bool): True if gpio is on
+                    inverted (bool): Gpio has inverted state
+                    owner (str): Application that owns the gpio
+                    type (str): Always "gpio"
+                    subtype (str): Same value than mode
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter specified
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        self._check_parameters(
+            [
+                {
+                    "name": "name",
+                    "value": name,
+                    "type": str,
+                    "validator": lambda val: self._devices_index.get_by_name(val)
+                    is None,
+                    "message": 'Name "%s" is already used' % name,
+                },
+                {
+                    "name": "gpio",
+                    "value": gpio,
+                    "type": str,
+                    "validators": [
+                        {
+                            "validator": lambda val: val in self._gpio_pins,
+                            "message": 'Gpio "%s" does not exist for this raspberry pi'
+                            % gpio,
+                        },
+                        {
+                            "validator": lambda val: self._devices_index.get_by_gpio(val)
+                            is None,
+                            "message": 'Gpio "%s" is already used by other application' % gpio,
+                        },
+                    ],
+                },
+                {
+                    "name": "mode",
+                    "value": mode,
+                    "type": str,
+                    "validator": lambda val: val
+                    in (
+                        self.MODE_INPUT,
+                        self.MODE_OUTPUT,
+                        self.MODE_COUNTER,
+                        self.MODE_PWM,
+                    ),
+                },
+                {"name": "keep", "value": keep, "type": bool},
+                {"name": "inverted", "value": inverted, "type": bool},
+            ]
+        )
+        self.__check_number("interval", interval)
+        self.__check_number("max_rate", max_rate, allow_zero=True)
+        self.__check_number("window", window, allow_zero=True)
+        self.__check_number("long_press", long_press, allow_zero=True)
+        self.__check_number("click_interval", click_interval, allow_zero=True)
+        self.__check_number("hold_repeat", hold_repeat, allow_zero=True)
+        self.__check_pwm_frequency(self._gpio_pins[gpio], frequency)
+
+        # gpio is valid, prepare new entry
+        data = {
+            "name": name,
+            "mode": mode,
+            "pin": self._gpio_pins[gpio],
+            "gpio": gpio,
+            "keep": keep,
+            "on": inverted,
+            "inverted": inverted,
+            "owner": command_sender,
+            "type": "gpio",
+            "subtype": mode,
+        }
+        if mode == self.MODE_COUNTER:
+            data["interval"] = interval or self.COUNTER_INTERVAL
+        if mode == self.MODE_INPUT:
+            data["max_rate"] = max_rate or 0
+            data["window"] = window or 0
+            data["long_press"] = long_press or 0
+            data["click_interval"] = click_interval or 0
+            data["hold_repeat"] = hold_repeat or 0
+        if mode == self.MODE_PWM:
+            data["on"] = False
+            data["frequency"] = frequency or self.PWM_FREQUENCY
+            data["dutycycle"] = 0
+
+        # add device
+        device = self._add_device(data)
+        if device is None:
+            raise CommandError("Unable to add device")
+        self._devices_index.add(device)
+        self.__update_pins_usage(gpio)
+
+        # configure it
+        self._configure_gpio(device)
+
+        return device
+
+    def __check_number(self, name, value, allow_zero=False):
+        """
+        Check optional positive number parameter
+
+        Args:
+            name (str): parameter name
+            value (float): parameter value (can be None)
+            allow_zero (bool): True if 0 is a valid value
+
+        Raises:
+            InvalidParameter: if value is invalid
+        """
+        if value is None:
+            return
+        if (
+            isinstance(value, bool)
+            or not isinstance(value, (int, float))
+            or value < 0
+            or (value == 0 and not allow_zero)
+        ):
+            raise InvalidParameter(
+                'Parameter "%s" is invalid (specified="%s")' % (name, value)
+            )
+
+    def delete_gpio(self, device_uuid, command_sender):
+        """
+        Delete gpio
+
+        Args:
+            device_uuid (str): device identifier
+            command_sender (str): command sender
+
+        Returns:
+            bool: True if device was deleted, False otherwise
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        self._check_parameters(
+            [
+                {"name": "device_uuid", "value": device_uuid, "type": str},
+            ]
+        )
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+        if device["owner"] != command_sender:
+            raise Unauthorized("Device can only be deleted by its owner")
+
+        # device is valid, remove entry
+        if not self._delete_device(device_uuid):
+            raise CommandError('Failed to delete device "%s"' % device["uuid"])
+        self._devices_index.remove(device_uuid)
+        self.__update_pins_usage(device["gpio"])
+        self.__cancel_actions(device_uuid)
+        with self._persist_lock:
+            self._persist_states.pop(device_uuid, None)
+
+        self._deconfigure_gpio(device)
+        self._histories.pop(device_uuid, None)
+        self._latencies.pop(device_uuid, None)
+        self._input_states.pop(device_uuid, None)
+        record = self._input_records.pop(device_uuid, None)
+        if record is not None and record.gesture is not None:
+            record.gesture.cancel()
+
+        return True
+
+    def update_gpio(
+        self,
+        device_uuid,
+        name,
+        keep,
+        inverted,
+        command_sender,
+        interval=None,
+        max_rate=None,
+        window=None,
+        long_press=None,
+        click_interval=None,
+        hold_repeat=None,
+    ):
+        """
+        Update gpio
+
+        Args:
+            device_uuid (str): device identifier
+            name (str): gpio name
+            keep (bool): keep status flag
+            inverted (bool): inverted flag
+            command_sender (str): command sender
+            interval (float): counter mode only, counter publication interval in seconds (optional)
+            max_rate (float): input mode only, maximum events sent per second, 0 to disable (optional)
+            window (float): input mode only, window in seconds merging transitions in a single summary
+                            event, 0 to disable (optional)
+            long_press (float): input mode only, press duration in seconds of longpress gesture,
+                                0 to disable (optional)
+            click_interval (float): input mode only, max delay in seconds between clicks of
+                                    click gestures, 0 to disable (optional)
+            hold_repeat (float): input mode only, hold gesture period in seconds after a long
+                                 press, 0 to disable (optional)
+
+        Returns:
+            dict: updated gpio device::
+
+                {
+                    name (str): name of gpio
+                    mode (str): Gpio mode ("output"|"input")
+                    pin (number): Gpio pin number
+                    gpio (str): Gpio id (GPIOX)
+                    keep (bool): True if gpio value is stored in config and restored after reboot
+                    on (bool): True if gpio is on
+                    inverted (bool): Gpio has inverted state
+                    owner (str): Application that owns the gpio
+                    type (str): Always "gpio"
+                    subtype (str): Same value than mode
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        self._check_parameters(
+            [
+                {"name": "device_uuid", "value": device_uuid, "type": str},
+                {"name": "name", "value": name, "type": str},
+                {"name": "keep", "value": keep, "type": bool},
+                {"name": "inverted", "value": inverted, "type": bool},
+            ]
+        )
+        self.__check_number("interval", interval)
+        self.__check_number("max_rate", max_rate, allow_zero=True)
+        self.__check_number("window", window, allow_zero=True)
+        self.__check_number("long_press", long_press, allow_zero=True)
+        self.__check_number("click_interval", click_interval, allow_zero=True)
+        self.__check_number("hold_repeat", hold_repeat, allow_zero=True)
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+        if device["owner"] != command_sender:
+            raise Unauthorized("Device can only be updated by its owner")
+
+        # device is valid, update entry
+        device["name"] = name
+        device["keep"] = keep
+        device["inverted"] = inverted
+        pwm = self._pwms.get(device_uuid)
+        if pwm is not None and keep:
+            # save current duty cycle that may not be saved yet
+            device["dutycycle"] = pwm["dutycycle"]
+            device["on"] = pwm["dutycycle"] > 0
+        if device.get("mode") == self.MODE_COUNTER and interval is not None:
+            device["interval"] = interval
+        if device.get("mode") == self.MODE_INPUT:
+            if max_rate is not None:
+                device["max_rate"] = max_rate
+            if window is not None:
+                device["window"] = window
+            if long_press is not None:
+                device["long_press"] = long_press
+            if click_interval is not None:
+                device["click_interval"] = click_interval
+            if hold_repeat is not None:
+                device["hold_repeat"] = hold_repeat
+        if not self._update_device(device_uuid, device):
+            raise CommandError('Failed to update device "%s"' % device["uuid"])
+        self._devices_index.add(device)
+        self.__cancel_actions(device_uuid)
+
+        # relaunch watcher
+        self._reconfigure_gpio(device)
+
+        return device
+
+    def turn_on(self, device_uuid):
+        """
+        Turn on specified device
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            bool: True if command executed successfully
+
+        Raises:
+            CommandError: Command failed
+        """
+        # check values
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise CommandError("Device not found")
+        if device["mode"] != self.MODE_OUTPUT:
+            raise CommandError(
+                'Gpio "%s" configured as "%s" cannot be turned on'
+                % (device["gpio"], device["mode"])
+            )
+
+        # turn on relay
+        self.logger.debug("Turn on GPIO %s" % device["gpio"])
+        self._gpio_output(device["pin"], GPIO_LOW)
+
+        # save current state
+        device["on"] = True
+        if device["keep"]:
+            self.__persist_states({device_uuid: {"on": True}})
+
+        # broadcast event
+        self.gpios_gpio_on.send(
+            params={"gpio": device["gpio"], "init": False}, device_id=device_uuid
+        )
+
+        return True
+
+    def turn_off(self, device_uuid):
+        """
+        Turn off specified device
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            bool: True if command executed successfully
+
+        Raises:
+            CommandError: Command failed
+        """
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise CommandError("Device not found")
+        if device["mode"] != self.MODE_OUTPUT:
+            raise CommandError(
+                'Gpio "%s" configured as "%s" cannot be turned off'
+                % (device["gpio"], device["mode"])
+            )
+
+        # turn off relay
+        self.logger.debug("Turn off GPIO %s" % device["gpio"])
+        self._gpio_output(device["pin"], GPIO_HIGH)
+
+        # save current state
+        device["on"] = False
+        if device["keep"]:
+            self.__persist_states({device_uuid: {"on": False}})
+
+        # broadcast event
+        self.gpios_gpio_off.send(
+            params={"gpio": device["gpio"], "init": False, "duration": 0},
+            device_id=device_uuid,
+        )
+
+        return True
+
+    def __get_pwm_device(self, device_uuid):
+        """
+        Return pwm device
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            dict: device data
+
+        Raises:
+            CommandError: if device is not a running pwm
+        """
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise CommandError("Device not found")
+        if device["mode"] != self.MODE_PWM or device_uuid not in self._pwms:
+            raise CommandError(
+                'Gpio "%s" configured as "%s" is not a running pwm'
+                % (device["gpio"], device["mode"])
+            )
+
+        return device
+
+    def set_duty_cycle(self, device_uuid, duty_cycle):
+        """
+        Set pwm duty cycle
+
+        Args:
+            device_uuid (str): device identifier
+            duty_cycle (float): duty cycle in percent (0-100). 100 means always on
+
+        Returns:
+            bool: True if command executed successfully
+
+        Raises:
+            CommandError: Command failed
+            InvalidParameter: Invalid command parameter
+        """
+        # check values
+        device = self.__get_pwm_device(device_uuid)
+        if duty_cycle is None:
+            raise MissingParameter('Parameter "duty_cycle" is missing')
+        self.__check_number("duty_cycle", duty_cycle, allow_zero=True)
+        if duty_cycle > 100:
+            raise InvalidParameter(
+                'Parameter "duty_cycle" is invalid (specified="%s")' % duty_cycle
+            )
+
+        # apply duty cycle
+        pwm = self._pwms[device_uuid]
+        self.logger.debug("Set GPIO %s duty cycle to %s" % (device["gpio"], duty_cycle))
+        if pwm["hardware"]:
+            pwm["hardware"].set_duty_cycle(
+                self.__get_hardware_duty_cycle(pwm, duty_cycle)
+            )
+        else:
+            self._software_pwm.set_duty_cycle(pwm["pin"], duty_cycle)
+        pwm["dutycycle"] = duty_cycle
+
+        # save current state
+        if device["keep"]:
+            self.__persist_states(
+                {device_uuid: {"dutycycle": duty_cycle, "on": duty_cycle > 0}}
+            )
+
+        # broadcast event
+        self.gpios_gpio_pwm.send(
+            params={
+                "gpio": device["gpio"],
+                "dutycycle": duty_cycle,
+                "frequency": pwm["frequency"],
+            },
+            device_id=device_uuid,
+        )
+
+        return True
+
+    def set_frequency(self, device_uuid, frequency):
+        """
+        Set pwm frequency
+
+        Args:
+            device_uuid (str): device identifier
+            frequency (float): pwm frequency in Hz
+
+        Returns:
+            bool: True if command executed successfully
+
+        Raises:
+            CommandError: Command failed
+            InvalidParameter: Invalid command parameter
+        """
+        # check values
+        device = self.__get_pwm_device(device_uuid)
+        if frequency is None:
+            raise MissingParameter('Parameter "frequency" is missing')
+        self.__check_pwm_frequency(device["pin"], frequency)
+
+        # apply frequency
+        pwm = self._pwms[device_uuid]
+        self.logger.debug("Set GPIO %s frequency to %s" % (device["gpio"], frequency))
+        if pwm["hardware"]:
+            pwm["hardware"].set_frequency(
+                frequency, self.__get_hardware_duty_cycle(pwm, pwm["dutycycle"])
+            )
+        else:
+            self._software_pwm.set_frequency(pwm["pin"], frequency)
+        pwm["frequency"] = frequency
+
+        # save frequency (with current duty cycle that may not be saved yet)
+        device["frequency"] = frequency
+        if device["keep"]:
+            device["dutycycle"] = pwm["dutycycle"]
+            device["on"] = pwm["dutycycle"] > 0
+        if not self._update_device(device_uuid, device):
+            raise CommandError('Failed to update device "%s"' % device["uuid"])
+        self._devices_index.add(device)
+
+        # broadcast event
+        self.gpios_gpio_pwm.send(
+            params={
+                "gpio": device["gpio"],
+                "dutycycle": pwm["dutycycle"],
+                "frequency": frequency,
+            },
+            device_id=device_uuid,
+        )
+
+        return True
+
+    def __get_output_device(self, device_uuid):
+        """
+        Return output device
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            dict: device data
+
+        Raises:
+            CommandError: if device is not an output
+        """
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise CommandError("Device not found")
+        if device["mode"] != self.MODE_OUTPUT:
+            raise CommandError(
+                'Gpio "%s" configured as "%s" cannot be turned on or off'
+                % (device["gpio"], device["mode"])
+            )
+
+        return device
+
+    def __run_action(self, device_uuid, state):
+        """
+        Run scheduled action (timer wheel callback)
+
+        Args:
+            device_uuid (str): device identifier
+            state (bool): True to turn on output, False to turn it off
+        """
+        self._pulses.pop(device_uuid, None)
+        try:
+            if state:
+                self.turn_on(device_uuid)
+            else:
+                self.turn_off(device_uuid)
+        except CommandError as error:
+            self.logger.warning(
+                'Scheduled action on device "%s" failed: %s' % (device_uuid, error)
+            )
+
+    def __cancel_actions(self, device_uuid):
+        """
+        Cancel pending actions of specified device
+
+        Args:
+            device_uuid (str): device identifier
+        """
+        self._pulses.pop(device_uuid, None)
+        if self._timer_wheel is not None:
+            cancelled = self._timer_wheel.cancel_group(device_uuid)
+            if cancelled:
+                self.logger.debug(
+                    'Cancelled %s pending actions of device "%s"'
+                    % (cancelled, device_uuid)
+                )
+
+    def pulse(self, device_uuid, duration):
+        """
+        Turn on output during specified duration. A new pulse on the same output replaces
+        the running one.
+
+        Args:
+            device_uuid (str): device identifier
+            duration (float): pulse duration in seconds
+
+        Returns:
+            int: pulse end action identifier (see cancel_action)
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        # check values
+        self.__get_output_device(device_uuid)
+        if duration is None:
+            raise MissingParameter('Parameter "duration" is missing')
+        self.__check_number("duration", duration)
+
+        # turn on output and schedule its turn off
+        previous_pulse = self._pulses.pop(device_uuid, None)
+        if previous_pulse is not None:
+            self._timer_wheel.cancel(previous_pulse)
+        self.turn_on(device_uuid)
+        action_id = self._timer_wheel.add(
+            time.monotonic() + duration,
+            self.__run_action,
+            [device_uuid, False],
+            group=device_uuid,
+        )
+        self._pulses[device_uuid] = action_id
+
+        return action_id
+
+    def schedule(self, device_uuid, state, at=None, after=None):
+        """
+        Schedule output state change. Pending actions are cancelled when device is updated or
+        deleted.
+
+        Args:
+            device_uuid (str): device identifier
+            state (bool): True to turn on output, False to turn it off
+            at (float): timestamp (seconds since epoch) of state change
+            after (float): delay in seconds before state change (if at is not specified)
+
+        Returns:
+            int: scheduled action identifier (see cancel_action)
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        # check values
+        self.__get_output_device(device_uuid)
+        self._check_parameters(
+            [
+                {"name": "state", "value": state, "type": bool},
+            ]
+        )
+        if at is None and after is None:
+            raise MissingParameter('Parameter "at" or "after" must be specified')
+        self.__check_number("at", at)
+        self.__check_number("after", after, allow_zero=True)
+
+        # schedule action
+        if at is not None:
+            deadline = time.monotonic() + (at - time.time())
+        else:
+            deadline = time.monotonic() + after
+        return self._timer_wheel.add(
+            deadline, self.__run_action, [device_uuid, state], group=device_uuid
+        )
+
+    def cancel_action(self, action_id):
+        """
+        Cancel scheduled action
+
+        Args:
+            action_id (int): action identifier returned by schedule or pulse
+
+        Returns:
+            bool: True if action cancelled, False if action doesn't exist or already ran
+        """
+        return self._timer_wheel.cancel(action_id)
+
+    def get_scheduler_stats(self):
+        """
+        Return scheduled actions statistics
+
+        Returns:
+            dict: statistics::
+
+                {
+                    pending (int): number of pending actions
+                    fired (int): number of executed actions
+                    cancelled (int): number of cancelled actions
+                    maxlateness (float): maximum action lateness (seconds)
+                    meanlateness (float): mean action lateness (seconds)
+                }
+
+        """
+        return self._timer_wheel.get_stats()
+
+    def is_on(self, device_uuid):
+        """
+        Return gpio status (on or off). Watched inputs status is served from live input state
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            bool: True if device is on, False if device is off
+
+        Raises:
+            CommandError: Command failed
+        """
+        # check values
+        device = self._get_device(device_uuid)
+        if device is None:
+            raise CommandError("Device not found")
+        if device["mode"] == self.MODE_RESERVED:
+            raise CommandError(
+                'Gpio "%s" configured as "%s" cannot be checked'
+                % (device["gpio"], device["mode"])
+            )
+
+        state = self._input_states.get(device_uuid)
+        if state is not None and state.level is not None:
+            return state.on
+        with self._persist_lock:
+            return self._persist_states.get(device_uuid, device).get("on", device["on"])
+
+    def is_gpio_on(self, gpio):
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
+        Get value of specified gpio. Gpio doesn't have to be declared as device. Watched inputs
+        level is served from live input state without reading gpio
+
+        Args:
+            gpio (str): gpio name
 
+        Returns:
+            bool: True if gpio is on, False otherwise
+        """
         # check values
         self._check_parameters(
             [
-                {
-                    "name": "name",
-                    "value": name,
-                    "type": str,
-                    "validator": lambda val: self._search_device("name", val) is None,
-                    "message": 'Name "%s" is already used' % name,
-                },
                 {
                     "name": "gpio",
                     "value": gpio,
                     "type": str,
-                    "validators": [
-                        {
-                            "validator": lambda val: val
-                            in self.get_raspi_gpios().keys(),
-                            "message": 'Gpio "%s" does not exist for this raspberry pi'
-                            % gpio,
-                        },
-                        {
-                            "validator": lambda val: self._search_device("gpio", gpio)
-                            is None,
-                            "message": 'Gpio "%s" is already used by other application' % gpio,
-                        },
-                    ],
-                },
-                {
-                    "name": "mode",
-                    "value": mode,
-                    "type": str,
-                    "validator": lambda val: val in (self.MODE_INPUT, self.MODE_OUTPUT),
+                    "validator": lambda val: val in self._gpio_pins,
                 },
-                {"name": "keep", "value": keep, "type": bool},
-                {"name": "inverted", "value": inverted, "type": bool},
             ]
         )
 
-        # gpio is valid, prepare new entry
-        data = {
-            "name": name,
-            "mode": mode,
-            "pin": self.get_raspi_gpios()[gpio],
-            "gpio": gpio,
-            "keep": keep,
-            "on": inverted,
-            "inverted": inverted,
-            "owner": command_sender,
-            "type": "gpio",
-            "subtype": mode,
+        state = self.__get_input_state(gpio)
+        if state is not None and state.level is not None:
+            return state.level == GPIO_HIGH
+
+        pin = self._gpio_pins[gpio]
+        self.logger.debug('Read value for gpio "%s" (pin %s)' % (gpio, pin))
+
+        return self._backend.input(pin) == GPIO_HIGH
+
+    def get_snapshot(self):
+        """
+        Return levels of all configured gpios as bitmasks. Inputs levels are debounced levels
+        read from a single sampling tick, outputs levels are last written levels and pwm levels
+        are active level while duty cycle is not 0 (pulse counters levels are not sampled). Clients can compare sequence numbers and diff bitmasks to
+        detect changes.
+
+        Returns:
+            dict: snapshot::
+
+                {
+                    sequence (int): sampling tick number (increases on each sampling)
+                    timestamp (float): sampling tick monotonic timestamp (None if never sampled)
+                    levels (int): bitmask with bit N set if GPION level is high
+                    configured (int): bitmask with bit N set if GPION is configured (not reserved)
+                }
+
+        """
+        sequence, timestamp, pins_levels = self._input_watcher.get_snapshot()
+
+        configured = 0
+        inputs = 0
+        outputs = 0
+        pwms = 0
+        for gpio in self._devices_index.get_gpios():
+            device = self._devices_index.get_by_gpio(gpio)
+            if device is None or device["mode"] == self.MODE_RESERVED:
+                continue
+            bit = self._pin_bits[device["pin"]]
+            configured |= bit
+            if device["mode"] == self.MODE_OUTPUT:
+                outputs |= bit
+            elif device["mode"] == self.MODE_PWM:
+                pwm = self._pwms.get(device["uuid"])
+                if pwm is not None and GPIO_HIGH == (
+                    pwm["activelevel"] if pwm["dutycycle"] else pwm["inactivelevel"]
+                ):
+                    pwms |= bit
+            elif pins_levels >> device["pin"] & 1:
+                inputs |= bit
+
+        return {
+            "sequence": sequence,
+            "timestamp": timestamp,
+            "levels": inputs | pwms | (self._outputs_levels & outputs),
+            "configured": configured,
         }
 
-        # add device
-        device = self._add_device(data)
-        if device is None:
-            raise CommandError("Unable to add device")
+    def __get_input_state(self, gpio):
+        """
+        Return live state of specified gpio
 
-        # configure it
-        self._configure_gpio(device)
+        Args:
+            gpio (str): gpio name
 
-        return device
+        Returns:
+            GpioInputState: input state or None if gpio is not a watched input
+        """
+        device = self._devices_index.get_by_gpio(gpio)
+        return self._input_states.get(device["uuid"]) if device else None
 
-    def delete_gpio(self, device_uuid, command_sender):
+    def get_gpio_state(self, gpio):
         """
-        Delete gpio
+        Return live state of specified input gpio, without reading gpio
 
         Args:
-            device_uuid (str): device identifier
-            command_sender (str): command sender
+            gpio (str): gpio name (GPIOXX)
 
         Returns:
-            bool: True if device was deleted, False otherwise
+            dict: input state::
+
+                {
+                    gpio (str): gpio name
+                    level (int): debounced input level (0|1)
+                    on (bool): True if input is on
+                    timestamp (float): monotonic timestamp of last level change
+                    changes (int): number of level changes since input is watched
+                    now (float): current monotonic timestamp
+                }
 
         Raises:
             CommandError: Command failed
             MissingParameter: Missing command parameter
-            Unauthorized: Command cannot be executed by application
             InvalidParameter: Invalid command parameter
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
-
-        # check values
         self._check_parameters(
             [
-                {"name": "device_uuid", "value": device_uuid, "type": str},
+                {
+                    "name": "gpio",
+                    "value": gpio,
+                    "type": str,
+                    "validator": lambda val: val in self._gpio_pins,
+                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
+                },
             ]
         )
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
-        if device["owner"] != command_sender:
-            raise Unauthorized("Device can only be deleted by its owner")
-
-        # device is valid, remove entry
-        if not self._delete_device(device_uuid):
-            raise CommandError('Failed to delete device "%s"' % device["uuid"])
 
-        self._deconfigure_gpio(device)
+        state = self.__get_input_state(gpio)
+        if state is None:
+            raise CommandError('Gpio "%s" is not a watched input' % gpio)
 
-        return True
+        level, on, timestamp, changes = state.get()
+        return {
+            "gpio": gpio,
+            "level": level,
+            "on": on,
+            "timestamp": timestamp,
+            "changes": changes,
+            "now": time.monotonic(),
+        }
 
-    def update_gpio(self, device_uuid, name, keep, inverted, command_sender):
+    def read_gpios(self, gpios=None, bitmask=False):
         """
-        Update gpio
+        Read many gpios levels in a single call. Gpios don't have to be declared as devices
 
         Args:
-            device_uuid (str): device identifier
-            name (str): gpio name
-            keep (bool): keep status flag
-            inverted (bool): inverted flag
-            command_sender (str): command sender
+            gpios (list): list of gpio names (GPIOXX). If not specified all configured gpios
+                          (not reserved) are read
+            bitmask (bool): return packed levels instead of levels by gpio
 
         Returns:
-            dict: updated gpio device::
+            dict or int: levels by gpio name (True if gpio is on)::
 
                 {
-                    name (str): name of gpio
-                    mode (str): Gpio mode ("output"|"input")
-                    pin (number): Gpio pin number
-                    gpio (str): Gpio id (GPIOX)
-                    keep (bool): True if gpio value is stored in config and restored after reboot
-                    on (bool): True if gpio is on
-                    inverted (bool): Gpio has inverted state
-                    owner (str): Application that owns the gpio
-                    type (str): Always "gpio"
-                    subtype (str): Same value than mode
+                    gpio (str): level (bool)
+                    ...
                 }
 
+            or bitmask with bit XX set if gpio GPIOXX is on
+
         Raises:
-            CommandError: Command failed
-            MissingParameter: Missing command parameter
-            Unauthorized: Command cannot be executed by application
             InvalidParameter: Invalid command parameter
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
-
         # check values
+        if gpios is None:
+            gpios = [
+                device["gpio"]
+                for device in self.get_module_devices().values()
+                if device["mode"] != self.MODE_RESERVED
+            ]
         self._check_parameters(
             [
-                {"name": "device_uuid", "value": device_uuid, "type": str},
-                {"name": "name", "value": name, "type": str},
-                {"name": "keep", "value": keep, "type": bool},
-                {"name": "inverted", "value": inverted, "type": bool},
+                {
+                    "name": "gpios",
+                    "value": gpios,
+                    "type": list,
+                    "validator": lambda val: all(
+                        gpio in self._gpio_pins for gpio in val
+                    ),
+                    "message": 'Parameter "gpios" contains invalid gpio',
+                    "empty": True,
+                },
+                {"name": "bitmask", "value": bitmask, "type": bool},
             ]
         )
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
-        if device["owner"] != command_sender:
-            raise Unauthorized("Device can only be updated by its owner")
 
-        # device is valid, update entry
-        device["name"] = name
-        device["keep"] = keep
-        device["inverted"] = inverted
-        if not self._update_device(device_uuid, device):
-            raise CommandError('Failed to update device "%s"' % device["uuid"])
-
-        # relaunch watcher
-        self._reconfigure_gpio(device)
+        levels = self._backend.inputs([self._gpio_pins[gpio] for gpio in gpios])
+        self.logger.debug("Read gpios %s: %s" % (gpios, levels))
 
-        return device
+        if bitmask:
+            mask = 0
+            for gpio, level in zip(gpios, levels):
+                if level == GPIO_HIGH:
+                    mask |= 1 << int(gpio[4:])
+            return mask
+        return {gpio: level == GPIO_HIGH for gpio, level in zip(gpios, levels)}
 
-    def turn_on(self, device_uuid):
+    def set_outputs(self, outputs):
         """
-        Turn on specified device
+        Set many outputs at once. All outputs are checked before any hardware access, then
+        gpios are written back to back, kept states are saved together and a single event is sent.
 
         Args:
-            device_uuid (str): device identifier
+            outputs (dict): output states by device uuid::
+
+                {
+                    uuid (str): state (bool): True to turn on output, False to turn it off
+                    ...
+                }
 
         Returns:
             bool: True if command executed successfully
 
         Raises:
             CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
         """
         # check values
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise CommandError("Device not found")
-        if device["mode"] != self.MODE_OUTPUT:
-            raise CommandError(
-                'Gpio "%s" configured as "%s" cannot be turned on'
-                % (device["gpio"], device["mode"])
-            )
+        self._check_parameters(
+            [
+                {"name": "outputs", "value": outputs, "type": dict},
+            ]
+        )
+        devices = {}
+        for device_uuid, state in outputs.items():
+            if not isinstance(state, bool):
+                raise InvalidParameter(
+                    'Parameter "outputs" is invalid (state of "%s" must be a bool)'
+                    % device_uuid
+                )
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise CommandError('Device "%s" not found' % device_uuid)
+            if device["mode"] != self.MODE_OUTPUT:
+                raise CommandError(
+                    'Gpio "%s" configured as "%s" cannot be turned on or off'
+                    % (device["gpio"], device["mode"])
+                )
+            devices[device_uuid] = device
 
-        # turn on relay
-        self.logger.debug("Turn on GPIO %s" % device["gpio"])
-        self._gpio_output(device["pin"], GPIO_LOW)
+        # set outputs
+        self.logger.debug("Set outputs %s" % outputs)
+        self._gpio_outputs(
+            [device["pin"] for device in devices.values()],
+            [GPIO_LOW if outputs[uuid] else GPIO_HIGH for uuid in devices],
+        )
 
-        # save current state
-        device["on"] = True
-        if device["keep"]:
-            self._update_device(device_uuid, device)
+        # save current states
+        for device_uuid, device in devices.items():
+            device["on"] = outputs[device_uuid]
+        kept_states = {
+            device_uuid: {"on": device["on"]}
+            for device_uuid, device in devices.items()
+            if device["keep"]
+        }
+        if kept_states:
+            self.__persist_states(kept_states)
 
         # broadcast event
-        self.gpios_gpio_on.send(
-            params={"gpio": device["gpio"], "init": False}, device_id=device_uuid
+        self.gpios_outputs_update.send(
+            params={
+                "outputs": {
+                    device_uuid: {"gpio": device["gpio"], "on": device["on"]}
+                    for device_uuid, device in devices.items()
+                }
+            }
         )
 
         return True
 
-    def turn_off(self, device_uuid):
+    def reset_gpios(self):
         """
-        Turn off specified device
+        Reset all gpios turning them off
+        """
+        devices = self.get_module_devices()
+        outputs = {
+            uuid: False
+            for uuid, device in devices.items()
+            if device["mode"] == Gpios.MODE_OUTPUT
+        }
+        if outputs:
+            self.set_outputs(outputs)
+
+    def __get_counter(self, device_uuid):
+        """
+        Return pulse counter of specified device
 
         Args:
             device_uuid (str): device identifier
 
         Returns:
-            bool: True if command executed successfully
+            GpioPulseCounter: pulse counter
 
         Raises:
             CommandError: Command failed
@@ -1135,87 +3417,47 @@ class Gpios(CleepModule):
         device = self._get_device(device_uuid)
         if device is None:
             raise CommandError("Device not found")
-        if device["mode"] != self.MODE_OUTPUT:
+        if device["mode"] != self.MODE_COUNTER or device_uuid not in self._counters:
             raise CommandError(
-                'Gpio "%s" configured as "%s" cannot be turned off'
+                'Gpio "%s" configured as "%s" has no counter'
                 % (device["gpio"], device["mode"])
             )
 
-        # turn off relay
-        self.logger.debug("Turn off GPIO %s" % device["gpio"])
-        self._gpio_output(device["pin"], GPIO_HIGH)
-
-        # save current state
-        device["on"] = False
-        if device["keep"]:
-            self._update_device(device_uuid, device)
-
-        # broadcast event
-        self.gpios_gpio_off.send(
-            params={"gpio": device["gpio"], "init": False, "duration": 0},
-            device_id=device_uuid,
-        )
-
-        return True
+        return self._counters[device_uuid]["counter"]
 
-    def is_on(self, device_uuid):
+    def get_counter(self, device_uuid):
         """
-        Return gpio status (on or off)
+        Return pulse counter values of specified device
 
         Args:
             device_uuid (str): device identifier
 
         Returns:
-            bool: True if device is on, False if device is off
+            dict: counter values::
+
+                {
+                    count (int): pulses counted since last reset
+                    total (int): pulses counted since counter start
+                    duration (float): seconds elapsed since last reset
+                    rate (float): average pulses per second since last reset
+                }
 
         Raises:
             CommandError: Command failed
         """
-        # check values
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise CommandError("Device not found")
-        if device["mode"] == self.MODE_RESERVED:
-            raise CommandError(
-                'Gpio "%s" configured as "%s" cannot be checked'
-                % (device["gpio"], device["mode"])
-            )
+        return self.__get_counter(device_uuid).snapshot()
 
-        return device["on"]
-
-    def is_gpio_on(self, gpio):
+    def reset_counter(self, device_uuid):
         """
-        Get value of specified gpio. Gpio doesn't have to be declared as device
+        Reset pulse counter of specified device. Values are read and reset atomically so no pulse is lost.
 
         Args:
-            gpio (str): gpio name
+            device_uuid (str): device identifier
 
         Returns:
-            bool: True if gpio is on, False otherwise
-        """
-        # check values
-        all_gpios = self.get_raspi_gpios()
-        self._check_parameters(
-            [
-                {
-                    "name": "gpio",
-                    "value": gpio,
-                    "type": str,
-                    "validator": lambda val: gpio in all_gpios.keys(),
-                },
-            ]
-        )
-
-        pin = all_gpios[gpio]
-        self.logger.debug('Read value for gpio "%s" (pin %s)' % (gpio, pin))
+            dict: counter values before reset (see get_counter)
 
-        return GPIO_input(pin) == GPIO_HIGH
-
-    def reset_gpios(self):
-        """
-        Reset all gpios turning them off
+        Raises:
+            CommandError: Command failed
         """
-        devices = self.get_module_devices()
-        for uuid in devices:
-            if devices[uuid]["mode"] == Gpios.MODE_OUTPUT:
-                self.turn_off(uuid)
+        return self.__get_counter(device_uuid).snapshot(reset=True)
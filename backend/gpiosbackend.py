@@ -0,0 +1,715 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock, Event
+import logging
+import mmap
+import os
+import time
+import select
+import struct
+import fcntl
+from .gpioslineeventwatcher import (
+    GPIO_GET_LINEEVENT_IOCTL,
+    GPIOHANDLE_GET_LINE_VALUES_IOCTL,
+    GPIOHANDLE_REQUEST_INPUT,
+    GPIOEVENT_REQUEST_RISING_EDGE,
+    GPIOEVENT_REQUEST_FALLING_EDGE,
+    GPIOEVENT_REQUEST,
+    GPIOEVENT_DATA,
+)
+
+__all__ = [
+    "GpioBackend",
+    "GpioRpiBackend",
+    "GpioChardevBackend",
+    "GpioMmapBackend",
+    "GpioSimulatedBackend",
+]
+
+# levels, modes, pulls and edges (same values as RPi.GPIO)
+LOW = 0
+HIGH = 1
+OUT = 0
+IN = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+# linux gpio character device ABI (v1)
+GPIO_GET_LINEHANDLE_IOCTL = 0xC16CB403
+GPIOHANDLE_SET_LINE_VALUES_IOCTL = 0xC040B409
+GPIOHANDLE_REQUEST_OUTPUT = 0x02
+GPIOHANDLE_REQUEST_BIAS_PULL_UP = 0x20
+GPIOHANDLE_REQUEST_BIAS_PULL_DOWN = 0x40
+# struct gpiohandle_request { u32 lineoffsets[64]; u32 flags; u8 default_values[64];
+#                             char consumer_label[32]; u32 lines; int fd; }
+GPIOHANDLE_REQUEST = struct.Struct("=64II64B32sIi")
+# struct gpiohandle_data { u8 values[64]; }
+GPIOHANDLE_DATA = struct.Struct("=64B")
+
+# BCM283x/BCM2711 gpio registers (32 bits words offsets)
+GPFSEL0 = 0x00 // 4
+GPSET0 = 0x1C // 4
+GPCLR0 = 0x28 // 4
+GPLEV0 = 0x34 // 4
+GPPUD = 0x94 // 4
+GPPUDCLK0 = 0x98 // 4
+GPIO_PUP_PDN_CNTRL_REG0 = 0xE4 // 4
+# BCM2835 returns this signature when reading unimplemented BCM2711 pull registers
+GPIO_PUP_PDN_SIGNATURE = 0x6770696F
+
+
+class GpioBackend:
+    """
+    Gpios hardware access interface. Pins are identified by their board number.
+
+    Implementations are selected at startup according to gpio_backend config field.
+    """
+
+    NAME = None
+    CPUINFO_PATH = "/proc/cpuinfo"
+
+    def set_board(self, gpio_pins):
+        """
+        Set board gpios, called once board is detected
+
+        Args:
+            gpio_pins (dict): pin number by gpio name (GPIOXX)
+        """
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        """
+        Configure pin
+
+        Args:
+            pin (int): pin number
+            mode (int): pin mode (IN|OUT)
+            initial (int): initial output level (LOW|HIGH)
+            pull_up_down (int): input pull (PUD_OFF|PUD_DOWN|PUD_UP)
+        """
+        raise NotImplementedError()
+
+    def input(self, pin):
+        """
+        Read pin level
+
+        Args:
+            pin (int): pin number
+
+        Returns:
+            int: pin level (LOW|HIGH)
+        """
+        raise NotImplementedError()
+
+    def inputs(self, pins):
+        """
+        Read many pins levels at once. Backends override it when hardware offers a faster
+        multi-pin read
+
+        Args:
+            pins (list): list of pins numbers
+
+        Returns:
+            list: pins levels (LOW|HIGH) in pins order
+        """
+        read = self.input
+        return [read(pin) for pin in pins]
+
+    def output(self, pin, level):
+        """
+        Set output level
+
+        Args:
+            pin (int|list): pin number or list of pins numbers
+            level (int|list): level or list of levels (one per pin)
+        """
+        raise NotImplementedError()
+
+    def add_event_detect(self, pin, edge, callback):
+        """
+        Enable edge detection on specified pin
+
+        Args:
+            pin (int): pin number
+            edge (int): detected edge (RISING|FALLING)
+            callback (function): function called with pin number on each detected edge
+        """
+        raise NotImplementedError()
+
+    def remove_event_detect(self, pin):
+        """
+        Disable edge detection on specified pin
+
+        Args:
+            pin (int): pin number
+        """
+        raise NotImplementedError()
+
+    def cleanup(self):
+        """
+        Release all pins
+        """
+        raise NotImplementedError()
+
+    def get_revision(self):
+        """
+        Return board revision read from cpu info
+
+        Returns:
+            int: board revision (1 and 2 for 26 pins boards, 3 for 40 pins boards)
+        """
+        try:
+            with open(self.CPUINFO_PATH, encoding="utf-8") as fd:
+                codes = [
+                    int(line.split(":")[1].strip(), 16)
+                    for line in fd
+                    if line.startswith("Revision")
+                ]
+        except Exception:
+            codes = []
+        if not codes or codes[0] & 0x800000:
+            # new style revision code: 40 pins board
+            return 3
+
+        code = codes[0] & 0xFFFF
+        if code in (0x2, 0x3):
+            return 1
+        return 2 if code <= 0xF else 3
+
+
+class GpioRpiBackend(GpioBackend):
+    """
+    Backend using RPi.GPIO library (BOARD numbering)
+    """
+
+    NAME = "rpigpio"
+
+    def __init__(self):
+        """
+        Constructor
+
+        Raises:
+            Exception: if RPi.GPIO is not available on this system
+        """
+        # pylint: disable=import-outside-toplevel
+        import RPi.GPIO as GPIO
+
+        self.gpio = GPIO
+        GPIO.setmode(GPIO.BOARD)
+        GPIO.setwarnings(False)
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        if initial is None and pull_up_down is None:
+            self.gpio.setup(pin, mode)
+        elif initial is None:
+            self.gpio.setup(pin, mode, pull_up_down=pull_up_down)
+        elif pull_up_down is None:
+            self.gpio.setup(pin, mode, initial=initial)
+
+    def input(self, pin):
+        return self.gpio.input(pin)
+
+    def inputs(self, pins):
+        read = self.gpio.input
+        return [read(pin) for pin in pins]
+
+    def output(self, pin, level):
+        self.gpio.output(pin, level)
+
+    def add_event_detect(self, pin, edge, callback):
+        self.gpio.add_event_detect(pin, edge, callback=callback)
+
+    def remove_event_detect(self, pin):
+        self.gpio.remove_event_detect(pin)
+
+    def cleanup(self):
+        self.gpio.cleanup()
+
+    def get_revision(self):
+        return self.gpio.RPI_INFO["P1_REVISION"]
+
+
+class GpioChardevBackend(GpioBackend):
+    """
+    Backend using linux gpio character device (/dev/gpiochipN) line handles
+
+    Each configured pin holds a line handle so reading or writing a level is a single ioctl.
+    Edge detection requests line events instead and edges are dispatched by a single thread.
+    """
+
+    NAME = "chardev"
+    CHIP_PATH = "/dev/gpiochip0"
+    CONSUMER_LABEL = b"cleep-gpios"
+    # max time waiting for dispatching thread to stop
+    STOP_TIMEOUT = 1.0
+    # delay before dispatching edges again after an error
+    ERROR_DELAY = 1.0
+
+    def __init__(self, chip_path=CHIP_PATH):
+        """
+        Constructor
+
+        Args:
+            chip_path (str): gpio character device path
+
+        Raises:
+            OSError: if gpio character device is not available
+        """
+        self.logger = logging.getLogger("Gpios")
+        self._chip_fd = self._open_chip(chip_path)
+        self._lock = Lock()
+        self.lines = {}
+        # pin: line fd
+        self._fds = {}
+        # line events fd: (pin, callback)
+        self._events = {}
+        self._epoll = select.epoll()
+        self._wakeup_read_fd, self._wakeup_write_fd = os.pipe()
+        self._epoll.register(self._wakeup_read_fd, select.EPOLLIN)
+        self._events_thread = None
+        self._running = False
+
+    def _open_chip(self, chip_path):  # pragma: no cover
+        """
+        Open gpio character device
+        """
+        return os.open(chip_path, os.O_RDONLY)
+
+    def _request_line(self, line, flags, default_value):  # pragma: no cover
+        """
+        Request line handle
+
+        Args:
+            line (int): gpio chip line offset
+            flags (int): request flags (GPIOHANDLE_REQUEST_XXX)
+            default_value (int): output initial level
+
+        Returns:
+            int: line handle file descriptor
+        """
+        lines = [line] + [0] * 63
+        values = [default_value] + [0] * 63
+        request = bytearray(
+            GPIOHANDLE_REQUEST.pack(*lines, flags, *values, self.CONSUMER_LABEL, 1, 0)
+        )
+        fcntl.ioctl(self._chip_fd, GPIO_GET_LINEHANDLE_IOCTL, request, True)
+        return GPIOHANDLE_REQUEST.unpack(request)[-1]
+
+    def _request_line_events(self, line, edges):  # pragma: no cover
+        """
+        Request line events
+
+        Args:
+            line (int): gpio chip line offset
+            edges (int): requested edges (GPIOEVENT_REQUEST_XXX)
+
+        Returns:
+            int: line events file descriptor
+        """
+        request = bytearray(
+            GPIOEVENT_REQUEST.pack(
+                line, GPIOHANDLE_REQUEST_INPUT, edges, self.CONSUMER_LABEL, 0
+            )
+        )
+        fcntl.ioctl(self._chip_fd, GPIO_GET_LINEEVENT_IOCTL, request, True)
+        return GPIOEVENT_REQUEST.unpack(request)[4]
+
+    def _get_line_value(self, fd):  # pragma: no cover
+        """
+        Return line level
+        """
+        values = bytearray(GPIOHANDLE_DATA.size)
+        fcntl.ioctl(fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, values, True)
+        return values[0]
+
+    def _set_line_value(self, fd, level):  # pragma: no cover
+        """
+        Set line level
+        """
+        values = bytearray(GPIOHANDLE_DATA.size)
+        values[0] = level
+        fcntl.ioctl(fd, GPIOHANDLE_SET_LINE_VALUES_IOCTL, values)
+
+    def set_board(self, gpio_pins):
+        self.lines = {pin: int(gpio.replace("GPIO", "")) for gpio, pin in gpio_pins.items()}
+
+    def __release(self, pin):
+        """
+        Release pin line (lock must be acquired)
+        """
+        fd = self._fds.pop(pin, None)
+        if fd is None:
+            return
+        if fd in self._events:
+            del self._events[fd]
+            self._epoll.unregister(fd)
+        os.close(fd)
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        if mode == OUT:
+            flags = GPIOHANDLE_REQUEST_OUTPUT
+        else:
+            flags = GPIOHANDLE_REQUEST_INPUT
+            if pull_up_down == PUD_UP:
+                flags |= GPIOHANDLE_REQUEST_BIAS_PULL_UP
+            elif pull_up_down == PUD_DOWN:
+                flags |= GPIOHANDLE_REQUEST_BIAS_PULL_DOWN
+        with self._lock:
+            self.__release(pin)
+            self._fds[pin] = self._request_line(self.lines[pin], flags, initial or LOW)
+
+    def input(self, pin):
+        return self._get_line_value(self._fds[pin])
+
+    def inputs(self, pins):
+        read = self._get_line_value
+        fds = self._fds
+        return [read(fds[pin]) for pin in pins]
+
+    def output(self, pin, level):
+        if isinstance(pin, (list, tuple)):
+            levels = level if isinstance(level, (list, tuple)) else [level] * len(pin)
+            for one_pin, one_level in zip(pin, levels):
+                self._set_line_value(self._fds[one_pin], one_level)
+        else:
+            self._set_line_value(self._fds[pin], level)
+
+    def add_event_detect(self, pin, edge, callback):
+        edges = (
+            GPIOEVENT_REQUEST_RISING_EDGE
+            if edge == RISING
+            else GPIOEVENT_REQUEST_FALLING_EDGE
+        )
+        with self._lock:
+            # line events fd replaces line handle (it can be read too)
+            self.__release(pin)
+            fd = self._request_line_events(self.lines[pin], edges)
+            self._fds[pin] = fd
+            self._events[fd] = (pin, callback)
+            self._epoll.register(fd, select.EPOLLIN | select.EPOLLPRI)
+            if self._events_thread is None:
+                self._running = True
+                self._events_thread = Thread(target=self._dispatch_events, daemon=True)
+                self._events_thread.start()
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            if self._fds.get(pin) not in self._events:
+                return
+            self.__release(pin)
+            self._fds[pin] = self._request_line(
+                self.lines[pin], GPIOHANDLE_REQUEST_INPUT, LOW
+            )
+
+    def _dispatch_events(self):
+        """
+        Edges dispatching thread
+        """
+        while self._running:
+            try:
+                for fd, _ in self._epoll.poll():
+                    if fd == self._wakeup_read_fd:
+                        os.read(self._wakeup_read_fd, 64)
+                        continue
+                    with self._lock:
+                        event = self._events.get(fd)
+                        data = os.read(fd, GPIOEVENT_DATA.size * 16) if event else b""
+                    for _ in range(len(data) // GPIOEVENT_DATA.size):
+                        event[1](event[0])
+            except Exception:  # pragma: no cover
+                self.logger.exception("Exception dispatching gpio edges:")
+                time.sleep(self.ERROR_DELAY)
+
+    def cleanup(self):
+        self._running = False
+        os.write(self._wakeup_write_fd, b"\0")
+        if self._events_thread is not None:
+            self._events_thread.join(self.STOP_TIMEOUT)
+            self._events_thread = None
+        with self._lock:
+            for pin in list(self._fds.keys()):
+                self.__release(pin)
+
+
+class GpioMmapBackend(GpioBackend):
+    """
+    Backend accessing BCM gpio registers mapped from /dev/gpiomem
+
+    Level register holds 32 gpios per word, so reading all inputs is a single memory load and
+    many outputs are changed with one write to set register and one write to clear register.
+    Registers don't raise interrupts, so edge detection is done by a thread polling level
+    register.
+    """
+
+    NAME = "gpiomem"
+    DEV_PATH = "/dev/gpiomem"
+    BLOCK_SIZE = 4096
+    # edge detection polling period (seconds)
+    EDGES_POLL_PERIOD = 0.001
+    # max time waiting for edge detection thread to stop
+    STOP_TIMEOUT = 1.0
+
+    def __init__(self, path=DEV_PATH):
+        """
+        Constructor
+
+        Args:
+            path (str): gpio registers device path
+
+        Raises:
+            OSError: if gpio registers can't be mapped
+        """
+        self.logger = logging.getLogger("Gpios")
+        fd = os.open(path, os.O_RDWR | os.O_SYNC)
+        try:
+            self._map = mmap.mmap(fd, self.BLOCK_SIZE, mmap.MAP_SHARED)
+        finally:
+            os.close(fd)
+        self._registers = memoryview(self._map).cast("I")
+        self._lock = Lock()
+        self.lines = {}
+        self._configured = set()
+        # pin: [edge, callback, level]
+        self._edge_detects = {}
+        self._edges_thread = None
+        self._stop_edges = Event()
+
+    def set_board(self, gpio_pins):
+        self.lines = {pin: int(gpio.replace("GPIO", "")) for gpio, pin in gpio_pins.items()}
+
+    def __set_function(self, line, function):
+        """
+        Set line function (lock must be acquired)
+
+        Args:
+            line (int): gpio line
+            function (int): 0 for input, 1 for output
+        """
+        register = GPFSEL0 + line // 10
+        shift = (line % 10) * 3
+        self._registers[register] = (self._registers[register] & ~(7 << shift)) | (
+            function << shift
+        )
+
+    def __set_pull(self, line, pull_up_down):
+        """
+        Set line pull (lock must be acquired)
+
+        Args:
+            line (int): gpio line
+            pull_up_down (int): PUD_OFF|PUD_DOWN|PUD_UP
+        """
+        registers = self._registers
+        if registers[GPIO_PUP_PDN_CNTRL_REG0 + 3] != GPIO_PUP_PDN_SIGNATURE:
+            # BCM2711: 2 bits per line (0 none, 1 up, 2 down)
+            pull = {PUD_UP: 1, PUD_DOWN: 2}.get(pull_up_down, 0)
+            register = GPIO_PUP_PDN_CNTRL_REG0 + line // 16
+            shift = (line % 16) * 2
+            registers[register] = (registers[register] & ~(3 << shift)) | (pull << shift)
+        else:
+            # BCM2835: pull is clocked in the line (0 off, 1 down, 2 up)
+            registers[GPPUD] = {PUD_DOWN: 1, PUD_UP: 2}.get(pull_up_down, 0)
+            time.sleep(0.00001)
+            registers[GPPUDCLK0 + line // 32] = 1 << (line % 32)
+            time.sleep(0.00001)
+            registers[GPPUD] = 0
+            registers[GPPUDCLK0 + line // 32] = 0
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        line = self.lines[pin]
+        with self._lock:
+            if mode == OUT:
+                # set level before enabling output to avoid a glitch
+                register = GPSET0 if initial == HIGH else GPCLR0
+                self._registers[register + line // 32] = 1 << (line % 32)
+                self.__set_function(line, 1)
+            else:
+                self.__set_pull(line, pull_up_down)
+                self.__set_function(line, 0)
+            self._configured.add(pin)
+
+    def input(self, pin):
+        line = self.lines[pin]
+        return (self._registers[GPLEV0 + line // 32] >> (line % 32)) & 1
+
+    def inputs(self, pins):
+        registers = self._registers
+        levels = registers[GPLEV0] | (registers[GPLEV0 + 1] << 32)
+        lines = self.lines
+        return [(levels >> lines[pin]) & 1 for pin in pins]
+
+    def output(self, pin, level):
+        if not isinstance(pin, (list, tuple)):
+            line = self.lines[pin]
+            self._registers[(GPSET0 if level else GPCLR0) + line // 32] = 1 << (line % 32)
+            return
+
+        levels = level if isinstance(level, (list, tuple)) else [level] * len(pin)
+        set_mask = 0
+        clear_mask = 0
+        for one_pin, one_level in zip(pin, levels):
+            if one_level:
+                set_mask |= 1 << self.lines[one_pin]
+            else:
+                clear_mask |= 1 << self.lines[one_pin]
+        registers = self._registers
+        for bank in range(2):
+            if set_mask & 0xFFFFFFFF:
+                registers[GPSET0 + bank] = set_mask & 0xFFFFFFFF
+            if clear_mask & 0xFFFFFFFF:
+                registers[GPCLR0 + bank] = clear_mask & 0xFFFFFFFF
+            set_mask >>= 32
+            clear_mask >>= 32
+
+    def add_event_detect(self, pin, edge, callback):
+        with self._lock:
+            self._edge_detects[pin] = [edge, callback, self.input(pin)]
+            if self._edges_thread is None:
+                self._stop_edges.clear()
+                self._edges_thread = Thread(target=self._poll_edges, daemon=True)
+                self._edges_thread.start()
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._edge_detects.pop(pin, None)
+
+    def _poll_edges(self):
+        """
+        Edges detection thread
+        """
+        while not self._stop_edges.wait(self.EDGES_POLL_PERIOD):
+            try:
+                detects = list(self._edge_detects.items())
+                levels = self.inputs([pin for pin, _ in detects])
+                for (pin, detect), level in zip(detects, levels):
+                    if level == detect[2]:
+                        continue
+                    detect[2] = level
+                    if detect[0] in (BOTH, RISING if level else FALLING):
+                        detect[1](pin)
+            except Exception:  # pragma: no cover
+                self.logger.exception("Exception detecting gpio edges:")
+
+    def cleanup(self):
+        self._stop_edges.set()
+        if self._edges_thread is not None:
+            self._edges_thread.join(self.STOP_TIMEOUT)
+            self._edges_thread = None
+        with self._lock:
+            self._edge_detects.clear()
+            # release pins as inputs without pull
+            for pin in self._configured:
+                self.__set_pull(self.lines[pin], PUD_OFF)
+                self.__set_function(self.lines[pin], 0)
+            self._configured.clear()
+
+
+class GpioSimulatedBackend(GpioBackend):
+    """
+    Simulated gpios, to run application on any linux box (tests and benchmarks)
+
+    Besides backend interface it offers virtual wiring (inputs following an output level), level
+    changes triggered by caller (scripted waveforms) and a log of last edge time per pin.
+    """
+
+    NAME = "simulated"
+
+    def __init__(self, revision=3):
+        """
+        Constructor
+
+        Args:
+            revision (int): simulated board revision
+        """
+        self.revision = revision
+        self._lock = Lock()
+        self.levels = {}
+        self.modes = {}
+        # output pin: list of wired input pins
+        self.wires = {}
+        # pin: (edge, callback)
+        self.edge_detects = {}
+        # pin: monotonic timestamp of last level change
+        self.last_edges = {}
+        self.reads = 0
+        self.writes = 0
+
+    def setup(self, pin, mode, initial=None, pull_up_down=None):
+        with self._lock:
+            self.modes[pin] = mode
+            if mode == OUT:
+                self.levels[pin] = LOW if initial is None else initial
+            elif pin not in self.levels:
+                self.levels[pin] = HIGH if pull_up_down == PUD_UP else LOW
+
+    def input(self, pin):
+        self.reads += 1
+        return self.levels.get(pin, LOW)
+
+    def inputs(self, pins):
+        self.reads += 1
+        levels = self.levels
+        return [levels.get(pin, LOW) for pin in pins]
+
+    def output(self, pin, level):
+        if isinstance(pin, (list, tuple)):
+            levels = level if isinstance(level, (list, tuple)) else [level] * len(pin)
+            for one_pin, one_level in zip(pin, levels):
+                self.set_level(one_pin, one_level)
+        else:
+            self.set_level(pin, level)
+        self.writes += 1
+
+    def add_event_detect(self, pin, edge, callback):
+        with self._lock:
+            self.edge_detects[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self.edge_detects.pop(pin, None)
+
+    def cleanup(self):
+        with self._lock:
+            self.modes.clear()
+            self.edge_detects.clear()
+
+    def get_revision(self):
+        return self.revision
+
+    def wire(self, output_pin, input_pin):
+        """
+        Wire output pin to input pin: input follows output level
+
+        Args:
+            output_pin (int): output pin number
+            input_pin (int): input pin number
+        """
+        with self._lock:
+            self.wires.setdefault(output_pin, []).append(input_pin)
+
+    def set_level(self, pin, level, timestamp=None):
+        """
+        Change pin level, propagating it to wired inputs and triggering edge detection
+
+        Args:
+            pin (int): pin number
+            level (int): new level
+            timestamp (float): edge monotonic timestamp (default now)
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        callbacks = []
+        with self._lock:
+            for target in [pin] + self.wires.get(pin, []):
+                if self.levels.get(target) == level:
+                    continue
+                self.levels[target] = level
+                self.last_edges[target] = timestamp
+                detect = self.edge_detects.get(target)
+                if detect and detect[0] in (BOTH, RISING if level else FALLING):
+                    callbacks.append((detect[1], target))
+        for callback, target in callbacks:
+            callback(target)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__all__ = ["GpioDebouncer"]
+
+
+class GpioDebouncer:
+    """
+    Input debounce state machine driven by timestamps
+
+    Raw levels (sampled or received from edges) are fed with their timestamp and a new debounced level is
+    accepted only when:
+
+        * debounce window opened by previous accepted transition is over (raw edges inside the window are
+          counted as bounces)
+        * raw level has been stable at least stable_time seconds (reverted changes are counted as glitches)
+        * rearm_time seconds elapsed since last transition to the same level
+
+    Nothing sleeps: caller only has to call check() again before next_deadline() to resolve a pending change
+    when no more edge occurs.
+    """
+
+    __slots__ = (
+        "debounce",
+        "stable_time",
+        "rearm_time",
+        "level",
+        "timestamp",
+        "raw_level",
+        "raw_timestamp",
+        "window_end",
+        "rearm_ends",
+        "bounces",
+        "glitches",
+    )
+
+    DEBOUNCE = 0.20
+    STABLE_TIME = 0.0
+    REARM_TIME = 0.0
+
+    def __init__(
+        self,
+        level,
+        timestamp,
+        debounce=DEBOUNCE,
+        stable_time=STABLE_TIME,
+        rearm_time=REARM_TIME,
+    ):
+        """
+        Constructor
+
+        Args:
+            level (int): initial level
+            timestamp (float): initial level timestamp (seconds)
+            debounce (float): debounce window (seconds)
+            stable_time (float): minimum time a raw level must be stable to be accepted (seconds)
+            rearm_time (float): minimum time between two transitions to the same level (seconds)
+        """
+        self.debounce = debounce
+        self.stable_time = stable_time
+        self.rearm_time = rearm_time
+
+        # debounced level and timestamp of its edge
+        self.level = level
+        self.timestamp = timestamp
+        # last raw level
+        self.raw_level = level
+        self.raw_timestamp = timestamp
+        self.window_end = 0.0
+        self.rearm_ends = [0.0, 0.0]
+
+        # counters
+        self.bounces = 0
+        self.glitches = 0
+
+    def is_pending(self):
+        """
+        Return True if a raw level change is waiting to be accepted
+
+        Returns:
+            bool: True if level change is pending
+        """
+        return self.raw_level != self.level
+
+    def next_deadline(self):
+        """
+        Return timestamp from which pending level change could be accepted
+
+        Returns:
+            float: timestamp or None if no level change is pending
+        """
+        if self.raw_level == self.level:
+            return None
+
+        return max(
+            self.window_end,
+            self.raw_timestamp + self.stable_time,
+            self.rearm_ends[self.raw_level],
+        )
+
+    def update(self, raw_level, timestamp):
+        """
+        Feed new raw level
+
+        Args:
+            raw_level (int): raw level (0|1)
+            timestamp (float): raw level timestamp (seconds)
+
+        Returns:
+            bool: True if a new debounced level is accepted (see level and timestamp members)
+        """
+        if raw_level != self.raw_level:
+            if timestamp < self.window_end:
+                self.bounces += 1
+            elif raw_level == self.level:
+                # pending change reverted before being accepted
+                self.glitches += 1
+            self.raw_level = raw_level
+            self.raw_timestamp = timestamp
+
+        return self.check(timestamp)
+
+    def check(self, now):
+        """
+        Check if pending level change can be accepted
+
+        Args:
+            now (float): current timestamp (seconds)
+
+        Returns:
+            bool: True if a new debounced level is accepted (see level and timestamp members)
+        """
+        if self.raw_level == self.level:
+            return False
+        if (
+            now < self.window_end
+            or now < self.raw_timestamp + self.stable_time
+            or now < self.rearm_ends[self.raw_level]
+        ):
+            return False
+
+        self.level = self.raw_level
+        self.timestamp = self.raw_timestamp
+        self.window_end = self.raw_timestamp + self.debounce
+        self.rearm_ends[self.level] = self.raw_timestamp + self.rearm_time
+
+        return True
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+__all__ = ["GpioDevicesIndex"]
+
+
+class GpioDevicesIndex:
+    """
+    In-memory indexes of gpio devices
+
+    Devices are indexed by uuid, gpio name, device name, pin number and reserved usage so lookups
+    don't have to scan all configured devices. Indexes must be updated each time a device is
+    added, updated or deleted.
+
+    Indexed devices are shared and must not be modified by caller. They hold device data at last
+    add or update (runtime values like "on" are not maintained here).
+    """
+
+    __slots__ = (
+        "_lock",
+        "reserved_mode",
+        "_devices",
+        "_by_gpio",
+        "_by_name",
+        "_by_pin",
+        "_by_usage",
+    )
+
+    def __init__(self, reserved_mode):
+        """
+        Constructor
+
+        Args:
+            reserved_mode (str): mode of reserved gpio devices (indexed by usage)
+        """
+        self._lock = Lock()
+        self.reserved_mode = reserved_mode
+        self._devices = {}
+        self._by_gpio = {}
+        self._by_name = {}
+        self._by_pin = {}
+        self._by_usage = {}
+
+    def rebuild(self, devices):
+        """
+        Rebuild indexes from scratch
+
+        Args:
+            devices (dict): all devices by uuid
+        """
+        with self._lock:
+            self._devices = {}
+            self._by_gpio = {}
+            self._by_name = {}
+            self._by_pin = {}
+            self._by_usage = {}
+            for device in devices.values():
+                self.__add(device)
+
+    def add(self, device):
+        """
+        Index new device, or reindex existing device after update
+
+        Args:
+            device (dict): device data
+        """
+        with self._lock:
+            self.__remove(device["uuid"])
+            self.__add(device)
+
+    def remove(self, device_uuid):
+        """
+        Remove device from indexes
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self._lock:
+            self.__remove(device_uuid)
+
+    def __add(self, device):
+        device = dict(device)
+        device_uuid = device["uuid"]
+        self._devices[device_uuid] = device
+        self._by_gpio[device["gpio"]] = device
+        self._by_pin[device["pin"]] = device
+        self._by_name.setdefault(device["name"], {})[device_uuid] = device
+        if device["mode"] == self.reserved_mode:
+            self._by_usage.setdefault(device["subtype"], {})[device_uuid] = device
+
+    def __remove(self, device_uuid):
+        device = self._devices.pop(device_uuid, None)
+        if device is None:
+            return
+
+        if self._by_gpio.get(device["gpio"]) is device:
+            del self._by_gpio[device["gpio"]]
+        if self._by_pin.get(device["pin"]) is device:
+            del self._by_pin[device["pin"]]
+        self.__remove_from_group(self._by_name, device["name"], device_uuid)
+        if device["mode"] == self.reserved_mode:
+            self.__remove_from_group(self._by_usage, device["subtype"], device_uuid)
+
+    @staticmethod
+    def __remove_from_group(index, key, device_uuid):
+        group = index.get(key)
+        if group is None:
+            return
+        group.pop(device_uuid, None)
+        if not group:
+            del index[key]
+
+    def get(self, device_uuid):
+        """
+        Return device by uuid
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            dict: device data or None if not found
+        """
+        return self._devices.get(device_uuid)
+
+    def get_by_gpio(self, gpio):
+        """
+        Return device using specified gpio
+
+        Args:
+            gpio (str): gpio name (GPIOX)
+
+        Returns:
+            dict: device data or None if gpio is not used
+        """
+        return self._by_gpio.get(gpio)
+
+    def get_by_pin(self, pin):
+        """
+        Return device using specified pin
+
+        Args:
+            pin (int): pin number
+
+        Returns:
+            dict: device data or None if pin is not used
+        """
+        return self._by_pin.get(pin)
+
+    def get_by_name(self, name):
+        """
+        Return device with specified name
+
+        Args:
+            name (str): device name
+
+        Returns:
+            dict: device data or None if name is not used
+        """
+        with self._lock:
+            group = self._by_name.get(name)
+            return next(iter(group.values())) if group else None
+
+    def get_by_usage(self, usage):
+        """
+        Return gpios reserved for specified usage
+
+        Args:
+            usage (str): reserved usage
+
+        Returns:
+            list: list of devices data
+        """
+        with self._lock:
+            return list(self._by_usage.get(usage, {}).values())
+
+    def get_gpios(self):
+        """
+        Return used gpios
+
+        Returns:
+            list: list of gpio names
+        """
+        with self._lock:
+            return list(self._by_gpio.keys())
+
+    def __len__(self):
+        return len(self._devices)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Condition
+from collections import deque
+import logging
+
+__all__ = ["GpioCallbackDispatcher"]
+
+
+class GpioCallbackWorker(Thread):
+    """
+    Dispatcher worker thread running callbacks pushed in its bounded queue, in push order
+    """
+
+    def __init__(self, name, queue_size, overflow):
+        """
+        Constructor
+
+        Args:
+            name (str): thread name
+            queue_size (int): max number of queued callbacks
+            overflow (str): overflow policy (see GpioCallbackDispatcher)
+        """
+        Thread.__init__(self, name=name)
+        self.daemon = True
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # self.logger.setLevel(logging.DEBUG)
+
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.running = True
+        self._queue = deque()
+        self._condition = Condition()
+
+        # stats
+        self.high_water = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.errors = 0
+
+    def stop(self):
+        """
+        Stop worker. Queued callbacks are run before thread ends
+        """
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, callback, args):
+        """
+        Queue callback applying overflow policy if queue is full
+
+        Args:
+            callback (function): callback function
+            args (tuple): callback arguments
+
+        Returns:
+            bool: True if callback is queued, False if it is dropped
+        """
+        with self._condition:
+            if self.running and len(self._queue) >= self.queue_size:
+                if self.overflow == GpioCallbackDispatcher.OVERFLOW_BLOCK:
+                    self.blocked += 1
+                    while self.running and len(self._queue) >= self.queue_size:
+                        self._condition.wait()
+                elif self.overflow == GpioCallbackDispatcher.OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                else:
+                    self._queue.popleft()
+                    self.dropped += 1
+            if not self.running:
+                self.dropped += 1
+                return False
+
+            self._queue.append((callback, args))
+            if len(self._queue) > self.high_water:
+                self.high_water = len(self._queue)
+            self._condition.notify_all()
+
+        return True
+
+    def run(self):
+        """
+        Worker process
+        """
+        while True:
+            with self._condition:
+                while self.running and not self._queue:
+                    self._condition.wait()
+                if not self._queue:
+                    break
+                callback, args = self._queue.popleft()
+                # wake up callers blocked on full queue
+                self._condition.notify_all()
+
+            try:
+                callback(*args)
+                self.dispatched += 1
+            except Exception:
+                self.errors += 1
+                self.logger.exception("Exception in dispatched callback:")
+
+
+class GpioCallbackDispatcher:
+    """
+    Run input callbacks from a small pool of worker threads, so input watchers timing doesn't
+    depend on event bus latency and a failing callback doesn't stop inputs sampling
+
+    Each worker drains its own bounded queue and callbacks are routed to workers by key (device
+    uuid), so callbacks of an input are always run in order. When a worker queue is full, overflow
+    policy drops oldest queued callback, drops new callback or blocks caller until a callback is
+    dequeued.
+    """
+
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_DROP_NEWEST = "drop_newest"
+    OVERFLOW_BLOCK = "block"
+    OVERFLOWS = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK)
+
+    QUEUE_SIZE = 256
+    WORKERS = 2
+
+    def __init__(
+        self, queue_size=QUEUE_SIZE, workers=WORKERS, overflow=OVERFLOW_DROP_OLDEST
+    ):
+        """
+        Constructor
+
+        Args:
+            queue_size (int): max number of queued callbacks per worker
+            workers (int): number of worker threads
+            overflow (str): overflow policy (drop_oldest|drop_newest|block)
+        """
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._workers = [
+            GpioCallbackWorker("GpioCallbackWorker-%d" % index, queue_size, overflow)
+            for index in range(workers)
+        ]
+
+    def start(self):
+        """
+        Start workers
+        """
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self):
+        """
+        Stop workers. Queued callbacks are run before workers end
+        """
+        for worker in self._workers:
+            worker.stop()
+
+    def join(self, timeout=None):
+        """
+        Wait for workers end
+
+        Args:
+            timeout (float): max time waiting for each worker (seconds)
+        """
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def is_alive(self):
+        """
+        Return True if a worker is running
+        """
+        return any(worker.is_alive() for worker in self._workers)
+
+    def dispatch(self, key, callback, args=()):
+        """
+        Queue callback in worker associated to key
+
+        Args:
+            key (str): routing key, callbacks with same key are run in order
+            callback (function): callback function
+            args (tuple): callback arguments
+
+        Returns:
+            bool: True if callback is queued, False if it is dropped
+        """
+        return self._workers[hash(key) % len(self._workers)].push(callback, args)
+
+    def get_stats(self):
+        """
+        Return dispatcher statistics
+
+        Returns:
+            dict: statistics::
+
+                {
+                    workers (int): number of worker threads
+                    queuesize (int): max number of queued callbacks per worker
+                    overflow (str): overflow policy
+                    depth (int): number of queued callbacks
+                    highwater (int): max number of callbacks queued in a worker
+                    dispatched (int): number of callbacks run
+                    dropped (int): number of callbacks dropped by overflow policy
+                    blocked (int): number of times caller was blocked on full queue
+                    errors (int): number of callbacks that raised an exception
+                }
+
+        """
+        return {
+            "workers": len(self._workers),
+            "queuesize": self.queue_size,
+            "overflow": self.overflow,
+            "depth": sum(len(worker) for worker in self._workers),
+            "highwater": max(worker.high_water for worker in self._workers),
+            "dispatched": sum(worker.dispatched for worker in self._workers),
+            "dropped": sum(worker.dropped for worker in self._workers),
+            "blocked": sum(worker.blocked for worker in self._workers),
+            "errors": sum(worker.errors for worker in self._workers),
+        }
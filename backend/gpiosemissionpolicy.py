@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+__all__ = ["GpioEmissionPolicy"]
+
+
+class GpioEmissionPolicy:
+    """
+    Per gpio events emission policy
+
+    It limits events sent on the bus by a noisy input:
+
+        * max_rate: maximum number of events per second (token bucket). Events exceeding rate are dropped and
+          latest one is sent as soon as rate allows it
+        * window: coalescing window opened after each sent event. Transitions occuring inside window are merged
+          and latest one is sent at window end as a summary event with transitions count
+
+    Summary event always holds the latest transition so subscribers never miss final gpio state.
+    """
+
+    __slots__ = (
+        "_lock",
+        "max_rate",
+        "window",
+        "tokens",
+        "tokens_time",
+        "window_end",
+        "pending",
+        "pending_transitions",
+        "pending_rate_limited",
+        "emitted",
+        "merged",
+        "dropped",
+    )
+
+    def __init__(self, max_rate=0, window=0):
+        """
+        Constructor
+
+        Args:
+            max_rate (float): maximum events per second (0 to disable)
+            window (float): coalescing window in seconds (0 to disable)
+        """
+        self._lock = Lock()
+        self.max_rate = max_rate
+        self.window = window
+        self.tokens = float(max(1.0, max_rate))
+        self.tokens_time = 0.0
+        self.window_end = 0.0
+        self.pending = None
+        self.pending_transitions = 0
+        self.pending_rate_limited = False
+
+        # counters
+        self.emitted = 0
+        self.merged = 0
+        self.dropped = 0
+
+    def __refill(self, now):
+        """
+        Refill token bucket
+
+        Args:
+            now (float): monotonic time
+        """
+        if self.max_rate <= 0:
+            return
+        capacity = max(1.0, self.max_rate)
+        self.tokens = min(capacity, self.tokens + (now - self.tokens_time) * self.max_rate)
+        self.tokens_time = now
+
+    def __emitted(self, now):
+        """
+        Update policy state after an event is emitted
+
+        Args:
+            now (float): monotonic time
+        """
+        self.emitted += 1
+        self.window_end = now + self.window
+        if self.max_rate > 0:
+            self.tokens -= 1.0
+
+    def submit(self, event, params, now):
+        """
+        Submit new event
+
+        Args:
+            event (Event): event instance
+            params (dict): event parameters
+            now (float): monotonic time
+
+        Returns:
+            float: None if event must be sent now, otherwise delay (seconds) after which flush must be called.
+                   0 is returned if a flush is already scheduled.
+        """
+        with self._lock:
+            if self.pending is not None:
+                # flush already scheduled, replace pending event by latest one
+                self.pending = (event, params)
+                self.pending_transitions += 1
+                if self.pending_rate_limited:
+                    self.dropped += 1
+                else:
+                    self.merged += 1
+                return 0
+
+            self.__refill(now)
+            if now < self.window_end:
+                self.pending = (event, params)
+                self.pending_transitions = 1
+                self.pending_rate_limited = False
+                self.merged += 1
+                return self.window_end - now
+
+            if self.max_rate > 0 and self.tokens < 1.0:
+                self.pending = (event, params)
+                self.pending_transitions = 1
+                self.pending_rate_limited = True
+                self.dropped += 1
+                return (1.0 - self.tokens) / self.max_rate
+
+            self.__emitted(now)
+            return None
+
+    def flush(self, now):
+        """
+        Return pending summary event
+
+        Args:
+            now (float): monotonic time
+
+        Returns:
+            tuple: (event, params) with params completed with "transitions" count, or None if nothing is pending
+        """
+        with self._lock:
+            if self.pending is None:
+                return None
+
+            event, params = self.pending
+            params = dict(params, transitions=self.pending_transitions)
+            self.pending = None
+            self.pending_transitions = 0
+            # summary replaces one dropped or merged event
+            if self.pending_rate_limited:
+                self.dropped -= 1
+            else:
+                self.merged -= 1
+            self.__refill(now)
+            self.__emitted(now)
+
+            return event, params
+
+    def get_stats(self):
+        """
+        Return policy counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    emitted (int): number of events sent
+                    merged (int): number of events merged in summary events
+                    dropped (int): number of events dropped by rate limiting
+                }
+
+        """
+        return {
+            "emitted": self.emitted,
+            "merged": self.merged,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+import time
+
+__all__ = ["GpioGestureDetector"]
+
+
+class GpioGestureDetector:
+    """
+    Per input gestures recognition from debounced presses and releases
+
+    Recognized gestures:
+
+        * click, doubleclick, tripleclick: 1 to 3 short presses, each one starting less than
+          click interval after previous release. Gesture is emitted click interval after last
+          release, or immediately on third release
+        * longpress: input pressed for long press duration, emitted while input is still pressed
+        * hold: emitted every hold repeat period while input stays pressed after a long press
+
+    A press sequence produces a single click or long press gesture. Timeouts are scheduled in
+    timer wheel, so detector doesn't need its own thread.
+    """
+
+    CLICK = "click"
+    DOUBLECLICK = "doubleclick"
+    TRIPLECLICK = "tripleclick"
+    LONGPRESS = "longpress"
+    HOLD = "hold"
+    # click gesture by number of clicks
+    CLICKS = (None, CLICK, DOUBLECLICK, TRIPLECLICK)
+
+    __slots__ = (
+        "_lock",
+        "_timers",
+        "_emit",
+        "uuid",
+        "long_press",
+        "click_interval",
+        "hold_repeat",
+        "press_time",
+        "clicks",
+        "last_duration",
+        "long_pressed",
+        "repeats",
+        "_timer_id",
+        "_token",
+        "gestures",
+    )
+
+    def __init__(
+        self, uuid, timers, emit, long_press=0.0, click_interval=0.0, hold_repeat=0.0
+    ):
+        """
+        Constructor
+
+        Args:
+            uuid (str): device uuid
+            timers (GpioTimerWheel): timer wheel running gestures timeouts
+            emit (function): function called with (uuid, gesture, clicks, duration, repeat) on
+                             each recognized gesture
+            long_press (float): press duration of long press gesture in seconds (0 to disable)
+            click_interval (float): max delay between clicks in seconds (0 to disable clicks)
+            hold_repeat (float): hold gesture period after long press in seconds (0 to disable)
+        """
+        self._lock = Lock()
+        self._timers = timers
+        self._emit = emit
+        self.uuid = uuid
+        self.long_press = long_press
+        self.click_interval = click_interval
+        self.hold_repeat = hold_repeat
+        # monotonic timestamp of current press (None when released)
+        self.press_time = None
+        self.clicks = 0
+        self.last_duration = 0.0
+        self.long_pressed = False
+        self.repeats = 0
+        self._timer_id = None
+        # incremented each time pending timeout is replaced, so a late timeout is ignored
+        self._token = 0
+
+        # counters
+        self.gestures = 0
+
+    def __schedule(self, deadline, callback):
+        """
+        Schedule timeout replacing pending one (lock must be acquired)
+
+        Args:
+            deadline (float): monotonic timeout deadline
+            callback (function): timeout callback
+        """
+        self.__cancel()
+        self._timer_id = self._timers.add(deadline, callback, [self._token])
+
+    def __cancel(self):
+        """
+        Cancel pending timeout (lock must be acquired)
+        """
+        self._token += 1
+        if self._timer_id is not None:
+            self._timers.cancel(self._timer_id)
+            self._timer_id = None
+
+    def cancel(self):
+        """
+        Cancel pending timeout and reset gesture in progress
+        """
+        with self._lock:
+            self.__cancel()
+            self.press_time = None
+            self.clicks = 0
+
+    def press(self, now):
+        """
+        Input pressed (turned on)
+
+        Args:
+            now (float): monotonic timestamp
+        """
+        with self._lock:
+            self.__cancel()
+            self.press_time = now
+            self.long_pressed = False
+            self.repeats = 0
+            if self.long_press:
+                self.__schedule(now + self.long_press, self.__long_press_timeout)
+
+    def release(self, now, duration):
+        """
+        Input released (turned off)
+
+        Args:
+            now (float): monotonic timestamp
+            duration (float): press duration (seconds)
+        """
+        gesture = None
+        with self._lock:
+            if self.press_time is None:
+                # input was not pressed (initial state)
+                return
+            self.press_time = None
+            self.__cancel()
+            if self.long_pressed:
+                self.clicks = 0
+            elif self.long_press and duration >= self.long_press:
+                # long press timeout not fired yet
+                self.clicks = 0
+                gesture = (self.LONGPRESS, 0, duration, 0)
+            elif self.click_interval:
+                self.clicks += 1
+                self.last_duration = duration
+                if self.clicks == len(self.CLICKS) - 1:
+                    gesture = (self.CLICKS[self.clicks], self.clicks, duration, 0)
+                    self.clicks = 0
+                else:
+                    self.__schedule(now + self.click_interval, self.__click_timeout)
+
+        if gesture is not None:
+            self.__emit(*gesture)
+
+    def __long_press_timeout(self, token):
+        """
+        Long press duration elapsed (timer wheel callback)
+
+        Args:
+            token (int): timeout token
+        """
+        with self._lock:
+            if token != self._token or self.press_time is None:
+                return
+            self._timer_id = None
+            self.long_pressed = True
+            self.clicks = 0
+            if self.hold_repeat:
+                self.__schedule(
+                    self.press_time + self.long_press + self.hold_repeat,
+                    self.__hold_timeout,
+                )
+
+        self.__emit(self.LONGPRESS, 0, self.long_press, 0)
+
+    def __hold_timeout(self, token):
+        """
+        Hold repeat period elapsed (timer wheel callback)
+
+        Args:
+            token (int): timeout token
+        """
+        with self._lock:
+            if token != self._token or self.press_time is None:
+                return
+            self._timer_id = None
+            self.repeats += 1
+            repeats = self.repeats
+            duration = self.long_press + self.hold_repeat * repeats
+            self.__schedule(
+                self.press_time + duration + self.hold_repeat, self.__hold_timeout
+            )
+
+        self.__emit(self.HOLD, 0, duration, repeats)
+
+    def __click_timeout(self, token):
+        """
+        Click interval elapsed without new press (timer wheel callback)
+
+        Args:
+            token (int): timeout token
+        """
+        with self._lock:
+            if token != self._token or not self.clicks:
+                return
+            self._timer_id = None
+            clicks = self.clicks
+            duration = self.last_duration
+            self.clicks = 0
+
+        self.__emit(self.CLICKS[clicks], clicks, duration, 0)
+
+    def __emit(self, gesture, clicks, duration, repeat):
+        """
+        Emit recognized gesture
+
+        Args:
+            gesture (str): gesture name
+            clicks (int): number of clicks (click gestures only)
+            duration (float): press duration (seconds)
+            repeat (int): hold repeat number (hold gesture only)
+        """
+        self.gestures += 1
+        self._emit(self.uuid, gesture, clicks, round(duration, 3), repeat)
+
+    def get_stats(self):
+        """
+        Return detector state and counters
+
+        Returns:
+            dict: detector stats::
+
+                {
+                    gestures (int): number of emitted gestures
+                    pressed (bool): True if input is pressed
+                    clicks (int): number of clicks of click gesture in progress
+                    pressduration (float): current press duration (0 if released)
+                }
+
+        """
+        press_time = self.press_time
+        return {
+            "gestures": self.gestures,
+            "pressed": press_time is not None,
+            "clicks": self.clicks,
+            "pressduration": (
+                time.monotonic() - press_time if press_time is not None else 0.0
+            ),
+        }
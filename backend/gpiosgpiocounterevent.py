@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+class GpiosGpioCounterEvent(Event):
+    """
+    Gpios.gpio.counter event
+    """
+
+    EVENT_NAME = 'gpios.gpio.counter'
+    EVENT_PARAMS = ['gpio', 'count', 'rate', 'frequency', 'interval']
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
+
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+class GpiosGpioGestureEvent(Event):
+    """
+    Gpios.gpio.gesture event
+    """
+
+    EVENT_NAME = 'gpios.gpio.gesture'
+    EVENT_PARAMS = ['gpio', 'gesture', 'clicks', 'duration', 'repeat']
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
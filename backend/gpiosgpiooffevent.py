@@ -9,7 +9,7 @@ class GpiosGpioOffEvent(Event):
     """
 
     EVENT_NAME = 'gpios.gpio.off'
-    EVENT_PARAMS = ['gpio', 'init', 'duration']
+    EVENT_PARAMS = ['gpio', 'init', 'duration', 'transitions']
 
     def __init__(self, params):
         """ 
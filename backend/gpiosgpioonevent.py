@@ -9,7 +9,7 @@ class GpiosGpioOnEvent(Event):
     """
 
     EVENT_NAME = 'gpios.gpio.on'
-    EVENT_PARAMS = ['gpio', 'init']
+    EVENT_PARAMS = ['gpio', 'init', 'transitions']
 
     def __init__(self, params):
         """
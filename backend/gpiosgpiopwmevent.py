@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+class GpiosGpioPwmEvent(Event):
+    """
+    Gpios.gpio.pwm event
+    """
+
+    EVENT_NAME = 'gpios.gpio.pwm'
+    EVENT_PARAMS = ['gpio', 'dutycycle', 'frequency']
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
+
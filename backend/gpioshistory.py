@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+from array import array
+
+__all__ = ["GpioEdgeHistory"]
+
+
+class GpioEdgeHistory:
+    """
+    Fixed size ring of input transitions (monotonic timestamp, level) fed by input watchers
+
+    Transitions are stored in preallocated arrays (8 bytes timestamp and 1 byte level per edge) so
+    recording an edge doesn't allocate anything and memory is bounded by ring size. Oldest edges
+    are overwritten when ring is full.
+    """
+
+    SIZE = 256
+
+    __slots__ = (
+        "_lock",
+        "size",
+        "timestamps",
+        "levels",
+        "head",
+        "count",
+        "total",
+    )
+
+    def __init__(self, size=SIZE):
+        """
+        Constructor
+
+        Args:
+            size (int): max number of edges kept
+        """
+        self._lock = Lock()
+        self.size = size
+        self.timestamps = array("d", bytes(8 * size))
+        self.levels = bytearray(size)
+        # index of next written edge
+        self.head = 0
+        # number of edges in ring
+        self.count = 0
+        # number of edges recorded since creation
+        self.total = 0
+
+    def add(self, timestamp, level):
+        """
+        Record new edge
+
+        Args:
+            timestamp (float): edge monotonic timestamp (seconds)
+            level (int): input level after edge (0|1)
+        """
+        with self._lock:
+            self.timestamps[self.head] = timestamp
+            self.levels[self.head] = level
+            self.head += 1
+            if self.head == self.size:
+                self.head = 0
+            if self.count < self.size:
+                self.count += 1
+            self.total += 1
+
+    def __len__(self):
+        return self.count
+
+    def get_edges(self, since=None, limit=None):
+        """
+        Return recorded edges, oldest first
+
+        Args:
+            since (float): only return edges recorded strictly after this monotonic timestamp
+            limit (int): max number of edges returned (latest ones are kept)
+
+        Returns:
+            tuple: (timestamps list, levels list)
+        """
+        with self._lock:
+            return self.__get_edges(since, limit)
+
+    def __get_edges(self, since, limit):
+        """
+        Return recorded edges, oldest first (lock must be acquired)
+
+        Args:
+            since (float): only return edges recorded strictly after this monotonic timestamp
+            limit (int): max number of edges returned (latest ones are kept)
+
+        Returns:
+            tuple: (timestamps list, levels list)
+        """
+        count = self.count
+        if limit is not None:
+            count = min(count, limit)
+
+        # walk ring backward from latest edge
+        timestamps = []
+        levels = []
+        index = self.head
+        for _ in range(count):
+            index = (index or self.size) - 1
+            timestamp = self.timestamps[index]
+            if since is not None and timestamp <= since:
+                break
+            timestamps.append(timestamp)
+            levels.append(self.levels[index])
+
+        timestamps.reverse()
+        levels.reverse()
+        return timestamps, levels
+
+    def resize(self, size):
+        """
+        Change ring size keeping latest edges. Edges are copied and ring is replaced atomically
+        so no edge recorded meanwhile is lost
+
+        Args:
+            size (int): max number of edges kept
+        """
+        with self._lock:
+            timestamps, levels = self.__get_edges(None, size)
+            self.size = size
+            self.timestamps = array("d", bytes(8 * size))
+            self.levels = bytearray(size)
+            self.timestamps[: len(timestamps)] = array("d", timestamps)
+            self.levels[: len(levels)] = bytes(levels)
+            self.head = len(timestamps) % size
+            self.count = len(timestamps)
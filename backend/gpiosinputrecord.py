@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__all__ = ["GpioInputRecord"]
+
+
+class GpioInputRecord:
+    """
+    Runtime record of a watched input, built when input is registered in input watcher
+
+    Record holds everything input callbacks need to emit an event (gpio name, emission policy,
+    latency stats...), so an edge doesn't have to look up device config (kept for persistence
+    only) nor several per device dicts. Input watcher samples inputs on records too, using
+    triggered level, debouncer and on timestamp slots.
+    """
+
+    __slots__ = (
+        "uuid",
+        "pin",
+        "gpio",
+        "inverted",
+        "history",
+        "latency",
+        "state",
+        "policy",
+        "gesture",
+        "level",
+        "debouncer",
+        "time_on",
+    )
+
+    def __init__(
+        self,
+        uuid,
+        pin,
+        gpio,
+        inverted,
+        history=None,
+        latency=None,
+        state=None,
+        policy=None,
+        gesture=None,
+        level=None,
+    ):
+        """
+        Constructor
+
+        Args:
+            uuid (str): device uuid
+            pin (int): input pin number
+            gpio (str): gpio name (GPIOXX)
+            inverted (bool): True if input is inverted
+            history (GpioEdgeHistory): input edges history
+            latency (GpioLatencyStats): input latency stats
+            state (GpioInputState): input live state
+            policy (GpioEmissionPolicy): input emission policy (None if events are not limited)
+            gesture (GpioGestureDetector): input gestures detector (None if gestures are disabled)
+            level (int): triggered level (0|1)
+        """
+        self.uuid = uuid
+        self.pin = pin
+        self.gpio = gpio
+        self.inverted = inverted
+        self.history = history
+        self.latency = latency
+        self.state = state
+        self.policy = policy
+        self.gesture = gesture
+        self.level = level
+        # input watcher sampling state
+        self.debouncer = None
+        self.time_on = 0
+
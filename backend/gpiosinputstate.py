@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__all__ = ["GpioInputState"]
+
+
+class GpioInputState:
+    """
+    Live state of a watched input, updated by input watcher on each debounced transition
+
+    State is stored in a single tuple replaced on each update, so readers always get a consistent
+    state without locking and without any hardware access.
+    """
+
+    __slots__ = ("_state",)
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        # (level, on, monotonic timestamp of last change, number of changes)
+        self._state = (None, False, None, 0)
+
+    def update(self, level, on, timestamp):
+        """
+        Update input state. First update sets initial state and is not counted as a change
+
+        Args:
+            level (int): debounced input level (0|1)
+            on (bool): True if input is on (level is triggered level)
+            timestamp (float): monotonic timestamp of level change
+        """
+        previous = self._state
+        if previous[2] is None:
+            self._state = (level, on, timestamp, 0)
+        elif level != previous[0]:
+            self._state = (level, on, timestamp, previous[3] + 1)
+        else:
+            # same level (input reconfigured), only triggered level may have changed
+            self._state = (level, on, previous[2], previous[3])
+
+    @property
+    def level(self):
+        return self._state[0]
+
+    @property
+    def on(self):
+        return self._state[1]
+
+    @property
+    def timestamp(self):
+        return self._state[2]
+
+    @property
+    def changes(self):
+        return self._state[3]
+
+    def get(self):
+        """
+        Return consistent input state
+
+        Returns:
+            tuple: (level, on, timestamp, changes). Level and timestamp are None until input is sampled
+        """
+        return self._state
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+from bisect import bisect_left
+
+__all__ = ["GpioLatencyHistogram", "GpioLatencyStats"]
+
+
+class GpioLatencyHistogram:
+    """
+    Latency histogram with fixed exponential buckets
+
+    Buckets upper bounds double from 1us to about 16s (plus an overflow bucket), so updating the
+    histogram is a bisect and a counter increment and memory doesn't depend on number of samples.
+    Percentiles are approximated by the upper bound of the bucket holding them.
+    """
+
+    # buckets upper bounds (seconds)
+    BOUNDS = tuple(0.000001 * 2**i for i in range(25))
+
+    __slots__ = (
+        "_lock",
+        "counts",
+        "count",
+        "total",
+        "max",
+    )
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self._lock = Lock()
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """
+        Add sample
+
+        Args:
+            value (float): latency (seconds)
+        """
+        bucket = bisect_left(self.BOUNDS, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def __percentile(self, percent):
+        """
+        Return approximated percentile (lock must be acquired)
+
+        Args:
+            percent (float): percentile (0-100)
+
+        Returns:
+            float: percentile value (seconds)
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100.0
+        cumulated = 0
+        for bucket, count in enumerate(self.counts):
+            cumulated += count
+            if cumulated >= rank and count:
+                bound = self.BOUNDS[bucket] if bucket < len(self.BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max  # pragma: no cover
+
+    def snapshot(self, reset=False):
+        """
+        Return histogram summary, and atomically reset histogram if requested
+
+        Args:
+            reset (bool): reset histogram after snapshot
+
+        Returns:
+            dict: histogram summary::
+
+                {
+                    count (int): number of samples
+                    mean (float): mean latency (seconds)
+                    max (float): max latency (seconds)
+                    p50 (float): median latency (seconds)
+                    p90 (float): 90th percentile latency (seconds)
+                    p99 (float): 99th percentile latency (seconds)
+                }
+
+        """
+        with self._lock:
+            summary = {
+                "count": self.count,
+                "mean": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "p50": self.__percentile(50),
+                "p90": self.__percentile(90),
+                "p99": self.__percentile(99),
+            }
+            if reset:
+                self.counts = [0] * (len(self.BOUNDS) + 1)
+                self.count = 0
+                self.total = 0.0
+                self.max = 0.0
+
+        return summary
+
+
+class GpioLatencyStats:
+    """
+    Latency histograms of an input, from physical edge to event sent on bus:
+
+        * detection: from edge timestamp to callback dispatch by input watcher
+        * callback: callback dispatch duration (input watcher is blocked meanwhile)
+        * queue: time spent by callback in dispatcher queue before a worker runs it
+        * send: event send duration (measured in dispatcher worker)
+    """
+
+    __slots__ = (
+        "detection",
+        "callback",
+        "queue",
+        "send",
+    )
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.detection = GpioLatencyHistogram()
+        self.callback = GpioLatencyHistogram()
+        self.queue = GpioLatencyHistogram()
+        self.send = GpioLatencyHistogram()
+
+    def snapshot(self, reset=False):
+        """
+        Return histograms summaries
+
+        Args:
+            reset (bool): reset histograms after snapshot
+
+        Returns:
+            dict: summaries::
+
+                {
+                    detection (dict): detection delay summary (see GpioLatencyHistogram.snapshot)
+                    callback (dict): callback duration summary
+                    queue (dict): dispatcher queue wait summary
+                    send (dict): event send duration summary
+                }
+
+        """
+        return {
+            "detection": self.detection.snapshot(reset),
+            "callback": self.callback.snapshot(reset),
+            "queue": self.queue.snapshot(reset),
+            "send": self.send.snapshot(reset),
+        }
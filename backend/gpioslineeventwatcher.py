@@ -0,0 +1,563 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock
+import logging
+import os
+import time
+import select
+import struct
+import fcntl
+from .gpiosdebouncer import GpioDebouncer
+
+__all__ = ["GpioLineEventWatcher"]
+
+# linux gpio character device ABI (v1)
+# @see https://github.com/torvalds/linux/blob/master/include/uapi/linux/gpio.h
+GPIO_GET_LINEEVENT_IOCTL = 0xC030B404
+GPIOHANDLE_GET_LINE_VALUES_IOCTL = 0xC040B408
+GPIOHANDLE_REQUEST_INPUT = 0x01
+GPIOEVENT_REQUEST_RISING_EDGE = 0x01
+GPIOEVENT_REQUEST_FALLING_EDGE = 0x02
+GPIOEVENT_REQUEST_BOTH_EDGES = 0x03
+GPIOEVENT_EVENT_RISING_EDGE = 0x01
+GPIOEVENT_EVENT_FALLING_EDGE = 0x02
+
+# struct gpioevent_request { u32 lineoffset; u32 handleflags; u32 eventflags; char consumer_label[32]; int fd; }
+GPIOEVENT_REQUEST = struct.Struct("=III32si")
+# struct gpioevent_data { u64 timestamp; u32 id; } (padded to 16 bytes)
+GPIOEVENT_DATA = struct.Struct("=QI4x")
+
+LEVEL_LOW = 0
+LEVEL_HIGH = 1
+
+
+class GpioLineEventWatcher(Thread):
+    """
+    Class that watches input pins using line events from linux gpio character device (/dev/gpiochipN)
+
+    Instead of polling input levels, all watched lines are waited at once with epoll and edges are timestamped
+    by the kernel (in nanoseconds) which gives accurate durations. Edges are debounced by a GpioDebouncer
+    state machine per input, pending level changes are resolved using epoll timeout.
+    Pulse counters only request the counted edge and are fed with every kernel event.
+    Callbacks receive the monotonic timestamp of the debounced edge, or None for the callback
+    sending input initial value (it is not an edge).
+
+    Note:
+        This object doesn't configure pin!
+    """
+
+    DEBOUNCE = GpioDebouncer.DEBOUNCE
+    STABLE_TIME = GpioDebouncer.STABLE_TIME
+    REARM_TIME = GpioDebouncer.REARM_TIME
+    CHIP_PATH = "/dev/gpiochip0"
+    CONSUMER_LABEL = b"cleep-gpios"
+    # max time waiting for events, it is only used to make sure watcher is still alive
+    POLL_TIMEOUT = 1.0
+
+    # input table columns
+    PIN = 0
+    UUID = 1
+    LEVEL = 2
+    FD = 3
+    DEBOUNCER = 4
+    TIME_ON = 5
+    HISTORY = 6
+    LATENCY = 7
+    STATE = 8
+
+    # counter table columns
+    COUNTER = 2
+
+    def __init__(self, on_callback, off_callback, lines, chip_path=CHIP_PATH):
+        """
+        Constructor
+
+        Args:
+            on_callback (function): on callback called with (uuid, timestamp)
+            off_callback (function): off callback called with (uuid, duration, timestamp)
+            lines (dict): map of pin number with gpio chip line offset
+            chip_path (str): gpio character device path
+
+        Raises:
+            OSError: if gpio character device is not available
+        """
+        # init
+        Thread.__init__(self)
+        self.daemon = True
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.debounce = GpioLineEventWatcher.DEBOUNCE
+        self.stable_time = GpioLineEventWatcher.STABLE_TIME
+        self.rearm_time = GpioLineEventWatcher.REARM_TIME
+        self.on_callback = on_callback
+        self.off_callback = off_callback
+        self.lines = lines
+        self._chip_fd = self._open_chip(chip_path)
+        self._inputs = {}
+        self._counters = {}
+        self._inputs_lock = Lock()
+        self._epoll = select.epoll()
+        self._wakeup_read_fd, self._wakeup_write_fd = os.pipe()
+        self._epoll.register(self._wakeup_read_fd, select.EPOLLIN)
+        self._clock_offset = None
+
+        # health metrics
+        self.loops = 0
+        self.overruns = 0
+        self.cpu_time = 0.0
+        self.last_alive = None
+
+        # (watcher loop, loop timestamp, bitmask of debounced high levels by pin number)
+        self.snapshot = (0, None, 0)
+
+    def _open_chip(self, chip_path):  # pragma: no cover
+        """
+        Open gpio character device
+
+        Args:
+            chip_path (str): gpio character device path
+
+        Returns:
+            int: chip file descriptor
+        """
+        return os.open(chip_path, os.O_RDONLY)
+
+    def _request_line_events(
+        self, line, edges=GPIOEVENT_REQUEST_BOTH_EDGES
+    ):  # pragma: no cover
+        """
+        Request edges events for specified line
+
+        Args:
+            line (int): gpio chip line offset
+            edges (int): requested edges (GPIOEVENT_REQUEST_XXX)
+
+        Returns:
+            int: line events file descriptor
+        """
+        request = bytearray(
+            GPIOEVENT_REQUEST.pack(
+                line,
+                GPIOHANDLE_REQUEST_INPUT,
+                edges,
+                self.CONSUMER_LABEL,
+                0,
+            )
+        )
+        fcntl.ioctl(self._chip_fd, GPIO_GET_LINEEVENT_IOCTL, request, True)
+        return GPIOEVENT_REQUEST.unpack(request)[4]
+
+    def _get_line_value(self, fd):  # pragma: no cover
+        """
+        Return current line value
+
+        Args:
+            fd (int): line events file descriptor
+
+        Returns:
+            int: line level (0|1)
+        """
+        values = bytearray(64)
+        fcntl.ioctl(fd, GPIOHANDLE_GET_LINE_VALUES_IOCTL, values, True)
+        return values[0]
+
+    def stop(self):
+        """
+        Stop process
+        """
+        self.continu = False
+        self.__wakeup()
+
+    def __wakeup(self):
+        """
+        Wake up watcher blocked waiting for events
+        """
+        try:
+            os.write(self._wakeup_write_fd, b"\0")
+        except OSError:  # pragma: no cover
+            pass
+
+    def add_input(
+        self, pin, uuid, level=LEVEL_LOW, history=None, latency=None, state=None
+    ):
+        """
+        Add input to watch. If input is already watched it is replaced
+
+        Args:
+            pin (int): gpio pin number
+            uuid (str): device uuid
+            level (int): triggered level (0|1)
+            history (GpioEdgeHistory): history fed with input debounced transitions
+            latency (GpioLatencyStats): stats fed with detection delay and callback duration
+            state (GpioInputState): live input state updated on debounced transitions
+        """
+        self.remove_input(uuid)
+
+        fd = self._request_line_events(self.lines[pin])
+        now = time.monotonic()
+        initial_level = self._get_line_value(fd)
+        debouncer = GpioDebouncer(
+            initial_level,
+            now,
+            self.debounce,
+            self.stable_time,
+            self.rearm_time,
+        )
+        if history is not None:
+            history.add(now, initial_level)
+        if state is not None:
+            state.update(initial_level, initial_level == level, now)
+        with self._inputs_lock:
+            self._inputs[fd] = [
+                pin,
+                uuid,
+                level,
+                fd,
+                debouncer,
+                0,
+                history,
+                latency,
+                state,
+            ]
+            self._epoll.register(fd, select.EPOLLIN | select.EPOLLPRI)
+
+        # refresh snapshot
+        self.__wakeup()
+
+        # send initial value
+        if level == LEVEL_LOW:
+            self.off_callback(uuid, 0, None)
+        else:
+            self.on_callback(uuid, None)
+
+    def add_counter(self, pin, uuid, counter, level=LEVEL_HIGH):
+        """
+        Add pulse counter input. If input is already watched it is replaced
+
+        Args:
+            pin (int): gpio pin number
+            uuid (str): device uuid
+            counter (GpioPulseCounter): counter to feed
+            level (int): level reached by counted edges (1 for rising edges, 0 for falling edges)
+        """
+        self.remove_input(uuid)
+
+        edges = (
+            GPIOEVENT_REQUEST_RISING_EDGE
+            if level == LEVEL_HIGH
+            else GPIOEVENT_REQUEST_FALLING_EDGE
+        )
+        fd = self._request_line_events(self.lines[pin], edges)
+        with self._inputs_lock:
+            self._counters[fd] = [pin, uuid, counter, fd]
+            self._epoll.register(fd, select.EPOLLIN | select.EPOLLPRI)
+
+    def remove_input(self, uuid):
+        """
+        Remove watched input or pulse counter
+
+        Args:
+            uuid (str): device uuid
+
+        Returns:
+            bool: True if input was watched, False otherwise
+        """
+        removed = False
+        with self._inputs_lock:
+            for table in (self._inputs, self._counters):
+                fds = [fd for fd, entry in table.items() if entry[self.UUID] == uuid]
+                for fd in fds:
+                    self._epoll.unregister(fd)
+                    del table[fd]
+                    os.close(fd)
+                    removed = True
+
+        return removed
+
+    def has_input(self, uuid):
+        """
+        Return True if input is watched
+
+        Args:
+            uuid (str): device uuid
+
+        Returns:
+            bool: True if input is watched
+        """
+        return uuid in self.get_inputs()
+
+    def get_inputs(self):
+        """
+        Return watched inputs
+
+        Returns:
+            list: list of watched devices uuids
+        """
+        return [
+            entry[self.UUID]
+            for entry in list(self._inputs.values()) + list(self._counters.values())
+        ]
+
+    def get_debounce_stats(self):
+        """
+        Return debounce counters of watched inputs
+
+        Returns:
+            dict: debounce counters by device uuid::
+
+                {
+                    uuid (str): {
+                        bounces (int): number of edges detected inside debounce window
+                        glitches (int): number of level changes shorter than stable time
+                        pending (bool): True if a level change is waiting to be accepted
+                    },
+                    ...
+                }
+
+        """
+        return {
+            entry[self.UUID]: {
+                "bounces": entry[self.DEBOUNCER].bounces,
+                "glitches": entry[self.DEBOUNCER].glitches,
+                "pending": entry[self.DEBOUNCER].is_pending(),
+            }
+            for entry in list(self._inputs.values())
+        }
+
+    def get_health(self):
+        """
+        Return watcher health metrics
+
+        Returns:
+            dict: health metrics::
+
+                {
+                    loops (int): number of watcher loops
+                    overruns (int): number of events reads that filled read buffer (events backlog)
+                    bounces (int): number of transitions detected inside debounce window
+                    cputime (float): watcher thread CPU time (seconds)
+                    lastalive (float): timestamp of last watcher loop (None if never run)
+                }
+
+        """
+        last_alive = self.last_alive
+        return {
+            "loops": self.loops,
+            "overruns": self.overruns,
+            "bounces": sum(
+                entry[self.DEBOUNCER].bounces for entry in list(self._inputs.values())
+            ),
+            "cputime": self.cpu_time,
+            "lastalive": (
+                None
+                if last_alive is None
+                else time.time() - (time.monotonic() - last_alive)
+            ),
+        }
+
+    def get_snapshot(self):
+        """
+        Return debounced levels of all watched inputs at last watcher loop
+
+        Returns:
+            tuple: (watcher loop number, loop monotonic timestamp, levels bitmask with bit N set
+                   if input on pin N is high)
+        """
+        return self.snapshot
+
+    def _to_monotonic(self, timestamp):
+        """
+        Convert kernel event timestamp to monotonic clock. Kernels older than 5.7 timestamp events
+        using realtime clock instead of monotonic one.
+
+        Args:
+            timestamp (int): kernel event timestamp (ns)
+
+        Returns:
+            float: monotonic timestamp (seconds)
+        """
+        seconds = timestamp / 1000000000.0
+        if self._clock_offset is None:
+            realtime_offset = time.time() - time.monotonic()
+            is_realtime = abs(seconds - time.time()) < abs(seconds - time.monotonic())
+            self._clock_offset = realtime_offset if is_realtime else 0.0
+
+        return seconds - self._clock_offset
+
+    def __get_trigger(self, entry):
+        """
+        Update input history and state on debounced level change, and return callback to
+        trigger (inputs lock must be acquired)
+
+        Args:
+            entry (list): input table entry
+
+        Returns:
+            tuple: trigger (uuid, pin, on, timestamp, duration, latency) for __trigger_callbacks
+        """
+        debouncer = entry[self.DEBOUNCER]
+        on = debouncer.level == entry[self.LEVEL]
+        if entry[self.HISTORY] is not None:
+            entry[self.HISTORY].add(debouncer.timestamp, debouncer.level)
+        if entry[self.STATE] is not None:
+            entry[self.STATE].update(debouncer.level, on, debouncer.timestamp)
+        duration = 0
+        if on:
+            entry[self.TIME_ON] = debouncer.timestamp
+        elif entry[self.TIME_ON]:
+            duration = debouncer.timestamp - entry[self.TIME_ON]
+
+        return (
+            entry[self.UUID],
+            entry[self.PIN],
+            on,
+            debouncer.timestamp,
+            duration,
+            entry[self.LATENCY],
+        )
+
+    def __trigger_callbacks(self, triggers):
+        """
+        Trigger callbacks of debounced level changes. Inputs lock must not be acquired: callbacks
+        may block (full dispatcher queue) and would block inputs add and remove meanwhile
+
+        Args:
+            triggers (list): triggers returned by __get_trigger
+        """
+        for uuid, pin, on, timestamp, duration, latency in triggers:
+            start = time.monotonic()
+            if on:
+                self.logger.trace("Input %s on", pin)
+                self.on_callback(uuid, timestamp)
+            else:
+                self.logger.trace("Input %s off", pin)
+                self.off_callback(uuid, duration, timestamp)
+            if latency is not None:
+                # kernel timestamps give actual edge to callback delay
+                latency.detection.add(max(0.0, start - timestamp))
+                latency.callback.add(time.monotonic() - start)
+
+    def _process_events(self, entry):
+        """
+        Read and process all pending events of specified input (inputs lock must be acquired)
+
+        Args:
+            entry (list): input table entry
+
+        Returns:
+            list: triggers of debounced level changes (see __trigger_callbacks)
+        """
+        triggers = []
+        data = os.read(entry[self.FD], GPIOEVENT_DATA.size * 16)
+        if len(data) == GPIOEVENT_DATA.size * 16:
+            self.overruns += 1
+        for timestamp, event_id in GPIOEVENT_DATA.iter_unpack(data):
+            level = LEVEL_HIGH if event_id == GPIOEVENT_EVENT_RISING_EDGE else LEVEL_LOW
+            if entry[self.DEBOUNCER].update(level, self._to_monotonic(timestamp)):
+                triggers.append(self.__get_trigger(entry))
+
+        return triggers
+
+    def _process_counter_events(self, entry):
+        """
+        Read all pending events of specified pulse counter and count them
+
+        Args:
+            entry (list): counter table entry
+        """
+        data = os.read(entry[self.FD], GPIOEVENT_DATA.size * 16)
+        if len(data) == GPIOEVENT_DATA.size * 16:
+            self.overruns += 1
+        counter = entry[self.COUNTER]
+        for timestamp, _ in GPIOEVENT_DATA.iter_unpack(data):
+            counter.add_edge(self._to_monotonic(timestamp))
+
+    def _get_timeout(self, now):
+        """
+        Compute waiting timeout according to inputs being debounced
+
+        Args:
+            now (float): current monotonic time
+
+        Returns:
+            float: timeout in seconds
+        """
+        timeout = self.POLL_TIMEOUT
+        for entry in list(self._inputs.values()):
+            deadline = entry[self.DEBOUNCER].next_deadline()
+            if deadline is not None:
+                timeout = min(timeout, max(0.0, deadline - now))
+        return timeout
+
+    def _check_pending(self, now):
+        """
+        Resolve pending level changes of debounced inputs. Inputs table is locked so no level
+        change is resolved for an input removed or replaced meanwhile
+
+        Args:
+            now (float): current monotonic time
+
+        Returns:
+            tuple: (bitmask of debounced high levels by pin number, list of triggers of debounced
+                   level changes (see __trigger_callbacks))
+        """
+        mask = 0
+        triggers = []
+        with self._inputs_lock:
+            for entry in self._inputs.values():
+                if entry[self.DEBOUNCER].check(now):
+                    triggers.append(self.__get_trigger(entry))
+                if entry[self.DEBOUNCER].level:
+                    mask |= 1 << entry[self.PIN]
+
+        return mask, triggers
+
+    def run(self):
+        """
+        Run watcher
+        """
+        while self.continu:
+            try:
+                events = self._epoll.poll(self._get_timeout(time.monotonic()))
+                triggers = []
+                for fd, _ in events:
+                    if fd == self._wakeup_read_fd:
+                        os.read(self._wakeup_read_fd, 64)
+                        continue
+                    with self._inputs_lock:
+                        entry = self._inputs.get(fd)
+                        if entry is not None:
+                            triggers.extend(self._process_events(entry))
+                        elif fd in self._counters:
+                            self._process_counter_events(self._counters[fd])
+
+                now = time.monotonic()
+                mask, pending_triggers = self._check_pending(now)
+                triggers.extend(pending_triggers)
+
+                # callbacks are triggered once inputs lock is released
+                self.__trigger_callbacks(triggers)
+
+                # update health metrics and snapshot
+                self.loops += 1
+                self.snapshot = (self.loops, now, mask)
+                self.last_alive = now
+                self.cpu_time = time.thread_time()
+            except Exception:  # pragma: no cover
+                self.logger.exception("Exception in GpioLineEventWatcher:")
+
+        # release resources
+        with self._inputs_lock:
+            for table in (self._inputs, self._counters):
+                for fd in list(table.keys()):
+                    self._epoll.unregister(fd)
+                    os.close(fd)
+                table.clear()
+        self._epoll.close()
+        os.close(self._wakeup_read_fd)
+        os.close(self._wakeup_write_fd)
+        os.close(self._chip_fd)
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+class GpiosOutputsUpdateEvent(Event):
+    """
+    Gpios.outputs.update event
+    """
+
+    EVENT_NAME = 'gpios.outputs.update'
+    EVENT_PARAMS = ['outputs']
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
+
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+import time
+
+__all__ = ["GpioPulseCounter"]
+
+
+class GpioPulseCounter:
+    """
+    Pulse counter fed by input watchers on each counted edge
+
+    It holds two independent accumulations:
+
+        * counter: pulses counted since last reset (see snapshot)
+        * window: pulses counted since last publication (see publish), used to compute rate and frequency
+
+    Edges are only counted here (no event sent) so it can be fed at high rate.
+    """
+
+    __slots__ = (
+        "_lock",
+        "count",
+        "total",
+        "reset_time",
+        "window_start",
+        "window_count",
+        "window_first_edge",
+        "window_last_edge",
+    )
+
+    def __init__(self, now=None):
+        """
+        Constructor
+
+        Args:
+            now (float): monotonic start time (default current time)
+        """
+        now = time.monotonic() if now is None else now
+        self._lock = Lock()
+        self.count = 0
+        self.total = 0
+        self.reset_time = now
+        self.window_start = now
+        self.window_count = 0
+        self.window_first_edge = None
+        self.window_last_edge = None
+
+    def add_edge(self, timestamp):
+        """
+        Count new edge
+
+        Args:
+            timestamp (float): edge monotonic timestamp (seconds)
+        """
+        with self._lock:
+            self.count += 1
+            self.total += 1
+            self.window_count += 1
+            if self.window_first_edge is None:
+                self.window_first_edge = timestamp
+            self.window_last_edge = timestamp
+
+    def snapshot(self, reset=False, now=None):
+        """
+        Return counter values, and atomically reset them if requested
+
+        Args:
+            reset (bool): reset counter after snapshot
+            now (float): monotonic snapshot time (default current time)
+
+        Returns:
+            dict: counter values::
+
+                {
+                    count (int): pulses counted since last reset
+                    total (int): pulses counted since counter creation
+                    duration (float): seconds elapsed since last reset
+                    rate (float): average pulses per second since last reset
+                }
+
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            duration = now - self.reset_time
+            snapshot = {
+                "count": self.count,
+                "total": self.total,
+                "duration": duration,
+                "rate": self.count / duration if duration > 0 else 0.0,
+            }
+            if reset:
+                self.count = 0
+                self.reset_time = now
+
+        return snapshot
+
+    def publish(self, now=None):
+        """
+        Return pulses counted since last publication and start new window
+
+        Args:
+            now (float): monotonic publication time (default current time)
+
+        Returns:
+            dict: window values::
+
+                {
+                    count (int): pulses counted during window
+                    rate (float): average pulses per second during window
+                    frequency (float): pulses frequency measured between first and last window edges (Hz)
+                    interval (float): window duration (seconds)
+                }
+
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            interval = now - self.window_start
+            count = self.window_count
+            first_edge = self.window_first_edge
+            last_edge = self.window_last_edge
+            self.window_start = now
+            self.window_count = 0
+            self.window_first_edge = None
+            self.window_last_edge = None
+
+        frequency = 0.0
+        if count > 1 and last_edge > first_edge:
+            frequency = (count - 1) / (last_edge - first_edge)
+
+        return {
+            "count": count,
+            "rate": count / interval if interval > 0 else 0.0,
+            "frequency": frequency,
+            "interval": interval,
+        }
@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock, Event
+import heapq
+import logging
+import mmap
+import os
+import time
+from .gpiosbackend import GPFSEL0
+
+__all__ = ["GpioSoftwarePwm", "GpioHardwarePwm"]
+
+
+class GpioSoftwarePwm(Thread):
+    """
+    Software PWM engine driving all software PWM channels from a single thread
+
+    Channel edges are stored in a heap ordered by edge time so the thread only wakes up for the
+    next edge of any channel. Edges are scheduled from cycle start time (not from previous edge
+    wake up) so sleep latency doesn't accumulate. Channels with 0% or 100% duty cycle hold a
+    static level and are not scheduled at all.
+    """
+
+    MAX_FREQUENCY = 1000.0
+
+    def __init__(self, set_level):
+        """
+        Constructor
+
+        Args:
+            set_level (function): function to set pin level: set_level(pin, level)
+        """
+        Thread.__init__(self)
+        self.daemon = True
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # self.logger.setLevel(logging.DEBUG)
+
+        self.set_level = set_level
+        self.running = True
+        self._lock = Lock()
+        self._wakeup = Event()
+        # pin: [frequency, duty_cycle, active_level, generation]
+        self._channels = {}
+        # heap of (edge time, pin, generation, active)
+        self._edges = []
+
+        # stats
+        self.edges = 0
+        self.overruns = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def stop(self):
+        """
+        Stop engine
+        """
+        self.running = False
+        self._wakeup.set()
+
+    def add_channel(self, pin, frequency, duty_cycle, active_level):
+        """
+        Add or replace channel
+
+        Args:
+            pin (int): pin number
+            frequency (float): PWM frequency (Hz)
+            duty_cycle (float): duty cycle (0-100%)
+            active_level (int): pin level during duty cycle
+        """
+        with self._lock:
+            channel = self._channels.get(pin)
+            generation = channel[3] + 1 if channel else 0
+            self._channels[pin] = [frequency, duty_cycle, active_level, generation]
+            self.__schedule(pin, time.monotonic())
+        self._wakeup.set()
+
+    def set_duty_cycle(self, pin, duty_cycle):
+        """
+        Change channel duty cycle. New duty cycle is applied immediately.
+
+        Args:
+            pin (int): pin number
+            duty_cycle (float): duty cycle (0-100%)
+        """
+        with self._lock:
+            self._channels[pin][1] = duty_cycle
+            self._channels[pin][3] += 1
+            self.__schedule(pin, time.monotonic())
+        self._wakeup.set()
+
+    def set_frequency(self, pin, frequency):
+        """
+        Change channel frequency. New frequency is applied immediately.
+
+        Args:
+            pin (int): pin number
+            frequency (float): PWM frequency (Hz)
+        """
+        with self._lock:
+            self._channels[pin][0] = frequency
+            self._channels[pin][3] += 1
+            self.__schedule(pin, time.monotonic())
+        self._wakeup.set()
+
+    def remove_channel(self, pin):
+        """
+        Remove channel. Pin keeps its last level.
+
+        Args:
+            pin (int): pin number
+
+        Returns:
+            bool: True if channel removed, False if channel was not found
+        """
+        with self._lock:
+            # scheduled edges are dropped by run loop since channel doesn't exist anymore
+            return self._channels.pop(pin, None) is not None
+
+    def has_channel(self, pin):
+        """
+        Return True if pin is driven by engine
+
+        Args:
+            pin (int): pin number
+
+        Returns:
+            bool: True if pin is driven
+        """
+        return pin in self._channels
+
+    def get_stats(self):
+        """
+        Return engine statistics
+
+        Returns:
+            dict: statistics::
+
+                {
+                    channels (int): number of channels
+                    edges (int): number of edges generated
+                    overruns (int): number of cycles skipped because engine was late
+                    maxlateness (float): maximum edge lateness (seconds)
+                    meanlateness (float): mean edge lateness (seconds)
+                }
+
+        """
+        return {
+            "channels": len(self._channels),
+            "edges": self.edges,
+            "overruns": self.overruns,
+            "maxlateness": self.max_lateness,
+            "meanlateness": self.total_lateness / self.edges if self.edges else 0.0,
+        }
+
+    def __schedule(self, pin, now):
+        """
+        Schedule channel new cycle (lock must be acquired)
+
+        Args:
+            pin (int): pin number
+            now (float): cycle start time
+        """
+        _, duty_cycle, active_level, generation = self._channels[pin]
+        if duty_cycle <= 0:
+            self.set_level(pin, 1 - active_level)
+        elif duty_cycle >= 100:
+            self.set_level(pin, active_level)
+        else:
+            heapq.heappush(self._edges, (now, pin, generation, True))
+
+    def __process_edge(self, edge_time, pin, generation, active, now):
+        """
+        Process edge and schedule next one (lock must be acquired)
+
+        Args:
+            edge_time (float): scheduled edge time
+            pin (int): pin number
+            generation (int): channel generation when edge was scheduled
+            active (bool): True for cycle start edge, False for duty cycle end edge
+            now (float): current time
+        """
+        channel = self._channels.get(pin)
+        if channel is None or channel[3] != generation:
+            # channel removed or updated since edge was scheduled
+            return
+
+        frequency, duty_cycle, active_level, _ = channel
+        self.set_level(pin, active_level if active else 1 - active_level)
+
+        lateness = now - edge_time
+        self.edges += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+
+        period = 1.0 / frequency
+        cycle_start = edge_time if active else edge_time - period * duty_cycle / 100.0
+        if active:
+            next_edge = (cycle_start + period * duty_cycle / 100.0, False)
+        else:
+            next_edge = (cycle_start + period, True)
+        if next_edge[0] + period < now:
+            # engine is too late, restart cycle now instead of generating late edges
+            self.overruns += 1
+            next_edge = (now, True)
+
+        heapq.heappush(self._edges, (next_edge[0], pin, generation, next_edge[1]))
+
+    def run(self):
+        """
+        Engine process
+        """
+        while self.running:
+            with self._lock:
+                now = time.monotonic()
+                while self._edges and self._edges[0][0] <= now:
+                    edge_time, pin, generation, active = heapq.heappop(self._edges)
+                    try:
+                        self.__process_edge(edge_time, pin, generation, active, now)
+                    except Exception:
+                        self.logger.exception('Error driving pwm on pin "%s":' % pin)
+                timeout = self._edges[0][0] - now if self._edges else None
+                self._wakeup.clear()
+
+            self._wakeup.wait(timeout)
+
+        self.logger.debug("Software pwm engine stopped")
+
+
+class GpioHardwarePwm:
+    """
+    Hardware PWM channel driven through linux sysfs pwm interface
+
+    Hardware PWM must be enabled on pins using pwm or pwm-2chan device tree overlay. Overlay
+    routes each channel to one of two pins, so a pin is only driven by hardware PWM if its
+    function (read from gpio registers) is the PWM alternate function.
+    """
+
+    CHIP_PATH = "/sys/class/pwm/pwmchip0"
+    GPIOMEM_PATH = "/dev/gpiomem"
+    # gpio function select values of pwm alternate functions
+    FUNCTION_ALT0 = 4
+    FUNCTION_ALT5 = 2
+    # board pin number: (pwm channel, gpio line, pwm alternate function)
+    PINS_CHANNELS = {
+        12: (0, 18, FUNCTION_ALT5),
+        32: (0, 12, FUNCTION_ALT0),
+        33: (1, 13, FUNCTION_ALT0),
+        35: (1, 19, FUNCTION_ALT5),
+    }
+
+    def __init__(self, channel, chip_path=CHIP_PATH):
+        """
+        Constructor
+
+        Args:
+            channel (int): pwm channel
+            chip_path (str): pwm chip sysfs path
+        """
+        self.channel = channel
+        self.chip_path = chip_path
+        self.channel_path = os.path.join(chip_path, "pwm%d" % channel)
+        self.period = 0
+
+    @staticmethod
+    def get_line_function(line, gpiomem_path=GPIOMEM_PATH):
+        """
+        Return current function of specified gpio line read from gpio registers
+
+        Args:
+            line (int): gpio line
+            gpiomem_path (str): gpio registers device path
+
+        Returns:
+            int: function select value (0 input, 1 output, others alternate functions) or None
+                 if gpio registers can't be read
+        """
+        try:
+            fd = os.open(gpiomem_path, os.O_RDONLY | os.O_SYNC)
+            try:
+                registers = mmap.mmap(fd, 4096, mmap.MAP_SHARED, mmap.PROT_READ)
+            finally:
+                os.close(fd)
+        except Exception:
+            return None
+
+        with registers:
+            register = memoryview(registers).cast("I")
+            try:
+                value = register[GPFSEL0 + line // 10]
+            finally:
+                register.release()
+
+        return (value >> ((line % 10) * 3)) & 7
+
+    @staticmethod
+    def get_channel(pin, chip_path=CHIP_PATH, gpiomem_path=GPIOMEM_PATH):
+        """
+        Return hardware pwm channel of specified pin if available on this system and routed to
+        this pin
+
+        Args:
+            pin (int): pin number
+            chip_path (str): pwm chip sysfs path
+            gpiomem_path (str): gpio registers device path
+
+        Returns:
+            int: pwm channel or None if pin has no hardware pwm
+        """
+        if pin not in GpioHardwarePwm.PINS_CHANNELS:
+            return None
+        channel, line, function = GpioHardwarePwm.PINS_CHANNELS[pin]
+        try:
+            with open(os.path.join(chip_path, "npwm"), encoding="utf-8") as fd:
+                channels_number = int(fd.read().strip())
+        except Exception:
+            return None
+        if channel >= channels_number:
+            return None
+
+        # channel may be routed to the other pin of the channel (or not at all)
+        if GpioHardwarePwm.get_line_function(line, gpiomem_path) != function:
+            return None
+
+        return channel
+
+    def _write(self, path, name, value):
+        """
+        Write sysfs attribute
+        """
+        with open(os.path.join(path, name), "w", encoding="utf-8") as fd:
+            fd.write(str(value))
+
+    def start(self, frequency, duty_cycle):
+        """
+        Export and enable channel
+
+        Args:
+            frequency (float): PWM frequency (Hz)
+            duty_cycle (float): duty cycle (0-100%)
+        """
+        if not os.path.exists(self.channel_path):
+            self._write(self.chip_path, "export", self.channel)
+        self._write(self.channel_path, "duty_cycle", 0)
+        self.set_frequency(frequency, duty_cycle)
+        self._write(self.channel_path, "enable", 1)
+
+    def set_duty_cycle(self, duty_cycle):
+        """
+        Change duty cycle
+
+        Args:
+            duty_cycle (float): duty cycle (0-100%)
+        """
+        self._write(
+            self.channel_path, "duty_cycle", int(self.period * duty_cycle / 100.0)
+        )
+
+    def set_frequency(self, frequency, duty_cycle):
+        """
+        Change frequency. Duty cycle is needed because duty cycle is specified in nanoseconds
+
+        Args:
+            frequency (float): PWM frequency (Hz)
+            duty_cycle (float): duty cycle (0-100%)
+        """
+        # duty cycle can't be greater than period
+        self._write(self.channel_path, "duty_cycle", 0)
+        self.period = int(1000000000 / frequency)
+        self._write(self.channel_path, "period", self.period)
+        self.set_duty_cycle(duty_cycle)
+
+    def stop(self):
+        """
+        Disable and unexport channel
+        """
+        self._write(self.channel_path, "enable", 0)
+        self._write(self.chip_path, "unexport", self.channel)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock, Event
+import itertools
+import logging
+import math
+import time
+
+__all__ = ["GpioTimerWheel"]
+
+
+class GpioTimerWheel(Thread):
+    """
+    Hashed timer wheel running delayed actions from a single thread
+
+    Time is divided in ticks and each timer is stored in the wheel slot of its deadline tick, so
+    adding or cancelling a timer is O(1) whatever the number of pending timers. Timers whose
+    deadline is farther than one wheel revolution stay in their slot until their tick is reached.
+
+    Thread sleeps on an event until the tick of the next pending timer (or until a timer is
+    added), so it doesn't wake up while nothing is due and stopping the wheel takes effect
+    immediately. Timers are fired at most one tick late (plus thread wake up latency), actual
+    lateness is reported by get_stats.
+    """
+
+    TICK = 0.01
+    SLOTS = 512
+
+    def __init__(self, tick=TICK, slots=SLOTS):
+        """
+        Constructor
+
+        Args:
+            tick (float): tick duration (seconds)
+            slots (int): number of wheel slots
+        """
+        Thread.__init__(self)
+        self.daemon = True
+        self.logger = logging.getLogger(self.__class__.__name__)
+        # self.logger.setLevel(logging.DEBUG)
+
+        self.tick = tick
+        self.running = True
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._ids = itertools.count(1)
+        self._start_time = time.monotonic()
+        self._current_tick = 0
+        # slot: {timer_id: (tick, deadline, callback, args, group)}
+        self._slots = [{} for _ in range(slots)]
+        # timer_id: slot
+        self._timers = {}
+        # group: set of timer ids
+        self._groups = {}
+
+        # stats
+        self.fired = 0
+        self.cancelled = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def stop(self):
+        """
+        Stop wheel. Pending timers are not fired
+        """
+        self.running = False
+        self._wakeup.set()
+
+    def add(self, deadline, callback, args=None, group=None):
+        """
+        Add timer
+
+        Args:
+            deadline (float): monotonic time at which callback must be called
+            callback (function): callback function
+            args (list): callback arguments
+            group (str): group the timer belongs to (used to cancel all timers of a group)
+
+        Returns:
+            int: timer id
+        """
+        timer_id = next(self._ids)
+        with self._lock:
+            if not self._timers:
+                # wheel doesn't tick while empty, restart ticking from now
+                self._current_tick = int(
+                    (time.monotonic() - self._start_time) / self.tick
+                )
+            tick = max(
+                math.ceil((deadline - self._start_time) / self.tick),
+                self._current_tick + 1,
+            )
+            slot = tick % len(self._slots)
+            self._slots[slot][timer_id] = (tick, deadline, callback, args or [], group)
+            self._timers[timer_id] = slot
+            if group is not None:
+                self._groups.setdefault(group, set()).add(timer_id)
+        self._wakeup.set()
+
+        return timer_id
+
+    def cancel(self, timer_id):
+        """
+        Cancel timer
+
+        Args:
+            timer_id (int): timer id
+
+        Returns:
+            bool: True if timer cancelled, False if timer doesn't exist or already fired
+        """
+        with self._lock:
+            return self.__remove(timer_id) is not None
+
+    def cancel_group(self, group):
+        """
+        Cancel all timers of specified group
+
+        Args:
+            group (str): timers group
+
+        Returns:
+            int: number of cancelled timers
+        """
+        with self._lock:
+            timer_ids = list(self._groups.get(group, ()))
+            for timer_id in timer_ids:
+                self.__remove(timer_id)
+            return len(timer_ids)
+
+    def __remove(self, timer_id, cancelled=True):
+        """
+        Remove timer (lock must be acquired)
+
+        Returns:
+            tuple: removed timer or None if not found
+        """
+        slot = self._timers.pop(timer_id, None)
+        if slot is None:
+            return None
+        timer = self._slots[slot].pop(timer_id)
+        group = timer[4]
+        if group is not None:
+            self._groups[group].discard(timer_id)
+            if not self._groups[group]:
+                del self._groups[group]
+        if cancelled:
+            self.cancelled += 1
+
+        return timer
+
+    def __len__(self):
+        return len(self._timers)
+
+    def get_stats(self):
+        """
+        Return wheel statistics
+
+        Returns:
+            dict: statistics::
+
+                {
+                    pending (int): number of pending timers
+                    fired (int): number of fired timers
+                    cancelled (int): number of cancelled timers
+                    maxlateness (float): maximum timer lateness (seconds)
+                    meanlateness (float): mean timer lateness (seconds)
+                }
+
+        """
+        return {
+            "pending": len(self._timers),
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "maxlateness": self.max_lateness,
+            "meanlateness": self.total_lateness / self.fired if self.fired else 0.0,
+        }
+
+    def __get_expired(self, tick, now_tick):
+        """
+        Remove and return timers of specified tick slot expired at current tick (lock must be
+        acquired)
+
+        Args:
+            tick (int): slot tick
+            now_tick (int): current tick
+
+        Returns:
+            list: list of expired timers
+        """
+        slot = self._slots[tick % len(self._slots)]
+        expired_ids = [
+            timer_id for timer_id, timer in slot.items() if timer[0] <= now_tick
+        ]
+        return [self.__remove(timer_id, cancelled=False) for timer_id in expired_ids]
+
+    def __get_next_tick(self):
+        """
+        Return tick of next pending timer (lock must be acquired and a timer pending)
+
+        Returns:
+            int: tick of next timer
+        """
+        slots_count = len(self._slots)
+        first_tick = self._current_tick + 1
+        for tick in range(first_tick, first_tick + slots_count):
+            for timer in self._slots[tick % slots_count].values():
+                if timer[0] <= tick:
+                    return tick
+
+        # all timers are farther than one wheel revolution
+        return min(timer[0] for slot in self._slots for timer in slot.values())
+
+    def run(self):
+        """
+        Wheel process
+        """
+        while self.running:
+            with self._lock:
+                self._wakeup.clear()
+                expired = []
+                if not self._timers:
+                    # nothing to do, sleep until new timer is added
+                    wait_timeout = None
+                else:
+                    now = time.monotonic()
+                    now_tick = int((now - self._start_time) / self.tick)
+                    # visit each slot at most once whatever the time elapsed since last tick
+                    first_tick = max(
+                        self._current_tick + 1, now_tick - len(self._slots) + 1
+                    )
+                    for tick in range(first_tick, now_tick + 1):
+                        expired.extend(self.__get_expired(tick, now_tick))
+                    self._current_tick = max(self._current_tick, now_tick)
+                    expired.sort(key=lambda timer: timer[1])
+
+                    # sleep until next timer tick
+                    wait_timeout = (
+                        self._start_time + self.__get_next_tick() * self.tick - now
+                        if self._timers
+                        else None
+                    )
+
+            if not self.running:
+                break
+
+            for _, deadline, callback, args, _ in expired:
+                lateness = time.monotonic() - deadline
+                self.fired += 1
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+                try:
+                    callback(*args)
+                except Exception:
+                    self.logger.exception("Error executing timer callback:")
+
+            if wait_timeout is None:
+                self._wakeup.wait()
+            else:
+                self._wakeup.wait(max(0.0, wait_timeout))
+
+        self.logger.debug("Timer wheel stopped")
@@ -0,0 +1,787 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gpios application benchmarks
+
+Each scenario runs in its own python process to get reliable CPU and RSS measurements.
+Gpios are simulated (simulated gpio backend and simulated_gpio.py waveforms) so benchmarks run on
+any linux box. Hardware backends are benchmarked only when available.
+
+Usage:
+    python3 bench_gpios.py
+    GPIOS_BENCH_PIN=40 python3 bench_gpios.py  # also benchmark hardware backends driving pin 40
+"""
+
+import sys
+import os
+import json
+import time
+import logging
+import subprocess
+import threading
+import timeit
+import tracemalloc
+import tempfile
+import unittest
+sys.path.append('../')
+import simulated_gpio
+from unittest.mock import Mock
+from cleep.libs.tests import session
+from backend.gpios import GpioInputWatcher, Gpios
+from backend.gpiosdevicesindex import GpioDevicesIndex
+from backend.gpiospwm import GpioSoftwarePwm
+from backend.gpiostimerwheel import GpioTimerWheel
+from backend.gpioshistory import GpioEdgeHistory
+from backend.gpiosbackend import HIGH, LOW, IN, OUT, PUD_DOWN, GpioMmapBackend
+
+INPUTS_COUNTS = [1, 10, 20, 40]
+IDLE_DURATION = 5.0
+DEVICES_COUNTS = [40, 400]
+LOOKUPS = 10000
+GETTERS_CALLS = 10000
+PWM_CHANNELS_COUNTS = [1, 4, 8]
+PWM_FREQUENCY = 100.0
+PWM_DURATION = 5.0
+TIMERS_COUNTS = [100, 1000, 10000]
+ACCURACY_TIMERS = 500
+ACCURACY_SPAN = 2.0
+HISTORY_SIZES = [256, 4096]
+HISTORY_EDGES = 100000
+PINS_COUNTS = [1, 10, 40]
+INPUT_FREQUENCY = 1.0
+INPUT_DURATION = 10.0
+OUTPUT_COMMANDS = 200
+LOOPBACK_ITERATIONS = 10
+BACKEND_CALLS = 10000
+# hardware backends drive this board pin only when set in environment
+BENCH_PIN_VARIABLE = 'GPIOS_BENCH_PIN'
+SIMULATED_PIN = 40
+NON_HARDWARE_BACKENDS = ('simulated', 'gpiomem file')
+READ_GPIOS_COUNT = 26
+READ_GPIOS_CALLS = 1000
+CALLBACK_EDGES = 10000
+DISPATCH_PINS = 10
+DISPATCH_FREQUENCY = 2.0
+DISPATCH_DURATION = 5.0
+SEND_DELAY = 0.02
+
+
+def get_rss():
+    """
+    Return current process resident set size
+
+    Returns:
+        int: RSS in kB
+    """
+    with open('/proc/self/status') as fd:
+        for line in fd:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_idle(duration):
+    """
+    Measure process CPU time consumed by background threads during specified duration
+
+    Args:
+        duration (float): idle duration
+
+    Returns:
+        float: CPU usage (percent of one core)
+    """
+    start_cpu = time.process_time()
+    start = time.monotonic()
+    time.sleep(duration)
+    return (time.process_time() - start_cpu) / (time.monotonic() - start) * 100.0
+
+
+def scenario_watcher_per_input(inputs_count):
+    """
+    Legacy layout: one watcher thread per input
+    """
+    rss_before = get_rss()
+    watchers = []
+    for index in range(inputs_count):
+        watcher = GpioInputWatcher(Mock(), Mock())
+        watcher._get_inputs_levels = lambda pins: [HIGH] * len(pins)
+        watcher.add_input(index, 'uuid-%d' % index)
+        watcher.start()
+        watchers.append(watcher)
+
+    cpu = measure_idle(IDLE_DURATION)
+    rss = get_rss() - rss_before
+
+    for watcher in watchers:
+        watcher.stop()
+    return {'cpu': cpu, 'rss': rss, 'threads': len(watchers)}
+
+
+def scenario_single_watcher(inputs_count):
+    """
+    Single multiplexed watcher for all inputs
+    """
+    rss_before = get_rss()
+    watcher = GpioInputWatcher(Mock(), Mock())
+    watcher._get_inputs_levels = lambda pins: [HIGH] * len(pins)
+    for index in range(inputs_count):
+        watcher.add_input(index, 'uuid-%d' % index)
+    watcher.start()
+
+    cpu = measure_idle(IDLE_DURATION)
+    rss = get_rss() - rss_before
+
+    watcher.stop()
+    return {'cpu': cpu, 'rss': rss, 'threads': 1}
+
+
+class SimulatedOutputs:
+    """
+    Simulated gpio outputs backend: only counts level changes
+    """
+
+    def __init__(self):
+        self.levels = {}
+        self.changes = 0
+
+    def set_level(self, pin, level):
+        self.levels[pin] = level
+        self.changes += 1
+
+
+def scenario_pwm_thread_per_channel(channels_count):
+    """
+    Legacy layout: one thread toggling each output at 50% duty cycle
+    """
+    outputs = SimulatedOutputs()
+    running = [True]
+    lateness = []
+
+    def toggle(pin):
+        half_period = 0.5 / PWM_FREQUENCY
+        level = 1
+        next_edge = time.monotonic()
+        while running[0]:
+            lateness.append(time.monotonic() - next_edge)
+            outputs.set_level(pin, level)
+            level = 1 - level
+            next_edge += half_period
+            time.sleep(max(0.0, next_edge - time.monotonic()))
+
+    threads = [threading.Thread(target=toggle, args=(pin,), daemon=True) for pin in range(channels_count)]
+    for thread in threads:
+        thread.start()
+    cpu = measure_idle(PWM_DURATION)
+    running[0] = False
+    for thread in threads:
+        thread.join()
+
+    return {
+        'cpu': cpu,
+        'threads': channels_count,
+        'edges': len(lateness),
+        'meanlateness': sum(lateness) / len(lateness) * 1000.0,
+        'maxlateness': max(lateness) * 1000.0,
+    }
+
+
+def scenario_pwm_shared_engine(channels_count):
+    """
+    Single software pwm engine driving all outputs at 50% duty cycle
+    """
+    outputs = SimulatedOutputs()
+    engine = GpioSoftwarePwm(outputs.set_level)
+    for pin in range(channels_count):
+        engine.add_channel(pin, PWM_FREQUENCY, 50, 1)
+    engine.start()
+    cpu = measure_idle(PWM_DURATION)
+    engine.stop()
+    engine.join()
+
+    stats = engine.get_stats()
+    return {
+        'cpu': cpu,
+        'threads': 1,
+        'edges': stats['edges'],
+        'meanlateness': stats['meanlateness'] * 1000.0,
+        'maxlateness': stats['maxlateness'] * 1000.0,
+    }
+
+
+class EventsRecorder:
+    """
+    Replace application events sending to timestamp sent input events
+    """
+
+    def __init__(self, module):
+        self.backend = module._backend
+        self.pins = {}
+        self.latencies = []
+        self.received = {}
+        self.waiting = threading.Event()
+        for event in (module.gpios_gpio_on, module.gpios_gpio_off):
+            event.send = self.send
+
+    def send(self, params=None, device_id=None, to=None, render=True):
+        now = time.monotonic()
+        pin = self.pins.get(device_id)
+        if pin is None:
+            return
+        self.received[device_id] = now
+        self.waiting.set()
+        edge_time = self.backend.last_edges.get(pin)
+        if edge_time is not None:
+            self.latencies.append(now - edge_time)
+
+
+def percentile(values, percent):
+    """
+    Return percentile of specified values
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def create_module():
+    """
+    Return Gpios application started against simulated gpios
+    """
+    test_session = session.TestSession(unittest.TestCase())
+    module = test_session.setup(Gpios)
+    module._set_config_field('gpio_backend', 'simulated')
+    test_session.start_module(module)
+    return module
+
+
+def get_bench_gpios(module, count):
+    """
+    Return gpios used by benchmark, limited by number of board gpios
+    """
+    gpios = module.get_raspi_gpios()
+    return sorted(gpios, key=lambda gpio: gpios[gpio])[:count]
+
+
+def scenario_module_inputs(pins_count):
+    """
+    Input events throughput and edge to event latency of Gpios application fed by square waves
+    """
+    rss_before = get_rss()
+    module = create_module()
+    recorder = EventsRecorder(module)
+    waveforms = {}
+    for index, gpio in enumerate(get_bench_gpios(module, pins_count)):
+        device = module.add_gpio('input%d' % index, gpio, Gpios.MODE_INPUT, False, False, 'bench')
+        recorder.pins[device['uuid']] = device['pin']
+        waveforms[device['pin']] = simulated_gpio.square_wave(
+            INPUT_FREQUENCY, INPUT_DURATION, phase=0.1 + index * 0.01
+        )
+    time.sleep(0.5)
+
+    start_cpu = time.process_time()
+    player = simulated_gpio.play(module._backend, waveforms)
+    time.sleep(INPUT_DURATION + 0.5)
+    cpu = (time.process_time() - start_cpu) / (INPUT_DURATION + 0.5) * 100.0
+    module._on_stop()
+
+    return {
+        'pins': len(waveforms),
+        'edges': player.played,
+        'events': len(recorder.latencies),
+        'throughput': len(recorder.latencies) / INPUT_DURATION,
+        'meanlatency': sum(recorder.latencies) / max(1, len(recorder.latencies)) * 1000.0,
+        'p99latency': percentile(recorder.latencies, 99) * 1000.0,
+        'cpu': cpu,
+        'rss': get_rss() - rss_before,
+    }
+
+
+def scenario_module_outputs(pins_count):
+    """
+    Output commands round trip time, and loopback latency from output command to event of a wired input
+    """
+    rss_before = get_rss()
+    module = create_module()
+    recorder = EventsRecorder(module)
+    gpios = get_bench_gpios(module, pins_count + 1)
+    outputs = [
+        module.add_gpio('output%d' % index, gpio, Gpios.MODE_OUTPUT, False, False, 'bench')
+        for index, gpio in enumerate(gpios[:-1])
+    ]
+    loop_input = module.add_gpio('loop', gpios[-1], Gpios.MODE_INPUT, False, False, 'bench')
+    recorder.pins[loop_input['uuid']] = loop_input['pin']
+    module._backend.wire(outputs[0]['pin'], loop_input['pin'])
+    time.sleep(0.5)
+
+    start_cpu = time.process_time()
+    commands = []
+    for index in range(OUTPUT_COMMANDS):
+        device = outputs[index % len(outputs)]
+        start = time.perf_counter()
+        module.turn_on(device['uuid'])
+        module.turn_off(device['uuid'])
+        commands.append((time.perf_counter() - start) / 2.0)
+    set_outputs = []
+    for index in range(OUTPUT_COMMANDS):
+        start = time.perf_counter()
+        module.set_outputs({device['uuid']: bool(index % 2) for device in outputs})
+        set_outputs.append(time.perf_counter() - start)
+    cpu_time = time.process_time() - start_cpu
+
+    loopbacks = []
+    for index in range(LOOPBACK_ITERATIONS * 2):
+        recorder.waiting.clear()
+        start = time.monotonic()
+        if index % 2:
+            module.turn_off(outputs[0]['uuid'])
+        else:
+            module.turn_on(outputs[0]['uuid'])
+        if recorder.waiting.wait(2.0):
+            loopbacks.append(recorder.received[loop_input['uuid']] - start)
+        time.sleep(0.3)
+    module._on_stop()
+
+    return {
+        'pins': len(outputs),
+        'command': sum(commands) / len(commands) * 1000000.0,
+        'setoutputs': sum(set_outputs) / len(set_outputs) * 1000000.0,
+        'loopback': sum(loopbacks) / max(1, len(loopbacks)) * 1000.0,
+        'cputime': cpu_time,
+        'rss': get_rss() - rss_before,
+    }
+
+
+SCENARIOS = {
+    'watcher_per_input': scenario_watcher_per_input,
+    'single_watcher': scenario_single_watcher,
+    'pwm_thread_per_channel': scenario_pwm_thread_per_channel,
+    'pwm_shared_engine': scenario_pwm_shared_engine,
+    'module_inputs': scenario_module_inputs,
+    'module_outputs': scenario_module_outputs,
+}
+
+
+def run_scenario(name, inputs_count):
+    """
+    Run scenario in a dedicated process
+
+    Returns:
+        dict: scenario results
+    """
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), name, str(inputs_count)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def bench_watcher_idle():
+    """
+    Idle CPU and RSS according to number of watched inputs
+    """
+    print('Idle watcher CPU and RSS (%ss idle)' % IDLE_DURATION)
+    print('%-20s %8s %8s %10s %10s' % ('scenario', 'inputs', 'threads', 'cpu (%)', 'rss (kB)'))
+    for name in ('watcher_per_input', 'single_watcher'):
+        for inputs_count in INPUTS_COUNTS:
+            result = run_scenario(name, inputs_count)
+            print('%-20s %8d %8d %10.2f %10d' % (name, inputs_count, result['threads'], result['cpu'], result['rss']))
+
+
+def get_devices(devices_count):
+    """
+    Return fake devices (gpio expanders provide more gpios than raspberry pi)
+
+    Returns:
+        dict: devices by uuid
+    """
+    devices = {}
+    for index in range(devices_count):
+        uuid = 'uuid-%d' % index
+        devices[uuid] = {
+            'uuid': uuid,
+            'name': 'name-%d' % index,
+            'gpio': 'GPIO%d' % index,
+            'pin': index,
+            'mode': 'reserved' if index % 4 == 0 else 'input',
+            'subtype': 'usage-%d' % (index % 8),
+            'owner': 'bench',
+        }
+    return devices
+
+
+def search_device(devices, key, value):
+    """
+    Full scan lookup, as done by devices search
+    """
+    for device in devices.values():
+        if device[key] == value:
+            return device
+    return None
+
+
+def bench_devices_lookup():
+    """
+    Devices lookups duration using full scan and indexes
+    """
+    print('Devices lookups (%d lookups, last device)' % LOOKUPS)
+    print('%-10s %8s %12s %12s' % ('lookup', 'devices', 'scan (us)', 'index (us)'))
+    for devices_count in DEVICES_COUNTS:
+        devices = get_devices(devices_count)
+        index = GpioDevicesIndex('reserved')
+        index.rebuild(devices)
+        last = devices['uuid-%d' % (devices_count - 1)]
+        lookups = [
+            ('gpio', lambda: search_device(devices, 'gpio', last['gpio']), lambda: index.get_by_gpio(last['gpio'])),
+            ('name', lambda: search_device(devices, 'name', last['name']), lambda: index.get_by_name(last['name'])),
+            ('pin', lambda: search_device(devices, 'pin', last['pin']), lambda: index.get_by_pin(last['pin'])),
+            ('usage', lambda: [d for d in devices.values() if d['subtype'] == 'usage-0' and d['mode'] == 'reserved'], lambda: index.get_by_usage('usage-0')),
+        ]
+        for name, scan, indexed in lookups:
+            scan_duration = timeit.timeit(scan, number=LOOKUPS) / LOOKUPS * 1000000.0
+            index_duration = timeit.timeit(indexed, number=LOOKUPS) / LOOKUPS * 1000000.0
+            print('%-10s %8d %12.3f %12.3f' % (name, devices_count, scan_duration, index_duration))
+
+
+def legacy_get_raspi_gpios(revision):
+    """
+    Gpios getter merging revision tables on each call
+    """
+    if revision == 1:
+        return Gpios.GPIOS_REV1
+    if revision == 2:
+        return Gpios.GPIOS_REV2
+    if revision == 3:
+        gpios = Gpios.GPIOS_REV2.copy()
+        gpios.update(Gpios.GPIOS_REV3)
+        return gpios
+    return {}
+
+
+def legacy_get_pins_usage(revision):
+    """
+    Pins usage getter selecting revision tables on each call (without devices)
+    """
+    all_pins = {1: Gpios.PINS_REV1, 2: Gpios.PINS_REV2, 3: Gpios.PINS_REV3}.get(revision, {})
+    all_gpios = legacy_get_raspi_gpios(revision)
+    output = {}
+    for pin_number in all_pins:
+        output[pin_number] = {'label': all_pins[pin_number], 'gpio': None}
+        if all_pins[pin_number] in all_gpios:
+            output[pin_number]['gpio'] = {'assigned': False, 'owner': None}
+    return output
+
+
+def get_board_module():
+    """
+    Return Gpios instance with only board tables initialized (no cleep bootstrap needed)
+    """
+    module = Gpios.__new__(Gpios)
+    module.logger = logging.getLogger('bench')
+    module._devices_index = GpioDevicesIndex(Gpios.MODE_RESERVED)
+    module._pins_usage_lock = threading.Lock()
+    module._pins_usage_version = 0
+    module._get_revision = lambda: 3
+    module._detect_board()
+    return module
+
+
+def bench_board_getters():
+    """
+    Board getters duration using per call revision lookup and precomputed tables
+    """
+    module = get_board_module()
+    getters = [
+        ('get_raspi_gpios', lambda: legacy_get_raspi_gpios(module._get_revision()), module.get_raspi_gpios),
+        ('gpio check', lambda: 'GPIO18' in legacy_get_raspi_gpios(module._get_revision()).keys(), lambda: 'GPIO18' in module._gpio_pins),
+        ('get_pins_usage', lambda: legacy_get_pins_usage(module._get_revision()), module.get_pins_usage),
+        ('unchanged usage', lambda: legacy_get_pins_usage(module._get_revision()), lambda: module.get_pins_usage(1)),
+    ]
+    print('Board getters (%d calls, revision 3)' % GETTERS_CALLS)
+    print('%-16s %12s %12s' % ('getter', 'before (us)', 'after (us)'))
+    for name, before, after in getters:
+        before_duration = timeit.timeit(before, number=GETTERS_CALLS) / GETTERS_CALLS * 1000000.0
+        after_duration = timeit.timeit(after, number=GETTERS_CALLS) / GETTERS_CALLS * 1000000.0
+        print('%-16s %12.3f %12.3f' % (name, before_duration, after_duration))
+
+
+def bench_software_pwm():
+    """
+    Software pwm CPU usage and edges jitter against simulated outputs
+    """
+    print('Software pwm CPU and jitter (%sHz, 50%% duty cycle, %ss)' % (PWM_FREQUENCY, PWM_DURATION))
+    print('%-24s %8s %8s %10s %8s %12s %12s' % ('scenario', 'channels', 'threads', 'cpu (%)', 'edges', 'mean (ms)', 'max (ms)'))
+    for name in ('pwm_thread_per_channel', 'pwm_shared_engine'):
+        for channels_count in PWM_CHANNELS_COUNTS:
+            result = run_scenario(name, channels_count)
+            print('%-24s %8d %8d %10.2f %8d %12.3f %12.3f' % (
+                name, channels_count, result['threads'], result['cpu'], result['edges'], result['meanlateness'], result['maxlateness']
+            ))
+
+
+def bench_timer_wheel():
+    """
+    Scheduled actions insert/cancel cost against thread timers, and firing accuracy
+    """
+    print('Scheduled actions insert+cancel cost')
+    print('%-16s %8s %16s %16s' % ('scheduler', 'pending', 'insert (us)', 'cancel (us)'))
+    for timers_count in TIMERS_COUNTS:
+        wheel = GpioTimerWheel()
+        deadline = time.monotonic() + 3600
+        start = time.perf_counter()
+        timer_ids = [wheel.add(deadline + i * 0.001, id, [i], group=i % 40) for i in range(timers_count)]
+        insert_duration = (time.perf_counter() - start) / timers_count * 1000000.0
+        start = time.perf_counter()
+        for timer_id in timer_ids:
+            wheel.cancel(timer_id)
+        cancel_duration = (time.perf_counter() - start) / timers_count * 1000000.0
+        print('%-16s %8d %16.3f %16.3f' % ('wheel', timers_count, insert_duration, cancel_duration))
+
+        if timers_count > 1000:
+            # one thread per pending action doesn't scale further
+            continue
+        start = time.perf_counter()
+        timers = []
+        for i in range(timers_count):
+            timer = threading.Timer(3600, id, [i])
+            timer.daemon = True
+            timer.start()
+            timers.append(timer)
+        insert_duration = (time.perf_counter() - start) / timers_count * 1000000.0
+        start = time.perf_counter()
+        for timer in timers:
+            timer.cancel()
+        cancel_duration = (time.perf_counter() - start) / timers_count * 1000000.0
+        for timer in timers:
+            timer.join()
+        print('%-16s %8d %16.3f %16.3f' % ('thread timers', timers_count, insert_duration, cancel_duration))
+
+    print('Scheduled actions accuracy (%d actions over %ss)' % (ACCURACY_TIMERS, ACCURACY_SPAN))
+    wheel = GpioTimerWheel()
+    wheel.start()
+    now = time.monotonic()
+    for i in range(ACCURACY_TIMERS):
+        wheel.add(now + ACCURACY_SPAN * i / ACCURACY_TIMERS, id, [i])
+    time.sleep(ACCURACY_SPAN + 0.1)
+    wheel.stop()
+    stats = wheel.get_stats()
+    print('%8s %12s %12s' % ('fired', 'mean (ms)', 'max (ms)'))
+    print('%8d %12.3f %12.3f' % (stats['fired'], stats['meanlateness'] * 1000.0, stats['maxlateness'] * 1000.0))
+
+
+def bench_edge_history():
+    """
+    Edge history recording cost, allocations and memory per gpio
+    """
+    print('Edge history (%d edges recorded)' % HISTORY_EDGES)
+    print('%8s %12s %16s %16s' % ('size', 'add (us)', 'allocated (B)', 'memory (B)'))
+    for size in HISTORY_SIZES:
+        history = GpioEdgeHistory(size)
+        memory = sys.getsizeof(history.timestamps) + sys.getsizeof(history.levels)
+        timestamps = [float(i) for i in range(HISTORY_EDGES)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for timestamp in timestamps:
+            history.add(timestamp, 1)
+        duration = (time.perf_counter() - start) / HISTORY_EDGES * 1000000.0
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print('%8d %12.3f %16d %16d' % (size, duration, allocated, memory))
+
+
+def bench_simulated_module():
+    """
+    Gpios application inputs and outputs performances against simulated gpios
+    """
+    print('Simulated inputs (%sHz square waves, %ss, pins limited by board gpios)' % (INPUT_FREQUENCY, INPUT_DURATION))
+    print('%8s %8s %8s %14s %12s %12s %10s %10s' % (
+        'pins', 'edges', 'events', 'events/s', 'mean (ms)', 'p99 (ms)', 'cpu (%)', 'rss (kB)'
+    ))
+    for pins_count in PINS_COUNTS:
+        result = run_scenario('module_inputs', pins_count)
+        print('%8d %8d %8d %14.2f %12.3f %12.3f %10.2f %10d' % (
+            result['pins'], result['edges'], result['events'], result['throughput'],
+            result['meanlatency'], result['p99latency'], result['cpu'], result['rss']
+        ))
+
+    print('Simulated outputs (%d commands, %d loopbacks)' % (OUTPUT_COMMANDS, LOOPBACK_ITERATIONS * 2))
+    print('%8s %14s %16s %14s %12s %10s' % ('pins', 'command (us)', 'set_outputs (us)', 'loopback (ms)', 'cpu (s)', 'rss (kB)'))
+    for pins_count in PINS_COUNTS:
+        result = run_scenario('module_outputs', pins_count)
+        print('%8d %14.3f %16.3f %14.3f %12.3f %10d' % (
+            result['pins'], result['command'], result['setoutputs'], result['loopback'], result['cputime'], result['rss']
+        ))
+
+
+def bench_gpio_backends():
+    """
+    Gpio read and write cost per backend. Gpiomem backend is also measured against a file
+    emulating gpio registers. Hardware backends drive a real pin as output, so they are only
+    measured when pin is explicitly given in GPIOS_BENCH_PIN environment variable (board pin
+    number, nothing must be wired on it). Only hardware backends are ranked.
+    """
+    module = get_board_module()
+    bench_pin = int(os.environ.get(BENCH_PIN_VARIABLE, 0)) or None
+    registers_file = tempfile.NamedTemporaryFile()
+    registers_file.write(bytes(GpioMmapBackend.BLOCK_SIZE))
+    registers_file.flush()
+    backends = list(Gpios.GPIO_BACKENDS.items())
+    backends.append(('gpiomem file', lambda: GpioMmapBackend(registers_file.name)))
+    print('Gpio backends (%d calls, hardware pin %s, simulated pin %d)' % (BACKEND_CALLS, bench_pin, SIMULATED_PIN))
+    print('%-12s %12s %12s' % ('backend', 'input (us)', 'output (us)'))
+    fastest = None
+    for name, backend_class in backends:
+        hardware = name not in NON_HARDWARE_BACKENDS
+        if hardware and bench_pin is None:
+            print('%-12s %12s %12s' % (name, 'skipped', 'skipped'))
+            continue
+        pin = bench_pin if hardware else SIMULATED_PIN
+        try:
+            backend = backend_class()
+            backend.set_board(module._gpio_pins)
+        except Exception:
+            print('%-12s %12s %12s' % (name, 'unavailable', 'unavailable'))
+            continue
+        backend.setup(pin, IN, pull_up_down=PUD_DOWN)
+        input_duration = timeit.timeit(lambda: backend.input(pin), number=BACKEND_CALLS) / BACKEND_CALLS * 1000000.0
+        backend.setup(pin, OUT, initial=LOW)
+        levels = [HIGH, LOW] * (BACKEND_CALLS // 2)
+        start = time.perf_counter()
+        for level in levels:
+            backend.output(pin, level)
+        output_duration = (time.perf_counter() - start) / len(levels) * 1000000.0
+        backend.cleanup()
+        print('%-12s %12.3f %12.3f' % (name, input_duration, output_duration))
+        if hardware and (fastest is None or input_duration + output_duration < fastest[1]):
+            fastest = (name, input_duration + output_duration)
+    registers_file.close()
+    if fastest is None:
+        print('Fastest hardware backend: none measured (set %s to a free board pin)' % BENCH_PIN_VARIABLE)
+    else:
+        print('Fastest hardware backend: %s' % fastest[0])
+
+
+def bench_read_gpios():
+    """
+    Reading many gpios one command per gpio against a single bulk read command
+    """
+    module = create_module()
+    gpios = get_bench_gpios(module, READ_GPIOS_COUNT)
+    reads = [
+        ('is_gpio_on', lambda: {gpio: module.is_gpio_on(gpio) for gpio in gpios}),
+        ('read_gpios', lambda: module.read_gpios(gpios)),
+        ('bitmask', lambda: module.read_gpios(gpios, bitmask=True)),
+    ]
+    print('Gpios bulk read (%d gpios, %d calls, without rpc round trips)' % (len(gpios), READ_GPIOS_CALLS))
+    print('%-12s %12s %12s' % ('command', 'commands', 'read (us)'))
+    for name, read in reads:
+        duration = timeit.timeit(read, number=READ_GPIOS_CALLS) / READ_GPIOS_CALLS * 1000000.0
+        print('%-12s %12d %12.3f' % (name, len(gpios) if name == 'is_gpio_on' else 1, duration))
+    module._on_stop()
+
+
+def legacy_input_on_callback(module, device_uuid):
+    """
+    Input on callback looking up device config and per device dicts on each edge (legacy)
+    """
+    module.logger.debug("on_callback for gpio %s triggered" % device_uuid)
+    device = module._devices_index.get(device_uuid)
+    params = {"gpio": device["gpio"], "init": False}
+    policy = module._emission_policies.get(device_uuid)
+    if policy is not None:
+        return
+    start = time.monotonic()
+    module.gpios_gpio_on.send(params=params, device_id=device_uuid)
+    latency = module._latencies.get(device_uuid)
+    if latency is not None:
+        latency.send.add(time.monotonic() - start)
+
+
+def bench_input_callbacks():
+    """
+    Cost per edge of input callback (event sending excluded) with device config lookup against
+    input record
+    """
+    module = create_module()
+    gpio = get_bench_gpios(module, 1)[0]
+    device = module.add_gpio('bench', gpio, Gpios.MODE_INPUT, False, False, 'bench')
+    module.gpios_gpio_on.send = lambda params, device_id: None
+    callbacks = [
+        ('device config', lambda: legacy_input_on_callback(module, device['uuid'])),
+        ('input record', lambda: module._Gpios__input_on_callback(device['uuid'])),
+    ]
+    print('Input callbacks (%d edges)' % CALLBACK_EDGES)
+    print('%-14s %12s %16s' % ('lookup', 'edge (us)', 'allocated (B)'))
+    for name, callback in callbacks:
+        duration = timeit.timeit(callback, number=CALLBACK_EDGES) / CALLBACK_EDGES * 1000000.0
+        # transient allocations of an edge (peak above memory traced before callback)
+        tracemalloc.start()
+        allocated = 0
+        for _ in range(CALLBACK_EDGES):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            callback()
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print('%-14s %12.3f %16d' % (name, duration, allocated / CALLBACK_EDGES))
+    module._on_stop()
+
+
+def bench_callback_dispatch():
+    """
+    Input sampler timing with a slow event bus, callbacks run inline by sampler against
+    callbacks queued in dispatcher
+    """
+    print('Callback dispatch (%d pins, %sHz square waves, %ss, %sms event send)' % (
+        DISPATCH_PINS, DISPATCH_FREQUENCY, DISPATCH_DURATION, SEND_DELAY * 1000.0
+    ))
+    print('%-12s %8s %8s %10s %10s %10s %10s' % ('callbacks', 'edges', 'events', 'loops/s', 'overruns', 'highwater', 'dropped'))
+    for name in ('inline', 'dispatcher'):
+        module = create_module()
+        module.gpios_gpio_on.send = lambda params, device_id: time.sleep(SEND_DELAY)
+        module.gpios_gpio_off.send = lambda params, device_id: time.sleep(SEND_DELAY)
+        if name == 'inline':
+            module._dispatcher.dispatch = lambda key, callback, args=(): callback(*args)
+        waveforms = {}
+        for index, gpio in enumerate(get_bench_gpios(module, DISPATCH_PINS)):
+            device = module.add_gpio('input%d' % index, gpio, Gpios.MODE_INPUT, False, False, 'bench')
+            waveforms[device['pin']] = simulated_gpio.square_wave(
+                DISPATCH_FREQUENCY, DISPATCH_DURATION, phase=0.1 + index * 0.001
+            )
+        time.sleep(0.5)
+
+        before = module.get_sampler_stats()
+        player = simulated_gpio.play(module._backend, waveforms)
+        time.sleep(DISPATCH_DURATION + 0.5)
+        after = module.get_sampler_stats()
+        dispatch = module.get_dispatch_stats()
+        module._on_stop()
+        print('%-12s %8d %8d %10.1f %10d %10d %10d' % (
+            name, player.played,
+            sum(module._latencies[uuid].send.count for uuid in module._latencies),
+            (after['loops'] - before['loops']) / (DISPATCH_DURATION + 0.5),
+            after['overruns'] - before['overruns'],
+            dispatch['highwater'] if name == 'dispatcher' else 0,
+            dispatch['dropped'],
+        ))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.FATAL)
+    if len(sys.argv) == 3:
+        print(json.dumps(SCENARIOS[sys.argv[1]](int(sys.argv[2]))))
+    else:
+        bench_watcher_idle()
+        bench_devices_lookup()
+        bench_board_getters()
+        bench_software_pwm()
+        bench_timer_wheel()
+        bench_edge_history()
+        bench_simulated_module()
+        bench_gpio_backends()
+        bench_read_gpios()
+        bench_input_callbacks()
+        bench_callback_dispatch()
+
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scripted waveforms played on simulated gpios (see backend.gpiosbackend.GpioSimulatedBackend)
+
+A waveform is a list of (offset, level) played on an input pin. All waveforms are played by a
+single thread and simulated backend logs timestamp of each edge, to measure edge to event latency.
+
+Usage:
+    player = play(module._backend, {11: square_wave(1.0, 10.0)})
+"""
+
+import time
+import heapq
+from threading import Thread, Event
+import sys
+sys.path.append('../')
+from backend.gpiosbackend import HIGH
+
+
+def square_wave(frequency, duration, phase=0.0, first_level=HIGH):
+    """
+    Build square waveform
+
+    Args:
+        frequency (float): frequency (Hz)
+        duration (float): waveform duration (seconds)
+        phase (float): offset of first edge (seconds)
+        first_level (int): level of first edge
+
+    Returns:
+        list: list of (offset, level)
+    """
+    half_period = 0.5 / frequency
+    edges = []
+    level = first_level
+    offset = phase
+    while offset < duration:
+        edges.append((offset, level))
+        level = 1 - level
+        offset += half_period
+    return edges
+
+
+def play(backend, waveforms, start=None):
+    """
+    Play scripted waveforms from a single thread
+
+    Args:
+        backend (GpioSimulatedBackend): simulated backend
+        waveforms (dict): list of (offset from start in seconds, level) by pin
+        start (float): monotonic start time (default now)
+
+    Returns:
+        WaveformPlayer: running player
+    """
+    player = WaveformPlayer(backend, waveforms, start)
+    player.start()
+    return player
+
+
+class WaveformPlayer(Thread):
+    """
+    Thread playing scripted waveforms on simulated pins
+    """
+
+    def __init__(self, backend, waveforms, start=None):
+        Thread.__init__(self)
+        self.daemon = True
+        self.backend = backend
+        self.start_time = time.monotonic() if start is None else start
+        self.edges = [
+            (self.start_time + offset, pin, level)
+            for pin, waveform in waveforms.items()
+            for offset, level in waveform
+        ]
+        heapq.heapify(self.edges)
+        self.played = 0
+        self._stop_event = Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while self.edges and not self._stop_event.is_set():
+            edge_time, pin, level = heapq.heappop(self.edges)
+            delay = edge_time - time.monotonic()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            self.backend.set_level(pin, level)
+            self.played += 1
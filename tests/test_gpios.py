@@ -3,14 +3,36 @@ import unittest
 import logging
 import time
 import sys, os, copy
+import threading
 import shutil
+import tempfile
+import mmap
+import struct
 sys.path.append('../')
 from backend.gpios import Gpios, GpioInputWatcher
+from backend.gpiosdebouncer import GpioDebouncer
+from backend.gpioslineeventwatcher import GpioLineEventWatcher, GPIOEVENT_DATA, GPIOEVENT_EVENT_RISING_EDGE, GPIOEVENT_EVENT_FALLING_EDGE
 from backend.gpiosgpioonevent import GpiosGpioOnEvent
 from backend.gpiosgpiooffevent import GpiosGpioOffEvent
+from backend.gpiosgpiocounterevent import GpiosGpioCounterEvent
+from backend.gpiosoutputsupdateevent import GpiosOutputsUpdateEvent
+from backend.gpiospulsecounter import GpioPulseCounter
+from backend.gpiosemissionpolicy import GpioEmissionPolicy
+from backend.gpiosdevicesindex import GpioDevicesIndex
+from backend.gpiospwm import GpioSoftwarePwm, GpioHardwarePwm
+from backend.gpiosgpiopwmevent import GpiosGpioPwmEvent
+from backend.gpiosgpiogestureevent import GpiosGpioGestureEvent
+from backend.gpiostimerwheel import GpioTimerWheel
+from backend.gpioshistory import GpioEdgeHistory
+from backend.gpioslatency import GpioLatencyHistogram, GpioLatencyStats
+from backend.gpiosinputstate import GpioInputState
+from backend.gpiosinputrecord import GpioInputRecord
+from backend.gpiosdispatcher import GpioCallbackDispatcher
+from backend.gpiosgesture import GpioGestureDetector
+from backend.gpiosbackend import GpioBackend, GpioRpiBackend, GpioChardevBackend, GpioMmapBackend, GpioSimulatedBackend
 from cleep.exception import InvalidParameter, MissingParameter, CommandError, Unauthorized
 import RPi.GPIO as GPIO
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, ANY, call
 
 class TestGpioInputWatcher(unittest.TestCase):
 
@@ -18,9 +40,12 @@ class TestGpioInputWatcher(unittest.TestCase):
         logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
         self.session = session.TestSession(self)
 
-        self.w = GpioInputWatcher(7, '123-456-789-123', self.__on_callback, self.__off_callback)
+        self.backend = Mock()
+        self.backend.inputs.side_effect = lambda pins: [self.backend.input(pin) for pin in pins]
+        self.w = GpioInputWatcher(self.__on_callback, self.__off_callback, self.backend)
         self.on_cb_count = 0 
         self.off_cb_count = 0 
+        self.cb_timestamps = []
 
     def tearDown(self):
         if self.w and self.w.is_alive():
@@ -28,14 +53,16 @@ class TestGpioInputWatcher(unittest.TestCase):
             self.w.join()
         self.session.clean()
 
-    def __on_callback(self, uuid):
+    def __on_callback(self, uuid, timestamp):
         self.on_cb_count += 1
+        self.cb_timestamps.append(timestamp)
 
-    def __off_callback(self, uuid, duration):
+    def __off_callback(self, uuid, duration, timestamp):
         self.off_cb_count += 1
+        self.cb_timestamps.append(timestamp)
 
     def test_stop(self):
-        self.w._get_input_level = Mock(GPIO.HIGH)
+        self.backend.input = Mock(return_value=GPIO.HIGH)
         self.w.start()
         time.sleep(1.0)
         self.w.stop()
@@ -44,984 +71,4309 @@ class TestGpioInputWatcher(unittest.TestCase):
         except:
             self.assertFalse(True, 'Thread should properly stop')
 
+    def test_stop_latency(self):
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.poll_period = 10.0
+        self.w.start()
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        self.w.stop()
+        self.w.join(1.0)
+
+        self.assertFalse(self.w.is_alive())
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_add_input_latency(self):
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.poll_period = 10.0
+        self.w.start()
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        self.w.add_input(7, '123-456-789-123', GPIO.LOW)
+        while not self.off_cb_count and time.monotonic() - start < 1.0:
+            time.sleep(0.001)
+
+        self.assertEqual(self.off_cb_count, 1)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_remove_input_waits_sampling_in_progress(self):
+        self.backend.input = Mock(side_effect=lambda pin: time.sleep(0.2) or GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123', GPIO.LOW)
+        self.w.start()
+        time.sleep(0.05)
+
+        self.assertTrue(self.w.remove_input('123-456-789-123'))
+        count = self.off_cb_count
+        time.sleep(0.3)
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.off_cb_count, 1)
+
     def test_initial_level_off(self):
-        w = GpioInputWatcher(7, '123-456-789-123', self.__on_callback, self.__off_callback, GPIO.LOW)
-        w._get_input_level = Mock(return_value=GPIO.HIGH)
-        w.start()
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123', GPIO.LOW)
+        self.w.start()
         time.sleep(0.25)
         self.assertEqual(self.on_cb_count, 0)
         self.assertEqual(self.off_cb_count, 1)
-        w.stop()
-        w.join()
 
     def test_initial_level_on(self):
-        w = GpioInputWatcher(7, '123-456-789-123', self.__on_callback, self.__off_callback, GPIO.HIGH)
-        w._get_input_level = Mock(return_value=GPIO.HIGH)
-        w.start()
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123', GPIO.HIGH)
+        self.w.start()
         time.sleep(0.25)
         self.assertEqual(self.on_cb_count, 1)
         self.assertEqual(self.off_cb_count, 0)
-        w.stop()
-        w.join()
+
+    def test_inputs_table_records(self):
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        state = GpioInputState()
+        self.w.add_input(7, '123-456-789-123', GPIO.HIGH, state=state)
+        self.w.start()
+        time.sleep(0.1)
+
+        record = self.w._inputs[0]
+        self.assertIsInstance(record, GpioInputRecord)
+        self.assertEqual((record.pin, record.uuid, record.level), (7, '123-456-789-123', GPIO.HIGH))
+        self.assertIs(record.state, state)
+        self.assertEqual(record.debouncer.level, GPIO.HIGH)
 
     def test_callbacks(self):
-        self.w._get_input_level = Mock(return_value=GPIO.HIGH)
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123')
         self.w.start()
         time.sleep(0.5)
         self.assertEqual(self.on_cb_count, 0)
         self.assertEqual(self.off_cb_count, 1)
 
-        self.w._get_input_level.return_value = GPIO.LOW
+        self.backend.input.return_value = GPIO.LOW
         time.sleep(0.5)
         self.assertEqual(self.on_cb_count, 1)
         self.assertEqual(self.off_cb_count, 1)
 
-        self.w._get_input_level.return_value = GPIO.HIGH
+        self.backend.input.return_value = GPIO.HIGH
         time.sleep(0.5)
         self.assertEqual(self.on_cb_count, 1)
         self.assertEqual(self.off_cb_count, 2)
 
-        self.w._get_input_level.return_value = GPIO.LOW
+        self.backend.input.return_value = GPIO.LOW
         time.sleep(0.5)
         self.assertEqual(self.on_cb_count, 2)
         self.assertEqual(self.off_cb_count, 2)
+        # initial value is not an edge, edges are timestamped with debounced transition time
+        self.assertIsNone(self.cb_timestamps[0])
+        self.assertTrue(all(timestamp is not None for timestamp in self.cb_timestamps[1:]))
+        self.assertEqual(self.cb_timestamps[1:], sorted(self.cb_timestamps[1:]))
+
+    def test_history(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        history = GpioEdgeHistory(8)
+        self.w.add_input(7, '123-456-789-123', history=history)
+        self.w.start()
+        time.sleep(0.1)
+        self.backend.input.return_value = GPIO.LOW
+        time.sleep(0.2)
+
+        timestamps, levels = history.get_edges()
+        self.assertEqual(levels, [GPIO.HIGH, GPIO.LOW])
+        self.assertGreater(timestamps[1], timestamps[0])
+
+    def test_state(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        state = GpioInputState()
+        self.w.add_input(7, '123-456-789-123', state=state)
+        self.w.start()
+        time.sleep(0.1)
+        self.assertEqual(state.get()[:2], (GPIO.HIGH, False))
+        self.assertEqual(state.changes, 0)
+
+        self.backend.input.return_value = GPIO.LOW
+        time.sleep(0.2)
+
+        level, on, timestamp, changes = state.get()
+        self.assertEqual(level, GPIO.LOW)
+        self.assertTrue(on)
+        self.assertEqual(changes, 1)
+        self.assertLess(timestamp, time.monotonic())
+
+    def test_snapshot(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(side_effect=lambda pin: GPIO.HIGH if pin == 7 else GPIO.LOW)
+        self.w.add_input(7, '123-456-789-123')
+        self.w.add_input(11, '456-789-123-456')
+        self.assertEqual(self.w.get_snapshot(), (0, None, 0))
+        self.w.start()
+        time.sleep(0.1)
+
+        sequence, timestamp, levels = self.w.get_snapshot()
+        self.assertGreater(sequence, 0)
+        self.assertLessEqual(timestamp, time.monotonic())
+        self.assertEqual(levels, 1 << 7)
+        time.sleep(0.05)
+        self.assertGreater(self.w.get_snapshot()[0], sequence)
+
+    def test_latency(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        latency = GpioLatencyStats()
+        self.w.on_callback = Mock(side_effect=lambda uuid, timestamp: time.sleep(0.002))
+        self.w.add_input(7, '123-456-789-123', latency=latency)
+        self.w.start()
+        time.sleep(0.1)
+        self.backend.input.return_value = GPIO.LOW
+        time.sleep(0.2)
+
+        stats = latency.snapshot()
+        self.assertEqual(stats['detection']['count'], 1)
+        # level change is accepted after stable time
+        self.assertGreaterEqual(stats['detection']['max'], self.w.stable_time)
+        self.assertEqual(stats['callback']['count'], 1)
+        self.assertGreaterEqual(stats['callback']['max'], 0.002)
+
+    def test_health(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.assertIsNone(self.w.get_health()['lastalive'])
+        self.w.add_input(7, '123-456-789-123')
+        self.w.start()
+        time.sleep(0.1)
+
+        health = self.w.get_health()
+        self.assertGreater(health['loops'], 3)
+        self.assertEqual(health['overruns'], 0)
+        self.assertEqual(health['bounces'], 0)
+        self.assertGreaterEqual(health['cputime'], 0.0)
+        self.assertAlmostEqual(health['lastalive'], time.time(), delta=0.1)
+
+    def test_health_overruns(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(side_effect=lambda pin: time.sleep(0.02) or GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123')
+        self.w.start()
+        time.sleep(0.15)
 
+        health = self.w.get_health()
+        self.assertGreater(health['overruns'], 0)
+        self.assertEqual(health['overruns'], health['loops'])
 
+    def test_unexpected_stop_is_logged(self):
+        self.w._inputs = None
+        with patch.object(self.w.logger, 'exception') as exception_mock:
+            self.w.start()
+            self.w.join(1.0)
 
-class TestGpios(unittest.TestCase):
+        self.assertFalse(self.w.is_alive())
+        exception_mock.assert_called_once_with('GpioInputWatcher stopped unexpectedly:')
 
-    def setUp(self):
-        logging.basicConfig(level=logging.DEBUG, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
-        self.session = session.TestSession(self)
+    def test_short_pulse_not_lost(self):
+        self.w.poll_period = 0.01
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.add_input(7, '123-456-789-123')
+        self.w.start()
+        time.sleep(0.1)
+        self.assertEqual(self.off_cb_count, 1)
 
-        # patch GpioInputWatcher
-        GpioInputWatcher._get_input_level = Mock(return_value=GPIO.HIGH)
+        # pulse shorter than debounce window
+        self.backend.input.return_value = GPIO.LOW
+        time.sleep(0.05)
+        self.backend.input.return_value = GPIO.HIGH
+        time.sleep(0.05)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(self.off_cb_count, 1)
+        self.assertTrue(self.w.get_debounce_stats()['123-456-789-123']['pending'])
 
-    def tearDown(self):
-        self.session.clean()
+        time.sleep(0.2)
+        self.assertEqual(self.off_cb_count, 2)
+        self.assertEqual(self.w.get_debounce_stats()['123-456-789-123']['bounces'], 1)
 
-    def init(self, start=True, mock_on_start=True, mock_on_stop=True):
-        self.module = self.session.setup(Gpios, mock_on_start=mock_on_start, mock_on_stop=mock_on_stop)
+    def test_multiple_inputs(self):
+        levels = {7: GPIO.HIGH, 11: GPIO.HIGH}
+        self.backend.input = Mock(side_effect=lambda pin: levels[pin])
+        self.w.add_input(7, '123-456-789-123')
+        self.w.add_input(11, '456-789-123-456')
+        self.w.start()
+        time.sleep(0.25)
+        self.assertEqual(self.off_cb_count, 2)
 
-        if start:
-            self.session.start_module(self.module)
+        levels[11] = GPIO.LOW
+        time.sleep(0.5)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(self.off_cb_count, 2)
 
-    def check_pin(self, pin):
-        self.assertTrue('gpio' in pin)
-        self.assertTrue('label' in pin)
-        if pin['label'].startswith('GPIO'):
-            self.assertTrue(type(pin['gpio']) is dict)
-            self.assertTrue('assigned' in pin['gpio'])
-            self.assertTrue('owner' in pin['gpio'])
+    def test_add_remove_input_no_thread(self):
+        self.backend.input = Mock(return_value=GPIO.HIGH)
+        self.w.start()
+        threads_count = threading.active_count()
 
-    def get_device(self):
-        """
-        Return device
-        """
-        return copy.deepcopy({
-            'name': 'dummy',
-            'mode': 'output',
-            'pin': 12,
-            'gpio': 'GPIO18',
-            'keep': False,
-            'on': True,
-            'inverted': False,
-            'owner': 'unittest',
-            'type': 'gpio',
-            'subtype': 'output',
-            'uuid': 'f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d'
-        })
+        self.w.add_input(7, '123-456-789-123')
+        self.w.add_input(11, '456-789-123-456')
+        self.assertEqual(threading.active_count(), threads_count)
+        self.assertCountEqual(self.w.get_inputs(), ['123-456-789-123', '456-789-123-456'])
 
-    def test_configure(self):
-        self.init(start=False, mock_on_start=False)
-        devices = {
-            '123-456-789': {
-                'name': 'device1'
-            },
-            '456-789-123': {
-                'name': 'device2'
-            },
-            '789-123-456': {
-                'name': 'device3'
-            }
-        }
-        self.module.get_module_devices = Mock(return_value=devices)
-        self.module._configure_gpio = Mock()
+        self.assertTrue(self.w.remove_input('123-456-789-123'))
+        self.assertFalse(self.w.remove_input('123-456-789-123'))
+        self.assertEqual(threading.active_count(), threads_count)
+        self.assertFalse(self.w.has_input('123-456-789-123'))
+        self.assertTrue(self.w.has_input('456-789-123-456'))
 
-        self.session.start_module(self.module)
+    def test_add_counter(self):
+        self.w._add_event_detect = Mock()
+        self.w._remove_event_detect = Mock()
+        counter = GpioPulseCounter()
 
-        self.assertEqual(self.module._configure_gpio.call_count, len(devices.keys()))
-        self.module._configure_gpio.assert_any_call(devices['123-456-789'])
-        self.module._configure_gpio.assert_any_call(devices['456-789-123'])
-        self.module._configure_gpio.assert_any_call(devices['789-123-456'])
+        self.w.add_counter(7, '123-456-789-123', counter)
+        self.w._add_event_detect.assert_called_with(7, GPIO.RISING, ANY)
+        self.assertTrue(self.w.has_input('123-456-789-123'))
 
-    @patch('backend.gpios.GPIO_output')
-    def test_gpio_output(self, mock_gpio_output):
-        self.init()
+        # simulate edge detection callbacks
+        callback = self.w._add_event_detect.call_args[0][2]
+        callback(7)
+        callback(7)
+        self.assertEqual(counter.snapshot()['count'], 2)
 
-        self.module._gpio_output(12, 1)
-        mock_gpio_output.assert_called_with(12, 1)
+        self.assertTrue(self.w.remove_input('123-456-789-123'))
+        self.w._remove_event_detect.assert_called_with(7)
+        self.assertFalse(self.w.has_input('123-456-789-123'))
 
-        self.module._gpio_output(18, 0)
-        mock_gpio_output.assert_called_with(18, 0)
+    def test_add_counter_falling_edges(self):
+        self.w._add_event_detect = Mock()
 
-    def test_configure_gpio_mode_reserved(self):
-        self.init()
-        self.module._gpio_setup = Mock()
-        device = self.get_device()
-        device['mode'] = 'reserved'
-        self.module._gpio_setup = Mock()
-        self.module._Gpios__launch_input_watcher = Mock()
+        self.w.add_counter(7, '123-456-789-123', GpioPulseCounter(), GPIO.LOW)
 
-        self.assertTrue(self.module._configure_gpio(device))
-        self.assertFalse(self.session.event_called('gpios.gpio.on'))
-        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
-        self.assertEqual(self.module._gpio_setup.call_count, 0)
+        self.w._add_event_detect.assert_called_with(7, GPIO.FALLING, ANY)
 
-    def test_configure_gpio_mode_output_on(self):
-        self.init()
-        self.module._gpio_setup = Mock()
-        self.module._Gpios__launch_input_watcher = Mock()
-        device = self.get_device()
-        device['mode'] = 'output'
-        device['on'] = True
-    
-        self.assertTrue(self.module._configure_gpio(device))
-        self.module._gpio_setup.assert_called_with(12, GPIO.OUT, initial=GPIO.LOW)
-        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': True}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
-        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+    def test_add_input_replace_existing(self):
+        self.w.add_input(7, '123-456-789-123')
+        self.w.add_input(11, '123-456-789-123')
 
-    def test_configure_gpio_mode_output_off(self):
-        self.init()
-        self.module._gpio_setup = Mock()
-        self.module._Gpios__launch_input_watcher = Mock()
-        device = self.get_device()
-        device['mode'] = 'output'
-        device['on'] = False
-    
-        self.assertTrue(self.module._configure_gpio(device))
-        self.module._gpio_setup.assert_called_with(12, GPIO.OUT, initial=GPIO.HIGH)
-        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': True, 'duration': 0}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
-        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+        self.assertEqual(self.w.get_inputs(), ['123-456-789-123'])
 
-    def test_configure_gpio_mode_input_on(self):
-        self.init()
-        self.module._gpio_setup = Mock()
-        self.module._Gpios__launch_input_watcher = Mock()
-        device = self.get_device()
-        device['mode'] = 'input'
-        device['on'] = True
-    
-        self.assertTrue(self.module._configure_gpio(device))
-        self.module._gpio_setup.assert_called_with(12, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-        self.assertFalse(self.session.event_called('gpios.gpio.on'))
-        self.module._Gpios__launch_input_watcher.assert_called_with(device)
 
-    def test_configure_gpio_mode_input_off(self):
-        self.init()
-        self.module._gpio_setup = Mock()
-        self.module._Gpios__launch_input_watcher = Mock()
-        device = self.get_device()
-        device['mode'] = 'input'
-        device['on'] = False
-    
-        self.assertTrue(self.module._configure_gpio(device))
-        self.module._gpio_setup.assert_called_with(12, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-        self.assertFalse(self.session.event_called('gpios.gpio.off'))
-        self.module._Gpios__launch_input_watcher.assert_called_with(device)
 
-    def test_configure_gpio_mode_exception(self):
-        self.init()
-        self.module._gpio_setup = Mock(side_effect=Exception('Test exception'))
-        self.module._Gpios__launch_input_watcher = Mock()
-        device = self.get_device()
-        device['mode'] = 'input'
-        device['on'] = False
-    
-        self.assertFalse(self.module._configure_gpio(device))
-        self.assertFalse(self.session.event_called('gpios.gpio.off'))
-        self.assertFalse(self.session.event_called('gpios.gpio.on'))
-        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+class TestGpioDebouncer(unittest.TestCase):
 
-    def test_input_on_callback(self):
-        self.init()
-        device = self.get_device()
-        self.module._get_device = Mock(return_value=device)
+    def test_accept_first_edge(self):
+        d = GpioDebouncer(0, 10.0, debounce=0.2)
 
-        self.module._Gpios__input_on_callback(device['uuid'])
+        self.assertTrue(d.update(1, 10.5))
+        self.assertEqual(d.level, 1)
+        self.assertEqual(d.timestamp, 10.5)
 
-        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': False}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+    def test_same_level_not_accepted(self):
+        d = GpioDebouncer(0, 10.0)
 
-    def test_input_on_callback_invalid_params(self):
-        self.init()
-        self.module._get_device = Mock(return_value=None)
+        self.assertFalse(d.update(0, 10.5))
+        self.assertFalse(d.is_pending())
+        self.assertIsNone(d.next_deadline())
 
-        with self.assertRaises(Exception) as cm:
-            self.module._Gpios__input_on_callback('123456789')
-        self.assertEqual(str(cm.exception), 'Device "123456789" not found')
-        self.assertFalse(self.session.event_called('gpios.gpio.on'))
+    def test_bounces_counted_and_pending_resolved(self):
+        d = GpioDebouncer(0, 10.0, debounce=0.2)
+        self.assertTrue(d.update(1, 11.0))
 
-    def test_input_off_callback(self):
-        self.init()
-        device = self.get_device()
-        self.module._get_device = Mock(return_value=device)
+        self.assertFalse(d.update(0, 11.01))
+        self.assertFalse(d.update(1, 11.02))
+        self.assertFalse(d.update(0, 11.05))
+        self.assertEqual(d.bounces, 3)
+        self.assertTrue(d.is_pending())
+        self.assertEqual(d.next_deadline(), 11.2)
 
-        self.module._Gpios__input_off_callback(device['uuid'], 666)
+        # short pulse is not lost: level change is accepted at window end with its real timestamp
+        self.assertFalse(d.check(11.1))
+        self.assertTrue(d.check(11.2))
+        self.assertEqual(d.level, 0)
+        self.assertEqual(d.timestamp, 11.05)
 
-        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': 666}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+    def test_stable_time(self):
+        d = GpioDebouncer(0, 10.0, debounce=0.0, stable_time=0.1)
 
-    def test_input_off_callback_invalid_params(self):
-        self.init()
-        self.module._get_device = Mock(return_value=None)
+        self.assertFalse(d.update(1, 11.0))
+        self.assertFalse(d.check(11.05))
+        self.assertEqual(d.next_deadline(), 11.1)
+        self.assertTrue(d.check(11.1))
+        self.assertEqual(d.timestamp, 11.0)
 
-        with self.assertRaises(Exception) as cm:
-            self.module._Gpios__input_off_callback('123456789', 666)
-        self.assertEqual(str(cm.exception), 'Device "123456789" not found')
-        self.assertFalse(self.session.event_called('gpios.gpio.off'))
+    def test_glitches(self):
+        d = GpioDebouncer(0, 10.0, debounce=0.0, stable_time=0.1)
 
-    def test_get_module_config(self):
-        self.init()
-        config = self.module.get_module_config()
-        self.assertTrue(type(config) is dict, 'Get_module_config returns invalid output type (dict awaited)')
-        self.assertTrue('pinsnumber' in config, '"pinsnumber" key does not exist in config')
-        self.assertTrue(type(config['pinsnumber']) is int, 'Config pinsnumber is not int')
-        self.assertTrue('revision' in config, '"revision" key does not exist in config')
-        self.assertTrue(type(config['revision']) is int, 'Config revision is not int')
+        self.assertFalse(d.update(1, 11.0))
+        self.assertFalse(d.update(0, 11.05))
 
-    def test_get_pins_usage(self):
-        self.init()
-        usage = self.module.get_pins_usage()
-        # logging.info(usage)
-        self.assertTrue(type(usage) is dict, 'get_pins_usage returns invalid type, dict awaited')
+        self.assertEqual(d.glitches, 1)
+        self.assertFalse(d.is_pending())
+        self.assertEqual(d.level, 0)
 
-        config = self.module.get_module_config()
-        self.module._get_revision = Mock(return_value=3)
-        usage = self.module.get_pins_usage()
-        self.assertEqual(len(usage), 40, 'Number of pins usage is invalid, 40 awaited')
-        for pin in usage.values():
-            self.check_pin(pin)
+    def test_rearm_time(self):
+        d = GpioDebouncer(0, 10.0, debounce=0.0, rearm_time=1.0)
+        self.assertTrue(d.update(1, 11.0))
+        self.assertTrue(d.update(0, 11.1))
 
-        config = self.module.get_module_config()
-        self.module._get_revision = Mock(return_value=2)
-        usage = self.module.get_pins_usage()
-        self.assertEqual(len(usage), 26, 'Number of pins usage is invalid, 26 awaited')
-        for pin in usage.values():
-            self.check_pin(pin)
+        self.assertFalse(d.update(1, 11.5))
+        self.assertEqual(d.next_deadline(), 12.0)
+        self.assertTrue(d.check(12.0))
+        self.assertEqual(d.level, 1)
 
-        config = self.module.get_module_config()
-        self.module._get_revision = Mock(return_value=1)
-        usage = self.module.get_pins_usage()
-        self.assertEqual(len(usage), 26, 'Number of pins usage is invalid, 26 awaited')
-        for pin in usage.values():
-            self.check_pin(pin)
 
-    def test_get_pins_usage_with_owner(self):
-        self.init()
-        usage = self.module.get_pins_usage()
-        # logging.info(usage)
-        self.assertTrue(type(usage) is dict, 'get_pins_usage returns invalid type, dict awaited')
-        self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'testmod')
 
-        config = self.module.get_module_config()
-        self.module._get_revision = Mock(return_value=3)
-        usage = self.module.get_pins_usage()
-        # logging.debug('Usage: %s' % usage)
+class TestGpioPulseCounter(unittest.TestCase):
 
-        gpio18 = usage[12]
-        logging.debug('Gpio18: %s' % gpio18)
-        self.assertEqual(gpio18['label'], 'GPIO18')
-        self.assertEqual(gpio18['gpio']['assigned'], True)
-        self.assertEqual(gpio18['gpio']['owner'], 'testmod')
+    def test_snapshot(self):
+        c = GpioPulseCounter(now=10.0)
+        for i in range(5):
+            c.add_edge(10.0 + i * 0.1)
 
-    def test_get_assigned_gpios(self):
-        self.init()
-        gpios = self.module.get_assigned_gpios()
-        self.assertTrue(type(gpios) is list, 'get_assigned_gpios returns invalid data type')
-        self.assertEqual(len(gpios), 0, 'Assigned gpios list should be empty')
+        snapshot = c.snapshot(now=12.0)
 
-        gpio = 'GPIO18'
-        device = self.module.reserve_gpio('dummy', gpio, 'test', 'unittest')
-        gpios = self.module.get_assigned_gpios()
-        self.assertEqual(len(gpios), 1, 'Assigned gpios list should be equal to 1')
-        self.assertEqual(gpios[0], gpio, 'Reserved gpio is invalid')
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['total'], 5)
+        self.assertAlmostEqual(snapshot['duration'], 2.0)
+        self.assertAlmostEqual(snapshot['rate'], 2.5)
 
-    def test_get_raspi_gpios(self):
-        self.init()
-        self.module._get_revision = Mock()
+    def test_snapshot_and_reset(self):
+        c = GpioPulseCounter(now=10.0)
+        c.add_edge(10.5)
+        c.add_edge(10.6)
 
-        # rev 1
-        self.module._get_revision.return_value = 1
-        self.assertDictEqual(self.module.get_raspi_gpios(), self.module.GPIOS_REV1)
+        snapshot = c.snapshot(reset=True, now=11.0)
+        self.assertEqual(snapshot['count'], 2)
 
-        # rev 2
-        self.module._get_revision.return_value = 2
-        self.assertDictEqual(self.module.get_raspi_gpios(), self.module.GPIOS_REV2)
+        c.add_edge(11.5)
+        snapshot = c.snapshot(now=12.0)
+        self.assertEqual(snapshot['count'], 1)
+        self.assertEqual(snapshot['total'], 3)
+        self.assertAlmostEqual(snapshot['duration'], 1.0)
 
-        # rev 3
-        self.module._get_revision.return_value = 3
-        gpios = copy.deepcopy(self.module.GPIOS_REV2)
-        gpios.update(self.module.GPIOS_REV3)
-        self.assertDictEqual(self.module.get_raspi_gpios(), gpios)
+    def test_publish(self):
+        c = GpioPulseCounter(now=10.0)
+        for i in range(11):
+            c.add_edge(10.5 + i * 0.05)
 
-        # invalid rev
-        self.module._get_revision.return_value = 4
-        self.assertDictEqual(self.module.get_raspi_gpios(), {})
+        values = c.publish(now=12.0)
+        self.assertEqual(values['count'], 11)
+        self.assertAlmostEqual(values['interval'], 2.0)
+        self.assertAlmostEqual(values['rate'], 5.5)
+        self.assertAlmostEqual(values['frequency'], 20.0)
+
+        # new window, counter since reset untouched
+        values = c.publish(now=13.0)
+        self.assertEqual(values['count'], 0)
+        self.assertEqual(values['frequency'], 0.0)
+        self.assertEqual(c.snapshot(now=13.0)['count'], 11)
+
+
+
+class TestGpioEmissionPolicy(unittest.TestCase):
+
+    def test_no_limit(self):
+        p = GpioEmissionPolicy()
+
+        for i in range(100):
+            self.assertIsNone(p.submit('on', {}, 10.0 + i * 0.001))
+        self.assertEqual(p.get_stats(), {'emitted': 100, 'merged': 0, 'dropped': 0})
+
+    def test_window_coalescing(self):
+        p = GpioEmissionPolicy(window=1.0)
+
+        self.assertIsNone(p.submit('on', {'gpio': 'GPIO18'}, 10.0))
+        self.assertAlmostEqual(p.submit('off', {'gpio': 'GPIO18'}, 10.2), 0.8)
+        self.assertEqual(p.submit('on', {'gpio': 'GPIO18'}, 10.3), 0)
+        self.assertEqual(p.submit('off', {'gpio': 'GPIO18'}, 10.4), 0)
+
+        event, params = p.flush(11.0)
+        self.assertEqual(event, 'off')
+        self.assertEqual(params, {'gpio': 'GPIO18', 'transitions': 3})
+        self.assertEqual(p.get_stats(), {'emitted': 2, 'merged': 2, 'dropped': 0})
+        self.assertIsNone(p.flush(11.0))
+
+        # new window opened by summary event
+        self.assertAlmostEqual(p.submit('on', {}, 11.5), 0.5)
+        # after window, event is sent immediately
+        p.flush(12.0)
+        self.assertIsNone(p.submit('off', {}, 13.1))
+
+    def test_rate_limit(self):
+        p = GpioEmissionPolicy(max_rate=2)
+
+        self.assertIsNone(p.submit('on', {}, 10.0))
+        self.assertIsNone(p.submit('off', {}, 10.01))
+        delay = p.submit('on', {}, 10.02)
+        self.assertAlmostEqual(delay, 0.48)
+        self.assertEqual(p.submit('off', {}, 10.03), 0)
+
+        event, params = p.flush(10.5)
+        self.assertEqual(event, 'off')
+        self.assertEqual(params['transitions'], 2)
+        self.assertEqual(p.get_stats(), {'emitted': 3, 'merged': 0, 'dropped': 1})
+
+        # bucket refilled
+        self.assertIsNone(p.submit('on', {}, 11.5))
+
+
+
+class TestGpioDevicesIndex(unittest.TestCase):
+
+    def get_device(self, uuid, name, gpio, pin, mode='input'):
+        return {'uuid': uuid, 'name': name, 'gpio': gpio, 'pin': pin, 'mode': mode, 'subtype': 'onewire' if mode == 'reserved' else mode, 'owner': 'unittest'}
+
+    def test_add(self):
+        i = GpioDevicesIndex('reserved')
+        device = self.get_device('uuid1', 'name1', 'GPIO18', 12)
+
+        i.add(device)
+
+        self.assertEqual(len(i), 1)
+        self.assertEqual(i.get('uuid1'), device)
+        self.assertIsNot(i.get('uuid1'), device)
+        self.assertIs(i.get_by_gpio('GPIO18'), i.get('uuid1'))
+        self.assertIs(i.get_by_pin(12), i.get('uuid1'))
+        self.assertIs(i.get_by_name('name1'), i.get('uuid1'))
+        self.assertEqual(i.get_by_usage('input'), [])
+        self.assertEqual(i.get_gpios(), ['GPIO18'])
+        self.assertIsNone(i.get('uuid2'))
+        self.assertIsNone(i.get_by_gpio('GPIO19'))
+        self.assertIsNone(i.get_by_pin(35))
+        self.assertIsNone(i.get_by_name('name2'))
+
+    def test_add_reserved(self):
+        i = GpioDevicesIndex('reserved')
+        i.add(self.get_device('uuid1', 'name1', 'GPIO18', 12, mode='reserved'))
+        i.add(self.get_device('uuid2', 'name2', 'GPIO19', 35, mode='reserved'))
+        i.add(self.get_device('uuid3', 'name3', 'GPIO20', 38))
+
+        self.assertCountEqual([device['uuid'] for device in i.get_by_usage('onewire')], ['uuid1', 'uuid2'])
+
+        i.remove('uuid1')
+        self.assertEqual([device['uuid'] for device in i.get_by_usage('onewire')], ['uuid2'])
+        i.remove('uuid2')
+        self.assertEqual(i.get_by_usage('onewire'), [])
+
+    def test_update(self):
+        i = GpioDevicesIndex('reserved')
+        i.add(self.get_device('uuid1', 'name1', 'GPIO18', 12))
+
+        i.add(self.get_device('uuid1', 'renamed', 'GPIO18', 12))
+
+        self.assertEqual(len(i), 1)
+        self.assertIsNone(i.get_by_name('name1'))
+        self.assertEqual(i.get_by_name('renamed')['uuid'], 'uuid1')
+        self.assertEqual(i.get_by_gpio('GPIO18')['name'], 'renamed')
+
+    def test_remove(self):
+        i = GpioDevicesIndex('reserved')
+        i.add(self.get_device('uuid1', 'name1', 'GPIO18', 12))
+
+        i.remove('uuid1')
+        i.remove('unknown')
+
+        self.assertEqual(len(i), 0)
+        self.assertIsNone(i.get('uuid1'))
+        self.assertIsNone(i.get_by_gpio('GPIO18'))
+        self.assertIsNone(i.get_by_pin(12))
+        self.assertIsNone(i.get_by_name('name1'))
+        self.assertEqual(i.get_gpios(), [])
+
+    def test_duplicated_names(self):
+        i = GpioDevicesIndex('reserved')
+        i.add(self.get_device('uuid1', 'name1', 'GPIO18', 12))
+        i.add(self.get_device('uuid2', 'name2', 'GPIO19', 35))
+        i.add(self.get_device('uuid2', 'name1', 'GPIO19', 35))
+
+        i.remove('uuid1')
+
+        self.assertEqual(i.get_by_name('name1')['uuid'], 'uuid2')
+
+    def test_rebuild(self):
+        i = GpioDevicesIndex('reserved')
+        i.add(self.get_device('uuid1', 'name1', 'GPIO18', 12))
+
+        i.rebuild({
+            'uuid2': self.get_device('uuid2', 'name2', 'GPIO19', 35),
+            'uuid3': self.get_device('uuid3', 'name3', 'GPIO20', 38, mode='reserved'),
+        })
+
+        self.assertEqual(len(i), 2)
+        self.assertIsNone(i.get('uuid1'))
+        self.assertEqual(i.get_by_pin(35)['uuid'], 'uuid2')
+        self.assertEqual(i.get_by_usage('onewire')[0]['uuid'], 'uuid3')
+
+
+
+class TestGpioSoftwarePwm(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.levels = []
+        self.e = GpioSoftwarePwm(lambda pin, level: self.levels.append((pin, level, time.monotonic())))
+
+    def tearDown(self):
+        self.e.stop()
+        if self.e.is_alive():
+            self.e.join(1.0)
+
+    def test_static_levels(self):
+        self.e.add_channel(12, 100, 0, GPIO.LOW)
+        self.assertEqual(self.levels[-1][:2], (12, GPIO.HIGH))
+        self.e.set_duty_cycle(12, 100)
+        self.assertEqual(self.levels[-1][:2], (12, GPIO.LOW))
+        self.e.start()
+        time.sleep(0.05)
+
+        self.assertEqual(len(self.levels), 2)
+        self.assertEqual(self.e.get_stats()['edges'], 0)
+
+    def test_duty_cycle(self):
+        self.e.add_channel(12, 100, 25, GPIO.HIGH)
+        self.e.start()
+        time.sleep(0.205)
+        self.e.stop()
+
+        highs = [ts for pin, level, ts in self.levels if level == GPIO.HIGH]
+        lows = [ts for pin, level, ts in self.levels if level == GPIO.LOW]
+        self.assertAlmostEqual(len(highs), 21, delta=3)
+        self.assertAlmostEqual(len(lows), 21, delta=3)
+        # high during 25% of 10ms period
+        durations = [low - high for high, low in zip(highs, lows)]
+        self.assertAlmostEqual(sorted(durations)[len(durations) // 2], 0.0025, delta=0.0015)
+        stats = self.e.get_stats()
+        self.assertEqual(stats['channels'], 1)
+        self.assertEqual(stats['edges'], len(self.levels))
+        self.assertGreaterEqual(stats['maxlateness'], stats['meanlateness'])
+
+    def test_many_channels_single_thread(self):
+        threads = threading.active_count()
+        for pin in (11, 12, 13):
+            self.e.add_channel(pin, 50, 50, GPIO.HIGH)
+        self.e.start()
+        time.sleep(0.1)
+
+        self.assertEqual(threading.active_count(), threads + 1)
+        self.assertEqual({pin for pin, _, _ in self.levels}, {11, 12, 13})
+
+    def test_set_frequency(self):
+        self.e.add_channel(12, 10, 50, GPIO.HIGH)
+        self.e.start()
+        time.sleep(0.05)
+        count = len(self.levels)
+
+        self.e.set_frequency(12, 200)
+        time.sleep(0.1)
+
+        self.assertGreater(len(self.levels) - count, 20)
+
+    def test_remove_channel(self):
+        self.e.add_channel(12, 100, 50, GPIO.HIGH)
+        self.e.start()
+        time.sleep(0.03)
+
+        self.assertTrue(self.e.has_channel(12))
+        self.assertTrue(self.e.remove_channel(12))
+        self.assertFalse(self.e.remove_channel(12))
+        self.assertFalse(self.e.has_channel(12))
+        time.sleep(0.02)
+        count = len(self.levels)
+        time.sleep(0.05)
+        self.assertEqual(len(self.levels), count)
+
+    def test_overrun(self):
+        self.e.set_level = lambda pin, level: time.sleep(0.03)
+        self.e.add_channel(12, 100, 50, GPIO.HIGH)
+        self.e.start()
+        time.sleep(0.2)
+
+        self.assertGreater(self.e.get_stats()['overruns'], 0)
+
+
+
+class TestGpioHardwarePwm(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        with open(os.path.join(self.path, 'npwm'), 'w') as fd:
+            fd.write('2\n')
+        os.mkdir(os.path.join(self.path, 'pwm1'))
+        # pwm-2chan overlay default routing: GPIO18 (pin 12) ALT5 and GPIO19 (pin 35) ALT5
+        self.gpiomem = os.path.join(self.path, 'gpiomem')
+        self.write_functions({18: 2, 19: 2})
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read(self, name):
+        with open(os.path.join(self.path, name)) as fd:
+            return fd.read()
+
+    def write_functions(self, functions):
+        registers = [0] * 1024
+        for line, function in functions.items():
+            registers[line // 10] |= function << ((line % 10) * 3)
+        with open(self.gpiomem, 'wb') as fd:
+            fd.write(struct.pack('1024I', *registers))
+
+    def test_get_line_function(self):
+        self.write_functions({4: 1, 18: 2})
+
+        self.assertEqual(GpioHardwarePwm.get_line_function(4, self.gpiomem), 1)
+        self.assertEqual(GpioHardwarePwm.get_line_function(18, self.gpiomem), 2)
+        self.assertEqual(GpioHardwarePwm.get_line_function(12, self.gpiomem), 0)
+        self.assertIsNone(GpioHardwarePwm.get_line_function(18, os.path.join(self.path, 'dummy')))
+
+    def test_get_channel(self):
+        self.assertEqual(GpioHardwarePwm.get_channel(12, self.path, self.gpiomem), 0)
+        self.assertEqual(GpioHardwarePwm.get_channel(35, self.path, self.gpiomem), 1)
+        self.assertIsNone(GpioHardwarePwm.get_channel(11, self.path, self.gpiomem))
+        self.assertIsNone(GpioHardwarePwm.get_channel(12, os.path.join(self.path, 'dummy'), self.gpiomem))
+
+    def test_get_channel_pin_not_routed(self):
+        # pwm overlay configured on GPIO12 (pin 32) and GPIO13 (pin 33)
+        self.write_functions({12: 4, 13: 4})
+
+        self.assertIsNone(GpioHardwarePwm.get_channel(12, self.path, self.gpiomem))
+        self.assertIsNone(GpioHardwarePwm.get_channel(35, self.path, self.gpiomem))
+        self.assertEqual(GpioHardwarePwm.get_channel(32, self.path, self.gpiomem), 0)
+        self.assertEqual(GpioHardwarePwm.get_channel(33, self.path, self.gpiomem), 1)
+
+    def test_get_channel_gpio_registers_unavailable(self):
+        self.assertIsNone(GpioHardwarePwm.get_channel(12, self.path, os.path.join(self.path, 'dummy')))
+
+    def test_get_channel_single_channel_chip(self):
+        with open(os.path.join(self.path, 'npwm'), 'w') as fd:
+            fd.write('1\n')
+
+        self.assertEqual(GpioHardwarePwm.get_channel(12, self.path, self.gpiomem), 0)
+        self.assertIsNone(GpioHardwarePwm.get_channel(35, self.path, self.gpiomem))
+
+    def test_start(self):
+        p = GpioHardwarePwm(1, self.path)
+
+        p.start(1000, 25)
+
+        self.assertEqual(self.read('pwm1/period'), '1000000')
+        self.assertEqual(self.read('pwm1/duty_cycle'), '250000')
+        self.assertEqual(self.read('pwm1/enable'), '1')
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'export')))
+
+    def test_start_export(self):
+        p = GpioHardwarePwm(0, self.path)
+        p._write = Mock()
+
+        p.start(1000, 25)
+
+        p._write.assert_any_call(self.path, 'export', 0)
+
+    def test_set_duty_cycle_and_frequency(self):
+        p = GpioHardwarePwm(1, self.path)
+        p.start(1000, 25)
+
+        p.set_duty_cycle(50)
+        self.assertEqual(self.read('pwm1/duty_cycle'), '500000')
+        p.set_frequency(100, 10)
+        self.assertEqual(self.read('pwm1/period'), '10000000')
+        self.assertEqual(self.read('pwm1/duty_cycle'), '1000000')
+
+    def test_stop(self):
+        p = GpioHardwarePwm(1, self.path)
+        p.start(1000, 25)
+
+        p.stop()
+
+        self.assertEqual(self.read('pwm1/enable'), '0')
+        self.assertEqual(self.read('unexport'), '1')
+
+
+
+class TestGpioEdgeHistory(unittest.TestCase):
+
+    def test_add_and_get_edges(self):
+        h = GpioEdgeHistory(4)
+        self.assertEqual(h.get_edges(), ([], []))
+
+        h.add(1.0, 1)
+        h.add(2.0, 0)
+
+        self.assertEqual(len(h), 2)
+        self.assertEqual(h.get_edges(), ([1.0, 2.0], [1, 0]))
+
+    def test_overwrite_oldest_edges(self):
+        h = GpioEdgeHistory(4)
+        for i in range(10):
+            h.add(float(i), i % 2)
+
+        self.assertEqual(len(h), 4)
+        self.assertEqual(h.total, 10)
+        self.assertEqual(h.get_edges(), ([6.0, 7.0, 8.0, 9.0], [0, 1, 0, 1]))
+
+    def test_since_and_limit(self):
+        h = GpioEdgeHistory(8)
+        for i in range(6):
+            h.add(float(i), i % 2)
+
+        self.assertEqual(h.get_edges(since=3.0), ([4.0, 5.0], [0, 1]))
+        self.assertEqual(h.get_edges(limit=3), ([3.0, 4.0, 5.0], [1, 0, 1]))
+        self.assertEqual(h.get_edges(since=1.0, limit=2), ([4.0, 5.0], [0, 1]))
+        self.assertEqual(h.get_edges(since=5.0), ([], []))
+
+    def test_resize(self):
+        h = GpioEdgeHistory(4)
+        for i in range(6):
+            h.add(float(i), i % 2)
+
+        h.resize(8)
+        self.assertEqual(h.get_edges(), ([2.0, 3.0, 4.0, 5.0], [0, 1, 0, 1]))
+        h.add(6.0, 0)
+        self.assertEqual(len(h), 5)
+
+        h.resize(2)
+        self.assertEqual(h.get_edges(), ([5.0, 6.0], [1, 0]))
+        h.add(7.0, 1)
+        self.assertEqual(h.get_edges(), ([6.0, 7.0], [0, 1]))
+        self.assertEqual(h.total, 8)
+
+    def test_resize_while_recording(self):
+        h = GpioEdgeHistory(20000)
+        def record():
+            for i in range(10000):
+                h.add(float(i), i % 2)
+        thread = threading.Thread(target=record)
+        # switch threads often to interleave edges recording and resizing
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(0.000001)
+        try:
+            thread.start()
+            sizes = (20000, 20001)
+            while thread.is_alive():
+                h.resize(sizes[h.size == 20000])
+            thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # no edge recorded during a resize is lost
+        self.assertEqual(len(h), 10000)
+        self.assertEqual(h.get_edges()[0], [float(i) for i in range(10000)])
+
+    def test_memory_is_bounded(self):
+        h = GpioEdgeHistory(100)
+        timestamps = h.timestamps
+        for i in range(1000):
+            h.add(float(i), 1)
+
+        self.assertIs(h.timestamps, timestamps)
+        self.assertEqual(len(h.timestamps), 100)
+        self.assertEqual(len(h.levels), 100)
+
+
+
+class TestGpioLatencyHistogram(unittest.TestCase):
+
+    def test_empty(self):
+        h = GpioLatencyHistogram()
+
+        self.assertEqual(h.snapshot(), {'count': 0, 'mean': 0.0, 'max': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0})
+
+    def test_percentiles(self):
+        h = GpioLatencyHistogram()
+        for _ in range(90):
+            h.add(0.0001)
+        for _ in range(9):
+            h.add(0.001)
+        h.add(0.5)
+
+        summary = h.snapshot()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['mean'], (90 * 0.0001 + 9 * 0.001 + 0.5) / 100)
+        self.assertEqual(summary['max'], 0.5)
+        # percentiles are bucket upper bounds: at most twice the actual value
+        self.assertTrue(0.0001 <= summary['p50'] <= 0.0002)
+        self.assertTrue(0.0001 <= summary['p90'] <= 0.0002)
+        self.assertTrue(0.001 <= summary['p99'] <= 0.002)
+
+    def test_overflow_bucket(self):
+        h = GpioLatencyHistogram()
+        h.add(60.0)
+
+        summary = h.snapshot()
+        self.assertEqual(summary['p99'], 60.0)
+        self.assertEqual(h.counts[-1], 1)
+
+    def test_constant_memory(self):
+        h = GpioLatencyHistogram()
+        for i in range(1000):
+            h.add(i * 0.001)
+
+        self.assertEqual(len(h.counts), len(GpioLatencyHistogram.BOUNDS) + 1)
+
+    def test_reset(self):
+        h = GpioLatencyHistogram()
+        h.add(0.001)
+
+        self.assertEqual(h.snapshot(reset=True)['count'], 1)
+        self.assertEqual(h.snapshot()['count'], 0)
+        self.assertEqual(sum(h.counts), 0)
+        self.assertEqual(h.max, 0.0)
+
+    def test_stats_snapshot(self):
+        stats = GpioLatencyStats()
+        stats.detection.add(0.001)
+        stats.queue.add(0.003)
+        stats.send.add(0.002)
+
+        snapshot = stats.snapshot(reset=True)
+        self.assertEqual(list(snapshot.keys()), ['detection', 'callback', 'queue', 'send'])
+        self.assertEqual(snapshot['detection']['count'], 1)
+        self.assertEqual(snapshot['callback']['count'], 0)
+        self.assertEqual(snapshot['queue']['max'], 0.003)
+        self.assertEqual(snapshot['send']['max'], 0.002)
+        self.assertEqual(stats.snapshot()['send']['count'], 0)
+
+
+
+class TestGpioInputState(unittest.TestCase):
+
+    def test_update(self):
+        state = GpioInputState()
+        self.assertEqual(state.get(), (None, False, None, 0))
+
+        state.update(1, False, 10.0)
+        self.assertEqual(state.get(), (1, False, 10.0, 0))
+        state.update(0, True, 10.5)
+        self.assertEqual(state.get(), (0, True, 10.5, 1))
+        self.assertEqual((state.level, state.on, state.timestamp, state.changes), (0, True, 10.5, 1))
+
+    def test_update_same_level(self):
+        state = GpioInputState()
+        state.update(1, False, 10.0)
+
+        # input reconfigured as inverted
+        state.update(1, True, 11.0)
+
+        self.assertEqual(state.get(), (1, True, 10.0, 0))
+
+
+
+class TestGpioBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.b = GpioBackend()
+        self.b.CPUINFO_PATH = os.path.join(self.path, 'cpuinfo')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write_revision(self, revision):
+        with open(self.b.CPUINFO_PATH, 'w') as fd:
+            fd.write('Hardware\t: BCM2835\nRevision\t: %s\nSerial\t: 0000\n' % revision)
+
+    def test_get_revision(self):
+        for revision, expected in (('0002', 1), ('0003', 1), ('000e', 2), ('0010', 3), ('a02082', 3), ('1000003', 1)):
+            self.write_revision(revision)
+            self.assertEqual(self.b.get_revision(), expected, revision)
+
+    def test_get_revision_unknown(self):
+        self.assertEqual(self.b.get_revision(), 3)
+
+    def test_inputs(self):
+        self.b.input = Mock(side_effect=[GPIO.HIGH, GPIO.LOW])
+
+        self.assertEqual(self.b.inputs([11, 12]), [GPIO.HIGH, GPIO.LOW])
+        self.b.input.assert_has_calls([call(11), call(12)])
+
+    def test_interface(self):
+        with self.assertRaises(NotImplementedError):
+            self.b.input(12)
+        with self.assertRaises(NotImplementedError):
+            self.b.output(12, GPIO.HIGH)
+
+
+
+class TestGpioRpiBackend(unittest.TestCase):
+
+    def test_delegates_to_rpi_gpio(self):
+        with patch('RPi.GPIO.setmode') as setmode_mock:
+            b = GpioRpiBackend()
+        setmode_mock.assert_called_once_with(GPIO.BOARD)
+
+        with patch('RPi.GPIO.setup') as setup_mock:
+            b.setup(12, GPIO.OUT, initial=GPIO.HIGH)
+            setup_mock.assert_called_once_with(12, GPIO.OUT, initial=GPIO.HIGH)
+            b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+            setup_mock.assert_called_with(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        with patch('RPi.GPIO.output') as output_mock:
+            b.output([12, 13], [GPIO.LOW, GPIO.HIGH])
+            output_mock.assert_called_once_with([12, 13], [GPIO.LOW, GPIO.HIGH])
+        with patch('RPi.GPIO.input', return_value=GPIO.HIGH):
+            self.assertEqual(b.input(11), GPIO.HIGH)
+            self.assertEqual(b.inputs([11, 12]), [GPIO.HIGH, GPIO.HIGH])
+        self.assertEqual(b.get_revision(), GPIO.RPI_INFO['P1_REVISION'])
+
+
+
+class TestGpioChardevBackend(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.fds = []
+        self.values = {}
+        self.event_writers = {}
+        with patch.object(GpioChardevBackend, '_open_chip', return_value=os.open(os.devnull, os.O_RDONLY)):
+            self.b = GpioChardevBackend()
+        self.b._request_line = Mock(side_effect=self.__request_line)
+        self.b._request_line_events = Mock(side_effect=self.__request_line_events)
+        self.b._get_line_value = Mock(side_effect=lambda fd: self.values.get(fd, 0))
+        self.b._set_line_value = Mock(side_effect=lambda fd, level: self.values.__setitem__(fd, level))
+        self.b.set_board({'GPIO17': 11, 'GPIO18': 12})
+
+    def tearDown(self):
+        self.b.cleanup()
+        for fd in self.event_writers.values():
+            os.close(fd)
+
+    def __request_line(self, line, flags, default_value):
+        fd = os.open(os.devnull, os.O_RDONLY)
+        self.values[fd] = default_value
+        return fd
+
+    def __request_line_events(self, line, edges):
+        read_fd, write_fd = os.pipe()
+        self.event_writers[line] = write_fd
+        return read_fd
+
+    def test_lines(self):
+        self.assertEqual(self.b.lines, {11: 17, 12: 18})
+
+    def test_output(self):
+        self.b.setup(12, GPIO.OUT, initial=GPIO.HIGH)
+        self.b._request_line.assert_called_once_with(18, 0x02, GPIO.HIGH)
+        self.assertEqual(self.b.input(12), GPIO.HIGH)
+        self.b.setup(11, GPIO.IN)
+        self.assertEqual(self.b.inputs([12, 11]), [GPIO.HIGH, GPIO.LOW])
+
+        self.b.output(12, GPIO.LOW)
+        self.assertEqual(self.b.input(12), GPIO.LOW)
+        self.b.output([12], [GPIO.HIGH])
+        self.assertEqual(self.b.input(12), GPIO.HIGH)
+
+    def test_input_pull_down(self):
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+        self.b._request_line.assert_called_once_with(17, 0x01 | 0x40, GPIO.LOW)
+
+    def test_setup_releases_previous_line(self):
+        self.b.setup(12, GPIO.OUT)
+        fd = self.b._fds[12]
+        with patch('backend.gpiosbackend.os.close', wraps=os.close) as close_mock:
+            self.b.setup(12, GPIO.IN)
+
+        close_mock.assert_called_once_with(fd)
+
+    def test_event_detect(self):
+        edges = []
+        self.b.setup(11, GPIO.IN)
+        self.b.add_event_detect(11, GPIO.RISING, edges.append)
+        os.write(self.event_writers[17], GPIOEVENT_DATA.pack(1000, GPIOEVENT_EVENT_RISING_EDGE) * 2)
+        time.sleep(0.1)
+        self.assertEqual(edges, [11, 11])
+
+        self.b.remove_event_detect(11)
+        self.assertEqual(self.b._events, {})
+        self.assertEqual(self.b._request_line.call_count, 2)
+
+    def test_cleanup(self):
+        self.b.setup(11, GPIO.IN)
+        self.b.add_event_detect(11, GPIO.FALLING, Mock())
+        thread = self.b._events_thread
+
+        self.b.cleanup()
+
+        thread.join(3.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.b._fds, {})
+
+    def test_cleanup_latency(self):
+        self.b.setup(11, GPIO.IN)
+        self.b.add_event_detect(11, GPIO.FALLING, Mock())
+        thread = self.b._events_thread
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        self.b.cleanup()
+
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+
+class TestGpioMmapBackend(unittest.TestCase):
+    """
+    Backend mapped on a file emulating gpio registers layout
+    """
+
+    GPFSEL1 = 0x04
+    GPSET0 = 0x1C
+    GPCLR0 = 0x28
+    GPLEV0 = 0x34
+    GPLEV1 = 0x38
+    GPPUD = 0x94
+    PUP_PDN_CNTRL_REG1 = 0xE8
+    PUP_PDN_CNTRL_REG3 = 0xF0
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(GpioMmapBackend.BLOCK_SIZE))
+        os.close(fd)
+        self.b = GpioMmapBackend(self.path)
+        self.b.set_board({'GPIO17': 11, 'GPIO18': 12, 'GPIO4': 7})
+        self.fd = open(self.path, 'r+b')
+        self.registers = mmap.mmap(self.fd.fileno(), GpioMmapBackend.BLOCK_SIZE)
+
+    def tearDown(self):
+        self.b.cleanup()
+        self.registers.close()
+        self.fd.close()
+        os.remove(self.path)
+
+    def read_register(self, offset):
+        return struct.unpack_from('I', self.registers, offset)[0]
+
+    def write_register(self, offset, value):
+        struct.pack_into('I', self.registers, offset, value)
+
+    def test_setup_output(self):
+        self.b.setup(12, GPIO.OUT, initial=GPIO.HIGH)
+
+        self.assertEqual(self.read_register(self.GPFSEL1), 1 << 24)
+        self.assertEqual(self.read_register(self.GPSET0), 1 << 18)
+
+    def test_setup_input(self):
+        self.write_register(self.GPFSEL1, 7 << 21 | 1 << 24)
+
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+        self.assertEqual(self.read_register(self.GPFSEL1), 1 << 24)
+        self.assertEqual(self.read_register(self.PUP_PDN_CNTRL_REG1), 2 << 2)
+
+    def test_setup_input_bcm2835_pull(self):
+        self.write_register(self.PUP_PDN_CNTRL_REG3, 0x6770696F)
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+
+        self.assertEqual(self.read_register(self.PUP_PDN_CNTRL_REG1), 0)
+        # pull sequence ends resetting pull register
+        self.assertEqual(self.read_register(self.GPPUD), 0)
+
+    def test_input(self):
+        self.write_register(self.GPLEV0, 1 << 17 | 1 << 4)
+
+        self.assertEqual(self.b.input(11), GPIO.HIGH)
+        self.assertEqual(self.b.input(12), GPIO.LOW)
+        self.assertEqual(self.b.inputs([12, 11, 7]), [GPIO.LOW, GPIO.HIGH, GPIO.HIGH])
+
+    def test_output(self):
+        self.b.output(12, GPIO.LOW)
+        self.assertEqual(self.read_register(self.GPCLR0), 1 << 18)
+
+        self.b.output([12, 11, 7], [GPIO.HIGH, GPIO.LOW, GPIO.HIGH])
+        self.assertEqual(self.read_register(self.GPSET0), 1 << 18 | 1 << 4)
+        self.assertEqual(self.read_register(self.GPCLR0), 1 << 17)
+
+    def test_event_detect(self):
+        callback = Mock()
+        self.b.add_event_detect(11, GPIO.RISING, callback)
+
+        self.write_register(self.GPLEV0, 1 << 17)
+        time.sleep(0.05)
+        self.write_register(self.GPLEV0, 0)
+        time.sleep(0.05)
+        callback.assert_called_once_with(11)
+
+        self.b.remove_event_detect(11)
+        self.write_register(self.GPLEV0, 1 << 17)
+        time.sleep(0.05)
+        self.assertEqual(callback.call_count, 1)
+
+    def test_cleanup(self):
+        self.b.setup(12, GPIO.OUT)
+        self.b.add_event_detect(11, GPIO.FALLING, Mock())
+        thread = self.b._edges_thread
+
+        self.b.cleanup()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.read_register(self.GPFSEL1), 0)
+
+    def test_unavailable(self):
+        with self.assertRaises(OSError):
+            GpioMmapBackend('/dev/dummy-gpiomem')
+
+
+
+class TestGpioSimulatedBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.b = GpioSimulatedBackend(revision=2)
+
+    def test_levels(self):
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self.b.setup(13, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.b.setup(12, GPIO.OUT, initial=GPIO.HIGH)
+
+        self.assertEqual(self.b.input(11), GPIO.HIGH)
+        self.assertEqual(self.b.input(13), GPIO.LOW)
+        self.assertEqual(self.b.input(12), GPIO.HIGH)
+        self.assertEqual(self.b.inputs([13, 11, 12]), [GPIO.LOW, GPIO.HIGH, GPIO.HIGH])
+        self.assertEqual(self.b.get_revision(), 2)
+
+    def test_wiring(self):
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.b.setup(12, GPIO.OUT)
+        self.b.wire(12, 11)
+
+        self.b.output(12, GPIO.HIGH)
+        self.assertEqual(self.b.input(11), GPIO.HIGH)
+        self.assertIn(11, self.b.last_edges)
+        self.b.output([12], [GPIO.LOW])
+        self.assertEqual(self.b.input(11), GPIO.LOW)
+
+    def test_event_detect(self):
+        callback = Mock()
+        self.b.setup(11, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.b.add_event_detect(11, GPIO.RISING, callback)
+
+        self.b.set_level(11, GPIO.HIGH)
+        self.b.set_level(11, GPIO.LOW)
+        self.b.set_level(11, GPIO.HIGH)
+        self.assertEqual(callback.call_count, 2)
+
+        self.b.remove_event_detect(11)
+        self.b.set_level(11, GPIO.LOW)
+        self.b.set_level(11, GPIO.HIGH)
+        self.assertEqual(callback.call_count, 2)
+
+
+
+class TestGpioTimerWheel(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.fired = []
+        self.w = GpioTimerWheel(tick=0.005, slots=8)
+
+    def tearDown(self):
+        self.w.stop()
+        if self.w.is_alive():
+            self.w.join(1.0)
+
+    def callback(self, name):
+        self.fired.append((name, time.monotonic()))
+
+    def test_fire_in_order(self):
+        self.w.start()
+        now = time.monotonic()
+        self.w.add(now + 0.06, self.callback, ['second'])
+        self.w.add(now + 0.02, self.callback, ['first'])
+        time.sleep(0.15)
+
+        self.assertEqual([name for name, _ in self.fired], ['first', 'second'])
+        self.assertGreaterEqual(self.fired[0][1], now + 0.02)
+        stats = self.w.get_stats()
+        self.assertEqual(stats['fired'], 2)
+        self.assertEqual(stats['pending'], 0)
+        self.assertLess(stats['maxlateness'], 0.05)
+
+    def test_deadline_after_one_revolution(self):
+        # 8 slots of 5ms: deadline shares its slot with timers of first revolution
+        self.w.start()
+        now = time.monotonic()
+        self.w.add(now + 0.1, self.callback, ['late'])
+        self.w.add(now + 0.01, self.callback, ['early'])
+        time.sleep(0.05)
+        self.assertEqual([name for name, _ in self.fired], ['early'])
+
+        time.sleep(0.12)
+        self.assertEqual([name for name, _ in self.fired], ['early', 'late'])
+
+    def test_past_deadline_fires_on_next_tick(self):
+        self.w.start()
+        self.w.add(time.monotonic() - 1, self.callback, ['past'])
+        time.sleep(0.05)
+
+        self.assertEqual([name for name, _ in self.fired], ['past'])
+
+    def test_cancel(self):
+        timer_id = self.w.add(time.monotonic() + 0.02, self.callback, ['cancelled'])
+        self.w.start()
+
+        self.assertTrue(self.w.cancel(timer_id))
+        self.assertFalse(self.w.cancel(timer_id))
+        time.sleep(0.05)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(self.w.get_stats()['cancelled'], 1)
+
+    def test_cancel_group(self):
+        now = time.monotonic()
+        self.w.add(now + 0.02, self.callback, ['a1'], group='a')
+        self.w.add(now + 0.03, self.callback, ['a2'], group='a')
+        self.w.add(now + 0.02, self.callback, ['b1'], group='b')
+        self.w.start()
+
+        self.assertEqual(self.w.cancel_group('a'), 2)
+        self.assertEqual(self.w.cancel_group('a'), 0)
+        self.assertEqual(len(self.w), 1)
+        time.sleep(0.06)
+        self.assertEqual([name for name, _ in self.fired], ['b1'])
+
+    def test_callback_exception(self):
+        self.w.start()
+        now = time.monotonic()
+        self.w.add(now + 0.01, Mock(side_effect=Exception('Test exception')))
+        self.w.add(now + 0.02, self.callback, ['after'])
+        time.sleep(0.06)
+
+        self.assertEqual([name for name, _ in self.fired], ['after'])
+        self.assertEqual(self.w.get_stats()['fired'], 2)
+
+    def test_stop(self):
+        self.w.start()
+        self.w.add(time.monotonic() + 10, self.callback, ['never'])
+        start = time.monotonic()
+        self.w.stop()
+        self.w.join(1.0)
+
+        self.assertFalse(self.w.is_alive())
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.fired, [])
+
+    def test_stop_latency(self):
+        wheel = GpioTimerWheel(tick=5.0)
+        wheel.start()
+        wheel.add(time.monotonic() + 10, self.callback, ['never'])
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        wheel.stop()
+        wheel.join(1.0)
+
+        self.assertFalse(wheel.is_alive())
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_sleep_until_next_deadline(self):
+        self.w._wakeup = Mock(wraps=self.w._wakeup)
+        self.w.start()
+        now = time.monotonic()
+        self.w.add(now + 10, self.callback, ['far'])
+        time.sleep(0.1)
+
+        # 20 ticks elapsed but wheel only woke up on timer add
+        self.assertLessEqual(self.w._wakeup.wait.call_count, 3)
+        timeout = self.w._wakeup.wait.call_args[0][0]
+        self.assertAlmostEqual(timeout, 10, delta=0.05)
+
+        # adding a nearer timer wakes wheel up
+        self.w.add(time.monotonic() + 0.02, self.callback, ['near'])
+        time.sleep(0.06)
+        self.assertEqual([name for name, _ in self.fired], ['near'])
+
+
+
+class TestGpioCallbackDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.called = []
+        self.release = threading.Event()
+        self.d = None
+
+    def tearDown(self):
+        self.release.set()
+        if self.d is not None:
+            self.d.stop()
+            self.d.join(1.0)
+
+    def callback(self, key, value):
+        self.called.append((key, value))
+
+    def blocking_callback(self, key, value):
+        self.release.wait(2.0)
+        self.called.append((key, value))
+
+    def wait_dispatched(self, count):
+        deadline = time.monotonic() + 1.0
+        while self.d.get_stats()['dispatched'] < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_dispatch_in_order_per_key(self):
+        self.d = GpioCallbackDispatcher(workers=3)
+        self.d.start()
+
+        for value in range(20):
+            for key in ('uuid1', 'uuid2', 'uuid3'):
+                self.assertTrue(self.d.dispatch(key, self.callback, (key, value)))
+        self.wait_dispatched(60)
+
+        for key in ('uuid1', 'uuid2', 'uuid3'):
+            self.assertEqual([value for k, value in self.called if k == key], list(range(20)))
+        stats = self.d.get_stats()
+        self.assertEqual(stats['dispatched'], 60)
+        self.assertEqual(stats['depth'], 0)
+        self.assertEqual(stats['workers'], 3)
+
+    def test_dispatch_does_not_wait_callback(self):
+        self.d = GpioCallbackDispatcher(workers=1)
+        self.d.start()
+
+        start = time.monotonic()
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 1))
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 2))
+
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.release.set()
+        self.wait_dispatched(2)
+        self.assertEqual(self.called, [('uuid1', 1), ('uuid1', 2)])
+
+    def test_overflow_drop_oldest(self):
+        self.d = GpioCallbackDispatcher(queue_size=2, workers=1)
+        self.d.start()
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 0))
+        time.sleep(0.05)
+
+        for value in range(1, 5):
+            self.assertTrue(self.d.dispatch('uuid1', self.callback, ('uuid1', value)))
+        stats = self.d.get_stats()
+        self.release.set()
+        self.wait_dispatched(3)
+
+        self.assertEqual((stats['depth'], stats['highwater'], stats['dropped']), (2, 2, 2))
+        self.assertEqual(self.called, [('uuid1', 0), ('uuid1', 3), ('uuid1', 4)])
+
+    def test_overflow_drop_newest(self):
+        self.d = GpioCallbackDispatcher(queue_size=2, workers=1, overflow=GpioCallbackDispatcher.OVERFLOW_DROP_NEWEST)
+        self.d.start()
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 0))
+        time.sleep(0.05)
+
+        results = [self.d.dispatch('uuid1', self.callback, ('uuid1', value)) for value in range(1, 5)]
+        self.release.set()
+        self.wait_dispatched(3)
+
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(self.d.get_stats()['dropped'], 2)
+        self.assertEqual(self.called, [('uuid1', 0), ('uuid1', 1), ('uuid1', 2)])
+
+    def test_overflow_block(self):
+        self.d = GpioCallbackDispatcher(queue_size=1, workers=1, overflow=GpioCallbackDispatcher.OVERFLOW_BLOCK)
+        self.d.start()
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 0))
+        time.sleep(0.05)
+        self.d.dispatch('uuid1', self.callback, ('uuid1', 1))
+        threading.Timer(0.1, self.release.set).start()
+
+        start = time.monotonic()
+        self.assertTrue(self.d.dispatch('uuid1', self.callback, ('uuid1', 2)))
+        self.wait_dispatched(3)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        stats = self.d.get_stats()
+        self.assertEqual((stats['blocked'], stats['dropped']), (1, 0))
+        self.assertEqual(self.called, [('uuid1', 0), ('uuid1', 1), ('uuid1', 2)])
+
+    def test_callback_exception(self):
+        self.d = GpioCallbackDispatcher(workers=1)
+        self.d.start()
+
+        self.d.dispatch('uuid1', Mock(side_effect=Exception('Test exception')))
+        self.d.dispatch('uuid1', self.callback, ('uuid1', 1))
+        self.wait_dispatched(1)
+
+        self.assertTrue(self.d.is_alive())
+        self.assertEqual(self.d.get_stats()['errors'], 1)
+        self.assertEqual(self.called, [('uuid1', 1)])
+
+    def test_stop_runs_queued_callbacks(self):
+        self.d = GpioCallbackDispatcher(workers=1)
+        self.d.start()
+        self.d.dispatch('uuid1', self.blocking_callback, ('uuid1', 0))
+        self.d.dispatch('uuid1', self.callback, ('uuid1', 1))
+
+        self.d.stop()
+        self.assertFalse(self.d.dispatch('uuid1', self.callback, ('uuid1', 2)))
+        self.release.set()
+        self.d.join(1.0)
+
+        self.assertFalse(self.d.is_alive())
+        self.assertEqual(self.called, [('uuid1', 0), ('uuid1', 1)])
+
+
+class TestGpioGestureDetector(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.timers = []
+        self.wheel = Mock()
+        self.wheel.add = Mock(side_effect=self.add_timer)
+        self.emit = Mock()
+        self.d = GpioGestureDetector('uuid1', self.wheel, self.emit, long_press=1.0, click_interval=0.3, hold_repeat=0.5)
+
+    def add_timer(self, deadline, callback, args):
+        self.timers.append((deadline, callback, args))
+        return len(self.timers)
+
+    def fire(self, index=-1):
+        _, callback, args = self.timers[index]
+        callback(*args)
+
+    def test_click(self):
+        self.d.press(10.0)
+        self.d.release(10.1, 0.1)
+
+        self.assertEqual(self.timers[-1][0], 10.1 + 0.3)
+        self.emit.assert_not_called()
+        self.fire()
+        self.emit.assert_called_once_with('uuid1', 'click', 1, 0.1, 0)
+        self.assertEqual(self.d.get_stats()['gestures'], 1)
+
+    def test_double_click(self):
+        self.d.press(10.0)
+        self.d.release(10.1, 0.1)
+        self.d.press(10.3)
+        self.d.release(10.35, 0.05)
+        self.fire()
+
+        self.emit.assert_called_once_with('uuid1', 'doubleclick', 2, 0.05, 0)
+        self.wheel.cancel.assert_called()
+
+    def test_triple_click_emitted_on_third_release(self):
+        for index in range(3):
+            self.d.press(10.0 + index * 0.2)
+            self.d.release(10.1 + index * 0.2, 0.1)
+
+        self.emit.assert_called_once_with('uuid1', 'tripleclick', 3, 0.1, 0)
+        self.assertEqual(self.d.get_stats()['clicks'], 0)
+
+    def test_cancelled_timeout_ignored(self):
+        self.d.press(10.0)
+        self.d.release(10.1, 0.1)
+        self.d.press(10.3)
+
+        # click timeout fired by wheel while it was cancelled
+        self.fire(1)
+
+        self.emit.assert_not_called()
+        self.assertEqual(self.d.get_stats()['clicks'], 1)
+
+    def test_long_press(self):
+        self.d.press(10.0)
+        self.assertEqual(self.timers[-1][0], 11.0)
+        self.fire()
+        self.emit.assert_called_once_with('uuid1', 'longpress', 0, 1.0, 0)
+        self.emit.reset_mock()
+
+        self.d.release(11.2, 1.2)
+
+        self.emit.assert_not_called()
+        self.assertEqual(self.d.get_stats()['clicks'], 0)
+
+    def test_long_press_on_release(self):
+        self.d.press(10.0)
+        self.d.release(11.5, 1.5)
+
+        self.emit.assert_called_once_with('uuid1', 'longpress', 0, 1.5, 0)
+
+    def test_long_press_cancels_clicks(self):
+        self.d.press(10.0)
+        self.d.release(10.1, 0.1)
+        self.d.press(10.3)
+        self.fire()
+
+        self.emit.assert_called_once_with('uuid1', 'longpress', 0, 1.0, 0)
+        self.assertEqual(self.d.get_stats()['clicks'], 0)
+
+    def test_hold_repeat(self):
+        self.d.press(10.0)
+        self.fire()
+        self.assertEqual(self.timers[-1][0], 11.5)
+        self.fire()
+        self.assertEqual(self.timers[-1][0], 12.0)
+        self.fire()
+        self.d.release(12.2, 2.2)
+
+        self.assertEqual(self.emit.call_args_list, [
+            call('uuid1', 'longpress', 0, 1.0, 0),
+            call('uuid1', 'hold', 0, 1.5, 1),
+            call('uuid1', 'hold', 0, 2.0, 2),
+        ])
+        self.wheel.cancel.assert_called_with(4)
+
+    def test_no_hold_repeat(self):
+        self.d.hold_repeat = 0
+        self.d.press(10.0)
+        self.fire()
+
+        self.assertEqual(len(self.timers), 1)
+        self.emit.assert_called_once_with('uuid1', 'longpress', 0, 1.0, 0)
+
+    def test_clicks_disabled(self):
+        self.d.click_interval = 0
+        self.d.press(10.0)
+        self.d.release(10.1, 0.1)
+
+        self.assertEqual(len(self.timers), 1)
+        self.emit.assert_not_called()
+
+    def test_release_without_press(self):
+        self.d.release(10.0, 0)
+
+        self.assertEqual(self.timers, [])
+        self.emit.assert_not_called()
+
+    def test_cancel(self):
+        self.d.press(10.0)
+        self.d.cancel()
+        self.fire()
+
+        self.emit.assert_not_called()
+        self.assertFalse(self.d.get_stats()['pressed'])
+
+
+class TestGpioLineEventWatcher(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+
+        self.on_calls = []
+        self.off_calls = []
+        self.lines = {}
+        with patch.object(GpioLineEventWatcher, '_open_chip', return_value=os.open(os.devnull, os.O_RDONLY)):
+            self.w = GpioLineEventWatcher(self.__on_callback, self.__off_callback, {7: 4, 11: 17})
+        self.w.debounce = 0.05
+        self.w._request_line_events = Mock(side_effect=self.__request_line_events)
+        self.w._get_line_value = Mock(return_value=0)
+
+    def tearDown(self):
+        if self.w and self.w.is_alive():
+            self.w.stop()
+            self.w.join()
+        for fd in self.lines.values():
+            os.close(fd)
+        self.session.clean()
+
+    def __on_callback(self, uuid, timestamp):
+        self.on_calls.append(uuid)
+
+    def __off_callback(self, uuid, duration, timestamp):
+        self.off_calls.append((uuid, duration))
+
+    def __request_line_events(self, line, edges=None):
+        # fake line event fd: a pipe whose write end emulates kernel events
+        read_fd, write_fd = os.pipe()
+        self.lines[line] = write_fd
+        return read_fd
+
+    def __send_event(self, line, timestamp, event_id):
+        os.write(self.lines[line], GPIOEVENT_DATA.pack(timestamp, event_id))
+
+    def test_stop(self):
+        self.w.start()
+        time.sleep(0.1)
+        start = time.time()
+        self.w.stop()
+        self.w.join(2.0)
+        self.assertFalse(self.w.is_alive())
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_initial_level(self):
+        self.w.add_input(7, '123-456-789-123', 0)
+        self.w.add_input(11, '456-789-123-456', 1)
+
+        self.assertEqual(self.off_calls, [('123-456-789-123', 0)])
+        self.assertEqual(self.on_calls, ['456-789-123-456'])
+        self.w._request_line_events.assert_any_call(4)
+        self.w._request_line_events.assert_any_call(17)
+
+    def test_callbacks_with_kernel_timestamps(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.start()
+        now = time.monotonic_ns()
+
+        self.__send_event(4, now, GPIOEVENT_EVENT_RISING_EDGE)
+        time.sleep(0.1)
+        self.assertEqual(self.on_calls, ['123-456-789-123', '123-456-789-123'])
+
+        self.__send_event(4, now + 250000000, GPIOEVENT_EVENT_FALLING_EDGE)
+        time.sleep(0.1)
+        self.assertEqual(len(self.off_calls), 1)
+        self.assertAlmostEqual(self.off_calls[0][1], 0.25)
+
+    def test_history(self):
+        history = GpioEdgeHistory(8)
+        self.w.add_input(7, '123-456-789-123', 1, history)
+        self.w.start()
+        now = time.monotonic_ns()
+
+        self.__send_event(4, now, GPIOEVENT_EVENT_RISING_EDGE)
+        self.__send_event(4, now + 250000000, GPIOEVENT_EVENT_FALLING_EDGE)
+        time.sleep(0.1)
+
+        timestamps, levels = history.get_edges()
+        self.assertEqual(levels, [0, 1, 0])
+        self.assertAlmostEqual(timestamps[1], now / 1000000000.0)
+        self.assertAlmostEqual(timestamps[2] - timestamps[1], 0.25)
+
+    def test_state(self):
+        state = GpioInputState()
+        self.w.add_input(7, '123-456-789-123', 1, state=state)
+        self.assertEqual((state.level, state.on, state.changes), (0, False, 0))
+        self.w.start()
+        now = time.monotonic_ns()
+
+        self.__send_event(4, now, GPIOEVENT_EVENT_RISING_EDGE)
+        time.sleep(0.1)
+
+        level, on, timestamp, changes = state.get()
+        self.assertEqual(level, 1)
+        self.assertTrue(on)
+        self.assertAlmostEqual(timestamp, now / 1000000000.0)
+        self.assertEqual(changes, 1)
+
+    def test_snapshot(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.start()
+        time.sleep(0.05)
+        sequence, _, levels = self.w.get_snapshot()
+        self.assertGreater(sequence, 0)
+        self.assertEqual(levels, 0)
+
+        self.__send_event(4, time.monotonic_ns(), GPIOEVENT_EVENT_RISING_EDGE)
+        time.sleep(0.1)
+
+        new_sequence, timestamp, levels = self.w.get_snapshot()
+        self.assertGreater(new_sequence, sequence)
+        self.assertLessEqual(timestamp, time.monotonic())
+        self.assertEqual(levels, 1 << 7)
+
+    def test_health(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.start()
+        now = time.monotonic_ns()
+
+        # more events than read buffer at once
+        for i in range(20):
+            self.__send_event(4, now + i * 1000, GPIOEVENT_EVENT_RISING_EDGE if i % 2 else GPIOEVENT_EVENT_FALLING_EDGE)
+        time.sleep(0.1)
+
+        health = self.w.get_health()
+        self.assertGreater(health['loops'], 0)
+        self.assertEqual(health['overruns'], 1)
+        self.assertGreater(health['bounces'], 0)
+        self.assertAlmostEqual(health['lastalive'], time.time(), delta=0.5)
+
+    def test_debounce_keeps_last_level(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.start()
+
+        # bouncing edges: only first edge is reported immediately, final level after debounce
+        now = time.monotonic_ns()
+        self.__send_event(4, now, GPIOEVENT_EVENT_RISING_EDGE)
+        self.__send_event(4, now + 1000000, GPIOEVENT_EVENT_FALLING_EDGE)
+        time.sleep(0.02)
+        self.assertEqual(len(self.off_calls), 0)
+        time.sleep(0.1)
+
+        self.assertEqual(self.on_calls, ['123-456-789-123', '123-456-789-123'])
+        self.assertEqual(len(self.off_calls), 1)
+        self.assertAlmostEqual(self.off_calls[0][1], 0.001)
+        self.assertEqual(self.w.get_debounce_stats()['123-456-789-123']['bounces'], 1)
+
+    def test_check_pending_locks_inputs(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        entry = list(self.w._inputs.values())[0]
+        locked = []
+        debouncer = Mock(level=1)
+        debouncer.check.side_effect = lambda now: locked.append(self.w._inputs_lock.locked())
+        entry[GpioLineEventWatcher.DEBOUNCER] = debouncer
+
+        mask, triggers = self.w._check_pending(time.monotonic())
+
+        self.assertEqual(locked, [True])
+        self.assertEqual(mask, 1 << 7)
+        self.assertEqual(triggers, [])
+
+    def test_check_pending_removed_input(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        entry = list(self.w._inputs.values())[0]
+        now = time.monotonic_ns()
+        self.__send_event(4, now, GPIOEVENT_EVENT_RISING_EDGE)
+        self.__send_event(4, now + 1000000, GPIOEVENT_EVENT_FALLING_EDGE)
+        self.w._process_events(entry)
+        self.assertTrue(entry[GpioLineEventWatcher.DEBOUNCER].is_pending())
+        self.w.remove_input('123-456-789-123')
+
+        mask, triggers = self.w._check_pending(time.monotonic() + 1.0)
+
+        # pending level change of removed input is not reported
+        self.assertEqual(mask, 0)
+        self.assertEqual(triggers, [])
+
+    def test_callbacks_run_without_inputs_lock(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.add_input(11, '456-789-123-456', 1)
+        release = threading.Event()
+        locked = []
+        def on_callback(uuid, timestamp):
+            locked.append(self.w._inputs_lock.locked())
+            # emulate full dispatcher queue with block overflow policy
+            release.wait(2.0)
+        self.w.on_callback = on_callback
+        self.w.start()
+
+        self.__send_event(4, time.monotonic_ns(), GPIOEVENT_EVENT_RISING_EDGE)
+        deadline = time.monotonic() + 1.0
+        while not locked and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.monotonic()
+        self.assertTrue(self.w.remove_input('456-789-123-456'))
+
+        self.assertLess(time.monotonic() - start, 0.5)
+        release.set()
+        self.assertEqual(locked, [False])
+
+    def test_realtime_kernel_timestamps(self):
+        self.w.add_input(7, '123-456-789-123', 1)
+        self.w.start()
+
+        self.__send_event(4, time.time_ns(), GPIOEVENT_EVENT_RISING_EDGE)
+        time.sleep(0.1)
+
+        self.assertAlmostEqual(self.w._to_monotonic(time.time_ns()), time.monotonic(), places=1)
+
+    def test_add_counter(self):
+        counter = GpioPulseCounter()
+        self.w.add_counter(7, '123-456-789-123', counter)
+        self.w._request_line_events.assert_called_with(4, 0x01)
+        self.w.start()
+
+        now = time.monotonic_ns()
+        for i in range(10):
+            self.__send_event(4, now + i * 1000000, GPIOEVENT_EVENT_RISING_EDGE)
+        time.sleep(0.1)
+
+        self.assertEqual(counter.snapshot()['count'], 10)
+        self.assertAlmostEqual(counter.publish()['frequency'], 1000.0, places=3)
+        self.assertTrue(self.w.remove_input('123-456-789-123'))
+
+    def test_add_counter_falling_edges(self):
+        self.w.add_counter(7, '123-456-789-123', GpioPulseCounter(), 0)
+
+        self.w._request_line_events.assert_called_with(4, 0x02)
+
+    def test_add_remove_input(self):
+        self.w.start()
+        threads_count = threading.active_count()
+
+        self.w.add_input(7, '123-456-789-123')
+        self.w.add_input(11, '456-789-123-456')
+        self.assertEqual(threading.active_count(), threads_count)
+        self.assertCountEqual(self.w.get_inputs(), ['123-456-789-123', '456-789-123-456'])
+
+        self.assertTrue(self.w.remove_input('123-456-789-123'))
+        self.assertFalse(self.w.remove_input('123-456-789-123'))
+        self.assertFalse(self.w.has_input('123-456-789-123'))
+        self.assertTrue(self.w.has_input('456-789-123-456'))
+
+
+
+class TestGpios(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.DEBUG, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+
+        # patch GpioInputWatcher
+        GpioInputWatcher._get_inputs_levels = Mock(side_effect=lambda pins: [GPIO.HIGH] * len(pins))
+
+    def tearDown(self):
+        self.session.clean()
+
+    def init(self, start=True, mock_on_start=True, mock_on_stop=True):
+        self.module = self.session.setup(Gpios, mock_on_start=mock_on_start, mock_on_stop=mock_on_stop)
+
+        if start:
+            self.session.start_module(self.module)
+
+    def check_pin(self, pin):
+        self.assertTrue('gpio' in pin)
+        self.assertTrue('label' in pin)
+        if pin['label'].startswith('GPIO'):
+            self.assertTrue(type(pin['gpio']) is dict)
+            self.assertTrue('assigned' in pin['gpio'])
+            self.assertTrue('owner' in pin['gpio'])
+
+    def get_device(self):
+        """
+        Return device
+        """
+        return copy.deepcopy({
+            'name': 'dummy',
+            'mode': 'output',
+            'pin': 12,
+            'gpio': 'GPIO18',
+            'keep': False,
+            'on': True,
+            'inverted': False,
+            'owner': 'unittest',
+            'type': 'gpio',
+            'subtype': 'output',
+            'uuid': 'f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d'
+        })
+
+    def test_configure(self):
+        self.init(start=False, mock_on_start=False)
+        devices = {
+            '123-456-789': {
+                'name': 'device1'
+            },
+            '456-789-123': {
+                'name': 'device2'
+            },
+            '789-123-456': {
+                'name': 'device3'
+            }
+        }
+        self.module.get_module_devices = Mock(return_value=devices)
+        self.module._configure_gpio = Mock()
+
+        self.session.start_module(self.module)
+
+        self.assertEqual(self.module._configure_gpio.call_count, len(devices.keys()))
+        self.module._configure_gpio.assert_any_call(devices['123-456-789'])
+        self.module._configure_gpio.assert_any_call(devices['456-789-123'])
+        self.module._configure_gpio.assert_any_call(devices['789-123-456'])
+
+    def test_gpio_output(self):
+        self.init()
+        mock_gpio_output = self.module._backend.output = Mock()
+
+        self.module._gpio_output(12, 1)
+        mock_gpio_output.assert_called_with(12, 1)
+
+        self.module._gpio_output(18, 0)
+        mock_gpio_output.assert_called_with(18, 0)
+
+    def test_configure_gpio_mode_reserved(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.get_device()
+        device['mode'] = 'reserved'
+        self.module._gpio_setup = Mock()
+        self.module._Gpios__launch_input_watcher = Mock()
+
+        self.assertTrue(self.module._configure_gpio(device))
+        self.assertFalse(self.session.event_called('gpios.gpio.on'))
+        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+        self.assertEqual(self.module._gpio_setup.call_count, 0)
+
+    def test_configure_gpio_mode_output_on(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        self.module._Gpios__launch_input_watcher = Mock()
+        device = self.get_device()
+        device['mode'] = 'output'
+        device['on'] = True
+    
+        self.assertTrue(self.module._configure_gpio(device))
+        self.module._gpio_setup.assert_called_with(12, GPIO.OUT, initial=GPIO.LOW)
+        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': True}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+
+    def test_configure_gpio_mode_output_off(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        self.module._Gpios__launch_input_watcher = Mock()
+        device = self.get_device()
+        device['mode'] = 'output'
+        device['on'] = False
+    
+        self.assertTrue(self.module._configure_gpio(device))
+        self.module._gpio_setup.assert_called_with(12, GPIO.OUT, initial=GPIO.HIGH)
+        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': True, 'duration': 0}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+
+    def test_configure_gpio_mode_input_on(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        self.module._Gpios__launch_input_watcher = Mock()
+        device = self.get_device()
+        device['mode'] = 'input'
+        device['on'] = True
+    
+        self.assertTrue(self.module._configure_gpio(device))
+        self.module._gpio_setup.assert_called_with(12, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.assertFalse(self.session.event_called('gpios.gpio.on'))
+        self.module._Gpios__launch_input_watcher.assert_called_with(device)
+
+    def test_configure_gpio_mode_input_off(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        self.module._Gpios__launch_input_watcher = Mock()
+        device = self.get_device()
+        device['mode'] = 'input'
+        device['on'] = False
+    
+        self.assertTrue(self.module._configure_gpio(device))
+        self.module._gpio_setup.assert_called_with(12, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.assertFalse(self.session.event_called('gpios.gpio.off'))
+        self.module._Gpios__launch_input_watcher.assert_called_with(device)
+
+    def test_configure_gpio_mode_exception(self):
+        self.init()
+        self.module._gpio_setup = Mock(side_effect=Exception('Test exception'))
+        self.module._Gpios__launch_input_watcher = Mock()
+        device = self.get_device()
+        device['mode'] = 'input'
+        device['on'] = False
+    
+        self.assertFalse(self.module._configure_gpio(device))
+        self.assertFalse(self.session.event_called('gpios.gpio.off'))
+        self.assertFalse(self.session.event_called('gpios.gpio.on'))
+        self.assertFalse(self.module._Gpios__launch_input_watcher.called)
+
+    def test_input_on_callback(self):
+        self.init()
+        device = self.get_device()
+        self.module._input_records[device['uuid']] = GpioInputRecord(device['uuid'], device['pin'], device['gpio'], device['inverted'])
+
+        self.module._Gpios__input_on_callback(device['uuid'])
+
+        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': False}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+
+    def test_input_callbacks_use_input_record(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, True, 'unittest', window=0.5)
+        record = self.module._input_records[device['uuid']]
+        self.module._get_device = Mock()
+
+        with patch.object(GpioDevicesIndex, 'get') as index_get:
+            self.module._Gpios__input_on_callback(device['uuid'])
+
+        self.assertEqual((record.uuid, record.pin, record.gpio, record.inverted), (device['uuid'], 11, 'GPIO17', True))
+        self.assertIs(record.policy, self.module._emission_policies[device['uuid']])
+        self.assertIs(record.state, self.module._input_states[device['uuid']])
+        self.assertIs(record.latency, self.module._latencies[device['uuid']])
+        index_get.assert_not_called()
+        self.module._get_device.assert_not_called()
+        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO17', 'init': False}, device_id=device['uuid'])
+
+    def test_input_record_dropped_on_delete(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.assertIn(device['uuid'], self.module._input_records)
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+
+        self.assertNotIn(device['uuid'], self.module._input_records)
+
+    def test_input_on_callback_deleted_device(self):
+        self.init()
+
+        # queued edge of deleted device is dropped
+        self.module._Gpios__input_on_callback('123456789', time.monotonic(), time.monotonic())
+
+        self.assertFalse(self.session.event_called('gpios.gpio.on'))
+
+    def test_input_off_callback(self):
+        self.init()
+        device = self.get_device()
+        self.module._input_records[device['uuid']] = GpioInputRecord(device['uuid'], device['pin'], device['gpio'], device['inverted'])
+
+        self.module._Gpios__input_off_callback(device['uuid'], 666)
+
+        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': 666}, device_id='f0cbd7a2-4228-44a5-944f-e4d4d8d4d63d')
+
+    def test_input_off_callback_deleted_device(self):
+        self.init()
+
+        # queued edge of deleted device is dropped
+        self.module._Gpios__input_off_callback('123456789', 666, time.monotonic(), time.monotonic())
+
+        self.assertFalse(self.session.event_called('gpios.gpio.off'))
+
+    def test_get_module_config(self):
+        self.init()
+        config = self.module.get_module_config()
+        self.assertTrue(type(config) is dict, 'Get_module_config returns invalid output type (dict awaited)')
+        self.assertTrue('pinsnumber' in config, '"pinsnumber" key does not exist in config')
+        self.assertTrue(type(config['pinsnumber']) is int, 'Config pinsnumber is not int')
+        self.assertTrue('revision' in config, '"revision" key does not exist in config')
+        self.assertTrue(type(config['revision']) is int, 'Config revision is not int')
+        self.assertTrue('inputbackend' in config, '"inputbackend" key does not exist in config')
+        self.assertTrue('persistdelay' in config, '"persistdelay" key does not exist in config')
+
+    def test_create_input_watcher(self):
+        self.init()
+        self.assertTrue(isinstance(self.module._input_watcher, GpioInputWatcher))
+
+    def test_create_input_watcher_chardev(self):
+        self.init(start=False)
+        self.module._set_config_field('input_backend', 'chardev')
+
+        with patch.object(GpioLineEventWatcher, '_open_chip', return_value=os.open(os.devnull, os.O_RDONLY)):
+            self.session.start_module(self.module)
+
+        self.assertTrue(isinstance(self.module._input_watcher, GpioLineEventWatcher))
+        self.assertEqual(self.module._input_watcher.lines[12], 18)
+        self.module._input_watcher.stop()
+
+    def test_create_input_watcher_chardev_fallback(self):
+        self.init(start=False)
+        self.module._set_config_field('input_backend', 'chardev')
+
+        with patch.object(GpioLineEventWatcher, '_open_chip', side_effect=OSError('No such file')):
+            self.session.start_module(self.module)
+
+        self.assertTrue(isinstance(self.module._input_watcher, GpioInputWatcher))
+
+    def test_create_input_watcher_chardev_with_chardev_gpio_backend(self):
+        self.init(start=False)
+        self.module._set_config_field('input_backend', 'chardev')
+        self.module._set_config_field('gpio_backend', 'chardev')
+
+        with patch.object(GpioChardevBackend, '_open_chip', return_value=os.open(os.devnull, os.O_RDONLY)):
+            with patch.object(GpioLineEventWatcher, '_open_chip') as watcher_open_chip:
+                self.session.start_module(self.module)
+
+        self.assertIsInstance(self.module._backend, GpioChardevBackend)
+        self.assertIsInstance(self.module._input_watcher, GpioInputWatcher)
+        watcher_open_chip.assert_not_called()
+        self.assertEqual(self.module.get_sampler_stats()['backend'], 'polling')
+
+    def test_configure_gpio_mode_counter(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        self.module._input_watcher.add_counter = Mock()
+        device = self.get_device()
+        device['mode'] = 'counter'
+        device['interval'] = 5.0
+
+        self.assertTrue(self.module._configure_gpio(device))
+
+        self.module._gpio_setup.assert_called_with(12, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        self.module._input_watcher.add_counter.assert_called_with(12, device['uuid'], ANY, GPIO.HIGH)
+        self.assertTrue(device['uuid'] in self.module._counters)
+        self.assertTrue(self.module._counters_task is not None)
+        self.module._counters_task.stop()
+
+    @patch('backend.gpios.Task')
+    @patch.object(GpioInputWatcher, '_add_event_detect')
+    @patch.object(GpioInputWatcher, '_remove_event_detect')
+    def test_add_gpio_counter(self, mock_remove_event_detect, mock_add_event_detect, mock_task):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('counter', 'GPIO18', 'counter', False, False, 'unittest', interval=2.5)
+
+        self.assertEqual(device['mode'], 'counter')
+        self.assertEqual(device['interval'], 2.5)
+        self.assertTrue(self.module._input_watcher.has_input(device['uuid']))
+        mock_task.assert_called_with(2.5, self.module._publish_counters, ANY)
+        self.assertTrue(mock_task.return_value.start.called)
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        self.assertFalse(device['uuid'] in self.module._counters)
+        self.assertIsNone(self.module._counters_task)
+        mock_remove_event_detect.assert_called_with(12)
+
+    @patch.object(GpioInputWatcher, '_add_event_detect')
+    def test_add_gpio_counter_default_interval(self, mock_add_event_detect):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('counter', 'GPIO18', 'counter', False, False, 'unittest')
+
+        self.assertEqual(device['interval'], Gpios.COUNTER_INTERVAL)
+        self.module._counters_task.stop()
+
+    def test_add_gpio_counter_invalid_interval(self):
+        self.init()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('counter', 'GPIO18', 'counter', False, False, 'unittest', interval=0)
+        self.assertEqual(str(cm.exception), 'Parameter "interval" is invalid (specified="0")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('counter', 'GPIO18', 'counter', False, False, 'unittest', interval='1')
+        self.assertEqual(str(cm.exception), 'Parameter "interval" is invalid (specified="1")')
+
+    @patch.object(GpioInputWatcher, '_add_event_detect')
+    def test_get_and_reset_counter(self, mock_add_event_detect):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('counter', 'GPIO18', 'counter', False, False, 'unittest')
+        self.module._counters_task.stop()
+        callback = mock_add_event_detect.call_args[0][2]
+        for _ in range(3):
+            callback(12)
+
+        self.assertEqual(self.module.get_counter(device['uuid'])['count'], 3)
+        self.assertEqual(self.module.reset_counter(device['uuid'])['count'], 3)
+        callback(12)
+        counter = self.module.get_counter(device['uuid'])
+        self.assertEqual(counter['count'], 1)
+        self.assertEqual(counter['total'], 4)
+
+    def test_get_counter_check_parameters(self):
+        self.init()
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.get_counter('123-456-789')
+        self.assertEqual(str(cm.exception), 'Device not found')
+
+        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'mode': 'input', 'gpio': 'GPIO18'})
+        with self.assertRaises(CommandError) as cm:
+            self.module.reset_counter('123-456-789')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "input" has no counter')
+
+    def test_publish_counters(self):
+        self.init()
+        counter = GpioPulseCounter()
+        counter.add_edge(time.monotonic())
+        counter.add_edge(time.monotonic())
+        self.module._counters = {
+            '123-456-789': {'counter': counter, 'gpio': 'GPIO18', 'interval': 1.0, 'next_publish': 0},
+            '456-789-123': {'counter': GpioPulseCounter(), 'gpio': 'GPIO19', 'interval': 60.0, 'next_publish': time.monotonic() + 60.0},
+        }
+
+        self.module.gpios_gpio_counter = Mock()
+
+        self.module._publish_counters()
+
+        self.assertEqual(self.module.gpios_gpio_counter.send.call_count, 1)
+        params = self.module.gpios_gpio_counter.send.call_args[1]['params']
+        self.assertEqual(self.module.gpios_gpio_counter.send.call_args[1]['device_id'], '123-456-789')
+        self.assertEqual(params['gpio'], 'GPIO18')
+        self.assertEqual(params['count'], 2)
+        self.assertCountEqual(params.keys(), GpiosGpioCounterEvent.EVENT_PARAMS)
+
+    def test_add_gpio_emission_policy(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', max_rate=5, window=0.5)
+
+        self.assertEqual(device['max_rate'], 5)
+        self.assertEqual(device['window'], 0.5)
+        self.assertTrue(device['uuid'] in self.module._emission_policies)
+        self.assertEqual(self.module.get_emission_stats()[device['uuid']], {'emitted': 0, 'merged': 0, 'dropped': 0})
+
+        device = self.module.update_gpio(device['uuid'], 'test', False, False, 'unittest', max_rate=0, window=0)
+        self.assertEqual(device['max_rate'], 0)
+        self.assertFalse(device['uuid'] in self.module._emission_policies)
+
+    def test_add_gpio_no_emission_policy(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest')
+
+        self.assertEqual(device['max_rate'], 0)
+        self.assertEqual(device['window'], 0)
+        self.assertEqual(self.module.get_emission_stats(), {})
+
+    def test_add_gpio_emission_policy_invalid_params(self):
+        self.init()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', max_rate=-1)
+        self.assertEqual(str(cm.exception), 'Parameter "max_rate" is invalid (specified="-1")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', window='1')
+        self.assertEqual(str(cm.exception), 'Parameter "window" is invalid (specified="1")')
+
+    def test_add_gpio_gestures(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', long_press=1.5, click_interval=0.05, hold_repeat=0.5)
+
+        self.assertEqual((device['long_press'], device['click_interval'], device['hold_repeat']), (1.5, 0.05, 0.5))
+        gesture = self.module._input_records[device['uuid']].gesture
+        self.assertEqual((gesture.long_press, gesture.click_interval, gesture.hold_repeat), (1.5, 0.05, 0.5))
+        self.assertEqual(self.module.get_gesture_stats()[device['uuid']], {'gestures': 0, 'pressed': False, 'clicks': 0, 'pressduration': 0.0})
+
+        device = self.module.update_gpio(device['uuid'], 'test', False, False, 'unittest', long_press=0, click_interval=0)
+        self.assertIsNone(self.module._input_records[device['uuid']].gesture)
+        self.assertEqual(self.module.get_gesture_stats(), {})
+
+    def test_add_gpio_gestures_invalid_params(self):
+        self.init()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', long_press=-1)
+        self.assertEqual(str(cm.exception), 'Parameter "long_press" is invalid (specified="-1")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', click_interval='1')
+        self.assertEqual(str(cm.exception), 'Parameter "click_interval" is invalid (specified="1")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', hold_repeat=True)
+        self.assertEqual(str(cm.exception), 'Parameter "hold_repeat" is invalid (specified="True")')
+
+    def test_input_callbacks_gestures(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', long_press=0.1, click_interval=0.05)
+
+        self.module._Gpios__input_on_callback(device['uuid'], time.monotonic())
+        self.module._Gpios__input_off_callback(device['uuid'], 0.01, time.monotonic())
+        self.module._Gpios__input_on_callback(device['uuid'], time.monotonic())
+        self.module._Gpios__input_off_callback(device['uuid'], 0.02, time.monotonic())
+        time.sleep(0.2)
+        self.module._Gpios__input_on_callback(device['uuid'], time.monotonic())
+        time.sleep(0.2)
+        self.module._Gpios__input_off_callback(device['uuid'], 0.2, time.monotonic())
+        time.sleep(0.1)
+
+        self.assertEqual(self.session.event_call_count('gpios.gpio.gesture'), 2)
+        self.session.assert_event_called_with('gpios.gpio.gesture', {'gpio': 'GPIO18', 'gesture': 'doubleclick', 'clicks': 2, 'duration': 0.02, 'repeat': 0}, device_id=device['uuid'])
+        self.session.assert_event_called_with('gpios.gpio.gesture', {'gpio': 'GPIO18', 'gesture': 'longpress', 'clicks': 0, 'duration': 0.1, 'repeat': 0}, device_id=device['uuid'])
+        self.assertEqual(self.session.event_call_count('gpios.gpio.on'), 3)
+
+    def test_gesture_cancelled_on_delete(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', long_press=0.05)
+        self.module._Gpios__input_on_callback(device['uuid'], time.monotonic())
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        time.sleep(0.15)
+
+        self.assertFalse(self.session.event_called('gpios.gpio.gesture'))
+
+    def test_input_callbacks_gestures_edge_timestamp(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', long_press=10.0)
+        gesture = self.module._input_records[device['uuid']].gesture
+
+        # dispatched callback runs late, press starts at edge time
+        self.module._Gpios__input_on_callback(device['uuid'], 123.0)
+
+        self.assertEqual(gesture.press_time, 123.0)
+        gesture.cancel()
+
+    def test_input_gestures_inverted_input_initially_low(self):
+        GpioInputWatcher._get_inputs_levels = Mock(side_effect=lambda pins: [GPIO.LOW] * len(pins))
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, True, 'unittest', long_press=0.05)
+        time.sleep(0.3)
+
+        # initial on callback of inverted input must not be seen as a press
+        self.assertEqual(self.module._input_records[device['uuid']].state.on, False)
+        self.assertIsNone(self.module._input_records[device['uuid']].gesture.press_time)
+        self.assertFalse(self.session.event_called('gpios.gpio.gesture'))
+
+    def test_input_callbacks_coalesced_flush_cancelled_on_delete(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest', window=0.1)
+        time.sleep(0.05)
+        policy = self.module._emission_policies[device['uuid']]
+
+        self.module._Gpios__input_on_callback(device['uuid'])
+        self.module._Gpios__input_off_callback(device['uuid'], 0.01)
+        self.assertEqual(len(self.module._timer_wheel), 1)
+        events_count = self.session.event_call_count('gpios.gpio.off')
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        time.sleep(0.2)
+
+        self.assertEqual(len(self.module._timer_wheel), 0)
+        self.assertEqual(self.session.event_call_count('gpios.gpio.off'), events_count)
+        self.assertIsNotNone(policy.pending)
+
+    def test_input_callbacks_coalesced(self):
+        self.init()
+        device = self.get_device()
+        device['mode'] = 'input'
+        self.module._emission_policies[device['uuid']] = GpioEmissionPolicy(window=0.1)
+        self.module._input_records[device['uuid']] = GpioInputRecord(device['uuid'], device['pin'], device['gpio'], device['inverted'], policy=self.module._emission_policies[device['uuid']])
+
+        self.module._Gpios__input_on_callback(device['uuid'])
+        self.module._Gpios__input_off_callback(device['uuid'], 0.01)
+        self.module._Gpios__input_on_callback(device['uuid'])
+        self.module._Gpios__input_off_callback(device['uuid'], 0.02)
+        self.assertEqual(self.session.event_call_count('gpios.gpio.on'), 1)
+        self.assertEqual(self.session.event_call_count('gpios.gpio.off'), 0)
+
+        time.sleep(0.2)
+        self.assertEqual(self.session.event_call_count('gpios.gpio.on'), 1)
+        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': 0.02, 'transitions': 3}, device_id=device['uuid'])
+        self.assertEqual(self.module.get_emission_stats()[device['uuid']], {'emitted': 2, 'merged': 2, 'dropped': 0})
+
+    def test_get_debounce_stats(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'testmod')
+
+        stats = self.module.get_debounce_stats()
+
+        self.assertTrue(device['uuid'] in stats)
+        self.assertCountEqual(stats[device['uuid']].keys(), ['bounces', 'glitches', 'pending'])
+
+    def test_set_input_backend(self):
+        self.init()
+
+        self.module.set_input_backend('chardev')
+
+        self.assertEqual(self.module.get_module_config()['inputbackend'], 'chardev')
+
+    def test_set_input_backend_check_parameters(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_input_backend(None)
+        self.assertEqual(str(cm.exception), 'Parameter "backend" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_input_backend('dummy')
+        self.assertEqual(str(cm.exception), 'Parameter "backend" is invalid (specified="dummy")')
+
+    def test_get_pins_usage(self):
+        self.init()
+        usage = self.module.get_pins_usage()
+        # logging.info(usage)
+        self.assertTrue(type(usage) is dict, 'get_pins_usage returns invalid type, dict awaited')
+
+        self.module._get_revision = Mock(return_value=3)
+        self.module._detect_board()
+        usage = self.module.get_pins_usage()
+        self.assertEqual(len(usage), 40, 'Number of pins usage is invalid, 40 awaited')
+        for pin in usage.values():
+            self.check_pin(pin)
+
+        self.module._get_revision = Mock(return_value=2)
+        self.module._detect_board()
+        usage = self.module.get_pins_usage()
+        self.assertEqual(len(usage), 26, 'Number of pins usage is invalid, 26 awaited')
+        for pin in usage.values():
+            self.check_pin(pin)
+
+        self.module._get_revision = Mock(return_value=1)
+        self.module._detect_board()
+        usage = self.module.get_pins_usage()
+        self.assertEqual(len(usage), 26, 'Number of pins usage is invalid, 26 awaited')
+        for pin in usage.values():
+            self.check_pin(pin)
+
+    def test_get_pins_usage_with_owner(self):
+        self.init()
+        usage = self.module.get_pins_usage()
+        # logging.info(usage)
+        self.assertTrue(type(usage) is dict, 'get_pins_usage returns invalid type, dict awaited')
+        self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'testmod')
+
+        self.module._get_revision = Mock(return_value=3)
+        self.module._detect_board()
+        usage = self.module.get_pins_usage()
+        # logging.debug('Usage: %s' % usage)
+
+        gpio18 = usage[12]
+        logging.debug('Gpio18: %s' % gpio18)
+        self.assertEqual(gpio18['label'], 'GPIO18')
+        self.assertEqual(gpio18['gpio']['assigned'], True)
+        self.assertEqual(gpio18['gpio']['owner'], 'testmod')
+
+    def test_get_pins_usage_persisted_devices(self):
+        self.init(start=False)
+        device = self.get_device()
+        del device['uuid']
+        self.module._add_device(device)
+
+        self.session.start_module(self.module)
+        usage = self.module.get_pins_usage()
+
+        self.assertEqual(usage[12]['gpio']['assigned'], True)
+        self.assertEqual(usage[12]['gpio']['owner'], 'unittest')
+
+    def test_get_pins_usage_cached(self):
+        self.init()
+        self.module._devices_index = Mock(wraps=self.module._devices_index)
+
+        usage1 = self.module.get_pins_usage()
+        usage2 = self.module.get_pins_usage()
+
+        self.assertIs(usage1, usage2)
+        self.assertFalse(self.module._devices_index.get_by_gpio.called)
+
+    def test_get_pins_usage_updated(self):
+        self.init()
+        usage = self.module.get_pins_usage()
+        version = self.module.get_pins_usage(0)['version']
+
+        device = self.module.add_gpio('test', 'GPIO18', 'output', False, False, 'testmod')
+        added = self.module.get_pins_usage()
+        self.assertEqual(added[12]['gpio'], {'assigned': True, 'owner': 'testmod'})
+        self.assertEqual(usage[12]['gpio'], {'assigned': False, 'owner': None})
+        self.assertIs(added[11], usage[11])
+        self.assertEqual(self.module.get_pins_usage(0)['version'], version + 1)
+
+        self.module.update_gpio(device['uuid'], 'renamed', False, False, 'testmod')
+        self.assertIs(self.module.get_pins_usage(), added)
+
+        reserved = self.module.reserve_gpio('reserved', 'GPIO19', 'onewire', 'testmod')
+        self.assertEqual(self.module.get_pins_usage()[35]['gpio'], {'assigned': True, 'owner': 'testmod'})
+        self.assertEqual(self.module.get_pins_usage(0)['version'], version + 2)
+
+        self.module.delete_gpio(device['uuid'], 'testmod')
+        self.module.delete_gpio(reserved['uuid'], 'testmod')
+        self.assertEqual(self.module.get_pins_usage(), usage)
+        self.assertEqual(self.module.get_pins_usage(0)['version'], version + 4)
+
+    def test_get_pins_usage_dnc_gpio_not_versioned(self):
+        self.init()
+        version = self.module.get_pins_usage(0)['version']
+
+        self.module.reserve_gpio('eeprom', 'GPIO0', 'eeprom', 'unittest')
+
+        self.assertIsNone(self.module.get_pins_usage()[27]['gpio'])
+        self.assertEqual(self.module.get_pins_usage(0)['version'], version)
+
+    def test_get_pins_usage_with_version(self):
+        self.init()
+
+        usage = self.module.get_pins_usage(0)
+        self.assertFalse(usage['unchanged'])
+        self.assertEqual(usage['pins'], self.module.get_pins_usage())
+
+        unchanged = self.module.get_pins_usage(usage['version'])
+        self.assertEqual(unchanged, {'version': usage['version'], 'unchanged': True, 'pins': None})
+
+        self.module.add_gpio('test', 'GPIO18', 'output', False, False, 'testmod')
+        changed = self.module.get_pins_usage(usage['version'])
+        self.assertFalse(changed['unchanged'])
+        self.assertEqual(changed['version'], usage['version'] + 1)
+        self.assertTrue(changed['pins'][12]['gpio']['assigned'])
+
+    def test_get_assigned_gpios(self):
+        self.init()
+        gpios = self.module.get_assigned_gpios()
+        self.assertTrue(type(gpios) is list, 'get_assigned_gpios returns invalid data type')
+        self.assertEqual(len(gpios), 0, 'Assigned gpios list should be empty')
+
+        gpio = 'GPIO18'
+        device = self.module.reserve_gpio('dummy', gpio, 'test', 'unittest')
+        self.assertEqual(device['gpio'], gpio, 'Reserved device gpio is invalid')
+        gpios = self.module.get_assigned_gpios()
+        self.assertEqual(len(gpios), 1, 'Assigned gpios list should be equal to 1')
+        self.assertEqual(gpios[0], gpio, 'Reserved gpio is invalid')
+
+    def test_get_raspi_gpios(self):
+        self.init()
+        self.module._get_revision = Mock()
+
+        # rev 1
+        self.module._get_revision.return_value = 1
+        self.module._detect_board()
+        self.assertDictEqual(self.module.get_raspi_gpios(), self.module.GPIOS_REV1)
+
+        # rev 2
+        self.module._get_revision.return_value = 2
+        self.module._detect_board()
+        self.assertDictEqual(self.module.get_raspi_gpios(), self.module.GPIOS_REV2)
+
+        # rev 3
+        self.module._get_revision.return_value = 3
+        self.module._detect_board()
+        gpios = copy.deepcopy(self.module.GPIOS_REV2)
+        gpios.update(self.module.GPIOS_REV3)
+        self.assertDictEqual(self.module.get_raspi_gpios(), gpios)
+
+        # invalid rev
+        self.module._get_revision.return_value = 4
+        self.module._detect_board()
+        self.assertDictEqual(self.module.get_raspi_gpios(), {})
+
+    def test_detect_board(self):
+        self.init()
+        self.module._get_revision = Mock(return_value=3)
+
+        self.module._detect_board()
+        for _ in range(3):
+            self.module.get_raspi_gpios()
+            self.module.get_pins_number()
+            self.module.get_pins_usage()
+            self.module.is_gpio_on('GPIO18')
+
+        self.module._get_revision.assert_called_once()
+        self.assertEqual(self.module._gpio_pins['GPIO18'], 12)
+        self.assertEqual(self.module._pin_labels[1], '3.3V')
+        self.assertEqual(self.module._pin_gpios[12], 'GPIO18')
+        self.assertNotIn(1, self.module._pin_gpios)
+        self.assertEqual(self.module._pin_gpios[27], 'GPIO0')
+        self.assertIsNone(self.module.get_pins_usage()[27]['gpio'])
+        self.assertEqual(len(self.module._pin_gpios), len(self.module._gpio_pins))
+        self.assertEqual(self.module.get_module_config()['revision'], 3)
+
+    def test_detect_board_tables_readonly(self):
+        self.init()
+
+        with self.assertRaises(TypeError):
+            self.module._gpio_pins['GPIO18'] = 666
+        with self.assertRaises(TypeError):
+            self.module._pin_labels[12] = 'dummy'
+        gpios = self.module.get_raspi_gpios()
+        gpios['GPIO18'] = 666
+        self.assertEqual(self.module.get_raspi_gpios()['GPIO18'], 12)
+
+    def test_board_tables_before_detection(self):
+        self.init(start=False)
+
+        for table in (self.module._gpio_pins, self.module._pin_labels, self.module._pin_gpios, self.module._pin_bits):
+            self.assertEqual(dict(table), {})
+            with self.assertRaises(TypeError):
+                table[12] = 'dummy'
+
+    def test_detect_board_invalid_revision(self):
+        self.init()
+        self.module._get_revision = Mock(return_value=4)
+
+        self.module._detect_board()
+
+        self.assertEqual(self.module.get_pins_usage(), {})
+        with self.assertRaises(InvalidParameter):
+            self.module.add_gpio('test', 'GPIO18', 'input', False, False, 'unittest')
 
     def test_get_pins_number(self):
         self.init()
-        self.module._get_revision = Mock()
+        self.module._get_revision = Mock()
+
+        # rev 1
+        self.module._get_revision.return_value = 1
+        self.module._detect_board()
+        self.assertEqual(self.module.get_pins_number(), 26)
+
+        # rev 2
+        self.module._get_revision.return_value = 2
+        self.module._detect_board()
+        self.assertEqual(self.module.get_pins_number(), 26)
+
+        # rev 3
+        self.module._get_revision.return_value = 3
+        self.module._detect_board()
+        self.assertEqual(self.module.get_pins_number(), 40)
+
+        # invalid rev
+        self.module._get_revision.return_value = 4
+        self.module._detect_board()
+        self.assertEqual(self.module.get_pins_number(), 0)
+
+    def test_reserve_gpio(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        self.assertTrue(type(device) is dict, 'reserve_gpio should return dict')
+        self.assertEqual(device['pin'], 12, 'Device pin should be 12 (for gpio18)')
+        self.assertEqual(device['inverted'], False, 'Device inverted value should be False')
+        self.assertEqual(device['owner'], data['owner'], 'Device owner is invalid')
+        self.assertEqual(device['gpio'], data['gpio'], 'Device gpio is invalid')
+        self.assertTrue('uuid' in device, 'Device should have uuid field')
+        self.assertEqual(device['on'], False, 'Device on value should be False')
+        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
+        self.assertEqual(device['keep'], False, 'Device keep flag is invalid')
+        self.assertEqual(device['subtype'], data['usage'], 'Device subtype is invalid')
+        self.assertEqual(device['mode'], Gpios.MODE_RESERVED, 'Device mode is invalid')
+        self.assertEqual(device['type'], 'gpio', 'Device type is invalid')
+
+    def test_reserve_gpio_ko_adddevice(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+        self.module._add_device = lambda data: None
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Unable to add device', 'Should raise exception when add_device failed')
+
+    def test_reserve_gpio_fix_owner(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'rpcserver'
+        }
+        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        self.assertEqual(device['owner'], 'gpios', 'Device owner is invalid')
+
+    def test_reserve_gpio_ko_parameters(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.reserve_gpio(None, data['gpio'], data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio('', data['gpio'], data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.reserve_gpio(data['name'], None, data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "gpio" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio(data['name'], '', data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "gpio" is invalid (specified="")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio(data['name'], 'GPIO50', data['usage'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Gpio "GPIO50" does not exist for this raspberry pi')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.reserve_gpio(data['name'], data['gpio'], None, data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "usage" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio(data['name'], data['gpio'], '', data['owner'])
+        self.assertEqual(str(cm.exception), 'Parameter "usage" is invalid (specified="")')
+
+        self.module.reserve_gpio('onewire-sensor', 'GPIO18', 'onewire', 'test')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio(data['name'], data['gpio'], 'test', data['owner'])
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" is already reserved for "onewire" usage')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.reserve_gpio('onewire-sensor', 'GPIO19', 'test', 'unittest')
+        self.assertEqual(str(cm.exception), 'Name "onewire-sensor" is already used')
+
+    def test_get_reserved_gpios(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        reserveds  = self.module.get_reserved_gpios(data['usage'])
+        self.assertTrue(type(reserveds) is list)
+        self.assertEqual(len(reserveds), 1)
+        self.assertEqual(reserveds[0]['uuid'], device['uuid'])
+
+        device = self.module.reserve_gpio(data['name']+'1', 'GPIO19', data['usage'], data['owner'])
+        reserveds  = self.module.get_reserved_gpios(data['usage'])
+        self.assertEqual(len(reserveds), 2)
+
+    def test_devices_index_maintained(self):
+        self.init()
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        reserved = self.module.reserve_gpio('name2', 'GPIO19', 'onewire', 'unittest')
+        self.assertEqual(self.module._devices_index.get_by_gpio('GPIO18')['uuid'], device['uuid'])
+        self.assertEqual(self.module._devices_index.get_by_pin(35)['uuid'], reserved['uuid'])
+        self.assertEqual(self.module._devices_index.get_by_usage('onewire')[0]['uuid'], reserved['uuid'])
+
+        self.module.update_gpio(device['uuid'], 'renamed', False, False, 'unittest')
+        self.assertIsNone(self.module._devices_index.get_by_name('name1'))
+        self.assertEqual(self.module._devices_index.get_by_name('renamed')['uuid'], device['uuid'])
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        self.module.delete_gpio(reserved['uuid'], 'unittest')
+        self.assertEqual(len(self.module._devices_index), 0)
+
+    def test_devices_index_built_at_startup(self):
+        self.init(start=False)
+        device = self.module._add_device(self.get_device())
+
+        self.session.start_module(self.module)
+
+        self.assertEqual(self.module._devices_index.get_by_gpio('GPIO18')['uuid'], device['uuid'])
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('other', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" is already used by other application')
+
+    def test_get_reserved_gpios_return_same(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+        device1 = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        device2 = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        self.assertEqual(device1, device2)
+
+    def test_get_reserved_gpios_invalid_params(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.get_reserved_gpios(None)
+        self.assertEqual(str(cm.exception), 'Parameter "usage" is missing')
+
+    def test_is_reserved_gpio(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'unittest'
+        }
+
+        # device reserved
+        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
+        self.assertTrue(self.module.is_reserved_gpio(data['gpio']), 'Gpio should be reserved')
+
+        # device not reserved
+        self.module.delete_gpio(device['uuid'], data['owner'])
+        self.assertFalse(self.module.is_reserved_gpio(data['gpio']), 'Gpio should not be reserved after device deletion')
+
+        # device 
+        self.module.add_gpio(device['uuid'], data['gpio'], 'output', False, False, data['owner'])
+        self.assertFalse(self.module.is_reserved_gpio(data['gpio']))
+
+    def test_add_gpio_input(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertTrue(isinstance(device, dict), 'add_gpio returns invalid data type')
+        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
+        self.assertEqual(device['gpio'], data['gpio'], 'Device gpiois invalid')
+        self.assertEqual(device['mode'], data['mode'], 'Device mode is invalid')
+        self.assertEqual(device['keep'], data['keep'], 'Device keep is invalid')
+        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
+        self.assertTrue('uuid' in device and len(device['uuid'])>0, 'Device has no uuid')
+        self.assertTrue(self.module._input_watcher.has_input(device['uuid']), 'No input watcher for device')
+        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
+        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+    def test_add_gpio_input_inverted(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': True,
+            'owner': 'unittest'
+        }
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertTrue(device['inverted'])
+        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+    def test_add_gpio_output(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertTrue(type(device) is dict, 'add_gpio returns invalid data type')
+        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
+        self.assertEqual(device['gpio'], data['gpio'], 'Device gpiois invalid')
+        self.assertEqual(device['mode'], data['mode'], 'Device mode is invalid')
+        self.assertEqual(device['keep'], data['keep'], 'Device keep is invalid')
+        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
+        self.assertTrue('uuid' in device and len(device['uuid'])>0, 'Device has no uuid')
+        self.assertEqual(len(self.module._input_watcher.get_inputs()), 0, 'No input watcher should run for output device')
+        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
+        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.OUT, initial=GPIO.HIGH)
+
+    def test_add_gpio_output_inverted(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': True,
+            'owner': 'unittest'
+        }
+        self.module._gpio_setup = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
+        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.OUT, initial=GPIO.LOW)
+
+    def test_add_gpio_ko_adddevice(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._add_device = lambda data: None
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Unable to add device', 'Should raise exception when add_device failed')
+
+    def test_add_gpio_ko_parameters(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.add_gpio(None, data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('', data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.add_gpio(data['name'], None, data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "gpio" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], '', data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "gpio" is invalid (specified="")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], 'GPIO50', data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Gpio "GPIO50" does not exist for this raspberry pi')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], None, data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "mode" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], '', data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "mode" is invalid (specified="")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], 'dummy', data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "mode" is invalid (specified="dummy")')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], data['mode'], None, data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "keep" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], data['mode'], '', data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "keep" must be of type "bool"')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], None, data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "inverted" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], '', data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "inverted" must be of type "bool"')
+
+        self.module.add_gpio('already-used-name', 'GPIO19', 'output', False, False, 'test')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio('already-used-name', data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(str(cm.exception), 'Name "already-used-name" is already used')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.add_gpio(data['name'], 'GPIO19', 'input', False, False, 'test')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO19" is already used by other application')
+
+    def test_add_gpio_fix_owner(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'usage': 'test',
+            'owner': 'rpcserver'
+        }
+        device = self.module.add_gpio(data['name'], data['gpio'], 'output', False, False, data['owner'])
+        self.assertEqual(device['owner'], 'gpios', 'Device owner is invalid')
 
-        # rev 1
-        self.module._get_revision.return_value = 1
-        self.assertEqual(self.module.get_pins_number(), 26)
+    def test_delete_gpio_input(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._deconfigure_gpio = Mock()
 
-        # rev 2
-        self.module._get_revision.return_value = 2
-        self.assertEqual(self.module.get_pins_number(), 26)
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']), 'Device should be deleted')
+        self.assertEqual(len(self.module.get_module_devices()), 0, 'Module should have device deleted')
+        self.module._deconfigure_gpio.assert_called_with(device)
 
-        # rev 3
-        self.module._get_revision.return_value = 3
-        self.assertEqual(self.module.get_pins_number(), 40)
+    def test_delete_gpio_output(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._deconfigure_gpio = Mock()
 
-        # invalid rev
-        self.module._get_revision.return_value = 4
-        self.assertEqual(self.module.get_pins_number(), 0)
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']), 'Device should be deleted')
+        self.assertEqual(len(self.module.get_module_devices()), 0, 'Module should have device deleted')
+        self.module._deconfigure_gpio.assert_called_with(device)
 
-    def test_reserve_gpio(self):
+    def test_delete_gpio_bad_owner(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._deconfigure_gpio = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        with self.assertRaises(Unauthorized) as cm:
+            self.module.delete_gpio(device['uuid'], 'another_owner')
+        self.assertEqual(cm.exception.message, 'Device can only be deleted by its owner')
+        
+        self.assertEqual(self.module._deconfigure_gpio.call_count, 0)
+
+    def test_delete_gpio_fix_owner(self):
         self.init()
         data = {
             'name': 'dummy',
             'gpio': 'GPIO18',
             'usage': 'test',
+            'owner': 'rpcserver',
+            'mode': 'output',
+        }
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], False, False, data['owner'])
+        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']))
+
+    def test_delete_gpio_check_params(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.delete_gpio(None, 'gpios')
+        self.assertEqual(str(cm.exception), 'Parameter "device_uuid" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.delete_gpio('123-456-789', 'gpios')
+        self.assertEqual(str(cm.exception), 'Device "123-456-789" does not exist')
+
+        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
+        with self.assertRaises(Unauthorized) as cm:
+            self.module.delete_gpio('123-456-789', 'gpios')
+        self.assertEqual(str(cm.exception), 'Device can only be deleted by its owner')
+
+    def test_delete_gpio_delete_device_failed(self):
+        self.init()
+        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
+        self.module._delete_device = Mock(return_value=False)
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.delete_gpio('123-456-789', 'dummy')
+        self.assertEqual(str(cm.exception), 'Failed to delete device "123-456-789"')
+
+    def test_update_gpio(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
             'owner': 'unittest'
         }
-        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        self.assertTrue(type(device) is dict, 'reserve_gpio should return dict')
-        self.assertEqual(device['pin'], 12, 'Device pin should be 12 (for gpio18)')
-        self.assertEqual(device['inverted'], False, 'Device inverted value should be False')
-        self.assertEqual(device['owner'], data['owner'], 'Device owner is invalid')
-        self.assertEqual(device['gpio'], data['gpio'], 'Device gpio is invalid')
-        self.assertTrue('uuid' in device, 'Device should have uuid field')
-        self.assertEqual(device['on'], False, 'Device on value should be False')
-        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
-        self.assertEqual(device['keep'], False, 'Device keep flag is invalid')
-        self.assertEqual(device['subtype'], data['usage'], 'Device subtype is invalid')
-        self.assertEqual(device['mode'], Gpios.MODE_RESERVED, 'Device mode is invalid')
-        self.assertEqual(device['type'], 'gpio', 'Device type is invalid')
+        self.module._reconfigure_gpio = Mock()
+
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        device = self.module.update_gpio(device['uuid'], 'dummynew', True, True, 'unittest')
+        self.assertTrue(type(device) is dict, 'update_gpio returns invalid data type')
+        self.assertEqual(device['name'], 'dummynew', 'Device name is invalid')
+        self.assertEqual(device['keep'], True, 'Device keep is invalid')
+        self.assertEqual(device['inverted'], True, 'Device inverted is invalid')
+        self.assertTrue(self.module._input_watcher.has_input(device['uuid']), 'No input watcher for device')
+        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
+        self.module._reconfigure_gpio.assert_called_with(device)
+
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._update_device = lambda uuid, data: False
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.update_gpio(device['uuid'], 'dummynew', True, True, 'unittest')
+        self.assertEqual(cm.exception.message, 'Failed to update device "%s"' % device['uuid'])
+
+    def test_update_gpio_fix_owner(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'gpios'
+        }
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        device = self.module.update_gpio(device['uuid'], 'newname', data['keep'], data['inverted'], 'rpcserver')
+        self.assertEqual(device['name'], 'newname')
+
+    def test_update_gpio_update_device_failed(self):
+        self.init()
+        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
+        self.module._update_device = Mock(return_value=False)
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.update_gpio('123-456-789', 'updatedname', False, False, 'dummy')
+        self.assertEqual(str(cm.exception), 'Failed to update device "123-456-789"')
+
+    def test_update_gpio_check_parameters(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_INPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.update_gpio(None, data['name'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "device_uuid" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.update_gpio('', data['name'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "device_uuid" is invalid (specified="")')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.update_gpio('123-456-789', data['name'], data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(str(cm.exception), 'Device "123-456-789" does not exist')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.update_gpio(device['uuid'], None, data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.update_gpio(device['uuid'], '', data['keep'], data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.update_gpio(device['uuid'], data['name'], None, data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "keep" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.update_gpio(device['uuid'], data['name'], '', data['inverted'], data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "keep" must be of type "bool"')
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.update_gpio(device['uuid'], data['name'], data['keep'], None, data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "inverted" is missing')
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.update_gpio(device['uuid'], data['name'], data['keep'], '', data['owner'])
+        self.assertEqual(cm.exception.message, 'Parameter "inverted" must be of type "bool"')
+
+        with self.assertRaises(Unauthorized) as cm:
+            self.module.update_gpio(device['uuid'], data['name'], data['keep'], data['inverted'], 'dummy')
+        self.assertEqual(cm.exception.message, 'Device can only be updated by its owner')
+
+    def test_turn_on(self):
+        self.init()
+        data = {
+            'name': 'dummy',
+            'gpio': 'GPIO18',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': False,
+            'owner': 'unittest'
+        }
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+
+        calls = self.session.event_call_count('gpios.gpio.on')
+        self.module.turn_on(device['uuid'])
+
+        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': False})
+        self.assertEqual(self.session.event_call_count('gpios.gpio.on'), calls + 1)
+
+    def test_turn_on_check_parameters(self):
+        self.init()
+        
+        with self.assertRaises(CommandError) as cm:
+            self.module.turn_on('123-456-789')
+        self.assertEqual(str(cm.exception), 'Device not found')
 
-    def test_reserve_gpio_ko_adddevice(self):
+        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'input', 'gpio': 'GPIO18'})
+        with self.assertRaises(CommandError) as cm:
+            self.module.turn_on('123-456-789')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "input" cannot be turned on')
+
+    def test_turn_off(self):
         self.init()
         data = {
             'name': 'dummy',
             'gpio': 'GPIO18',
-            'usage': 'test',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': False,
+            'inverted': False,
             'owner': 'unittest'
         }
-        self.module._add_device = lambda data: None
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
 
-        with self.assertRaises(CommandError) as cm:
-            self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Unable to add device', 'Should raise exception when add_device failed')
+        calls = self.session.event_call_count('gpios.gpio.off')
+        self.module.turn_off(device['uuid'])
 
-    def test_reserve_gpio_fix_owner(self):
+        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': 0})
+        self.assertEqual(self.session.event_call_count('gpios.gpio.off'), calls + 1)
+
+    def test_turn_off_check_parameters(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'rpcserver'
-        }
-        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        self.assertEqual(device['owner'], 'gpios', 'Device owner is invalid')
+        
+        with self.assertRaises(CommandError) as cm:
+            self.module.turn_off('123-456-789')
+        self.assertEqual(str(cm.exception), 'Device not found')
 
-    def test_reserve_gpio_ko_parameters(self):
+        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'input', 'gpio': 'GPIO18'})
+        with self.assertRaises(CommandError) as cm:
+            self.module.turn_off('123-456-789')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "input" cannot be turned off')
+
+    def test_is_on(self):
         self.init()
         data = {
             'name': 'dummy',
             'gpio': 'GPIO18',
-            'usage': 'test',
+            'mode': Gpios.MODE_OUTPUT,
+            'keep': True,
+            'inverted': False,
             'owner': 'unittest'
         }
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.reserve_gpio(None, data['gpio'], data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+        self.assertEqual(self.module.is_on(device['uuid']), False)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio('', data['gpio'], data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+        self.module.turn_on(device['uuid'])
+        self.assertEqual(self.module.is_on(device['uuid']), True)
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.reserve_gpio(data['name'], None, data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "gpio" is missing')
+    def test_is_on_check_parameters(self):
+        self.init()
+        
+        with self.assertRaises(CommandError) as cm:
+            self.module.is_on('123-456-789')
+        self.assertEqual(str(cm.exception), 'Device not found')
+
+        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'reserved', 'gpio': 'GPIO18', 'on': False})
+        with self.assertRaises(CommandError) as cm:
+            self.module.is_on('123-456-789')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "reserved" cannot be checked')
+
+    def test_is_gpio_on(self):
+        self.init()
+        mock_gpio_input = self.module._backend.input = Mock()
+
+        mock_gpio_input.return_value = True
+        self.assertTrue(self.module.is_gpio_on('GPIO18'))
+
+        mock_gpio_input.return_value = False
+        self.assertFalse(self.module.is_gpio_on('GPIO18'))
+
+    def test_is_gpio_on_check_parameters(self):
+        self.init()
 
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio(data['name'], '', data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "gpio" is invalid (specified="")')
+            self.module.is_gpio_on('hello')
+        self.assertEqual(str(cm.exception), 'Parameter "gpio" is invalid (specified="hello")')
+
+    def test_read_gpios(self):
+        self.init()
+        self.module._backend.inputs = Mock(return_value=[GPIO.HIGH, GPIO.LOW, GPIO.HIGH])
+
+        levels = self.module.read_gpios(['GPIO18', 'GPIO17', 'GPIO4'])
+
+        self.module._backend.inputs.assert_called_once_with([12, 11, 7])
+        self.assertEqual(levels, {'GPIO18': True, 'GPIO17': False, 'GPIO4': True})
+
+    def test_read_gpios_bitmask(self):
+        self.init()
+        self.module._backend.inputs = Mock(return_value=[GPIO.HIGH, GPIO.LOW, GPIO.HIGH])
+
+        mask = self.module.read_gpios(['GPIO18', 'GPIO17', 'GPIO4'], bitmask=True)
+
+        self.assertEqual(mask, (1 << 18) | (1 << 4))
+
+    def test_read_gpios_configured_gpios(self):
+        self.init()
+        self.module._backend.inputs = Mock(return_value=[GPIO.LOW, GPIO.HIGH])
+        self.module.add_gpio('output', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module.add_gpio('input', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.module.reserve_gpio('reserved', 'GPIO4', 'onewire', 'unittest')
+
+        levels = self.module.read_gpios()
+
+        self.assertEqual(levels, {'GPIO18': False, 'GPIO17': True})
+
+    def test_read_gpios_no_gpio(self):
+        self.init()
+
+        self.assertEqual(self.module.read_gpios(), {})
+        self.assertEqual(self.module.read_gpios([], bitmask=True), 0)
+
+    def test_read_gpios_check_parameters(self):
+        self.init()
 
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio(data['name'], 'GPIO50', data['usage'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Gpio "GPIO50" does not exist for this raspberry pi')
+            self.module.read_gpios('GPIO18')
+        self.assertEqual(str(cm.exception), 'Parameter "gpios" must be of type "list"')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.read_gpios(['GPIO18', 'GPIO99'])
+        self.assertEqual(str(cm.exception), 'Parameter "gpios" contains invalid gpio')
+        with self.assertRaises(InvalidParameter):
+            self.module.read_gpios(['GPIO18'], bitmask=1)
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.reserve_gpio(data['name'], data['gpio'], None, data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "usage" is missing')
+    def test_turn_on_off_write_behind(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module._update_config = Mock(wraps=self.module._update_config)
+        self.module._update_device = Mock()
+
+        with patch('backend.gpios.Timer') as timer_mock:
+            for _ in range(3):
+                self.module.turn_on(device['uuid'])
+                self.module.turn_off(device['uuid'])
+            self.module.turn_on(device['uuid'])
+
+        timer_mock.assert_called_once_with(10.0, self.module._flush_states)
+        self.assertFalse(self.module._update_config.called)
+        self.assertFalse(self.module._update_device.called)
+        self.assertTrue(self.module.is_on(device['uuid']))
+        self.assertTrue(self.module.get_module_devices()[device['uuid']]['on'])
+        self.assertFalse(self.module._get_device(device['uuid'])['on'])
+
+        self.assertTrue(self.module._flush_states())
+
+        timer_mock.return_value.cancel.assert_called_once()
+        self.module._update_config.assert_called_once()
+        self.assertTrue(self.module._get_device(device['uuid'])['on'])
+        self.assertTrue(self.module.is_on(device['uuid']))
+        stats = self.module.get_persist_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['changes'], 7)
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['coalesced'], 6)
+        self.assertGreaterEqual(stats['maxlatency'], stats['lastlatency'])
+
+    def test_turn_on_persist_delay_zero(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        self.module.set_persist_delay(0)
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module._update_config = Mock(wraps=self.module._update_config)
+
+        with patch('backend.gpios.Timer') as timer_mock:
+            self.module.turn_on(device['uuid'])
+
+        self.assertFalse(timer_mock.called)
+        self.module._update_config.assert_called_once()
+        self.assertTrue(self.module._get_device(device['uuid'])['on'])
+        self.assertEqual(self.module.get_persist_stats()['pending'], 0)
+
+    def test_turn_on_not_kept_not_persisted(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+
+        with patch('backend.gpios.Timer') as timer_mock:
+            self.module.turn_on(device['uuid'])
+
+        self.assertFalse(timer_mock.called)
+        self.assertEqual(self.module.get_persist_stats()['changes'], 0)
+
+    def test_flush_states_failed(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        with patch('backend.gpios.Timer'):
+            self.module.turn_on(device['uuid'])
+        self.module._update_config = Mock(return_value=False)
+
+        with patch('backend.gpios.Timer') as timer_mock:
+            self.assertFalse(self.module._flush_states())
+
+        stats = self.module.get_persist_stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['flushes'], 0)
+        self.assertTrue(self.module.is_on(device['uuid']))
+        # flush is retried after persist delay
+        timer_mock.assert_called_once_with(10.0, self.module._flush_states)
+        timer_mock.return_value.start.assert_called_once()
+
+    def test_flush_states_failed_persist_delay_zero(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        self.module.set_persist_delay(0)
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module._update_config = Mock(side_effect=[False, True])
+
+        with patch('backend.gpios.Timer') as timer_mock:
+            self.module.turn_on(device['uuid'])
+
+        timer_mock.assert_called_once_with(Gpios.PERSIST_RETRY_DELAY, self.module._flush_states)
+        self.assertEqual(self.module.get_persist_stats()['pending'], 1)
+        self.assertTrue(self.module._flush_states())
+        self.assertEqual(self.module.get_persist_stats()['pending'], 0)
+        self.assertEqual(self.module._update_config.call_count, 2)
 
+    def test_flush_states_nothing_to_save(self):
+        self.init()
+        self.module._update_config = Mock()
+
+        self.assertTrue(self.module._flush_states())
+
+        self.assertFalse(self.module._update_config.called)
+
+    def test_on_stop_flushes_states(self):
+        self.init(mock_on_stop=False)
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        with patch('backend.gpios.Timer'):
+            self.module.turn_on(device['uuid'])
+
+        self.module._on_stop()
+
+        self.assertTrue(self.module._get_device(device['uuid'])['on'])
+        self.assertEqual(self.module.get_persist_stats()['pending'], 0)
+
+    def test_delete_gpio_drops_pending_state(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        with patch('backend.gpios.Timer'):
+            self.module.turn_on(device['uuid'])
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+
+        self.assertEqual(self.module.get_persist_stats()['pending'], 0)
+        self.assertTrue(self.module._flush_states())
+
+    def test_set_persist_delay(self):
+        self.init()
+
+        self.module.set_persist_delay(2.5)
+
+        self.assertEqual(self.module.get_module_config()['persistdelay'], 2.5)
+
+    def test_set_persist_delay_invalid_parameters(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_persist_delay(None)
+        self.assertEqual(str(cm.exception), 'Parameter "delay" is missing')
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio(data['name'], data['gpio'], '', data['owner'])
-        self.assertEqual(str(cm.exception), 'Parameter "usage" is invalid (specified="")')
+            self.module.set_persist_delay(-1)
+        self.assertEqual(str(cm.exception), 'Parameter "delay" is invalid (specified="-1")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_persist_delay('1')
+        self.assertEqual(str(cm.exception), 'Parameter "delay" is invalid (specified="1")')
 
-        self.module.reserve_gpio('onewire-sensor', 'GPIO18', 'onewire', 'test')
+    def test_set_persist_delay_failed(self):
+        self.init()
+        self.module._set_config_field = Mock(return_value=False)
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_persist_delay(1)
+        self.assertEqual(str(cm.exception), 'Unable to save persist delay')
+
+    def test_get_snapshot(self):
+        self.init()
+        self.module._backend.output = Mock()
+        self.module._input_watcher.poll_period = 0.01
+        self.module.add_gpio('input', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        output = self.module.add_gpio('output', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module.reserve_gpio('reserved', 'GPIO4', 'onewire', 'unittest')
+        time.sleep(0.05)
+
+        snapshot = self.module.get_snapshot()
+
+        self.assertGreater(snapshot['sequence'], 0)
+        self.assertLessEqual(snapshot['timestamp'], time.monotonic())
+        self.assertEqual(snapshot['configured'], 1 << 17 | 1 << 18)
+        # input sampled high, output off is high
+        self.assertEqual(snapshot['levels'], 1 << 17 | 1 << 18)
+
+        self.module.turn_on(output['uuid'])
+        time.sleep(0.05)
+        new_snapshot = self.module.get_snapshot()
+        self.assertGreater(new_snapshot['sequence'], snapshot['sequence'])
+        self.assertEqual(new_snapshot['levels'], 1 << 17)
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_get_snapshot_pwm(self, get_channel_mock):
+        self.init()
+        self.module._backend.output = Mock()
+        device = self.add_pwm()
+        inverted = self.module.add_gpio('pwm2', 'GPIO27', Gpios.MODE_PWM, False, True, 'unittest')
+
+        # duty cycle 0: inactive level (high for not inverted pwm)
+        self.assertEqual(self.module.get_snapshot()['levels'], 1 << 17)
+
+        self.module.set_duty_cycle(device['uuid'], 40)
+        self.module.set_duty_cycle(inverted['uuid'], 40)
+        self.assertEqual(self.module.get_snapshot()['levels'], 1 << 27)
+        self.module._software_pwm.stop()
+
+    def test_get_snapshot_no_gpio(self):
+        self.init()
+
+        snapshot = self.module.get_snapshot()
+
+        self.assertEqual(snapshot['configured'], 0)
+        self.assertEqual(snapshot['levels'], 0)
+
+    def test_get_gpio_state(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.module._input_states[device['uuid']].update(GPIO.HIGH, False, 10.0)
+        self.module._input_states[device['uuid']].update(GPIO.LOW, True, 10.5)
+        self.module._backend.input = Mock()
+
+        result = self.module.get_gpio_state('GPIO17')
+
+        self.assertEqual(result['gpio'], 'GPIO17')
+        self.assertEqual(result['level'], GPIO.LOW)
+        self.assertTrue(result['on'])
+        self.assertEqual(result['timestamp'], 10.5)
+        self.assertEqual(result['changes'], 1)
+        self.assertGreater(result['now'], 0)
+        self.assertFalse(self.module._backend.input.called)
+
+    def test_get_gpio_state_invalid_parameters(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+
+        with self.assertRaises(MissingParameter):
+            self.module.get_gpio_state(None)
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio(data['name'], data['gpio'], 'test', data['owner'])
-        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" is already reserved for "onewire" usage')
+            self.module.get_gpio_state('GPIO99')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO99" does not exist for this raspberry pi')
+        with self.assertRaises(CommandError) as cm:
+            self.module.get_gpio_state('GPIO18')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" is not a watched input')
+
+    def test_input_live_state(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        state = self.module._input_states[device['uuid']]
+        self.module._backend.input = Mock(return_value=GPIO.HIGH)
+
+        # not sampled yet
+        self.assertFalse(self.module.is_on(device['uuid']))
+        state.update(GPIO.LOW, True, 10.0)
+
+        self.assertTrue(self.module.is_on(device['uuid']))
+        self.assertFalse(self.module.is_gpio_on('GPIO17'))
+        self.assertFalse(self.module._backend.input.called)
+        # gpio not watched is read
+        self.assertTrue(self.module.is_gpio_on('GPIO27'))
+
+    def test_input_live_state_sampled(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, True, 'unittest')
+        time.sleep(0.1)
+
+        # sampled level is high and input is inverted
+        self.assertTrue(self.module.is_on(device['uuid']))
+        self.assertTrue(self.module.is_gpio_on('GPIO17'))
+        self.assertEqual(self.module.get_gpio_state('GPIO17')['changes'], 0)
+
+    def test_input_live_state_kept_on_update_dropped_on_delete(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        state = self.module._input_states[device['uuid']]
+
+        self.module.update_gpio(device['uuid'], 'name2', False, True, 'unittest')
+        self.assertIs(self.module._input_states[device['uuid']], state)
+
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        self.assertNotIn(device['uuid'], self.module._input_states)
+
+    def test_get_gpio_history(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        history = self.module._histories[device['uuid']]
+        history.add(10.0, GPIO.HIGH)
+        history.add(10.25, GPIO.LOW)
+        history.add(10.5, GPIO.HIGH)
+
+        result = self.module.get_gpio_history('GPIO17')
+
+        self.assertEqual(result['gpio'], 'GPIO17')
+        self.assertEqual(result['start'], 10.0)
+        self.assertEqual(result['offsets'], [0, 250000, 500000])
+        self.assertEqual(result['levels'], '101')
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['size'], GpioEdgeHistory.SIZE)
+        self.assertGreater(result['now'], 0)
+        result = self.module.get_gpio_history('GPIO17', since=10.0, limit=1)
+        self.assertEqual(result['start'], 10.5)
+        self.assertEqual(result['levels'], '1')
+        result = self.module.get_gpio_history('GPIO17', since=10.5)
+        self.assertIsNone(result['start'])
+        self.assertEqual(result['offsets'], [])
+
+    def test_get_gpio_history_invalid_parameters(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
 
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.reserve_gpio('onewire-sensor', 'GPIO19', 'test', 'unittest')
-        self.assertEqual(str(cm.exception), 'Name "onewire-sensor" is already used')
+            self.module.get_gpio_history('GPIO99')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO99" does not exist for this raspberry pi')
+        with self.assertRaises(CommandError) as cm:
+            self.module.get_gpio_history('GPIO18')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" is not a watched input')
+        with self.assertRaises(CommandError) as cm:
+            self.module.get_gpio_history('GPIO17')
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO17" is not a watched input')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.get_gpio_history('GPIO17', limit=0)
+        self.assertEqual(str(cm.exception), 'Parameter "limit" is invalid (specified="0")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.get_gpio_history('GPIO17', since='1')
+        self.assertEqual(str(cm.exception), 'Parameter "since" is invalid (specified="1")')
 
-    def test_get_reserved_gpios(self):
+    def test_history_kept_on_update_dropped_on_delete(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'unittest'
-        }
-        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        reserveds  = self.module.get_reserved_gpios(data['usage'])
-        self.assertTrue(type(reserveds) is list)
-        self.assertEqual(len(reserveds), 1)
-        self.assertEqual(reserveds[0]['uuid'], device['uuid'])
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        history = self.module._histories[device['uuid']]
 
-        device = self.module.reserve_gpio(data['name']+'1', 'GPIO19', data['usage'], data['owner'])
-        reserveds  = self.module.get_reserved_gpios(data['usage'])
-        self.assertEqual(len(reserveds), 2)
+        self.module.update_gpio(device['uuid'], 'name2', False, True, 'unittest')
+        self.assertIs(self.module._histories[device['uuid']], history)
 
-    def test_get_reserved_gpios_return_same(self):
+        self.module.delete_gpio(device['uuid'], 'unittest')
+        self.assertNotIn(device['uuid'], self.module._histories)
+
+    def test_set_history_size(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'unittest'
-        }
-        device1 = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        device2 = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        self.assertEqual(device1, device2)
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
 
-    def test_get_reserved_gpios_invalid_params(self):
+        self.module.set_history_size(16)
+
+        self.assertEqual(self.module.get_module_config()['historysize'], 16)
+        self.assertEqual(self.module._histories[device['uuid']].size, 16)
+        device = self.module.add_gpio('name2', 'GPIO27', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.assertEqual(self.module._histories[device['uuid']].size, 16)
+
+    def test_set_history_size_invalid_parameters(self):
         self.init()
 
         with self.assertRaises(MissingParameter) as cm:
-            self.module.get_reserved_gpios(None)
-        self.assertEqual(str(cm.exception), 'Parameter "usage" is missing')
+            self.module.set_history_size(None)
+        self.assertEqual(str(cm.exception), 'Parameter "size" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_history_size(0)
+        self.assertEqual(str(cm.exception), 'Parameter "size" must be between 1 and 65536')
+        self.module._set_config_field = Mock(return_value=False)
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_history_size(10)
+        self.assertEqual(str(cm.exception), 'Unable to save history size')
 
-    def test_is_reserved_gpio(self):
+    def test_set_dispatch_policy(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'unittest'
-        }
+        dispatcher = self.module._dispatcher
 
-        # device reserved
-        device = self.module.reserve_gpio(data['name'], data['gpio'], data['usage'], data['owner'])
-        self.assertTrue(self.module.is_reserved_gpio(data['gpio']), 'Gpio should be reserved')
+        self.module.set_dispatch_policy(16, 4, 'block')
 
-        # device not reserved
-        self.module.delete_gpio(device['uuid'], data['owner'])
-        self.assertFalse(self.module.is_reserved_gpio(data['gpio']), 'Gpio should not be reserved after device deletion')
+        config = self.module.get_module_config()
+        self.assertEqual((config['dispatchqueuesize'], config['dispatchworkers'], config['dispatchoverflow']), (16, 4, 'block'))
+        stats = self.module.get_dispatch_stats()
+        self.assertEqual((stats['queuesize'], stats['workers'], stats['overflow']), (16, 4, 'block'))
+        dispatcher.join(1.0)
+        self.assertFalse(dispatcher.is_alive())
+        self.assertTrue(self.module._dispatcher.is_alive())
+
+    def test_set_dispatch_policy_invalid_parameters(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_dispatch_policy(None, 2, 'block')
+        self.assertEqual(str(cm.exception), 'Parameter "queue_size" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_dispatch_policy(0, 2, 'block')
+        self.assertEqual(str(cm.exception), 'Parameter "queue_size" must be between 1 and 65536')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_dispatch_policy(16, 9, 'block')
+        self.assertEqual(str(cm.exception), 'Parameter "workers" must be between 1 and 8')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_dispatch_policy(16, 2, 'dummy')
+        self.assertEqual(str(cm.exception), 'Parameter "overflow" must be one of drop_oldest, drop_newest, block')
+        self.module._update_config = Mock(return_value=False)
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_dispatch_policy(16, 2, 'block')
+        self.assertEqual(str(cm.exception), 'Unable to save dispatch policy')
+
+    def test_input_callbacks_dispatched(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        release = threading.Event()
+        send = self.module.gpios_gpio_on.send
+        self.module.gpios_gpio_on.send = Mock(side_effect=lambda *args, **kwargs: release.wait(2.0))
+
+        start = time.monotonic()
+        self.module._Gpios__dispatch_input_on(device['uuid'], None)
+        self.module._Gpios__dispatch_input_on(device['uuid'], None)
+
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertGreaterEqual(self.module.get_dispatch_stats()['depth'], 1)
+        release.set()
+        deadline = time.monotonic() + 1.0
+        while self.module.gpios_gpio_on.send.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.module.gpios_gpio_on.send.call_count, 2)
+        self.module.gpios_gpio_on.send = send
+
+    def test_gpio_backend_default(self):
+        self.init()
+
+        self.assertIsInstance(self.module._backend, GpioRpiBackend)
+        self.assertEqual(self.module.get_module_config()['gpiobackend'], 'rpigpio')
+
+    def test_gpio_backend_simulated(self):
+        self.init(start=False)
+        self.module._set_config_field('gpio_backend', 'simulated')
+        self.session.start_module(self.module)
+        backend = self.module._backend
+        self.module.add_gpio('input', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.module.add_gpio('output', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        backend.wire(12, 13)
+
+        self.assertIsInstance(backend, GpioSimulatedBackend)
+        self.assertEqual(self.module.get_module_config()['gpiobackend'], 'simulated')
+        self.assertIs(self.module._input_watcher.backend, backend)
+        output_uuid = self.module._devices_index.get_by_gpio('GPIO18')['uuid']
+        # outputs are active low
+        self.module.set_outputs({output_uuid: True})
+        self.assertFalse(self.module.is_gpio_on('GPIO27'))
+        self.module.set_outputs({output_uuid: False})
+        self.assertTrue(self.module.is_gpio_on('GPIO27'))
+
+    def test_gpio_backend_fallback(self):
+        self.init(start=False)
+        self.module._set_config_field('gpio_backend', 'chardev')
+        with patch.object(GpioChardevBackend, '_open_chip', side_effect=OSError('No such file')):
+            self.session.start_module(self.module)
+
+        self.assertIsInstance(self.module._backend, GpioRpiBackend)
+
+    def test_set_gpio_backend(self):
+        self.init()
 
-        # device 
-        self.module.add_gpio(device['uuid'], data['gpio'], 'output', False, False, data['owner'])
-        self.assertFalse(self.module.is_reserved_gpio(data['gpio']))
+        self.module.set_gpio_backend('chardev')
 
-    def test_add_gpio_input(self):
+        self.assertEqual(self.module._get_config_field('gpio_backend'), 'chardev')
+        self.assertEqual(self.module.get_module_config()['gpiobackend'], 'rpigpio')
+
+    def test_set_gpio_backend_invalid_parameters(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._gpio_setup = Mock()
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertTrue(isinstance(device, dict), 'add_gpio returns invalid data type')
-        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
-        self.assertEqual(device['gpio'], data['gpio'], 'Device gpiois invalid')
-        self.assertEqual(device['mode'], data['mode'], 'Device mode is invalid')
-        self.assertEqual(device['keep'], data['keep'], 'Device keep is invalid')
-        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
-        self.assertTrue('uuid' in device and len(device['uuid'])>0, 'Device has no uuid')
-        self.assertTrue(device['uuid'] in self.module._input_watchers, 'No input watcher for device')
-        self.assertTrue(self.module._input_watchers[device['uuid']].is_alive, 'No input watcher running for device')
-        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
-        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        with self.assertRaises(MissingParameter):
+            self.module.set_gpio_backend(None)
+        with self.assertRaises(InvalidParameter):
+            self.module.set_gpio_backend('wiringpi')
+        self.module._set_config_field = Mock(return_value=False)
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_gpio_backend('chardev')
+        self.assertEqual(str(cm.exception), 'Unable to save gpio backend')
 
-    def test_add_gpio_input_inverted(self):
+    def test_get_sampler_stats(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': True,
-            'owner': 'unittest'
-        }
-        self.module._gpio_setup = Mock()
+        self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertTrue(device['inverted'])
-        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        stats = self.module.get_sampler_stats()
 
-    def test_add_gpio_output(self):
+        self.assertEqual(stats['backend'], 'polling')
+        self.assertTrue(stats['alive'])
+        self.assertEqual(stats['restarts'], 0)
+        self.assertEqual(stats['inputs'], 1)
+        for key in ('loops', 'overruns', 'bounces', 'cputime', 'lastalive'):
+            self.assertIn(key, stats)
+
+    def test_check_input_watcher_restarts_dead_watcher(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._gpio_setup = Mock()
+        self.module._gpio_output = Mock()
+        input_device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        counter_device = self.module.add_gpio('name2', 'GPIO27', Gpios.MODE_COUNTER, False, False, 'unittest')
+        self.module.add_gpio('name3', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        counter = self.module._counters[counter_device['uuid']]['counter']
+        dead_watcher = self.module._input_watcher
+        dead_watcher.stop()
+        dead_watcher.join(1.0)
+
+        self.module._check_input_watcher()
+
+        watcher = self.module._input_watcher
+        self.assertIsNot(watcher, dead_watcher)
+        self.assertTrue(watcher.is_alive())
+        self.assertCountEqual(watcher.get_inputs(), [input_device['uuid'], counter_device['uuid']])
+        self.assertIs(self.module._counters[counter_device['uuid']]['counter'], counter)
+        self.assertEqual(self.module.get_sampler_stats()['restarts'], 1)
+        self.assertGreaterEqual(watcher.loops, dead_watcher.loops)
+
+    def test_check_input_watcher_alive(self):
+        self.init()
+        watcher = self.module._input_watcher
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertTrue(type(device) is dict, 'add_gpio returns invalid data type')
-        self.assertEqual(device['name'], data['name'], 'Device name is invalid')
-        self.assertEqual(device['gpio'], data['gpio'], 'Device gpiois invalid')
-        self.assertEqual(device['mode'], data['mode'], 'Device mode is invalid')
-        self.assertEqual(device['keep'], data['keep'], 'Device keep is invalid')
-        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
-        self.assertTrue('uuid' in device and len(device['uuid'])>0, 'Device has no uuid')
-        self.assertEqual(len(self.module._input_watchers), 0, 'No input watcher should run for output device')
-        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
-        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.OUT, initial=GPIO.HIGH)
+        self.module._check_input_watcher()
 
-    def test_add_gpio_output_inverted(self):
+        self.assertIs(self.module._input_watcher, watcher)
+        self.assertEqual(self.module.get_sampler_stats()['restarts'], 0)
+
+    def test_get_stats(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': True,
-            'owner': 'unittest'
-        }
-        self.module._gpio_setup = Mock()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.module._latencies[device['uuid']].detection.add(0.001)
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(device['inverted'], data['inverted'], 'Device inverted is invalid')
-        self.module._gpio_setup.assert_called_with(device['pin'], GPIO.OUT, initial=GPIO.LOW)
+        self.module._Gpios__input_on_callback(device['uuid'])
+        stats = self.module.get_stats(reset=False)
 
-    def test_add_gpio_ko_adddevice(self):
+        self.assertEqual(list(stats.keys()), ['GPIO17'])
+        self.assertEqual(stats['GPIO17']['detection']['count'], 1)
+        self.assertEqual(stats['GPIO17']['send']['count'], 1)
+        self.assertEqual(self.module.get_stats()['GPIO17']['send']['count'], 1)
+        self.assertEqual(self.module.get_stats()['GPIO17']['send']['count'], 0)
+
+    def test_get_stats_dispatcher_queue_wait(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._add_device = lambda data: None
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        release = threading.Event()
+        send = self.module.gpios_gpio_on.send
+        self.module.gpios_gpio_on.send = Mock(side_effect=lambda *args, **kwargs: release.wait(2.0))
+        # drop initial value callback stats
+        time.sleep(0.1)
+        self.module.get_stats()
+
+        # second callback waits in queue while first one is blocked sending its event
+        self.module._Gpios__dispatch_input_on(device['uuid'], time.monotonic())
+        self.module._Gpios__dispatch_input_on(device['uuid'], time.monotonic())
+        time.sleep(0.1)
+        release.set()
+        deadline = time.monotonic() + 1.0
+        while self.module.gpios_gpio_on.send.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.module.gpios_gpio_on.send = send
+
+        stats = self.module.get_stats()['GPIO17']['queue']
+        self.assertEqual(stats['count'], 2)
+        self.assertGreaterEqual(stats['max'], 0.1)
+
+    def test_get_stats_event_rate_limited_not_measured(self):
+        self.init()
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest', window=10)
 
-        with self.assertRaises(CommandError) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Unable to add device', 'Should raise exception when add_device failed')
+        self.module._Gpios__input_on_callback(device['uuid'])
+        with patch('backend.gpios.Timer'):
+            self.module._Gpios__input_off_callback(device['uuid'], 0.1)
 
-    def test_add_gpio_ko_parameters(self):
+        self.assertEqual(self.module.get_stats()['GPIO17']['send']['count'], 1)
+
+    def test_get_stats_dropped_on_delete(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
+        device = self.module.add_gpio('name1', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.add_gpio(None, data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+        self.module.delete_gpio(device['uuid'], 'unittest')
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio('', data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+        self.assertEqual(self.module.get_stats(), {})
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.add_gpio(data['name'], None, data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "gpio" is missing')
+    def test_get_stats_invalid_parameters(self):
+        self.init()
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], '', data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "gpio" is invalid (specified="")')
+        with self.assertRaises(InvalidParameter):
+            self.module.get_stats(reset='yes')
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], 'GPIO50', data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Gpio "GPIO50" does not exist for this raspberry pi')
+    def test_pulse(self):
+        self.init()
+        self.module._timer_wheel.tick = 0.005
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module.set_persist_delay(60)
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], None, data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "mode" is missing')
+        action_id = self.module.pulse(device['uuid'], 0.05)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], '', data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "mode" is invalid (specified="")')
+        self.assertIsInstance(action_id, int)
+        self.assertTrue(self.module.is_on(device['uuid']))
+        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': False})
+        time.sleep(0.15)
+        self.assertFalse(self.module.is_on(device['uuid']))
+        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': ANY})
+        self.assertEqual(self.module.get_scheduler_stats()['fired'], 1)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], 'dummy', data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "mode" is invalid (specified="dummy")')
+    def test_pulse_replaces_running_pulse(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], data['mode'], None, data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "keep" is missing')
+        first_id = self.module.pulse(device['uuid'], 10)
+        self.module.pulse(device['uuid'], 20)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], data['mode'], '', data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "keep" must be of type "bool"')
+        self.assertFalse(self.module.cancel_action(first_id))
+        stats = self.module.get_scheduler_stats()
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['cancelled'], 1)
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], None, data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "inverted" is missing')
+    def test_pulse_invalid_parameters(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        input_device = self.module.add_gpio('name2', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
 
+        with self.assertRaises(CommandError) as cm:
+            self.module.pulse('unknown', 1)
+        self.assertEqual(str(cm.exception), 'Device not found')
+        with self.assertRaises(CommandError) as cm:
+            self.module.pulse(input_device['uuid'], 1)
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO17" configured as "input" cannot be turned on or off')
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.pulse(device['uuid'], None)
+        self.assertEqual(str(cm.exception), 'Parameter "duration" is missing')
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], '', data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "inverted" must be of type "bool"')
+            self.module.pulse(device['uuid'], 0)
+        self.assertEqual(str(cm.exception), 'Parameter "duration" is invalid (specified="0")')
 
-        self.module.add_gpio('already-used-name', 'GPIO19', 'output', False, False, 'test')
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio('already-used-name', data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(str(cm.exception), 'Name "already-used-name" is already used')
+    def test_schedule_after(self):
+        self.init()
+        self.module._timer_wheel.tick = 0.005
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module.set_persist_delay(60)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.add_gpio(data['name'], 'GPIO19', 'input', False, False, 'test')
-        self.assertEqual(str(cm.exception), 'Gpio "GPIO19" is already used by other application')
+        self.module.schedule(device['uuid'], True, after=0.03)
 
-    def test_add_gpio_fix_owner(self):
+        self.assertFalse(self.module.is_on(device['uuid']))
+        time.sleep(0.1)
+        self.assertTrue(self.module.is_on(device['uuid']))
+
+    def test_schedule_at(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'rpcserver'
-        }
-        device = self.module.add_gpio(data['name'], data['gpio'], 'output', False, False, data['owner'])
-        self.assertEqual(device['owner'], 'gpios', 'Device owner is invalid')
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module._timer_wheel.add = Mock(return_value=12)
 
-    def test_delete_gpio_input(self):
+        with patch('backend.gpios.time.time', return_value=1000.0):
+            with patch('backend.gpios.time.monotonic', return_value=50.0):
+                action_id = self.module.schedule(device['uuid'], False, at=1010.0)
+
+        self.assertEqual(action_id, 12)
+        self.module._timer_wheel.add.assert_called_once_with(60.0, ANY, [device['uuid'], False], group=device['uuid'])
+
+    def test_schedule_invalid_parameters(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._deconfigure_gpio = Mock()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']), 'Device should be deleted')
-        self.assertEqual(len(self.module.get_module_devices()), 0, 'Module should have device deleted')
-        self.module._deconfigure_gpio.assert_called_with(device)
+        with self.assertRaises(CommandError) as cm:
+            self.module.schedule('unknown', True, after=1)
+        self.assertEqual(str(cm.exception), 'Device not found')
+        with self.assertRaises(InvalidParameter):
+            self.module.schedule(device['uuid'], 'on', after=1)
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.schedule(device['uuid'], True)
+        self.assertEqual(str(cm.exception), 'Parameter "at" or "after" must be specified')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.schedule(device['uuid'], True, after=-1)
+        self.assertEqual(str(cm.exception), 'Parameter "after" is invalid (specified="-1")')
 
-    def test_delete_gpio_output(self):
+    def test_cancel_action(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._deconfigure_gpio = Mock()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        self.module.set_persist_delay(60)
+        action_id = self.module.schedule(device['uuid'], True, after=0.02)
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']), 'Device should be deleted')
-        self.assertEqual(len(self.module.get_module_devices()), 0, 'Module should have device deleted')
-        self.module._deconfigure_gpio.assert_called_with(device)
+        self.assertTrue(self.module.cancel_action(action_id))
+        self.assertFalse(self.module.cancel_action(action_id))
+        time.sleep(0.06)
+        self.assertFalse(self.module.is_on(device['uuid']))
 
-    def test_delete_gpio_bad_owner(self):
+    def test_delete_gpio_cancels_actions(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._deconfigure_gpio = Mock()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module.pulse(device['uuid'], 10)
+        self.module.schedule(device['uuid'], True, after=10)
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        with self.assertRaises(Unauthorized) as cm:
-            self.module.delete_gpio(device['uuid'], 'another_owner')
-        self.assertEqual(cm.exception.message, 'Device can only be deleted by its owner')
-        
-        self.assertEqual(self.module._deconfigure_gpio.call_count, 0)
+        self.module.delete_gpio(device['uuid'], 'unittest')
 
-    def test_delete_gpio_fix_owner(self):
+        self.assertEqual(self.module.get_scheduler_stats()['pending'], 0)
+        self.assertEqual(self.module._pulses, {})
+
+    def test_update_gpio_cancels_actions(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'usage': 'test',
-            'owner': 'rpcserver',
-            'mode': 'output',
-        }
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], False, False, data['owner'])
-        self.assertTrue(self.module.delete_gpio(device['uuid'], data['owner']))
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module.schedule(device['uuid'], True, after=10)
 
-    def test_delete_gpio_check_params(self):
+        self.module.update_gpio(device['uuid'], 'name2', False, False, 'unittest')
+
+        self.assertEqual(self.module.get_scheduler_stats()['pending'], 0)
+
+    def test_scheduled_action_on_deleted_device(self):
         self.init()
+        self.module._gpio_output = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module._delete_device(device['uuid'])
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.delete_gpio(None, 'gpios')
-        self.assertEqual(str(cm.exception), 'Parameter "device_uuid" is missing')
+        # must not raise
+        self.module._Gpios__run_action(device['uuid'], True)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.delete_gpio('123-456-789', 'gpios')
-        self.assertEqual(str(cm.exception), 'Device "123-456-789" does not exist')
+    def test_on_stop_joins_threads(self):
+        self.init(mock_on_stop=False)
+        self.module._input_watcher.poll_period = 10.0
+        self.module.add_gpio('input', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        time.sleep(0.05)
 
-        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
-        with self.assertRaises(Unauthorized) as cm:
-            self.module.delete_gpio('123-456-789', 'gpios')
-        self.assertEqual(str(cm.exception), 'Device can only be deleted by its owner')
+        start = time.monotonic()
+        self.module._on_stop()
 
-    def test_delete_gpio_delete_device_failed(self):
-        self.init()
-        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
-        self.module._delete_device = Mock(return_value=False)
+        self.assertFalse(self.module._input_watcher.is_alive())
+        self.assertFalse(self.module._timer_wheel.is_alive())
+        self.assertLess(time.monotonic() - start, 0.5)
 
-        with self.assertRaises(CommandError) as cm:
-            self.module.delete_gpio('123-456-789', 'dummy')
-        self.assertEqual(str(cm.exception), 'Failed to delete device "123-456-789"')
+    def test_on_stop_join_timeout(self):
+        self.init(mock_on_stop=False)
+        self.module.STOP_TIMEOUT = 0.1
+        self.module._input_watcher.stop()
+        self.module._input_watcher = Mock()
+        self.module._input_watcher.is_alive.return_value = True
+        self.module.logger = Mock()
 
-    def test_update_gpio(self):
+        self.module._on_stop()
+
+        timeout = self.module._input_watcher.join.call_args[0][0]
+        self.assertLessEqual(timeout, 0.1)
+        self.module.logger.warning.assert_called_once_with('Mock thread still running after 0.1s')
+
+    def test_reconfigure_input_latency(self):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._reconfigure_gpio = Mock()
+        self.module._input_watcher.poll_period = 10.0
+        device = self.module.add_gpio('input', 'GPIO17', Gpios.MODE_INPUT, False, False, 'unittest')
+        time.sleep(0.05)
+        self.module.gpios_gpio_on = Mock()
 
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        device = self.module.update_gpio(device['uuid'], 'dummynew', True, True, 'unittest')
-        self.assertTrue(type(device) is dict, 'update_gpio returns invalid data type')
-        self.assertEqual(device['name'], 'dummynew', 'Device name is invalid')
-        self.assertEqual(device['keep'], True, 'Device keep is invalid')
-        self.assertEqual(device['inverted'], True, 'Device inverted is invalid')
-        self.assertTrue(device['uuid'] in self.module._input_watchers, 'No input watcher for device')
-        self.assertTrue(self.module._input_watchers[device['uuid']].is_alive, 'No input watcher running for device')
-        self.assertEqual(len(self.module.get_module_devices()), 1, 'Module should have 1 device stored')
-        self.module._reconfigure_gpio.assert_called_with(device)
+        start = time.monotonic()
+        self.module.update_gpio(device['uuid'], 'input', False, True, 'unittest')
+        while not self.module.gpios_gpio_on.send.called and time.monotonic() - start < 1.0:
+            time.sleep(0.001)
 
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._update_device = lambda uuid, data: False
+        self.assertTrue(self.module.gpios_gpio_on.send.called)
+        self.assertLess(time.monotonic() - start, 0.1)
 
-        with self.assertRaises(CommandError) as cm:
-            self.module.update_gpio(device['uuid'], 'dummynew', True, True, 'unittest')
-        self.assertEqual(cm.exception.message, 'Failed to update device "%s"' % device['uuid'])
+    def test_on_stop_stops_timer_wheel(self):
+        self.init(mock_on_stop=False)
 
-    def test_update_gpio_fix_owner(self):
+        self.module._on_stop()
+
+        self.module._timer_wheel.join(1.0)
+        self.assertFalse(self.module._timer_wheel.is_alive())
+
+    def add_pwm(self, gpio='GPIO17', keep=False, inverted=False, frequency=None):
+        self.module._gpio_setup = Mock()
+        self.module._gpio_output = Mock()
+        self.module.gpios_gpio_pwm = Mock()
+        return self.module.add_gpio('pwm', gpio, Gpios.MODE_PWM, keep, inverted, 'unittest', frequency=frequency)
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_add_gpio_pwm_software(self, get_channel_mock):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'gpios'
-        }
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
-        device = self.module.update_gpio(device['uuid'], 'newname', data['keep'], data['inverted'], 'rpcserver')
-        self.assertEqual(device['name'], 'newname')
 
-    def test_update_gpio_update_device_failed(self):
+        device = self.add_pwm(frequency=50)
+
+        self.assertEqual(device['mode'], Gpios.MODE_PWM)
+        self.assertEqual(device['frequency'], 50)
+        self.assertEqual(device['dutycycle'], 0)
+        self.assertFalse(device['on'])
+        self.module._gpio_setup.assert_called_with(11, GPIO.OUT, initial=GPIO.HIGH)
+        self.assertTrue(self.module._software_pwm.has_channel(11))
+        self.assertIsNone(self.module._pwms[device['uuid']]['hardware'])
+        # engine drives backend without taking outputs lock on each edge
+        self.assertEqual(self.module._software_pwm.set_level, self.module._backend.output)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_add_gpio_pwm_default_frequency(self, get_channel_mock):
         self.init()
-        self.module._get_device = Mock(return_value={'uuid': '123-456-789', 'owner': 'dummy'})
-        self.module._update_device = Mock(return_value=False)
 
-        with self.assertRaises(CommandError) as cm:
-            self.module.update_gpio('123-456-789', 'updatedname', False, False, 'dummy')
-        self.assertEqual(str(cm.exception), 'Failed to update device "123-456-789"')
+        device = self.add_pwm()
 
-    def test_update_gpio_check_parameters(self):
+        self.assertEqual(device['frequency'], Gpios.PWM_FREQUENCY)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_add_gpio_pwm_hardware(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_INPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.update_gpio(None, data['name'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "device_uuid" is missing')
+        device = self.add_pwm(gpio='GPIO18', frequency=5000)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.update_gpio('', data['name'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "device_uuid" is invalid (specified="")')
+        hardware_mock.assert_called_once_with(0)
+        hardware_mock.return_value.start.assert_called_once_with(5000, 100.0)
+        self.assertIsNone(self.module._software_pwm)
+        self.assertFalse(self.module._gpio_setup.called)
+        self.assertEqual(self.module._pwms[device['uuid']]['hardware'], hardware_mock.return_value)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.update_gpio('123-456-789', data['name'], data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(str(cm.exception), 'Device "123-456-789" does not exist')
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_add_gpio_pwm_hardware_channel_used(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
+        hardware_mock.return_value.channel = 0
+        self.init()
+        self.add_pwm(gpio='GPIO18')
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.update_gpio(device['uuid'], None, data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is missing')
+        device = self.module.add_gpio('pwm2', 'GPIO12', Gpios.MODE_PWM, False, False, 'unittest')
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.update_gpio(device['uuid'], '', data['keep'], data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "name" is invalid (specified="")')
+        hardware_mock.assert_called_once_with(0)
+        self.assertTrue(self.module._software_pwm.has_channel(32))
+        self.assertIsNone(self.module._pwms[device['uuid']]['hardware'])
+        self.module._software_pwm.stop()
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.update_gpio(device['uuid'], data['name'], None, data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "keep" is missing')
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_add_gpio_pwm_invalid_frequency(self, get_channel_mock):
+        self.init()
 
         with self.assertRaises(InvalidParameter) as cm:
-            self.module.update_gpio(device['uuid'], data['name'], '', data['inverted'], data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "keep" must be of type "bool"')
+            self.add_pwm(frequency=0)
+        self.assertEqual(str(cm.exception), 'Parameter "frequency" is invalid (specified="0")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.add_pwm(frequency=5000)
+        self.assertEqual(str(cm.exception), 'Parameter "frequency" is invalid (software pwm frequency must be lower than 1000.0)')
 
-        with self.assertRaises(MissingParameter) as cm:
-            self.module.update_gpio(device['uuid'], data['name'], data['keep'], None, data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "inverted" is missing')
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_set_duty_cycle_software(self, get_channel_mock):
+        self.init()
+        device = self.add_pwm()
+        self.module._software_pwm.set_duty_cycle = Mock()
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.update_gpio(device['uuid'], data['name'], data['keep'], '', data['owner'])
-        self.assertEqual(cm.exception.message, 'Parameter "inverted" must be of type "bool"')
+        self.assertTrue(self.module.set_duty_cycle(device['uuid'], 40))
 
-        with self.assertRaises(Unauthorized) as cm:
-            self.module.update_gpio(device['uuid'], data['name'], data['keep'], data['inverted'], 'dummy')
-        self.assertEqual(cm.exception.message, 'Device can only be updated by its owner')
+        self.module._software_pwm.set_duty_cycle.assert_called_once_with(11, 40)
+        self.module.gpios_gpio_pwm.send.assert_called_once_with(params={'gpio': 'GPIO17', 'dutycycle': 40, 'frequency': 100.0}, device_id=device['uuid'])
+        self.assertEqual(self.module.get_persist_stats()['changes'], 0)
+        self.module._software_pwm.stop()
 
-    def test_turn_on(self):
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_set_duty_cycle_hardware(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._gpio_output = Mock()
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        device = self.add_pwm(gpio='GPIO18', inverted=True)
 
-        calls = self.session.event_call_count('gpios.gpio.on')
-        self.module.turn_on(device['uuid'])
+        self.module.set_duty_cycle(device['uuid'], 40)
 
-        self.session.assert_event_called_with('gpios.gpio.on', {'gpio': 'GPIO18', 'init': False})
+        hardware_mock.return_value.set_duty_cycle.assert_called_once_with(40)
 
-    def test_turn_on_check_parameters(self):
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_set_duty_cycle_keep(self, get_channel_mock):
         self.init()
-        
+        device = self.add_pwm(keep=True)
+
+        with patch('backend.gpios.Timer'):
+            self.module.set_duty_cycle(device['uuid'], 60)
+        self.assertTrue(self.module.is_on(device['uuid']))
+        self.module._flush_states()
+
+        saved = self.module._get_device(device['uuid'])
+        self.assertEqual(saved['dutycycle'], 60)
+        self.assertTrue(saved['on'])
+
+        # duty cycle restored at startup
+        self.module._Gpios__stop_pwm(saved)
+        self.module._software_pwm.add_channel = Mock()
+        self.module._configure_gpio(saved)
+        self.module._software_pwm.add_channel.assert_called_once_with(11, 100.0, 60, GPIO.LOW)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_set_duty_cycle_invalid_parameters(self, get_channel_mock):
+        self.init()
+        device = self.add_pwm()
+        output = self.module.add_gpio('output', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+
         with self.assertRaises(CommandError) as cm:
-            self.module.turn_on('123-456-789')
+            self.module.set_duty_cycle('dummy', 10)
         self.assertEqual(str(cm.exception), 'Device not found')
-
-        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'input', 'gpio': 'GPIO18'})
         with self.assertRaises(CommandError) as cm:
-            self.module.turn_on('123-456-789')
-        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "input" cannot be turned on')
+            self.module.set_duty_cycle(output['uuid'], 10)
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "output" is not a running pwm')
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_duty_cycle(device['uuid'], None)
+        self.assertEqual(str(cm.exception), 'Parameter "duty_cycle" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_duty_cycle(device['uuid'], 101)
+        self.assertEqual(str(cm.exception), 'Parameter "duty_cycle" is invalid (specified="101")')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_duty_cycle(device['uuid'], -1)
+        self.assertEqual(str(cm.exception), 'Parameter "duty_cycle" is invalid (specified="-1")')
+        self.module._software_pwm.stop()
 
-    def test_turn_off(self):
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_set_frequency_software(self, get_channel_mock):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': False,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._gpio_output = Mock()
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        device = self.add_pwm()
+        self.module._software_pwm.set_frequency = Mock()
 
-        calls = self.session.event_call_count('gpios.gpio.off')
-        self.module.turn_off(device['uuid'])
+        self.assertTrue(self.module.set_frequency(device['uuid'], 20))
 
-        self.session.assert_event_called_with('gpios.gpio.off', {'gpio': 'GPIO18', 'init': False, 'duration': 0})
+        self.module._software_pwm.set_frequency.assert_called_once_with(11, 20)
+        self.assertEqual(self.module._get_device(device['uuid'])['frequency'], 20)
+        self.module.gpios_gpio_pwm.send.assert_called_once_with(params={'gpio': 'GPIO17', 'dutycycle': 0, 'frequency': 20}, device_id=device['uuid'])
+        self.module._software_pwm.stop()
 
-    def test_turn_off_check_parameters(self):
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_set_frequency_hardware(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
         self.init()
-        
-        with self.assertRaises(CommandError) as cm:
-            self.module.turn_off('123-456-789')
-        self.assertEqual(str(cm.exception), 'Device not found')
+        device = self.add_pwm(gpio='GPIO18')
+        self.module.set_duty_cycle(device['uuid'], 30)
 
-        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'input', 'gpio': 'GPIO18'})
-        with self.assertRaises(CommandError) as cm:
-            self.module.turn_off('123-456-789')
-        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "input" cannot be turned off')
+        self.module.set_frequency(device['uuid'], 20000)
 
-    def test_is_on(self):
+        hardware_mock.return_value.set_frequency.assert_called_once_with(20000, 70.0)
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_set_frequency_invalid_parameters(self, get_channel_mock):
         self.init()
-        data = {
-            'name': 'dummy',
-            'gpio': 'GPIO18',
-            'mode': Gpios.MODE_OUTPUT,
-            'keep': True,
-            'inverted': False,
-            'owner': 'unittest'
-        }
-        self.module._gpio_output = Mock()
-        device = self.module.add_gpio(data['name'], data['gpio'], data['mode'], data['keep'], data['inverted'], data['owner'])
+        device = self.add_pwm()
 
-        self.assertEqual(self.module.is_on(device['uuid']), False)
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_frequency(device['uuid'], None)
+        self.assertEqual(str(cm.exception), 'Parameter "frequency" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_frequency(device['uuid'], 2000)
+        self.assertEqual(str(cm.exception), 'Parameter "frequency" is invalid (software pwm frequency must be lower than 1000.0)')
+        self.module._software_pwm.stop()
 
-        self.module.turn_on(device['uuid'])
-        self.assertEqual(self.module.is_on(device['uuid']), True)
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_delete_gpio_pwm(self, get_channel_mock):
+        self.init()
+        device = self.add_pwm()
 
-    def test_is_on_check_parameters(self):
+        self.module.delete_gpio(device['uuid'], 'unittest')
+
+        self.assertFalse(self.module._software_pwm.has_channel(11))
+        self.module._gpio_output.assert_called_with(11, GPIO.HIGH)
+        with self.assertRaises(CommandError):
+            self.module.set_duty_cycle(device['uuid'], 10)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_update_gpio_pwm_inverted(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
         self.init()
-        
-        with self.assertRaises(CommandError) as cm:
-            self.module.is_on('123-456-789')
-        self.assertEqual(str(cm.exception), 'Device not found')
+        device = self.add_pwm(gpio='GPIO18')
+        self.module.set_duty_cycle(device['uuid'], 30)
 
-        self.module._get_device = Mock(return_value={'name': 'test', 'uuid':'123-456-789', 'mode': 'reserved', 'gpio': 'GPIO18', 'on': False})
-        with self.assertRaises(CommandError) as cm:
-            self.module.is_on('123-456-789')
-        self.assertEqual(str(cm.exception), 'Gpio "GPIO18" configured as "reserved" cannot be checked')
+        self.module.update_gpio(device['uuid'], 'pwm', False, True, 'unittest')
+
+        # pwm keeps running, only levels are swapped
+        hardware_mock.return_value.stop.assert_not_called()
+        hardware_mock.return_value.set_duty_cycle.assert_called_with(30)
+        pwm = self.module._pwms[device['uuid']]
+        self.assertEqual((pwm['activelevel'], pwm['inactivelevel']), (GPIO.HIGH, GPIO.LOW))
+        self.assertEqual(pwm['dutycycle'], 30)
 
-    @patch('backend.gpios.GPIO_input')
-    def test_is_gpio_on(self, mock_gpio_input):
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_update_gpio_pwm_keeps_duty_cycle(self, get_channel_mock):
         self.init()
+        device = self.add_pwm()
+        self.module.set_duty_cycle(device['uuid'], 40)
+        self.module._software_pwm.add_channel = Mock()
 
-        mock_gpio_input.return_value = True
-        self.assertTrue(self.module.is_gpio_on('GPIO18'))
+        self.module.update_gpio(device['uuid'], 'pwm', False, False, 'unittest')
 
-        mock_gpio_input.return_value = False
-        self.assertFalse(self.module.is_gpio_on('GPIO18'))
+        self.assertEqual(self.module._pwms[device['uuid']]['dutycycle'], 40)
+        self.assertTrue(self.module._software_pwm.has_channel(11))
+        self.module._software_pwm.add_channel.assert_not_called()
 
-    def test_is_gpio_on_check_parameters(self):
+        self.module.update_gpio(device['uuid'], 'pwm', False, True, 'unittest')
+
+        self.module._software_pwm.add_channel.assert_called_once_with(11, 100.0, 40, GPIO.HIGH)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm.get_channel', return_value=None)
+    def test_update_gpio_pwm_keep_saves_live_duty_cycle(self, get_channel_mock):
         self.init()
+        device = self.add_pwm()
+        self.module.set_duty_cycle(device['uuid'], 40)
 
-        with self.assertRaises(InvalidParameter) as cm:
-            self.module.is_gpio_on('hello')
-        self.assertEqual(str(cm.exception), 'Parameter "gpio" is invalid (specified="hello")')
+        updated = self.module.update_gpio(device['uuid'], 'pwm', True, False, 'unittest')
+
+        self.assertEqual(updated['dutycycle'], 40)
+        self.assertEqual(self.module._get_device(device['uuid'])['dutycycle'], 40)
+        self.assertEqual(self.module._pwms[device['uuid']]['dutycycle'], 40)
+        self.module._software_pwm.stop()
+
+    @patch('backend.gpios.GpioHardwarePwm')
+    def test_on_stop_stops_pwms(self, hardware_mock):
+        hardware_mock.get_channel.return_value = 0
+        self.init(mock_on_stop=False)
+        self.add_pwm(gpio='GPIO18')
+        hardware_mock.get_channel.return_value = None
+        self.module.add_gpio('pwm2', 'GPIO17', Gpios.MODE_PWM, False, False, 'unittest')
+
+        self.module._on_stop()
+
+        hardware_mock.return_value.stop.assert_called_once()
+        self.module._software_pwm.join(1.0)
+        self.assertFalse(self.module._software_pwm.is_alive())
 
     def test_reset_gpios(self):
         self.init()
@@ -1034,6 +4386,7 @@ class TestGpios(unittest.TestCase):
             'owner': 'unittest'
         }
         self.module._gpio_output = Mock()
+        self.module._gpio_outputs = Mock()
 
         device1 = self.module.add_gpio('name1', 'GPIO18', data['mode'], data['keep'], data['inverted'], data['owner'])
         device2 = self.module.add_gpio('name2', 'GPIO19', data['mode'], data['keep'], data['inverted'], data['owner'])
@@ -1044,6 +4397,94 @@ class TestGpios(unittest.TestCase):
         self.module.reset_gpios()
         self.assertEqual(self.module.is_on(device1['uuid']), False)
         self.assertEqual(self.module.is_on(device2['uuid']), False)
+        self.module._gpio_outputs.assert_called_once_with([12, 35], [GPIO.HIGH, GPIO.HIGH])
+
+    def test_reset_gpios_no_output(self):
+        self.init()
+        self.module.set_outputs = Mock()
+
+        self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_INPUT, False, False, 'unittest')
+        self.module.reset_gpios()
+
+        self.assertFalse(self.module.set_outputs.called)
+
+    def test_set_outputs(self):
+        self.init()
+        self.module._gpio_output = Mock()
+        self.module._gpio_outputs = Mock()
+        self.module.gpios_outputs_update = Mock()
+        device1 = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        device2 = self.module.add_gpio('name2', 'GPIO19', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        device3 = self.module.add_gpio('name3', 'GPIO20', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module._update_config = Mock(wraps=self.module._update_config)
+        self.module._update_device = Mock()
+
+        self.assertTrue(self.module.set_outputs({
+            device1['uuid']: True,
+            device2['uuid']: False,
+            device3['uuid']: True,
+        }))
+
+        self.module._gpio_outputs.assert_called_once_with([12, 35, 38], [GPIO.LOW, GPIO.HIGH, GPIO.LOW])
+        self.assertFalse(self.module._gpio_output.called)
+        self.assertFalse(self.module._update_config.called)
+        self.assertEqual(self.module.get_persist_stats()['pending'], 2)
+        self.module._flush_states()
+        self.module._update_config.assert_called_once()
+        self.assertFalse(self.module._update_device.called)
+        self.assertTrue(self.module.is_on(device1['uuid']))
+        self.assertFalse(self.module.is_on(device2['uuid']))
+        self.assertFalse(self.module.is_on(device3['uuid']))
+        self.module.gpios_outputs_update.send.assert_called_once_with(params={
+            'outputs': {
+                device1['uuid']: {'gpio': 'GPIO18', 'on': True},
+                device2['uuid']: {'gpio': 'GPIO19', 'on': False},
+                device3['uuid']: {'gpio': 'GPIO20', 'on': True},
+            }
+        })
+
+    def test_set_outputs_not_kept(self):
+        self.init()
+        self.module._gpio_outputs = Mock()
+        self.module.gpios_outputs_update = Mock()
+        device = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, False, False, 'unittest')
+        self.module._update_config = Mock()
+
+        self.module.set_outputs({device['uuid']: True})
+
+        self.assertFalse(self.module._update_config.called)
+        self.module.gpios_outputs_update.send.assert_called_once()
+
+    def test_set_outputs_validates_before_writing(self):
+        self.init()
+        self.module._gpio_outputs = Mock()
+        self.module.gpios_outputs_update = Mock()
+        device1 = self.module.add_gpio('name1', 'GPIO18', Gpios.MODE_OUTPUT, True, False, 'unittest')
+        device2 = self.module.add_gpio('name2', 'GPIO19', Gpios.MODE_INPUT, False, False, 'unittest')
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_outputs({device1['uuid']: True, device2['uuid']: True})
+        self.assertEqual(str(cm.exception), 'Gpio "GPIO19" configured as "input" cannot be turned on or off')
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_outputs({device1['uuid']: True, 'unknown': True})
+        self.assertEqual(str(cm.exception), 'Device "unknown" not found')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_outputs({device1['uuid']: True, 'unknown': 1})
+        self.assertEqual(str(cm.exception), 'Parameter "outputs" is invalid (state of "unknown" must be a bool)')
+
+        self.assertFalse(self.module._gpio_outputs.called)
+        self.assertFalse(self.module.gpios_outputs_update.send.called)
+        self.assertFalse(self.module.is_on(device1['uuid']))
+
+    def test_set_outputs_invalid_parameters(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_outputs(None)
+        self.assertEqual(str(cm.exception), 'Parameter "outputs" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_outputs([])
+        self.assertEqual(str(cm.exception), 'Parameter "outputs" must be of type "dict"')
 
 
 
@@ -1056,11 +4497,61 @@ class TestsGpiosGpioOnEvent(unittest.TestCase):
         self.event = self.session.setup_event(GpiosGpioOnEvent)
 
     def test_event_params(self):
-        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'init'])
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'init', 'transitions'])
+
+
+
+
+class TestsGpiosGpioCounterEvent(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+        self.event = self.session.setup_event(GpiosGpioCounterEvent)
+
+    def test_event_params(self):
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'count', 'rate', 'frequency', 'interval'])
+
+
+
+
+class TestsGpiosOutputsUpdateEvent(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+        self.event = self.session.setup_event(GpiosOutputsUpdateEvent)
+
+    def test_event_params(self):
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['outputs'])
+
+
+
+
+class TestsGpiosGpioPwmEvent(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+        self.event = self.session.setup_event(GpiosGpioPwmEvent)
+
+    def test_event_params(self):
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'dutycycle', 'frequency'])
 
 
 
 
+class TestsGpiosGpioGestureEvent(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(level=logging.FATAL, format=u'%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s')
+        self.session = session.TestSession(self)
+        self.event = self.session.setup_event(GpiosGpioGestureEvent)
+
+    def test_event_params(self):
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'gesture', 'clicks', 'duration', 'repeat'])
+
+
 class TestsGpiosGpioOffEvent(unittest.TestCase):
 
     def setUp(self):
@@ -1069,7 +4560,7 @@ class TestsGpiosGpioOffEvent(unittest.TestCase):
         self.event = self.session.setup_event(GpiosGpioOffEvent)
 
     def test_event_params(self):
-        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'duration', 'init'])
+        self.assertCountEqual(self.event.EVENT_PARAMS, ['gpio', 'duration', 'init', 'transitions'])
         
 
 